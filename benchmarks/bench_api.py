@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+bench_api.py
+
+Load-tests the production server (news_grouping_app.serve) on a synthetic
+database: N articles from the last two weeks, one in two in a group of a
+random category, inserted through the normal triggers.
+
+For each worker count, starts the server with that many gunicorn workers,
+then runs --clients client processes, each sending requests back to back on a
+keep-alive connection for --seconds. The requests cycle through a mix of
+home groups, a category page, a group's articles and a search. Reports
+requests/s, p50/p95 latency and errors per worker count. Throughput scales
+with workers only up to the number of CPU cores, which the report prints.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_api                           # 1, 2 and 4 workers
+    python -m benchmarks.bench_api --workers 1,4,8 --clients 32 --seconds 20
+"""
+
+import argparse
+import http.client
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from news_grouping_app.db.database import setup_database
+
+CATEGORIES = [
+    "Cybersecurity & Data Privacy",
+    "Artificial Intelligence & Machine Learning",
+    "Business, Finance & Trade",
+    "Other",
+]
+WORDS = [f"w{i}" for i in range(5000)]
+
+
+def build_database(db_path, n_articles, seed=5):
+    rng = random.Random(seed)
+    setup_database(db_path)
+    conn = sqlite3.connect(db_path)
+    now = datetime.now(timezone.utc)
+    rows = []
+    for i in range(1, n_articles + 1):
+        published = now - timedelta(minutes=rng.randrange(14 * 24 * 60))
+        rows.append(
+            (i, f"https://example.com/{i}", " ".join(rng.choices(WORDS, k=8)),
+             " ".join(rng.choices(WORDS, k=120)), published.strftime("%Y-%m-%d %H:%M:%S"))
+        )
+    conn.executemany("INSERT INTO articles (id, link, title, content, published_date) VALUES (?, ?, ?, ?, ?)", rows)
+    n_groups = max(n_articles // 20, 1)
+    conn.executemany(
+        "INSERT INTO two_phase_article_groups (group_id, main_topic, sub_topic, group_label, description) VALUES (?, ?, '', ?, ?)",
+        [(g, rng.choice(CATEGORIES), " ".join(rng.choices(WORDS, k=3)), " ".join(rng.choices(WORDS, k=20)))
+         for g in range(1, n_groups + 1)],
+    )
+    conn.executemany(
+        "INSERT INTO two_phase_article_group_memberships (article_id, group_id) VALUES (?, ?)",
+        [(i, rng.randint(1, n_groups)) for i in range(1, n_articles + 1, 2)],
+    )
+    conn.commit()
+    conn.close()
+    return n_groups
+
+
+def request_paths(n_groups, seed):
+    rng = random.Random(seed)
+    while True:
+        yield "/api/home_groups"
+        yield f"/api/category_groups?category={rng.choice(CATEGORIES).replace(' ', '%20').replace('&', '%26')}&limit=20"
+        yield f"/api/groups/{rng.randint(1, n_groups)}/articles"
+        yield f"/api/search?q={rng.choice(WORDS)}"
+
+
+def run_client(port, n_groups, seconds, seed):
+    """Send requests for `seconds`; returns (latencies, errors)."""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    latencies, errors = [], 0
+    paths = request_paths(n_groups, seed)
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        try:
+            conn.request("GET", next(paths))
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - t0)
+    conn.close()
+    return latencies, errors
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(db_path, workers, threads, port):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "news_grouping_app.serve", "--db", db_path, "--bind", f"127.0.0.1:{port}",
+         "--workers", str(workers), "--threads", str(threads)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            conn.request("GET", "/api/home_groups")
+            if conn.getresponse().status == 200:
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"Server with {workers} workers did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=50000)
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts")
+    parser.add_argument("--threads", type=int, default=4, help="Threads per worker")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent client processes")
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    n_groups = build_database(db_path, args.articles)
+    print(f"{args.articles} articles in {n_groups} groups; {os.cpu_count()} CPU cores; {args.clients} clients")
+
+    for workers in [int(w) for w in args.workers.split(",")]:
+        port = free_port()
+        server = start_server(db_path, workers, args.threads, port)
+        try:
+            with ProcessPoolExecutor(max_workers=args.clients) as pool:
+                futures = [
+                    pool.submit(run_client, port, n_groups, args.seconds, seed)
+                    for seed in range(args.clients)
+                ]
+                results = [future.result() for future in futures]
+        finally:
+            server.terminate()
+            server.wait()
+        latencies = sorted(latency for client, _ in results for latency in client)
+        errors = sum(client_errors for _, client_errors in results)
+        if not latencies:
+            print(f"{workers:>2} workers: no successful requests ({errors} errors)")
+            continue
+        p50 = latencies[len(latencies) // 2]
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(
+            f"{workers:>2} workers x {args.threads} threads: {len(latencies) / args.seconds:8.1f} req/s  "
+            f"p50 {p50 * 1000:7.1f} ms  p95 {p95 * 1000:7.1f} ms  errors {errors}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+bench_article_bodies.py
+
+Compares the old layout, with article text inline in `articles.content`, to
+compressed bodies in `article_bodies` on a synthetic database: N articles with
+log-normal body lengths (median ~600 words) drawn from a small vocabulary.
+
+The database is first built in the old layout (body triggers dropped), timed,
+then migrated with compact_article_bodies() and timed again. Reports the file
+size after VACUUM, the time of the metadata-only scans the pipeline runs on
+every pass (latest titles/dates, ungrouped articles), and the time to fetch
+the bodies of a batch of articles, which now includes decompression.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_article_bodies                    # 20,000 articles
+    python -m benchmarks.bench_article_bodies --articles 5000 --repeat 10
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from news_grouping_app.db.database import (
+    ARTICLE_BODY_CODEC,
+    compact_article_bodies,
+    get_article_bodies,
+    setup_database,
+)
+
+WORDS = (
+    "attack breach patch exploit ransomware cloud model release outage update researchers "
+    "vulnerability firmware launch acquisition lawsuit chip browser botnet phishing supply chain "
+    "the a of to in and for on with said company security data users new system"
+).split()
+
+TITLE_SCAN_QUERY = "SELECT id, title, published_date FROM articles ORDER BY published_date DESC LIMIT 500"
+UNGROUPED_QUERY = """
+    SELECT a.id, a.title, a.published_date
+    FROM articles a
+    WHERE NOT EXISTS (
+        SELECT 1 FROM two_phase_article_group_memberships tgm WHERE tgm.article_id = a.id
+    )
+"""
+FULL_SCAN_QUERY = "SELECT COUNT(*), MAX(length(title)) FROM articles"
+
+
+def build_database(db_path, n_articles, seed=5):
+    """Articles in the pre-compression layout; one in ten is left ungrouped."""
+    rng = random.Random(seed)
+    setup_database(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("DROP TRIGGER IF EXISTS trg_article_body_insert")
+    conn.execute("DROP TRIGGER IF EXISTS trg_article_body_update")
+    start = datetime(2025, 1, 1)
+    rows = []
+    for i in range(1, n_articles + 1):
+        length = min(12000, max(40, int(rng.lognormvariate(6.4, 0.8))))
+        body = " ".join(rng.choice(WORDS) for _ in range(length))
+        published = start + timedelta(minutes=rng.randint(0, 180 * 24 * 60))
+        rows.append((i, f"https://example.com/{i}", f"Article {i}", body, published.strftime("%Y-%m-%d %H:%M:%S")))
+    conn.executemany("INSERT INTO articles (id, link, title, content, published_date) VALUES (?, ?, ?, ?, ?)", rows)
+    conn.executemany(
+        "INSERT INTO two_phase_article_group_memberships (article_id, group_id) VALUES (?, ?)",
+        [(i, i // 5 + 1) for i in range(1, n_articles + 1) if i % 10],
+    )
+    conn.commit()
+    conn.close()
+
+
+def vacuumed_size(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("VACUUM")
+    conn.close()
+    return os.path.getsize(db_path) / 1024 / 1024
+
+
+def time_queries(db_path, body_ids, repeat):
+    """Best-of-`repeat` seconds for each scan and for fetching bodies of body_ids."""
+    conn = sqlite3.connect(db_path)
+    timings = {}
+    for name, query in (("latest titles", TITLE_SCAN_QUERY), ("ungrouped", UNGROUPED_QUERY), ("full scan", FULL_SCAN_QUERY)):
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            conn.execute(query).fetchall()
+            best = min(best, time.perf_counter() - t0)
+        timings[name] = best
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        get_article_bodies(body_ids, cursor=conn.cursor())
+        best = min(best, time.perf_counter() - t0)
+    timings[f"{len(body_ids)} bodies"] = best
+    conn.close()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=20000)
+    parser.add_argument("--bodies", type=int, default=200, help="Articles whose bodies are fetched per timing")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    t0 = time.perf_counter()
+    build_database(db_path, args.articles)
+    print(f"Built {args.articles} articles in {time.perf_counter() - t0:.1f}s")
+    body_ids = random.Random(1).sample(range(1, args.articles + 1), min(args.bodies, args.articles))
+
+    size_before = vacuumed_size(db_path)
+    before = time_queries(db_path, body_ids, args.repeat)
+
+    setup_database(db_path)  # Restores the body triggers
+    t0 = time.perf_counter()
+    moved = compact_article_bodies(db_path)
+    print(f"Migration: {moved} bodies compressed ({ARTICLE_BODY_CODEC}) in {time.perf_counter() - t0:.1f}s")
+
+    size_after = vacuumed_size(db_path)
+    after = time_queries(db_path, body_ids, args.repeat)
+
+    print(f"Database size after VACUUM: {size_before:.1f} MB inline -> {size_after:.1f} MB compressed "
+          f"({size_before / max(size_after, 1e-9):.1f}x smaller)")
+    for name in before:
+        print(f"{name:>14}: {before[name] * 1000:8.2f} ms inline  {after[name] * 1000:8.2f} ms compressed  "
+              f"({before[name] / max(after[name], 1e-9):.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+bench_chunk_packing.py
+
+Compares the legacy word-count batch packing used for entity extraction
+(words * 1.3 against EXTRACTION_TOKEN_CHUNK, then 3,000-char truncation per
+article) with the tokenizer-backed chunk_summaries packing.
+
+For each strategy it reports batches per 1,000 articles, the share of batches
+whose prompt would overflow the model context or whose expected output would
+exceed the output limit, and how much article text was dropped.
+
+Token counts use tiktoken when available, otherwise the calibrated estimate in
+utils.count_tokens (the report says which).
+
+Usage (from the repository root):
+    python -m benchmarks.bench_chunk_packing                  # synthetic corpus
+    python -m benchmarks.bench_chunk_packing --db db/news.db  # real articles
+"""
+
+import argparse
+import random
+import sqlite3
+
+from news_grouping_app.db.database import get_article_bodies
+from news_grouping_app.config import MAX_OUTPUT_TOKENS
+from news_grouping_app.utils import chunk_summaries, count_tokens, tokenizer_is_exact
+from news_grouping_app.analysis.entity_extraction import (
+    EXTRACTION_TOKEN_CHUNK,
+    ENTITY_OUTPUT_TOKENS_PER_ARTICLE,
+    ENTITY_PROMPT_HEADER,
+    ENTITY_SYSTEM_PROMPT,
+)
+
+WORDS = (
+    "the a of to and in for on with security attack vulnerability patch CVE-2024-3094 "
+    "Microsoft Google ransomware cloud AI model data breach researchers said update "
+    "https://example.com/advisory/2024 1,024 users 3.5% critical exploit firmware"
+).split()
+
+
+def synthetic_corpus(n, seed=7):
+    """Articles with a log-normal length distribution (median ~600 words, long tail)."""
+    rng = random.Random(seed)
+    corpus = {}
+    for i in range(n):
+        length = min(12000, max(40, int(rng.lognormvariate(6.4, 0.8))))
+        corpus[i] = " ".join(rng.choice(WORDS) for _ in range(length))
+    return corpus
+
+
+def db_corpus(db_path, n):
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT id, title FROM articles ORDER BY id DESC LIMIT ?", (n,)).fetchall()
+    bodies = get_article_bodies([row[0] for row in rows], cursor=conn.cursor())
+    conn.close()
+    return {row[0]: f"{row[1]} - {bodies[row[0]]}" for row in rows if bodies.get(row[0])}
+
+
+def legacy_chunks(summaries, max_token_chunk):
+    """The pre-tokenizer packing: words * 1.3, no prompt overhead, no output budget."""
+    chunk, tokens = {}, 0
+    for key, text in sorted(summaries.items(), key=lambda x: len(x[1])):
+        est = int(len(text.split()) * 1.3)
+        if est > max_token_chunk:
+            if chunk:
+                yield chunk
+                chunk, tokens = {}, 0
+            yield {key: text}
+            continue
+        if tokens + est > max_token_chunk and chunk:
+            yield chunk
+            chunk, tokens = {}, 0
+        chunk[key] = text
+        tokens += est
+    if chunk:
+        yield chunk
+
+
+def prompt_tokens(batch, truncate_chars=None):
+    body = ENTITY_SYSTEM_PROMPT + ENTITY_PROMPT_HEADER
+    for key, text in batch.items():
+        body += f"Article ID={key}:\n{text[:truncate_chars] if truncate_chars else text}\n\n"
+    return count_tokens(body)
+
+
+def evaluate(name, batches, summaries, context_tokens, max_output, truncate_chars=None):
+    total_chars = sum(len(t) for t in summaries.values())
+    sent_chars = sum(
+        len(t[:truncate_chars] if truncate_chars else t) for b in batches for t in b.values()
+    )
+    overflow_in = overflow_out = 0
+    fill = []
+    for batch in batches:
+        in_tokens = prompt_tokens(batch, truncate_chars)
+        out_tokens = len(batch) * ENTITY_OUTPUT_TOKENS_PER_ARTICLE
+        fill.append(in_tokens / context_tokens)
+        if in_tokens + out_tokens > context_tokens:
+            overflow_in += 1
+        elif out_tokens > max_output:
+            overflow_out += 1
+    n = len(batches)
+    per_1000 = n * 1000 / max(1, len(summaries))
+    print(f"{name}:")
+    print(f"  batches per 1,000 articles : {per_1000:.1f}")
+    print(f"  context overflow rate      : {overflow_in / max(1, n):.1%}")
+    print(f"  output overflow rate       : {overflow_out / max(1, n):.1%}")
+    print(f"  mean context fill          : {sum(fill) / max(1, n):.1%}")
+    print(f"  article text sent          : {sent_chars / max(1, total_chars):.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--db", help="Use articles from this SQLite database instead of synthetic text")
+    parser.add_argument("--articles", type=int, default=1000)
+    parser.add_argument("--context-tokens", type=int, default=1047576, help="Model context window (gpt-4.1-mini)")
+    parser.add_argument("--max-output", type=int, default=MAX_OUTPUT_TOKENS)
+    args = parser.parse_args()
+
+    summaries = db_corpus(args.db, args.articles) if args.db else synthetic_corpus(args.articles)
+    print(
+        f"{len(summaries)} articles, tokenizer: {'tiktoken' if tokenizer_is_exact() else 'calibrated estimate'}, "
+        f"context {args.context_tokens}, max output {args.max_output}\n"
+    )
+
+    legacy = list(legacy_chunks(summaries, EXTRACTION_TOKEN_CHUNK))
+    evaluate("legacy (words*1.3, 3000-char truncation)", legacy, summaries,
+             args.context_tokens, args.max_output, truncate_chars=3000)
+
+    budget = min(EXTRACTION_TOKEN_CHUNK, args.context_tokens - args.max_output)
+    packed = list(
+        chunk_summaries(
+            summaries,
+            max_token_chunk=budget,
+            prompt_overhead_tokens=count_tokens(ENTITY_SYSTEM_PROMPT + ENTITY_PROMPT_HEADER),
+            output_tokens_per_item=ENTITY_OUTPUT_TOKENS_PER_ARTICLE,
+            max_output_tokens=args.max_output,
+        )
+    )
+    evaluate("tokenizer packing (chunk_summaries)", packed, summaries, args.context_tokens, args.max_output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+bench_entity_cooccurrence.py
+
+Compares the old per-category co-occurrence self-join with the daily
+aggregate table (`entity_pair_daily`) on a synthetic database of about
+100,000 article_entities rows: articles spread over the last few days and
+ten categories, each with ~10 Zipf-distributed entities.
+
+Reports the initial backfill, the self-join and aggregate query times for
+every category, an incremental refresh after new articles arrive, and checks
+that both approaches return the same top pairs (the self-join is given the
+same day-aligned cutoff as the aggregate).
+
+Usage (from the repository root):
+    python -m benchmarks.bench_entity_cooccurrence                  # 100,000 rows
+    python -m benchmarks.bench_entity_cooccurrence --rows 20000 --new 500
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from news_grouping_app.db.database import setup_database
+from news_grouping_app.analysis import entity_cooccurrence
+
+CATEGORIES = [f"Category {i}" for i in range(10)]
+ENTITIES_PER_ARTICLE = 10
+N_ENTITIES = 5000
+
+SELF_JOIN_QUERY = """
+    SELECT e1.entity_id, e2.entity_id, COUNT(DISTINCT a.id) AS co_occurrence_count
+    FROM articles a
+    JOIN two_phase_article_group_memberships tgm ON a.id = tgm.article_id
+    JOIN two_phase_article_groups tg ON tgm.group_id = tg.group_id
+    JOIN article_entities ae1 ON a.id = ae1.article_id
+    JOIN entity_profiles e1 ON ae1.entity_id = e1.entity_id
+    JOIN article_entities ae2 ON a.id = ae2.article_id
+    JOIN entity_profiles e2 ON ae2.entity_id = e2.entity_id
+    WHERE tg.main_topic = ?
+      AND a.published_date >= ?
+      AND e1.entity_id < e2.entity_id
+    GROUP BY e1.entity_id, e2.entity_id
+    HAVING co_occurrence_count > 1
+    ORDER BY co_occurrence_count DESC, e1.entity_id, e2.entity_id
+    LIMIT ?
+"""
+
+
+def add_articles(conn, rng, first_id, count, now):
+    """Insert `count` articles (one group each, ~10 entities) starting at first_id."""
+    for article_id in range(first_id, first_id + count):
+        published = now - timedelta(minutes=rng.randint(0, 3 * 24 * 60))
+        conn.execute(
+            "INSERT INTO articles (id, link, title, content, published_date) VALUES (?, ?, ?, '', ?)",
+            (article_id, f"https://example.com/{article_id}", f"Article {article_id}", published.strftime("%Y-%m-%d %H:%M:%S")),
+        )
+        conn.execute(
+            "INSERT INTO two_phase_article_group_memberships (article_id, group_id) VALUES (?, ?)",
+            (article_id, rng.randint(1, len(CATEGORIES) * 20)),
+        )
+        entities = set()
+        while len(entities) < ENTITIES_PER_ARTICLE:
+            entities.add(min(N_ENTITIES, int(rng.paretovariate(0.9))))
+        conn.executemany(
+            "INSERT INTO article_entities (article_id, entity_id, relevance_score) VALUES (?, ?, ?)",
+            [(article_id, e, rng.random()) for e in entities],
+        )
+    conn.commit()
+
+
+def build_database(db_path, n_rows, seed=7):
+    rng = random.Random(seed)
+    setup_database(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO entity_profiles (entity_id, entity_name, entity_type) VALUES (?, ?, 'organization')",
+        [(i, f"Entity {i}") for i in range(1, N_ENTITIES + 1)],
+    )
+    # Twenty groups per category, so group_id // 20 picks the category
+    conn.executemany(
+        "INSERT INTO two_phase_article_groups (group_id, main_topic, sub_topic, group_label) VALUES (?, ?, '', ?)",
+        [(g, CATEGORIES[(g - 1) // 20], f"Group {g}") for g in range(1, len(CATEGORIES) * 20 + 1)],
+    )
+    n_articles = n_rows // ENTITIES_PER_ARTICLE
+    add_articles(conn, rng, 1, n_articles, datetime.now(timezone.utc))
+    conn.close()
+    return rng, n_articles
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="article_entities rows to generate")
+    parser.add_argument("--new", type=int, default=200, help="Articles added before the incremental refresh")
+    parser.add_argument("--limit", type=int, default=15)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    t0 = time.perf_counter()
+    rng, n_articles = build_database(db_path, args.rows)
+    print(f"Built {n_articles} articles / {n_articles * ENTITIES_PER_ARTICLE} article_entities rows in {time.perf_counter() - t0:.1f}s")
+
+    t0 = time.perf_counter()
+    processed = entity_cooccurrence.refresh_entity_pair_daily(db_path)
+    conn = sqlite3.connect(db_path)
+    pair_rows = conn.execute("SELECT COUNT(*) FROM entity_pair_daily").fetchone()[0]
+    print(f"Initial backfill: {time.perf_counter() - t0:.2f}s ({processed} articles, {pair_rows} daily pair rows)")
+
+    cutoff_day = (datetime.now(timezone.utc) - timedelta(hours=48)).strftime("%Y-%m-%d")
+    t_join = t_agg = 0.0
+    mismatches = 0
+    for category in CATEGORIES:
+        t0 = time.perf_counter()
+        old = conn.execute(SELF_JOIN_QUERY, (category, f"{cutoff_day} 00:00:00", args.limit)).fetchall()
+        t_join += time.perf_counter() - t0
+        t0 = time.perf_counter()
+        new = entity_cooccurrence.get_entity_pair_counts(category, hours=48, limit=args.limit, db_path=db_path)
+        t_agg += time.perf_counter() - t0
+        # Compare counts; ties can be ordered differently
+        old_counts = sorted(row[2] for row in old)
+        new_counts = sorted(int(c) for c in new["co_occurrence_count"])
+        mismatches += old_counts != new_counts
+    print(f"Self-join, {len(CATEGORIES)} categories: {t_join:.2f}s")
+    print(f"Aggregate, {len(CATEGORIES)} categories: {t_agg:.3f}s  ({t_join / max(t_agg, 1e-9):.0f}x faster)")
+    print(f"Categories with differing top-{args.limit} counts: {mismatches}")
+
+    add_articles(conn, rng, n_articles + 1, args.new, datetime.now(timezone.utc))
+    t0 = time.perf_counter()
+    processed = entity_cooccurrence.refresh_entity_pair_daily(db_path)
+    print(f"Incremental refresh after {args.new} new articles: {time.perf_counter() - t0:.3f}s ({processed} articles)")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+bench_group_merging.py
+
+Times the blocked group-merging pass on a synthetic database: N groups of a
+few articles each, with Zipf-distributed entities and companies, dates spread
+over a few months, and a known number of planted duplicate groups (a copy of
+another group's entities, companies and text, published a day later).
+
+The LLM is not called (no API key), so merges rely on structural similarity
+alone (final score = 0.7 * structural); the default --threshold of 0.45 is
+set for that, where the pipeline uses 0.60 with the LLM term.
+Reports the naive O(G^2) pair count, the pairs left after blocking, and the
+wall time of each stage.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_group_merging                 # 10,000 groups
+    python -m benchmarks.bench_group_merging --groups 2000 --no-text
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from news_grouping_app.db.database import setup_database
+from news_grouping_app.analysis import group_merging
+from news_grouping_app.analysis.text_vectors import refresh_group_centroids, vectorize_new_articles
+
+ENTITY_TYPES = ["organization", "product", "technology", "person", "place", "concept"]
+WORDS = (
+    "attack breach patch exploit ransomware cloud model release outage update researchers "
+    "vulnerability firmware launch acquisition lawsuit chip browser botnet phishing supply chain"
+).split()
+
+
+def build_database(db_path, n_groups, duplicate_share, seed=11):
+    rng = random.Random(seed)
+    setup_database(db_path)
+    conn = sqlite3.connect(db_path)
+    n_entities = max(1000, n_groups * 2)
+    conn.executemany(
+        "INSERT INTO entity_profiles (entity_id, entity_name, entity_type) VALUES (?, ?, ?)",
+        [(i, f"Entity {i}", rng.choice(ENTITY_TYPES)) for i in range(1, n_entities + 1)],
+    )
+
+    def zipf_entity():
+        return min(n_entities, int(rng.paretovariate(1.1)))
+
+    start = datetime(2026, 1, 1)
+    article_id = 0
+    planted = []
+    templates = []
+    for group_id in range(1, n_groups + 1):
+        duplicate_of = None
+        if templates and rng.random() < duplicate_share:
+            duplicate_of = rng.choice(templates)
+        if duplicate_of:
+            original_id, entities, companies, words, day = duplicate_of
+            planted.append((original_id, group_id))
+            day = day + 1
+        else:
+            entities = {zipf_entity() for _ in range(4)} | {rng.randint(1, n_entities) for _ in range(2)}
+            companies = {f"Company {min(5000, int(rng.paretovariate(1.2)))}" for _ in range(2)}
+            words = rng.sample(WORDS, 6) + [f"topic{group_id}", f"story{group_id}"]
+            day = rng.randint(0, 120)
+            templates.append((group_id, entities, companies, words, day))
+        conn.execute(
+            "INSERT INTO two_phase_article_groups (group_id, main_topic, sub_topic, group_label, description) VALUES (?, 'Other', '', ?, ?)",
+            (group_id, f"Group {group_id}", " ".join(words)),
+        )
+        for _ in range(rng.randint(1, 4)):
+            article_id += 1
+            published = (start + timedelta(days=day, hours=rng.randint(0, 23))).isoformat()
+            conn.execute(
+                "INSERT INTO articles (id, link, title, content, published_date) VALUES (?, ?, ?, ?, ?)",
+                (article_id, f"https://example.com/{article_id}", " ".join(words[:5]), " ".join(words * 5), published),
+            )
+            conn.execute(
+                "INSERT INTO two_phase_article_group_memberships (article_id, group_id) VALUES (?, ?)",
+                (article_id, group_id),
+            )
+            conn.executemany(
+                "INSERT INTO article_entities (article_id, entity_id, relevance_score) VALUES (?, ?, 0.9)",
+                [(article_id, e) for e in entities],
+            )
+            conn.executemany(
+                "INSERT INTO article_companies (article_id, company_name) VALUES (?, ?)",
+                [(article_id, c) for c in companies],
+            )
+    conn.commit()
+    conn.close()
+    return article_id, planted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groups", type=int, default=10000)
+    parser.add_argument("--duplicates", type=float, default=0.05, help="Share of planted duplicate groups")
+    parser.add_argument("--threshold", type=float, default=0.45)
+    parser.add_argument("--no-text", action="store_true", help="Skip text vectors and centroids")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    t0 = time.perf_counter()
+    n_articles, planted = build_database(db_path, args.groups, args.duplicates)
+    print(f"Built {args.groups} groups / {n_articles} articles ({len(planted)} planted duplicates) in {time.perf_counter() - t0:.1f}s")
+
+    if not args.no_text:
+        t0 = time.perf_counter()
+        vectorize_new_articles(db_path=db_path)
+        refresh_group_centroids(db_path=db_path)
+        print(f"Text vectors and centroids: {time.perf_counter() - t0:.1f}s")
+
+    t0 = time.perf_counter()
+    profiles = group_merging.load_group_profiles(db_path)
+    t_profiles = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    pairs = group_merging.generate_candidate_pairs(profiles)
+    t_blocking = time.perf_counter() - t0
+    naive = len(profiles) * (len(profiles) - 1) // 2
+    print(f"Load profiles: {t_profiles:.2f}s")
+    recall = sum(1 for pair in planted if pair in pairs) / max(len(planted), 1)
+    print(f"Blocking:      {t_blocking:.2f}s  ({len(pairs)} candidate pairs vs {naive} naive, {len(pairs) / max(naive, 1):.4%})")
+    print(f"Blocking recall on planted duplicates: {recall:.1%}")
+
+    t0 = time.perf_counter()
+    stats = group_merging.merge_similar_groups(args.threshold, api_key=None, db_path=db_path)
+    print(f"Full merge pass: {time.perf_counter() - t0:.2f}s")
+    print(
+        f"Merged {stats['merged_pairs']} groups in {stats['merge_sets']} sets "
+        f"(planted duplicates: {len(planted)}); errors: {stats['errors']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
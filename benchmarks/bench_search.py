@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+bench_search.py
+
+Times /api/search queries on a synthetic database: N articles with ~150-word
+bodies drawn from a Zipf-distributed vocabulary (so common words match a large
+share of articles and rare ones a handful), inserted through the normal
+triggers so the FTS index is built as in production. One in four articles is
+in a group of a random category.
+
+Reports the index size and p50/p95 latency of a first page (20 results + 1)
+for rare, common and multi-term queries, with and without time and category
+filters, and for a deep page.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_search                        # 200,000 articles
+    python -m benchmarks.bench_search --articles 1000000 --repeat 20
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from news_grouping_app.db.database import setup_database
+from news_grouping_app.search import build_match_query, search_articles, search_groups
+
+VOCABULARY_SIZE = 20000
+BODY_WORDS = 150
+CATEGORIES = ["Cybersecurity & Data Privacy", "Artificial Intelligence & Machine Learning", "Other"]
+
+
+def word(i):
+    return f"w{i}"
+
+
+def build_database(db_path, n_articles, seed=11):
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(VOCABULARY_SIZE)]
+    setup_database(db_path)
+    conn = sqlite3.connect(db_path)
+    start = datetime(2025, 1, 1)
+    batch = 20000
+    for first in range(1, n_articles + 1, batch):
+        rows = []
+        for i in range(first, min(first + batch, n_articles + 1)):
+            terms = rng.choices(range(VOCABULARY_SIZE), weights=weights, k=BODY_WORDS + 8)
+            published = start + timedelta(minutes=i * 525600 // n_articles)
+            rows.append((i, f"https://example.com/{i}", " ".join(map(word, terms[:8])),
+                         " ".join(map(word, terms[8:])), published.strftime("%Y-%m-%d %H:%M:%S")))
+        conn.executemany("INSERT INTO articles (id, link, title, content, published_date) VALUES (?, ?, ?, ?, ?)", rows)
+        conn.commit()
+    n_groups = n_articles // 20
+    conn.executemany(
+        "INSERT INTO two_phase_article_groups (group_id, main_topic, sub_topic, group_label, description) VALUES (?, ?, 'x', ?, ?)",
+        [(g, rng.choice(CATEGORIES), f"{word(rng.randrange(2000))} {word(rng.randrange(2000))}",
+          " ".join(word(rng.randrange(VOCABULARY_SIZE)) for _ in range(20))) for g in range(1, n_groups + 1)],
+    )
+    conn.executemany(
+        "INSERT INTO two_phase_article_group_memberships (article_id, group_id) VALUES (?, ?)",
+        [(i, rng.randint(1, n_groups)) for i in range(1, n_articles + 1, 4)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def index_size_mb(conn):
+    pages = conn.execute(
+        "SELECT SUM(pgsize) FROM dbstat WHERE name LIKE 'article_search%'"
+    ).fetchone()[0]
+    return (pages or 0) / 1024 / 1024
+
+
+def time_query(conn, search, repeat, **kwargs):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        results, _ = search(conn.cursor(), **kwargs)
+        timings.append(time.perf_counter() - t0)
+    timings.sort()
+    return timings[len(timings) // 2], timings[min(len(timings) - 1, int(len(timings) * 0.95))], len(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    t0 = time.perf_counter()
+    build_database(db_path, args.articles)
+    print(f"Built and indexed {args.articles} articles in {time.perf_counter() - t0:.1f}s")
+
+    conn = sqlite3.connect(db_path)
+    try:
+        print(f"article_search size: {index_size_mb(conn):.0f} MB")
+    except sqlite3.OperationalError:
+        pass  # dbstat not compiled in
+    last_month = "2025-12-01 00:00:00"
+    cases = [
+        ("rare term", search_articles, {"match": build_match_query("w15000")}),
+        ("mid term", search_articles, {"match": build_match_query("w500")}),
+        ("common term", search_articles, {"match": build_match_query("w3")}),
+        ("two terms", search_articles, {"match": build_match_query("w40 w900")}),
+        ("phrase", search_articles, {"match": build_match_query('"w0 w1"')}),
+        ("prefix", search_articles, {"match": build_match_query("w123*")}),
+        ("mid + last month", search_articles, {"match": build_match_query("w500"), "since": last_month}),
+        ("mid + category", search_articles, {"match": build_match_query("w500"), "category": CATEGORIES[0]}),
+        ("mid, page 50", search_articles, {"match": build_match_query("w500"), "offset": 49 * 20}),
+        ("groups", search_groups, {"match": build_match_query("w42")}),
+    ]
+    for name, search, kwargs in cases:
+        kwargs.setdefault("limit", 21)
+        if search is search_articles:
+            kwargs["db_path"] = db_path  # Snippets are cut from the stored bodies
+        hits = conn.execute(
+            f"SELECT COUNT(*) FROM {'group_search' if search is search_groups else 'article_search'} "
+            f"WHERE {'group_search' if search is search_groups else 'article_search'} MATCH ?",
+            (kwargs["match"],),
+        ).fetchone()[0]
+        p50, p95, returned = time_query(conn, search, args.repeat, **kwargs)
+        print(f"{name:>18}: {hits:8d} matches  p50 {p50 * 1000:7.1f} ms  p95 {p95 * 1000:7.1f} ms  ({returned} returned)")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
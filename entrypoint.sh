@@ -26,9 +26,9 @@ python -m news_grouping_app.main &
 SCRAPER_PID=$!
 echo "Scrapers started with PID: $SCRAPER_PID"
 
-# Step 3: Start Flask app in the foreground
-echo "Starting Flask app in the foreground..."
-python -m news_grouping_app.app
+# Step 3: Start the web server (gunicorn, see news_grouping_app/serve.py) in the foreground
+echo "Starting web server in the foreground..."
+python -m news_grouping_app.serve
 
 # If Flask app exits, kill the scraper process
 kill $SCRAPER_PID
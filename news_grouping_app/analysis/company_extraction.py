@@ -7,35 +7,54 @@ import time
 import pandas as pd
 import logging
 
-from news_grouping_app.db.database import get_connection
+from news_grouping_app.db.database import get_connection, get_article_bodies
 from news_grouping_app.llm_calls import call_gpt_api
-from news_grouping_app.utils import chunk_summaries, MAX_TOKEN_CHUNK
+from news_grouping_app.utils import chunk_summaries, count_tokens, MAX_TOKEN_CHUNK
 from news_grouping_app.config import OPENAI_MODEL
 
 logger = logging.getLogger(__name__)
 MODEL = OPENAI_MODEL  # default model can be overridden via env var
+COMPANY_OUTPUT_TOKENS_PER_ARTICLE = 60  # Expected JSON output per article
+
+COMPANY_PROMPT_HEADER = (
+    "You are a named-entity recognition AI. For each article, extract all company names mentioned. "
+    "Return only JSON with the format:\n"
+    '{ "extractions": [ {"article_id": "...", "companies": ["CompanyA", "CompanyB"]}, ... ] }\n\n'
+)
+COMPANY_SYSTEM_PROMPT = "Extract company names from the provided article texts."
 
 
 def get_articles_missing_company_extraction(db_path="db/news.db"):
     """
     Returns a DataFrame of articles that do NOT have any entry in article_companies.
     Now selects articles by integer id instead of text link.
+    Near-duplicates are skipped; they inherit their canonical article's companies.
     """
     conn = get_connection(db_path)
     query = """
         SELECT
             a.id AS article_id,
-            a.title || ' - ' || a.content AS expanded_summary
+            a.title
         FROM articles a
         WHERE NOT EXISTS (
             SELECT 1 FROM article_companies ac
             WHERE ac.article_id = a.id
         )
+        AND NOT EXISTS (
+            SELECT 1 FROM article_duplicates d
+            WHERE d.article_id = a.id  -- near-duplicates inherit from their canonical
+        )
         ORDER BY a.published_date DESC
     """
     df = pd.read_sql_query(query, conn)
+    bodies = get_article_bodies(df["article_id"], cursor=conn.cursor())
     conn.close()
-    return df
+    # Same as the old `title || ' - ' || content`: NULL when there is no body
+    df["expanded_summary"] = [
+        f"{title} - {bodies[article_id]}" if article_id in bodies else None
+        for article_id, title in zip(df["article_id"], df["title"])
+    ]
+    return df.drop(columns="title")
 
 
 def extract_company_names_for_all_articles(api_key, db_path="db/news.db"):
@@ -57,7 +76,12 @@ def extract_company_names_for_all_articles(api_key, db_path="db/news.db"):
             summaries_dict[art_id] = content
 
     chunked_articles = list(
-        chunk_summaries(summaries_dict, max_token_chunk=MAX_TOKEN_CHUNK)
+        chunk_summaries(
+            summaries_dict,
+            max_token_chunk=MAX_TOKEN_CHUNK,
+            prompt_overhead_tokens=count_tokens(COMPANY_SYSTEM_PROMPT + COMPANY_PROMPT_HEADER),
+            output_tokens_per_item=COMPANY_OUTPUT_TOKENS_PER_ARTICLE,
+        )
     )
     total_extractions = 0
 
@@ -67,20 +91,15 @@ def extract_company_names_for_all_articles(api_key, db_path="db/news.db"):
             f"with {len(chunk_dict)} articles."
         )
 
-        prompt = (
-            "You are a named-entity recognition AI. For each article, extract all company names mentioned. "
-            "Return only JSON with the format:\n"
-            '{ "extractions": [ {"article_id": "...", "companies": ["CompanyA", "CompanyB"]}, ... ] }\n\n'
-        )
-        # Append the article texts
+        prompt = COMPANY_PROMPT_HEADER
+        # Append the article texts (already sized to fit by chunk_summaries)
         for art_id, text in chunk_dict.items():
-            snippet = text[:5000]  # limit if needed
-            prompt += f"Article ID={art_id}:\n{snippet}\n\n"
+            prompt += f"Article ID={art_id}:\n{text}\n\n"
 
         messages = [
             {
                 "role": "system",
-                "content": "Extract company names from the provided article texts.",
+                "content": COMPANY_SYSTEM_PROMPT,
             },
             {"role": "user", "content": prompt},
         ]
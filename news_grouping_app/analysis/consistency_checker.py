@@ -1,5 +1,6 @@
 # analysis/consistency_checker.py
 
+import os
 import logging
 import json
 import pandas as pd
@@ -7,9 +8,15 @@ import re
 from datetime import datetime, timedelta
 import pytz
 
-from news_grouping_app.db.database import get_connection, create_exemplar, add_article_to_exemplar
+from news_grouping_app.db.database import (
+    get_connection,
+    get_article_bodies,
+    create_exemplar,
+    add_article_to_exemplar,
+    record_group_consistency,
+)
 from news_grouping_app.llm_calls import call_gpt_api
-from news_grouping_app.utils import chunk_summaries, MAX_TOKEN_CHUNK
+from news_grouping_app.utils import chunk_summaries, approximate_tokens, MAX_TOKEN_CHUNK
 from news_grouping_app.analysis.context_builder import build_grouping_context, format_context_for_prompt
 from news_grouping_app.analysis.entity_extraction import get_entities_for_article
 from news_grouping_app.config import OPENAI_MODEL
@@ -17,6 +24,30 @@ from news_grouping_app.config import OPENAI_MODEL
 logger = logging.getLogger(__name__)
 MODEL = OPENAI_MODEL  # default model can be overridden via env var
 
+# Deferred consistency pass: groups are marked dirty when articles are added and
+# evaluated together after grouping, at most once per interval
+CONSISTENCY_MIN_INTERVAL_MINUTES = int(os.getenv("CONSISTENCY_MIN_INTERVAL_MINUTES", "60"))
+CONSISTENCY_BATCH_SIZE = 8  # Max groups per evaluation call
+CONSISTENCY_MAX_PROMPT_TOKENS = 30000
+CONSISTENCY_MAX_ARTICLES_PER_GROUP = 20  # Article lines listed per group
+
+CONSISTENCY_SYSTEM_PROMPT = (
+    "You are an expert evaluator of article groupings. Your goal is to ensure "
+    "that article groups are consistent and coherent. Articles describing the same core incident "
+    "should be grouped together, even when they emphasize different aspects or use different language."
+)
+CONSISTENCY_GUIDELINES = (
+    "\nIMPORTANT EVALUATION GUIDELINES:\n"
+    "1. Focus on the CORE EVENT/INCIDENT: Do all articles cover the same fundamental event, even if they emphasize different aspects?\n"
+    "2. Look beyond narrative style: Different publishers may frame the same news differently (e.g., focusing on the company's apology vs. user frustration).\n"
+    "3. Consider shared entities: Articles sharing key companies, products, or individuals are likely covering the same story.\n"
+    "4. Temporal relationships matter: Articles may cover different stages of the same evolving story (announcement, reaction, aftermath).\n"
+    "5. Look for causal relationships: An article about 'impact of X' belongs with articles about 'X happening'.\n\n"
+    "Examples of articles that SHOULD be grouped together despite different emphasis:\n"
+    "- 'Microsoft apologizes for removing VS Code extensions' + 'VS Code developers frustrated after removal of extensions'\n"
+    "- 'CloudProvider A suffers outage' + 'Financial impacts of yesterday's major cloud disruption'\n\n"
+)
+
 
 def get_recent_groups_for_category(category, days=30, db_path="db/news.db"):
     """
@@ -58,6 +89,35 @@ def get_recent_groups_for_category(category, days=30, db_path="db/news.db"):
     return df
 
 
+def _maybe_create_exemplar(category, group_label, description, article_ids, evaluation, db_path="db/news.db"):
+    """Save the group as an exemplar if the evaluation marks it exemplar-worthy with a high score."""
+    if not (
+        evaluation.get("exemplar_worthy", False)
+        and evaluation.get("consistency_score", 0) >= 0.8
+    ):
+        return None
+    try:
+        exemplar_id = create_exemplar(
+            category=category,
+            pattern_name=f"Exemplar: {group_label}",
+            pattern_description=description,
+            success_score=evaluation.get("consistency_score", 0.8),
+            db_path=db_path,
+        )
+
+        # Add articles to the exemplar
+        for art_id in article_ids:
+            add_article_to_exemplar(exemplar_id, art_id, db_path=db_path)
+
+        logger.info(
+            f"Created exemplar {exemplar_id} for group with label '{group_label}'"
+        )
+        return exemplar_id
+    except Exception as e:
+        logger.error(f"Error creating exemplar for group '{group_label}': {e}")
+        return None
+
+
 def evaluate_group_consistency(group_data, api_key, db_path="db/news.db"):
     """
     Evaluate the consistency of a newly formed group.
@@ -66,7 +126,8 @@ def evaluate_group_consistency(group_data, api_key, db_path="db/news.db"):
     category = group_data.get("main_topic", "")
     group_label = group_data.get("group_label", "")
     description = group_data.get("description", "")
-    article_ids = group_data.get("articles", [])
+    # Callers pass group dicts from get_existing_groups, keyed "article_ids"
+    article_ids = group_data.get("article_ids") or group_data.get("articles", [])
 
     if not category or not article_ids:
         return {
@@ -87,14 +148,15 @@ def evaluate_group_consistency(group_data, api_key, db_path="db/news.db"):
     query = f"""
         SELECT
             id AS article_id,
-            title,
-            content
+            title
         FROM articles
         WHERE id IN ({placeholders})
     """
 
     articles_df = pd.read_sql_query(query, conn, params=article_ids)
+    bodies = get_article_bodies(articles_df["article_id"], cursor=conn.cursor())
     conn.close()
+    articles_df["content"] = articles_df["article_id"].map(bodies).fillna("")
 
     # Create summaries dict for context building
     summaries_dict = {}
@@ -166,16 +228,8 @@ def evaluate_group_consistency(group_data, api_key, db_path="db/news.db"):
 
     # IMPROVED EVALUATION CRITERIA
     prompt += (
-        "\nIMPORTANT EVALUATION GUIDELINES:\n"
-        "1. Focus on the CORE EVENT/INCIDENT: Do all articles cover the same fundamental event, even if they emphasize different aspects?\n"
-        "2. Look beyond narrative style: Different publishers may frame the same news differently (e.g., focusing on the company's apology vs. user frustration).\n"
-        "3. Consider shared entities: Articles sharing key companies, products, or individuals are likely covering the same story.\n"
-        "4. Temporal relationships matter: Articles may cover different stages of the same evolving story (announcement, reaction, aftermath).\n"
-        "5. Look for causal relationships: An article about 'impact of X' belongs with articles about 'X happening'.\n\n"
-        "Examples of articles that SHOULD be grouped together despite different emphasis:\n"
-        "- 'Microsoft apologizes for removing VS Code extensions' + 'VS Code developers frustrated after removal of extensions'\n"
-        "- 'CloudProvider A suffers outage' + 'Financial impacts of yesterday's major cloud disruption'\n\n"
-        "Please evaluate the group, focusing on whether the articles cover the same core event/incident rather than just surface similarities.\n\n"
+        CONSISTENCY_GUIDELINES
+        + "Please evaluate the group, focusing on whether the articles cover the same core event/incident rather than just surface similarities.\n\n"
         "Return only JSON with this format:\n"
         "{\n"
         '  "consistency_score": 0.1-1.0,\n'
@@ -190,14 +244,7 @@ def evaluate_group_consistency(group_data, api_key, db_path="db/news.db"):
     )
 
     messages = [
-        {
-            "role": "system",
-            "content": (
-                "You are an expert evaluator of article groupings. Your goal is to ensure "
-                "that article groups are consistent and coherent. Articles describing the same core incident "
-                "should be grouped together, even when they emphasize different aspects or use different language."
-            ),
-        },
+        {"role": "system", "content": CONSISTENCY_SYSTEM_PROMPT},
         {"role": "user", "content": prompt},
     ]
 
@@ -218,28 +265,7 @@ def evaluate_group_consistency(group_data, api_key, db_path="db/news.db"):
         data = json.loads(cleaned)
 
         # If this group is worthy of being an exemplar, save it
-        if (
-            data.get("exemplar_worthy", False)
-            and data.get("consistency_score", 0) >= 0.8
-        ):
-            try:
-                exemplar_id = create_exemplar(
-                    category=category,
-                    pattern_name=f"Exemplar: {group_label}",
-                    pattern_description=description,
-                    success_score=data.get("consistency_score", 0.8),
-                    db_path=db_path,
-                )
-
-                # Add articles to the exemplar
-                for art_id in article_ids:
-                    add_article_to_exemplar(exemplar_id, art_id, db_path=db_path)
-
-                logger.info(
-                    f"Created exemplar {exemplar_id} for group with label '{group_label}'"
-                )
-            except Exception as e:
-                logger.error(f"Error creating exemplar for group '{group_label}': {e}")
+        _maybe_create_exemplar(category, group_label, description, article_ids, data, db_path)
 
         return data
     except json.JSONDecodeError as e:
@@ -248,3 +274,250 @@ def evaluate_group_consistency(group_data, api_key, db_path="db/news.db"):
             "consistency_score": 0.5,  # Default neutral score
             "feedback": "Could not parse consistency evaluation",
         }
+
+
+def get_groups_due_for_consistency(min_interval_minutes=CONSISTENCY_MIN_INTERVAL_MINUTES, db_path="db/news.db"):
+    """
+    Return dirty groups with more than one article whose last evaluation is older
+    than `min_interval_minutes` (or that were never evaluated), as a list of dicts
+    with group_id, main_topic, group_label, description and article_ids.
+    """
+    conn = get_connection(db_path)
+    try:
+        rows = conn.execute(
+            """
+            SELECT tg.group_id, tg.main_topic, tg.group_label, tg.description,
+                   GROUP_CONCAT(tgm.article_id) AS article_ids
+            FROM group_consistency_state s
+            JOIN two_phase_article_groups tg ON tg.group_id = s.group_id
+            JOIN two_phase_article_group_memberships tgm ON tgm.group_id = s.group_id
+            WHERE s.dirty = 1
+              AND (s.evaluated_at IS NULL OR s.evaluated_at <= datetime('now', ?))
+            GROUP BY tg.group_id
+            HAVING COUNT(tgm.article_id) > 1
+            ORDER BY tg.main_topic, tg.group_id
+            """,
+            (f"-{int(min_interval_minutes)} minutes",),
+        ).fetchall()
+    finally:
+        conn.close()
+    return [
+        {
+            "group_id": group_id,
+            "main_topic": main_topic or "",
+            "group_label": group_label or "",
+            "description": description or "",
+            "article_ids": sorted(int(aid) for aid in article_ids.split(",") if aid),
+        }
+        for group_id, main_topic, group_label, description, article_ids in rows
+    ]
+
+
+def _load_article_lines(article_ids, db_path="db/news.db"):
+    """Return {article_id: "title\\nKey entities: ..."} for all articles in two queries."""
+    if not article_ids:
+        return {}
+    conn = get_connection(db_path)
+    try:
+        placeholders = ",".join("?" for _ in article_ids)
+        titles = dict(
+            conn.execute(
+                f"SELECT id, title FROM articles WHERE id IN ({placeholders})", list(article_ids)
+            ).fetchall()
+        )
+        entity_rows = conn.execute(
+            f"""
+            SELECT ae.article_id, e.entity_name, e.entity_type
+            FROM article_entities ae
+            JOIN entity_profiles e ON e.entity_id = ae.entity_id
+            WHERE ae.article_id IN ({placeholders})
+            ORDER BY ae.article_id, ae.relevance_score DESC
+            """,
+            list(article_ids),
+        ).fetchall()
+    finally:
+        conn.close()
+
+    entities = {}
+    for art_id, name, etype in entity_rows:
+        top = entities.setdefault(art_id, [])
+        if len(top) < 5:
+            top.append(f"{name} ({etype})")
+    lines = {}
+    for art_id in article_ids:
+        line = titles.get(art_id) or ""
+        if entities.get(art_id):
+            line += "\nKey entities: " + ", ".join(entities[art_id])
+        lines[art_id] = line
+    return lines
+
+
+def _build_batch_consistency_prompt(category, groups, article_lines, historical_data):
+    """Consistency prompt for several groups of the same category."""
+    prompt = (
+        f"Evaluate the consistency of each article group below in the '{category}' category.\n\n"
+    )
+    for group in groups:
+        article_ids = group["article_ids"]
+        prompt += (
+            f"GROUP {group['group_id']}:\n"
+            f"Group Label: {group['group_label']}\n"
+            f"Description: {group['description']}\n"
+            f"Article Count: {len(article_ids)}\n"
+            f"Articles:\n"
+        )
+        for art_id in article_ids[:CONSISTENCY_MAX_ARTICLES_PER_GROUP]:
+            prompt += f"Article {art_id}: {article_lines.get(art_id, '')}\n"
+        prompt += "\n"
+
+    if historical_data:
+        prompt += "RECENT SUCCESSFUL GROUPS IN THIS CATEGORY:\n"
+        for group in historical_data:
+            prompt += (
+                f"- {group['group_label']} (Score: {group['consistency_score']}): "
+                f"{(group['description'] or '')[:100]}...\n"
+            )
+
+    prompt += (
+        CONSISTENCY_GUIDELINES
+        + "Please evaluate each group independently, focusing on whether its articles cover the same core event/incident rather than just surface similarities.\n\n"
+        "Return only JSON with this format, keyed by group number:\n"
+        "{\n"
+        '  "groups": {\n'
+        '    "<group number>": {\n'
+        '      "consistency_score": 0.1-1.0,\n'
+        '      "feedback": "Detailed feedback about group consistency",\n'
+        '      "recommended_changes": {\n'
+        '        "remove_articles": [article_ids that don\'t fit],\n'
+        '        "suggested_label": "Better label if needed",\n'
+        '        "suggested_description": "Better description if needed"\n'
+        "      },\n"
+        '      "exemplar_worthy": true/false\n'
+        "    }\n"
+        "  }\n"
+        "}\n"
+    )
+    return prompt
+
+
+def run_consistency_pass(
+    api_key,
+    db_path="db/news.db",
+    min_interval_minutes=CONSISTENCY_MIN_INTERVAL_MINUTES,
+    batch_size=CONSISTENCY_BATCH_SIZE,
+):
+    """
+    Evaluate every dirty group that is due, several groups of a category per LLM
+    call. Stores each score in `consistency_score`, clears the dirty flag and
+    creates exemplars for exemplar-worthy groups. Groups the LLM does not answer
+    for stay dirty. Returns the number of groups evaluated.
+    """
+    groups = get_groups_due_for_consistency(min_interval_minutes, db_path=db_path)
+    if not groups:
+        logger.info("No groups due for consistency evaluation.")
+        return 0
+
+    by_category = {}
+    for group in groups:
+        by_category.setdefault(group["main_topic"], []).append(group)
+
+    all_article_ids = sorted(
+        {
+            art_id
+            for group in groups
+            for art_id in group["article_ids"][:CONSISTENCY_MAX_ARTICLES_PER_GROUP]
+        }
+    )
+    article_lines = _load_article_lines(all_article_ids, db_path=db_path)
+    evaluated = 0
+    calls = 0
+
+    for category, category_groups in by_category.items():
+        # Historical groups are fetched once per category, not per group
+        historical_groups = get_recent_groups_for_category(category, days=30, db_path=db_path)
+        historical_data = [
+            {
+                "group_label": g["group_label"],
+                "description": g["description"],
+                "consistency_score": g["consistency_score"],
+            }
+            for _, g in historical_groups.iterrows()
+            if g["group_id"] not in {cg["group_id"] for cg in category_groups}
+        ]
+
+        batches, batch = [], []
+        for group in category_groups:
+            if batch and (
+                len(batch) >= batch_size
+                or approximate_tokens(
+                    _build_batch_consistency_prompt(category, batch + [group], article_lines, historical_data)
+                )
+                > CONSISTENCY_MAX_PROMPT_TOKENS
+            ):
+                batches.append(batch)
+                batch = []
+            batch.append(group)
+        if batch:
+            batches.append(batch)
+
+        for batch in batches:
+            messages = [
+                {"role": "system", "content": CONSISTENCY_SYSTEM_PROMPT},
+                {
+                    "role": "user",
+                    "content": _build_batch_consistency_prompt(category, batch, article_lines, historical_data),
+                },
+            ]
+            calls += 1
+            response = call_gpt_api(messages, api_key)
+            if not response:
+                logger.warning(f"No response from GPT for batched consistency evaluation in '{category}'")
+                continue
+
+            cleaned = response.strip().strip("```")
+            cleaned = re.sub(r"^json\s+", "", cleaned, flags=re.IGNORECASE)
+            try:
+                results = json.loads(cleaned).get("groups", {}) or {}
+            except (json.JSONDecodeError, AttributeError) as e:
+                logger.error(f"Error parsing batched consistency evaluation JSON: {e}\n{cleaned}")
+                continue
+
+            scored = []
+            conn = get_connection(db_path)
+            cursor = conn.cursor()
+            try:
+                for group in batch:
+                    data = results.get(str(group["group_id"]))
+                    if not isinstance(data, dict):
+                        continue
+                    try:
+                        score = max(0.0, min(1.0, float(data.get("consistency_score", 0.5))))
+                    except (TypeError, ValueError):
+                        score = 0.5
+                    data["consistency_score"] = score
+                    if record_group_consistency(
+                        group["group_id"], score, len(group["article_ids"]), db_path=db_path, cursor=cursor
+                    ):
+                        evaluated += 1
+                        scored.append((group, data))
+                        logger.info(
+                            f"Consistency for Group {group['group_id']} ('{group['group_label']}'): Score={score:.2f}"
+                        )
+                conn.commit()
+            finally:
+                conn.close()
+
+            for group, data in scored:
+                _maybe_create_exemplar(
+                    category,
+                    group["group_label"],
+                    group["description"],
+                    group["article_ids"],
+                    data,
+                    db_path,
+                )
+
+    logger.info(
+        f"Consistency pass evaluated {evaluated}/{len(groups)} dirty groups in {calls} LLM calls."
+    )
+    return evaluated
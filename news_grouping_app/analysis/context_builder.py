@@ -6,9 +6,9 @@ import json
 from datetime import datetime, timedelta
 import pytz
 
-from news_grouping_app.db.database import get_connection
+from news_grouping_app.db.database import get_connection, get_article_bodies
 from news_grouping_app.analysis.entity_extraction import (
-    get_entities_for_article,
+    get_entities_for_articles,
     get_entities_for_category,
     get_related_entities,
 )
@@ -43,19 +43,19 @@ def get_exemplar_groups(category, limit=3, db_path="db/news.db"):
         article_query = """
             SELECT
                 a.id AS article_id,
-                a.title,
-                a.content
+                a.title
             FROM articles a
             JOIN exemplar_articles ea ON a.id = ea.article_id
             WHERE ea.exemplar_id = ?
             LIMIT 3
         """
         articles_df = pd.read_sql_query(article_query, conn, params=(exemplar_id,))
+        bodies = get_article_bodies(articles_df["article_id"], cursor=conn.cursor())
 
         articles = []
         for _, article in articles_df.iterrows():
             # Get summary instead of full content
-            content = article["content"]
+            content = bodies.get(article["article_id"])
             if content and len(content) > 500:
                 content = content[:500] + "..."
 
@@ -158,7 +158,9 @@ def get_recent_category_groups(category, days=7, limit=5, db_path="db/news.db"):
     return result
 
 
-def build_grouping_context(articles_dict, category, api_key=None, db_path="db/news.db"):
+def build_grouping_context(
+    articles_dict, category, api_key=None, db_path="db/news.db", article_entities=None
+):
     """
     Build rich context for grouping decisions.
 
@@ -167,15 +169,20 @@ def build_grouping_context(articles_dict, category, api_key=None, db_path="db/ne
         category: The main category to focus on
         api_key: API key for LLM (not used here but kept for consistency)
         db_path: Path to the database
+        article_entities: Optional {article_id: entities DataFrame} already loaded
+            by the caller (see get_entities_for_articles); skips the lookup
 
     Returns:
         A context object with information to help the LLM make better grouping decisions
     """
     # Get key entities for all articles in the batch
-    all_entities = {}
-    for article_id in articles_dict.keys():
-        entities_df = get_entities_for_article(article_id, db_path=db_path)
-        all_entities[article_id] = entities_df.to_dict(orient="records")
+    if article_entities is None:
+        article_entities = get_entities_for_articles(articles_dict.keys(), db_path=db_path)
+    all_entities = {
+        article_id: article_entities[article_id].to_dict(orient="records")
+        for article_id in articles_dict.keys()
+        if article_id in article_entities
+    }
 
     # Get the most relevant entities for this category
     category_entities = get_entities_for_category(category, limit=10, db_path=db_path)
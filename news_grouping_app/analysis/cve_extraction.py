@@ -1,5 +1,4 @@
 import pandas as pd
-import re
 from datetime import datetime, timedelta
 import pytz
 import sqlite3
@@ -9,644 +8,674 @@ from news_grouping_app.db.database import (
     get_connection,
     insert_or_update_cve_info,
 )  # Assuming this helper exists
-from news_grouping_app.db.database import insert_article_cve  # Assuming this helper exists
+from news_grouping_app.db.database import (
+    get_article_bodies,
+    insert_article_cves_bulk,
+    get_watermark,
+    set_watermark,
+    upsert_cve_record,
+)
 import json
+import os
 import requests
+import requests.adapters
+import threading
 import time
-from news_grouping_app.utils import extract_cves, CVE_REGEX  # <<< ADD CVE_REGEX HERE
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from news_grouping_app.utils import extract_cves, CVE_PATTERN, normalize_date, to_utc_sqlite_str
 
 logger = logging.getLogger(__name__)
 
 
-def build_cve_table(date_hours=None, db_path="db/news.db"):
-    """
-    Returns a DataFrame with CVE mentions and metadata, for use in the React CVE Mentions table.
-    Filters by `published_date` if `date_hours` is provided.
+CVE_TABLE_COLUMNS = [
+    "cve_id",
+    "times_seen",
+    "first_mention",
+    "last_mention",
+    "article_links",
+    "base_score",
+    "vendor",
+    "affected_products",
+    "cve_page_link",
+    "vendor_link",
+    "solution",
+    "sources",
+]
+
+# SQLite limits the number of bound parameters per statement, so IN (...) lists
+# over CVE IDs are issued in slices of this size.
+SQL_IN_CHUNK_SIZE = 500
 
-    The 'article_links' column is now an array/list of objects, each containing
-    the 'url' and 'source' of the article mention.
-    Example: [{'url': 'http://...', 'source': 'bleepingcomputer'}, {'url': 'http://...', 'source': 'theregister'}]
-    """
-    conn = get_connection(db_path)
-    c = conn.cursor()
-    logger.info(f"Building CVE table for date_hours: {date_hours}")
 
-    # 1) Load references
-    # Use alias 'article_published_date' to avoid potential conflict with cve_info dates
-    query_ac = """
-        SELECT
-            ac.cve_id, ac.article_id, ac.published_date AS article_published_date,
-            a.title AS article_title, a.link AS article_url, a.content, a.source
-        FROM article_cves ac
-        JOIN articles a ON ac.article_id = a.id
+def refresh_cve_mentions_summary(cve_ids=None, db_path="db/news.db", cursor=None):
+    """
+    Recompute `cve_mentions_summary` rows for the given CVE IDs from
+    `article_cves`, `articles` and `cve_info`. Mentions of archived articles
+    count with the link and source archive.py copied onto them.
+    If cve_ids is None, the whole summary table is rebuilt (used for backfill).
+    Uses the provided cursor if available. Returns the number of rows written.
     """
+    conn_managed_here = False
+    conn = None
+    if cursor is None:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+        conn_managed_here = True
+
     try:
-        article_cves_df = pd.read_sql_query(query_ac, conn)
-        logger.info(
-            f"Initial fetch from article_cves yielded {len(article_cves_df)} rows."
-        )
-        if article_cves_df.empty:
-            conn.close()
-            logger.warning(
-                "No CVE mentions found in article_cves join. Returning empty table."
+        if cve_ids is None:
+            cursor.execute("SELECT DISTINCT cve_id FROM article_cves")
+            cve_ids = [row[0] for row in cursor.fetchall()]
+            cursor.execute("DELETE FROM cve_mentions_summary")
+        cve_ids = sorted(set(cve_ids))
+        if not cve_ids:
+            return 0
+
+        written = 0
+        for start in range(0, len(cve_ids), SQL_IN_CHUNK_SIZE):
+            chunk = cve_ids[start : start + SQL_IN_CHUNK_SIZE]
+            placeholders = ",".join("?" for _ in chunk)
+            cursor.execute(
+                f"""
+                SELECT ac.cve_id, ac.article_id, ac.published_date,
+                       COALESCE(a.link, ac.link), COALESCE(a.source, ac.source)
+                FROM article_cves ac
+                LEFT JOIN articles a ON ac.article_id = a.id
+                WHERE ac.cve_id IN ({placeholders}) AND (a.id IS NOT NULL OR ac.link IS NOT NULL)
+                ORDER BY ac.cve_id, ac.article_id
+                """,
+                chunk,
             )
-            return pd.DataFrame(
-                columns=[
-                    "cve_id",
-                    "times_seen",
-                    "first_mention",
-                    "last_mention",
-                    "article_links",
-                    "base_score",
-                    "vendor",
-                    "affected_products",
-                    "cve_page_link",
-                    "vendor_link",
-                    "solution",
-                    "sources",
-                ]
+            mentions = {}
+            for cve_id, article_id, published_date, link, source in cursor.fetchall():
+                entry = mentions.setdefault(
+                    cve_id,
+                    {"article_ids": set(), "dates": [], "links": [], "hosts": set()},
+                )
+                entry["article_ids"].add(article_id)
+                parsed_date = to_utc_sqlite_str(published_date)
+                if parsed_date:
+                    entry["dates"].append(parsed_date)
+                if link:
+                    entry["links"].append(
+                        {"url": link, "source": source if source else "unknown"}
+                    )
+                    try:
+                        hostname = urlparse(link).netloc
+                        if hostname:
+                            entry["hosts"].add(hostname)
+                    except Exception as parse_err:
+                        logger.warning(
+                            f"Could not parse URL '{link}' for source extraction: {parse_err}"
+                        )
+
+            cursor.execute(
+                f"""
+                SELECT cve_id, base_score, vendor, affected_products, vendor_link, solution
+                FROM cve_info WHERE cve_id IN ({placeholders})
+                """,
+                chunk,
             )
-
-        # Convert published_date to datetime
-        article_cves_df["published_date_dt"] = pd.to_datetime(
-            article_cves_df["article_published_date"], utc=True, errors="coerce"
-        )
-        failed_parses = article_cves_df["published_date_dt"].isna().sum()
-        if failed_parses > 0:
-            logger.warning(f"Failed to parse {failed_parses} article published dates.")
-
-        # Drop rows where date parsing failed if date filtering is active
-        if date_hours is not None and date_hours > 0:
-            article_cves_df.dropna(subset=["published_date_dt"], inplace=True)
-            if article_cves_df.empty:
-                logger.warning(
-                    "DataFrame became empty after dropping rows with unparseable dates during initial load."
+            info_map = {row[0]: row[1:] for row in cursor.fetchall()}
+
+            # CVEs with no remaining mentions drop out of the summary
+            stale = [cve_id for cve_id in chunk if cve_id not in mentions]
+            if stale:
+                cursor.executemany(
+                    "DELETE FROM cve_mentions_summary WHERE cve_id = ?",
+                    [(cve_id,) for cve_id in stale],
                 )
 
-    except Exception as e:
-        logger.error(
-            f"Error during initial data fetch or date conversion: {e}", exc_info=True
-        )
-        conn.close()
-        return pd.DataFrame(
-            columns=[
-                "cve_id",
-                "times_seen",
-                "first_mention",
-                "last_mention",
-                "article_links",
-                "base_score",
-                "vendor",
-                "affected_products",
-                "cve_page_link",
-                "vendor_link",
-                "solution",
-                "sources",
-            ]
-        )
-
-    # 2) Filter by date_hours if requested
-    if date_hours is not None and date_hours > 0 and not article_cves_df.empty:
-        cutoff_utc = datetime.now(pytz.UTC) - timedelta(hours=date_hours)
-        logger.info(f"Applying date filter: published_date_dt >= {cutoff_utc}")
-        article_cves_df = article_cves_df[
-            article_cves_df["published_date_dt"] >= cutoff_utc
-        ].copy()
-        logger.info(f"DataFrame shape after date filter: {article_cves_df.shape}")
-
-    if article_cves_df.empty:
-        conn.close()
-        logger.warning(
-            "No CVE mentions found after applying date filter. Returning empty table."
-        )
-        return pd.DataFrame(
-            columns=[
-                "cve_id",
-                "times_seen",
-                "first_mention",
-                "last_mention",
-                "article_links",
-                "base_score",
-                "vendor",
-                "affected_products",
-                "cve_page_link",
-                "vendor_link",
-                "solution",
-                "sources",
-            ]
-        )
+            rows = []
+            for cve_id, entry in mentions.items():
+                base_score, vendor, products, vendor_link, solution = info_map.get(
+                    cve_id, (None, None, None, None, None)
+                )
+                rows.append(
+                    (
+                        cve_id,
+                        len(entry["article_ids"]),
+                        min(entry["dates"]) if entry["dates"] else None,
+                        max(entry["dates"]) if entry["dates"] else None,
+                        ", ".join(sorted(entry["hosts"])),
+                        json.dumps(entry["links"]),
+                        base_score,
+                        vendor,
+                        products,
+                        vendor_link,
+                        solution,
+                    )
+                )
+            cursor.executemany(
+                """
+                INSERT INTO cve_mentions_summary (
+                    cve_id, times_seen, first_mention, last_mention, sources,
+                    article_links, base_score, vendor, affected_products,
+                    vendor_link, solution, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(cve_id) DO UPDATE SET
+                    times_seen=excluded.times_seen, first_mention=excluded.first_mention,
+                    last_mention=excluded.last_mention, sources=excluded.sources,
+                    article_links=excluded.article_links, base_score=excluded.base_score,
+                    vendor=excluded.vendor, affected_products=excluded.affected_products,
+                    vendor_link=excluded.vendor_link, solution=excluded.solution,
+                    updated_at=CURRENT_TIMESTAMP
+                """,
+                rows,
+            )
+            written += len(rows)
+
+        if conn_managed_here and conn:
+            conn.commit()
+        logger.info(f"Refreshed cve_mentions_summary for {written} CVEs.")
+        return written
+    except sqlite3.Error as e:
+        logger.error(f"Error refreshing cve_mentions_summary: {e}", exc_info=True)
+        if conn_managed_here and conn:
+            conn.rollback()
+        raise
+    finally:
+        if conn_managed_here and conn:
+            conn.close()
 
-    # 3) Load CVE metadata
-    try:
-        cve_info_rows = c.execute("SELECT * FROM cve_info").fetchall()
-        cve_info_cols = [desc[0] for desc in c.description]
-        cve_info_df = pd.DataFrame(cve_info_rows, columns=cve_info_cols)
-        logger.info(f"Fetched {len(cve_info_df)} rows from cve_info.")
-    except Exception as e:
-        logger.error(f"Error fetching cve_info: {e}", exc_info=True)
-        cve_info_df = pd.DataFrame(columns=["cve_id"])
 
-    conn.close()  # Close connection after DB reads
+def build_cve_table(date_hours=None, db_path="db/news.db", cursor=None):
+    """
+    Returns a DataFrame with CVE mentions and metadata, for use in the React CVE Mentions table.
+    Reads the materialized `cve_mentions_summary` table; if `date_hours` is provided,
+    only CVEs whose last mention falls inside the window are returned.
 
-    # 4) Merge
-    if not cve_info_df.empty and "cve_id" in cve_info_df.columns:
-        if "cve_id" in article_cves_df.columns:
-            merged_df = pd.merge(article_cves_df, cve_info_df, on="cve_id", how="left")
-            logger.info(f"Shape after merging with cve_info: {merged_df.shape}")
-        else:
-            logger.warning(
-                "Missing 'cve_id' column in article_cves_df, skipping merge."
-            )
-            merged_df = article_cves_df.copy()
-            for col in [
-                "base_score",
-                "vendor",
-                "affected_products",
-                "cve_url",
-                "vendor_link",
-                "solution",
-            ]:
-                if col not in merged_df.columns:
-                    merged_df[col] = None
-    else:
-        logger.warning(
-            "cve_info table is empty or missing 'cve_id', proceeding without merge."
-        )
-        merged_df = article_cves_df.copy()
-        for col in [
-            "base_score",
-            "vendor",
-            "affected_products",
-            "cve_url",
-            "vendor_link",
-            "solution",
-        ]:
-            if col not in merged_df.columns:
-                merged_df[col] = None
-
-    if merged_df.empty:
-        logger.warning("DataFrame is empty before grouping. Returning empty table.")
-        return pd.DataFrame(
-            columns=[
-                "cve_id",
-                "times_seen",
-                "first_mention",
-                "last_mention",
-                "article_links",
-                "base_score",
-                "vendor",
-                "affected_products",
-                "cve_page_link",
-                "vendor_link",
-                "solution",
-                "sources",
-            ]
-        )
+    The 'article_links' column is an array/list of objects, each containing
+    the 'url' and 'source' of the article mention.
+    Example: [{'url': 'http://...', 'source': 'bleepingcomputer'}, {'url': 'http://...', 'source': 'theregister'}]
+    Reads through the connection of `cursor` if given, and leaves it open.
+    """
+    logger.info(f"Building CVE table for date_hours: {date_hours}")
+    query = """
+        SELECT cve_id, times_seen, first_mention, last_mention, article_links,
+               base_score, vendor, affected_products, vendor_link, solution, sources
+        FROM cve_mentions_summary
+    """
+    params = []
+    if date_hours is not None and date_hours > 0:
+        cutoff_utc = datetime.now(pytz.UTC) - timedelta(hours=date_hours)
+        query += " WHERE last_mention >= ?"
+        params.append(cutoff_utc.strftime("%Y-%m-%d %H:%M:%S"))
+        logger.info(f"Applying date filter: last_mention >= {params[0]}")
+    query += " ORDER BY times_seen DESC, cve_id ASC"
 
-    # 5) Group by cve_id
+    conn = cursor.connection if cursor else get_connection(db_path)
     try:
-        grouped = (
-            merged_df.groupby("cve_id")
-            .agg(
-                article_id_list=pd.NamedAgg(
-                    column="article_id", aggfunc=lambda x: list(x.unique())
-                ),
-                article_url_list=pd.NamedAgg(column="article_url", aggfunc=list),
-                source_list=pd.NamedAgg(column="source", aggfunc=list),
-                article_title_list=pd.NamedAgg(column="article_title", aggfunc=list),
-                published_date_min=pd.NamedAgg(
-                    column="published_date_dt", aggfunc="min"
-                ),
-                published_date_max=pd.NamedAgg(
-                    column="published_date_dt", aggfunc="max"
-                ),
-                base_score=pd.NamedAgg(column="base_score", aggfunc="first"),
-                vendor=pd.NamedAgg(column="vendor", aggfunc="first"),
-                affected_products=pd.NamedAgg(
-                    column="affected_products", aggfunc="first"
-                ),
-                cve_url=pd.NamedAgg(column="cve_url", aggfunc="first"),
-                vendor_link=pd.NamedAgg(column="vendor_link", aggfunc="first"),
-                solution=pd.NamedAgg(column="solution", aggfunc="first"),
-            )
-            .reset_index()
-        )
-        logger.info(f"Shape after grouping: {grouped.shape}")
-
-    except KeyError as e:
-        logger.error(
-            f"Grouping failed - Missing column: {e}. Columns available: {merged_df.columns.tolist()}",
-            exc_info=True,
-        )
-        return pd.DataFrame(
-            columns=[
-                "cve_id",
-                "times_seen",
-                "first_mention",
-                "last_mention",
-                "article_links",
-                "base_score",
-                "vendor",
-                "affected_products",
-                "cve_page_link",
-                "vendor_link",
-                "solution",
-                "sources",
-            ]
-        )
+        result_df = pd.read_sql_query(query, conn, params=params)
     except Exception as e:
-        logger.error(f"Error during grouping: {e}", exc_info=True)
-        return pd.DataFrame(
-            columns=[
-                "cve_id",
-                "times_seen",
-                "first_mention",
-                "last_mention",
-                "article_links",
-                "base_score",
-                "vendor",
-                "affected_products",
-                "cve_page_link",
-                "vendor_link",
-                "solution",
-                "sources",
-            ]
-        )
-
-    if grouped.empty:
-        logger.warning("DataFrame is empty after grouping. Returning empty table.")
-        return pd.DataFrame(
-            columns=[
-                "cve_id",
-                "times_seen",
-                "first_mention",
-                "last_mention",
-                "article_links",
-                "base_score",
-                "vendor",
-                "affected_products",
-                "cve_page_link",
-                "vendor_link",
-                "solution",
-                "sources",
-            ]
-        )
-
-    # 6) Build final rows
-    table_rows = []
-    for _, row in grouped.iterrows():
-        cve_id = row["cve_id"]
-        article_urls = row["article_url_list"] or []
-        article_sources = row["source_list"] or []
-
-        times_seen = len(row["article_id_list"] or [])
-        first_mention = row["published_date_min"]  # Datetime object
-        last_mention = row["published_date_max"]  # Datetime object
-
-        # --- This is where urlparse is needed ---
-        sources_set = set()
-        for url in article_urls:
-            if url:
-                try:
-                    # Use urlparse here
-                    hostname = urlparse(url).netloc
-                    if hostname:
-                        sources_set.add(hostname)
-                except Exception as parse_err:
-                    logger.warning(
-                        f"Could not parse URL '{url}' for source extraction: {parse_err}"
-                    )
-        sources_str = ", ".join(sorted(list(sources_set)))
-        # --- End of urlparse usage ---
-
-        mitre_cve_link = (
-            f"https://cve.mitre.org/cgi-bin/cvename.cgi?name={cve_id}"
-            if cve_id
-            else None
-        )
-
-        article_links_data = []
-        num_links = min(len(article_urls), len(article_sources))
-        for i in range(num_links):
-            article_links_data.append(
-                {
-                    "url": article_urls[i],
-                    "source": article_sources[i] if article_sources[i] else "unknown",
-                }
-            )
-
-        table_rows.append(
-            {
-                "cve_id": cve_id,
-                "times_seen": times_seen,
-                "first_mention": (
-                    first_mention.isoformat() if pd.notna(first_mention) else None
-                ),
-                "last_mention": (
-                    last_mention.isoformat() if pd.notna(last_mention) else None
-                ),
-                "article_links": article_links_data,
-                "base_score": row["base_score"],
-                "vendor": row["vendor"],
-                "affected_products": row["affected_products"],
-                "cve_page_link": mitre_cve_link,
-                "vendor_link": row["vendor_link"],
-                "solution": row["solution"],
-                "sources": sources_str,
-            }
-        )
+        logger.error(f"Error reading cve_mentions_summary: {e}", exc_info=True)
+        return pd.DataFrame(columns=CVE_TABLE_COLUMNS)
+    finally:
+        if cursor is None:
+            conn.close()
 
-    result_df = pd.DataFrame(table_rows)
-    result_df = result_df.where(pd.notnull(result_df), None)
+    if result_df.empty:
+        logger.warning("No CVE mentions found for the requested window.")
+        return pd.DataFrame(columns=CVE_TABLE_COLUMNS)
 
-    result_df["times_seen"] = pd.to_numeric(
-        result_df["times_seen"], errors="coerce"
-    ).fillna(0)
-    result_df.sort_values(
-        by=["times_seen", "cve_id"], ascending=[False, True], inplace=True
+    for col in ("first_mention", "last_mention"):
+        parsed = pd.to_datetime(result_df[col], utc=True, errors="coerce")
+        result_df[col] = [dt.isoformat() if pd.notna(dt) else None for dt in parsed]
+    result_df["article_links"] = result_df["article_links"].apply(
+        lambda x: json.loads(x) if x else []
     )
+    result_df["cve_page_link"] = (
+        "https://cve.mitre.org/cgi-bin/cvename.cgi?name=" + result_df["cve_id"]
+    )
+    result_df = result_df[CVE_TABLE_COLUMNS]
+    result_df = result_df.where(pd.notnull(result_df), None)
 
     logger.info(f"Finished building CVE table. Returning {len(result_df)} rows.")
     return result_df
 
 
-# --- Other functions like update_cve_details_from_api, process_cves_in_articles remain unchanged ---
+CVE_SCAN_WATERMARK = "cve_scan_article_id"
+CVE_SCAN_BATCH_SIZE = 500  # Articles read and committed per batch
 
 
 def process_cves_in_articles(db_path="db/news.db"):
     """
-    - Extract CVE numbers from articles using regex.
-    - Store each CVE mention in `article_cves(article_id, cve_id, published_date)`.
+    - Extract CVE numbers from articles added since the last run using regex.
+    - Store each CVE mention in `article_cves(article_id, cve_id, published_date)`,
+      with the date normalized to UTC 'YYYY-MM-DD HH:MM:SS'.
+    - Refresh `cve_mentions_summary` for every CVE that gained a new mention.
+
+    Progress is tracked by the `cve_scan_article_id` watermark (highest article id
+    scanned), so each run only reads new articles. Mentions are written with one
+    executemany per batch, committed together with the advanced watermark.
     """
     conn = get_connection(db_path)
     cursor = conn.cursor()
-
-    # Fetch all articles WITH their published date
-    cursor.execute("SELECT id, published_date, content FROM articles")
-    articles = cursor.fetchall()
-    conn.close()
-
     total_found = 0
-    from news_grouping_app.db.database import insert_article_cve  # Assuming this helper exists
-    from news_grouping_app.utils import extract_cves  # Assuming this helper exists
-
-    for article_id, published_date, content in articles:
-        # Ensure published_date is passed along
-        # It might be a string here, the insert_article_cve should handle format if needed,
-        # but ideally, the migration script fixed the format in the articles table.
-        found_cves = extract_cves(content or "")
-        if not found_cves:
-            continue
+    scanned = 0
+    touched_cves = set()
+    summary_is_empty = False
 
-        for cve in found_cves:
-            # Pass the published_date from the article record
-            insert_success = insert_article_cve(
-                article_id, cve, published_date, db_path=db_path
+    try:
+        last_scanned_id = get_watermark(CVE_SCAN_WATERMARK, cursor=cursor)
+        cursor.execute("SELECT COUNT(*) FROM cve_mentions_summary")
+        summary_is_empty = cursor.fetchone()[0] == 0
+        logger.info(f"Scanning articles with id > {last_scanned_id} for CVE mentions.")
+
+        while True:
+            cursor.execute(
+                "SELECT id, published_date FROM articles WHERE id > ? ORDER BY id LIMIT ?",
+                (last_scanned_id, CVE_SCAN_BATCH_SIZE),
             )
-            if insert_success:
-                total_found += 1
-            else:
-                logger.warning(
-                    f"Failed to insert CVE mention for article {article_id}, CVE {cve}"
-                )
+            articles = cursor.fetchall()
+            if not articles:
+                break
+            bodies = get_article_bodies([article_id for article_id, _ in articles], cursor=cursor)
+
+            rows = []
+            for article_id, published_date in articles:
+                published_date = normalize_date(published_date)
+                for cve in extract_cves(bodies.get(article_id) or ""):
+                    rows.append((article_id, cve, published_date))
+                    touched_cves.add(cve)
+
+            if rows:
+                inserted = insert_article_cves_bulk(rows, db_path=db_path, cursor=cursor)
+                if inserted is None:
+                    conn.rollback()
+                    logger.warning(
+                        f"Failed to insert CVE mentions for articles {articles[0][0]}-{articles[-1][0]}; will retry next run."
+                    )
+                    break
+                total_found += inserted
+
+            last_scanned_id = articles[-1][0]
+            set_watermark(CVE_SCAN_WATERMARK, last_scanned_id, cursor=cursor)
+            conn.commit()
+            scanned += len(articles)
+    except sqlite3.Error as e:
+        logger.error(f"Database error while scanning articles for CVEs: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
 
     logger.info(
-        f"Finished processing CVEs. Attempted to insert {total_found} new CVE references."
+        f"Finished processing CVEs. Scanned {scanned} new articles, inserted {total_found} new CVE references."
     )
 
+    try:
+        if summary_is_empty:
+            # First run against an existing database: backfill every CVE
+            refresh_cve_mentions_summary(None, db_path=db_path)
+        elif touched_cves:
+            refresh_cve_mentions_summary(touched_cves, db_path=db_path)
+    except sqlite3.Error as e:
+        logger.error(f"Failed to refresh CVE mention summary: {e}")
 
-def update_cve_details_from_api(db_path="db/news.db"):
-    """
-    Fetches CVE details from Mitre API and updates `cve_info` table.
-    """
-    conn = get_connection(db_path)
-    c = conn.cursor()
 
-    # 1) Get all unique CVE IDs from article_cves
-    try:
-        c.execute("SELECT DISTINCT cve_id FROM article_cves")
-        all_cves = [row[0] for row in c.fetchall()]
-        logger.info(f"Found {len(all_cves)} unique CVE IDs mentioned in articles.")
-    except Exception as e:
-        logger.error(
-            f"Error fetching distinct CVEs from article_cves: {e}", exc_info=True
-        )
-        conn.close()
-        return
+CVE_API_URL = "https://cveawg.mitre.org/api/cve/{cve_id}"
+CVE_REFRESH_DAYS = 7  # Re-fetch cve_info rows older than this
+CVE_FETCH_WORKERS = int(os.environ.get("CVE_FETCH_WORKERS", "8"))
+CVE_FETCH_MAX_RETRIES = 4
+CVE_FETCH_BACKOFF_SECONDS = 1.0  # Doubled on each retry unless Retry-After says otherwise
+CVE_WRITE_COMMIT_EVERY = 100
+CVE_RECORD_CODEC = "zlib"
 
-    # 2) Count occurrences for each CVE
-    times_mentioned_map = {}
-    try:
-        mention_rows = c.execute(
-            "SELECT cve_id, COUNT(*) FROM article_cves GROUP BY cve_id"
-        ).fetchall()
-        times_mentioned_map = {row[0]: row[1] for row in mention_rows}
-    except Exception as e:
-        logger.error(f"Error counting CVE mentions: {e}", exc_info=True)
-        # Continue, but times_mentioned might be inaccurate
+_http_local = threading.local()
 
-    updated_count = 0
-    skipped_count = 0
-    failed_count = 0
-    processed_count = 0
-
-    from news_grouping_app.db.database import insert_or_update_cve_info  # Assuming this helper exists
-    import json  # Ensure json is imported
-    import requests  # Ensure requests is imported
-
-    total_cves = len(all_cves)
-    for index, cve_id in enumerate(all_cves):
-        processed_count += 1
-        if index % 50 == 0:  # Log progress
-            logger.info(
-                f"Updating CVE details: Processed {processed_count}/{total_cves}..."
-            )
 
-        # Check if CVE info already exists and was updated recently (e.g., last 7 days)
-        # This avoids hitting the API too often for the same CVE
-        try:
-            c.execute("SELECT updated_at FROM cve_info WHERE cve_id = ?", (cve_id,))
-            result = c.fetchone()
-            if result and result[0]:
-                last_updated_str = result[0]
-                last_updated_dt = pd.to_datetime(
-                    last_updated_str, errors="coerce"
-                )  # Try parsing stored date
-                if (
-                    pd.notna(last_updated_dt)
-                    and (datetime.now() - last_updated_dt).days < 7
-                ):
-                    # logger.debug(f"Skipping recently updated CVE: {cve_id}")
-                    skipped_count += 1
-                    continue  # Skip update if recent
-        except Exception as check_err:
-            logger.warning(
-                f"Could not check last update time for {cve_id}: {check_err}"
-            )
+def _get_http_session():
+    """Return a per-thread requests.Session so worker threads reuse connections."""
+    session = getattr(_http_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=2)
+        session.mount("https://", adapter)
+        _http_local.session = session
+    return session
 
-        # Construct API URL carefully
-        if not isinstance(cve_id, str) or not re.match(CVE_REGEX, cve_id):
-            logger.warning(f"Skipping invalid CVE ID format: {cve_id}")
-            failed_count += 1
-            continue
 
-        url = f"https://cveawg.mitre.org/api/cve/{cve_id}"
-        try:
-            resp = requests.get(url, timeout=15)  # Increased timeout slightly
-            resp.raise_for_status()  # Check for HTTP errors
-            data = resp.json()
+def compress_cve_record(data):
+    """Serialize a CVE JSON record to a zlib-compressed blob."""
+    return zlib.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"), 6)
 
-            if not isinstance(data, dict):
-                logger.warning(f"Invalid JSON response for {cve_id}: {data}")
-                failed_count += 1
-                continue
-            if (
-                data.get("error") == "CVE_RECORD_NOT_FOUND"
-                or data.get("message") == "CVE not found"
-            ):
-                logger.info(f"CVE not found in API: {cve_id}")
-                # Optionally, insert a placeholder or mark as not found
-                failed_count += 1
-                continue
-            if data.get("error") == "INTERNAL_SERVER_ERROR":
-                logger.warning(f"API internal server error for {cve_id}. Skipping.")
-                failed_count += 1
-                continue
 
+def decompress_cve_record(blob, codec=CVE_RECORD_CODEC):
+    """Inverse of compress_cve_record."""
+    if codec != CVE_RECORD_CODEC:
+        raise ValueError(f"Unsupported CVE record codec: {codec}")
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+def fetch_cve_record(cve_id):
+    """
+    Fetch one CVE JSON record from the MITRE API.
+    Retries 429/5xx responses with backoff, honouring Retry-After when present.
+    Returns (data, error); exactly one of them is None.
+    """
+    url = CVE_API_URL.format(cve_id=cve_id)
+    session = _get_http_session()
+    delay = CVE_FETCH_BACKOFF_SECONDS
+    for attempt in range(CVE_FETCH_MAX_RETRIES):
+        try:
+            resp = session.get(url, timeout=15)
         except requests.exceptions.Timeout:
-            logger.warning(f"Timeout fetching details for {cve_id}")
-            failed_count += 1
-            continue
+            error = "timeout"
         except requests.exceptions.RequestException as req_err:
-            logger.warning(f"Request error fetching details for {cve_id}: {req_err}")
-            failed_count += 1
-            continue
-        except json.JSONDecodeError as json_err:
-            logger.warning(
-                f"JSON decode error for {cve_id}: {json_err}. Response text: {resp.text[:200]}"
-            )
-            failed_count += 1
-            continue
-        except Exception as e:
-            logger.error(
-                f"Unexpected error fetching/parsing details for {cve_id}: {e}",
-                exc_info=True,
-            )
-            failed_count += 1
-            continue
+            error = f"request error: {req_err}"
+        else:
+            if resp.status_code == 404:
+                return None, "not found"
+            if resp.status_code == 429 or resp.status_code >= 500:
+                error = f"HTTP {resp.status_code}"
+                retry_after = resp.headers.get("Retry-After")
+                if retry_after and retry_after.isdigit():
+                    delay = max(delay, float(retry_after))
+            else:
+                try:
+                    resp.raise_for_status()
+                    data = resp.json()
+                except requests.exceptions.HTTPError as http_err:
+                    return None, f"HTTP error: {http_err}"
+                except ValueError as json_err:
+                    return None, f"JSON decode error: {json_err}"
+                if not isinstance(data, dict):
+                    return None, "invalid JSON response"
+                if (
+                    data.get("error") == "CVE_RECORD_NOT_FOUND"
+                    or data.get("message") == "CVE not found"
+                ):
+                    return None, "not found"
+                if data.get("error") == "INTERNAL_SERVER_ERROR":
+                    error = "API internal server error"
+                else:
+                    return data, None
 
-        # --- Parse CVE details ---
-        cna_data = data.get("containers", {}).get("cna", {})
-        if not cna_data:  # Check if cna container exists
-            logger.warning(f"No CNA container found in JSON for {cve_id}")
-            # Treat as failure or insert minimal info? Let's count as failure for now.
-            failed_count += 1
-            continue
+        if attempt < CVE_FETCH_MAX_RETRIES - 1:
+            logger.debug(f"Retrying {cve_id} in {delay:.1f}s after {error}")
+            time.sleep(delay)
+            delay *= 2
+    return None, error
 
-        affected_list = cna_data.get("affected", [])
 
-        # Safely get vendor and product, handle potential None values
-        vendor_str = ", ".join(
-            sorted(
-                {
-                    aff.get("vendor", "")
-                    for aff in affected_list
-                    if aff and aff.get("vendor")
-                }
-            )
+def parse_cve_record(data):
+    """
+    Extract the cve_info fields from a CVE JSON 5.x record.
+    Returns a dict (base_score, vendor, affected_products, vendor_link, solution)
+    or None if the record has no CNA container.
+    """
+    cna_data = (data.get("containers") or {}).get("cna") or {}
+    if not cna_data:  # Check if cna container exists
+        return None
+
+    affected_list = cna_data.get("affected") or []
+
+    # Safely get vendor and product, handle potential None values
+    vendor_str = ", ".join(
+        sorted(
+            {
+                aff.get("vendor", "")
+                for aff in affected_list
+                if isinstance(aff, dict) and aff.get("vendor")
+            }
         )
-        products_str = ", ".join(
-            sorted(
-                {
-                    aff.get("product", "")
-                    for aff in affected_list
-                    if aff and aff.get("product")
-                }
-            )
+    )
+    products_str = ", ".join(
+        sorted(
+            {
+                aff.get("product", "")
+                for aff in affected_list
+                if isinstance(aff, dict) and aff.get("product")
+            }
         )
+    )
 
-        # Safely get base score
-        base_score = None
-        metrics_list = cna_data.get("metrics", [])
-        if metrics_list and isinstance(metrics_list, list):
-            # Prefer CVSS v3.x if available
-            cvss_v3 = next(
+    # Safely get base score
+    base_score = None
+    metrics_list = cna_data.get("metrics", [])
+    if metrics_list and isinstance(metrics_list, list):
+        # Prefer CVSS v3.x if available
+        cvss_v3 = next(
+            (
+                m.get("cvssV3_1", {}).get("baseScore")
+                or m.get("cvssV3_0", {}).get("baseScore")
+                for m in metrics_list
+                if isinstance(m, dict) and (m.get("cvssV3_1") or m.get("cvssV3_0"))
+            ),
+            None,
+        )
+        if cvss_v3 is not None:
+            base_score = cvss_v3
+        else:
+            # Fallback to CVSS v2 if v3 not found
+            cvss_v2 = next(
                 (
-                    m.get("cvssV3_1", {}).get("baseScore")
-                    or m.get("cvssV3_0", {}).get("baseScore")
+                    m.get("cvssV2", {}).get("baseScore")
                     for m in metrics_list
-                    if isinstance(m, dict) and (m.get("cvssV3_1") or m.get("cvssV3_0"))
+                    if isinstance(m, dict) and m.get("cvssV2")
                 ),
                 None,
             )
-            if cvss_v3 is not None:
-                base_score = cvss_v3
-            else:
-                # Fallback to CVSS v2 if v3 not found
-                cvss_v2 = next(
-                    (
-                        m.get("cvssV2", {}).get("baseScore")
-                        for m in metrics_list
-                        if isinstance(m, dict) and m.get("cvssV2")
-                    ),
-                    None,
-                )
-                base_score = cvss_v2
+            base_score = cvss_v2
+
+    # Safely get vendor link
+    vendor_link = ""
+    references_list = cna_data.get("references", [])
+    if references_list and isinstance(references_list, list):
+        vendor_link = next(
+            (
+                ref.get("url", "")
+                for ref in references_list
+                if isinstance(ref, dict)
+                and isinstance(ref.get("tags"), list)
+                and "vendor-advisory" in ref["tags"]
+            ),
+            "",
+        )
 
-        # Safely get vendor link
-        vendor_link = ""
-        references_list = cna_data.get("references", [])
-        if references_list and isinstance(references_list, list):
-            vendor_link = next(
-                (
-                    ref.get("url", "")
-                    for ref in references_list
-                    if isinstance(ref, dict)
-                    and isinstance(ref.get("tags"), list)
-                    and "vendor-advisory" in ref["tags"]
-                ),
-                "",
-            )
+    # Safely get solutions
+    solution_str = ""
+    solutions_list = cna_data.get("solutions", [])
+    if solutions_list and isinstance(solutions_list, list):
+        solution_str = "\n\n".join(
+            sol.get("value", "")
+            for sol in solutions_list
+            if isinstance(sol, dict) and sol.get("value")
+        ).strip()
+
+    return {
+        "base_score": base_score,
+        "vendor": vendor_str,
+        "affected_products": products_str,
+        "vendor_link": vendor_link,
+        "solution": solution_str,
+    }
+
+
+def store_cve_record(cve_id, data, times_mentioned, db_path="db/news.db", cursor=None, blob=None):
+    """
+    Parse a CVE JSON record and write it to `cve_info`. Freshly fetched records
+    (blob=None) are also cached compressed in `cve_records`; pass the existing blob
+    when the record came from that cache. Returns True on success, False otherwise.
+    """
+    fields = parse_cve_record(data)
+    if fields is None:
+        logger.warning(f"No CNA container found in JSON for {cve_id}")
+        return False
+    if blob is None and not upsert_cve_record(
+        cve_id, compress_cve_record(data), CVE_RECORD_CODEC, db_path=db_path, cursor=cursor
+    ):
+        return False
+    return insert_or_update_cve_info(
+        cve_id=cve_id,
+        base_score=fields["base_score"],
+        vendor=fields["vendor"],
+        affected_products=fields["affected_products"],
+        cve_url=CVE_API_URL.format(cve_id=cve_id),
+        vendor_link=fields["vendor_link"],
+        solution=fields["solution"],
+        times_mentioned=times_mentioned,
+        raw_json_str=None,  # Raw record lives compressed in cve_records
+        db_path=db_path,
+        cursor=cursor,
+    )
 
-        # Safely get solutions
-        solution_str = ""
-        solutions_list = cna_data.get("solutions", [])
-        if solutions_list and isinstance(solutions_list, list):
-            solution_str = "\n\n".join(
-                sol.get("value", "")
-                for sol in solutions_list
-                if isinstance(sol, dict) and sol.get("value")
-            ).strip()
-
-        # Get current times mentioned count
-        current_times_mentioned = times_mentioned_map.get(cve_id, 0)
-
-        # Insert/Update using the database helper function
-        insert_success = insert_or_update_cve_info(
-            cve_id=cve_id,
-            base_score=base_score,
-            vendor=vendor_str,
-            affected_products=products_str,
-            # Construct API link if needed, or use link from response if available
-            cve_url=f"https://cveawg.mitre.org/api/cve/{cve_id}",  # Or use a specific URL from response if preferred
-            vendor_link=vendor_link,
-            solution=solution_str,
-            times_mentioned=current_times_mentioned,  # Use count from article_cves
-            raw_json_str=json.dumps(data),  # Store the raw JSON
-            db_path=db_path,
-            # Let the helper handle the cursor/connection
-        )
 
-        if insert_success:
-            updated_count += 1
-        else:
-            logger.warning(f"Failed to insert/update cve_info for {cve_id}")
-            failed_count += 1
+def get_cves_needing_update(max_age_days=CVE_REFRESH_DAYS, db_path="db/news.db"):
+    """
+    Return {cve_id: (times_mentioned, has_cached_record)} for every mentioned CVE
+    that is missing from `cve_info` or was last updated more than max_age_days ago.
+    """
+    conn = get_connection(db_path)
+    try:
+        rows = conn.execute(
+            """
+            SELECT ac.cve_id, COUNT(*) AS times_mentioned,
+                   ci.cve_id IS NOT NULL AS has_info,
+                   cr.cve_id IS NOT NULL AS has_record
+            FROM article_cves ac
+            LEFT JOIN cve_info ci ON ci.cve_id = ac.cve_id
+            LEFT JOIN cve_records cr ON cr.cve_id = ac.cve_id
+            WHERE ci.cve_id IS NULL
+               OR ci.updated_at IS NULL
+               OR ci.updated_at < datetime('now', ?)
+            GROUP BY ac.cve_id
+            """,
+            (f"-{int(max_age_days)} days",),
+        ).fetchall()
+    finally:
+        conn.close()
+    # A cached record only substitutes for the network when cve_info is missing
+    return {
+        cve_id: (count, bool(has_record) and not has_info)
+        for cve_id, count, has_info, has_record in rows
+    }
+
+
+def update_cve_details_from_api(db_path="db/news.db", max_workers=CVE_FETCH_WORKERS):
+    """
+    Fetches CVE details from Mitre API and updates `cve_info` table.
+
+    Only CVEs that are missing or stale are selected (one query). CVEs missing
+    from cve_info but present in the local `cve_records` cache are re-parsed
+    without a network call; the rest are fetched concurrently by a bounded
+    thread pool. All DB writes happen on this thread through one connection.
+    """
+    try:
+        pending = get_cves_needing_update(db_path=db_path)
+    except sqlite3.Error as e:
+        logger.error(f"Error selecting CVEs needing update: {e}", exc_info=True)
+        return
+
+    to_fetch = []
+    from_cache = []
+    for cve_id, (times_mentioned, use_cache) in pending.items():
+        if not isinstance(cve_id, str) or not CVE_PATTERN.match(cve_id):
+            logger.warning(f"Skipping invalid CVE ID format: {cve_id}")
+            continue
+        (from_cache if use_cache else to_fetch).append(cve_id)
+    logger.info(
+        f"{len(pending)} CVEs need details: {len(from_cache)} from local cache, {len(to_fetch)} from API."
+    )
+    if not pending:
+        return
 
-        # Optional: Small delay to be polite to the API
-        time.sleep(0.1)
+    updated_count = 0
+    failed_count = 0
+    refreshed_cves = []
+    start_time = time.time()
+
+    conn = get_connection(db_path)
+    cursor = conn.cursor()
+    try:
+        # 1) Re-parse cached records (no network)
+        for cve_id in from_cache:
+            row = cursor.execute(
+                "SELECT codec, record FROM cve_records WHERE cve_id = ?", (cve_id,)
+            ).fetchone()
+            try:
+                data = decompress_cve_record(row[1], row[0])
+            except (ValueError, zlib.error) as e:
+                logger.warning(f"Cached record for {cve_id} unreadable ({e}); fetching instead.")
+                to_fetch.append(cve_id)
+                continue
+            if store_cve_record(cve_id, data, pending[cve_id][0], db_path, cursor, blob=row[1]):
+                updated_count += 1
+                refreshed_cves.append(cve_id)
+            else:
+                failed_count += 1
+        conn.commit()
+
+        # 2) Fetch the remainder concurrently; write results as they arrive
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = {executor.submit(fetch_cve_record, cve_id): cve_id for cve_id in to_fetch}
+            for done, future in enumerate(as_completed(futures), start=1):
+                cve_id = futures[future]
+                try:
+                    data, error = future.result()
+                except Exception as e:
+                    data, error = None, f"unexpected error: {e}"
+                if error:
+                    logger.info(f"Could not fetch details for {cve_id}: {error}")
+                    failed_count += 1
+                elif store_cve_record(cve_id, data, pending[cve_id][0], db_path, cursor):
+                    updated_count += 1
+                    refreshed_cves.append(cve_id)
+                else:
+                    logger.warning(f"Failed to insert/update cve_info for {cve_id}")
+                    failed_count += 1
+
+                if done % CVE_WRITE_COMMIT_EVERY == 0:
+                    conn.commit()
+                    logger.info(f"Updating CVE details: Fetched {done}/{len(to_fetch)}...")
+        conn.commit()
+
+        # Push refreshed metadata into the materialized summary
+        if refreshed_cves:
+            refresh_cve_mentions_summary(refreshed_cves, db_path=db_path, cursor=cursor)
+            conn.commit()
+    except sqlite3.Error as e:
+        logger.error(f"Database error while updating CVE details: {e}", exc_info=True)
+        conn.rollback()
+    finally:
+        conn.close()
 
     logger.info(
-        f"Finished updating CVE details. Total Processed: {processed_count}, Updated: {updated_count}, Skipped (Recent): {skipped_count}, Failed/Not Found: {failed_count}."
+        f"Finished updating CVE details in {time.time() - start_time:.2f}s. Total Pending: {len(pending)}, Updated: {updated_count}, Failed/Not Found: {failed_count}."
     )
-    # No explicit commit/close needed if insert_or_update_cve_info handles its connection
+
+
+def reparse_cached_cve_records(db_path="db/news.db"):
+    """
+    Rebuild `cve_info` fields for every cached record in `cve_records` without
+    touching the network (e.g. after changing parse_cve_record).
+    Returns the number of CVEs re-parsed.
+    """
+    conn = get_connection(db_path)
+    cursor = conn.cursor()
+    reparsed = []
+    try:
+        counts = dict(
+            cursor.execute(
+                "SELECT cve_id, COUNT(*) FROM article_cves GROUP BY cve_id"
+            ).fetchall()
+        )
+        records = conn.execute("SELECT cve_id, codec, record FROM cve_records")
+        for cve_id, codec, blob in records:
+            try:
+                data = decompress_cve_record(blob, codec)
+            except (ValueError, zlib.error) as e:
+                logger.warning(f"Skipping unreadable cached record for {cve_id}: {e}")
+                continue
+            if store_cve_record(cve_id, data, counts.get(cve_id, 0), db_path, cursor, blob=blob):
+                reparsed.append(cve_id)
+        refresh_cve_mentions_summary(reparsed, db_path=db_path, cursor=cursor)
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.error(f"Database error while re-parsing cached CVE records: {e}", exc_info=True)
+        conn.rollback()
+    finally:
+        conn.close()
+    logger.info(f"Re-parsed {len(reparsed)} cached CVE records.")
+    return len(reparsed)
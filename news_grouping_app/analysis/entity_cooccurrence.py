@@ -0,0 +1,219 @@
+# analysis/entity_cooccurrence.py
+# Entity co-occurrence counts per category and day, maintained incrementally.
+#
+# `entity_pair_daily(day, category, e1, e2, count)` holds, for every entity pair
+# (e1 < e2), the number of articles published that day in that category that
+# mention both. Triggers on article_entities, group memberships, group topics
+# and article dates queue affected article IDs in `entity_pair_dirty`.
+# refresh_entity_pair_daily() folds the queue into the counts: each article's
+# previous contribution (kept in `entity_pair_article_state`) is subtracted and
+# its current one added, so a co-occurrence query over a 48-hour window is a
+# sum over two or three day rows per pair instead of a self-join of
+# article_entities.
+
+import json
+import sqlite3
+import logging
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from itertools import combinations
+
+import pandas as pd
+
+from news_grouping_app.db.database import get_connection, get_watermark, set_watermark
+
+logger = logging.getLogger(__name__)
+
+ENTITY_PAIR_RETENTION_DAYS = 14  # Older days are pruned; trending only reads 48 hours
+ENTITY_PAIR_MAX_ENTITIES = 25  # Most relevant entities per article that form pairs
+ENTITY_PAIR_BATCH_SIZE = 500  # Dirty articles per read; also keeps IN (...) lists short
+ENTITY_PAIR_BACKFILL_WATERMARK = "entity_pair_backfill"
+
+
+def _cutoff_day(days):
+    return (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+def _load_current_contributions(cursor, article_ids):
+    """Return {article_id: (day, categories, entity_ids)} from the live tables."""
+    placeholders = ",".join("?" for _ in article_ids)
+    days = dict(
+        cursor.execute(
+            f"SELECT id, date(published_date) FROM articles WHERE id IN ({placeholders})",
+            article_ids,
+        ).fetchall()
+    )
+    categories = {}
+    for article_id, topic in cursor.execute(
+        f"""
+        SELECT DISTINCT m.article_id, g.main_topic
+        FROM two_phase_article_group_memberships m
+        JOIN two_phase_article_groups g ON g.group_id = m.group_id
+        WHERE m.article_id IN ({placeholders})
+        """,
+        article_ids,
+    ):
+        categories.setdefault(article_id, set()).add(topic)
+    entities = {}
+    for article_id, entity_id in cursor.execute(
+        f"""
+        SELECT article_id, entity_id FROM article_entities
+        WHERE article_id IN ({placeholders})
+        ORDER BY article_id, relevance_score DESC, entity_id
+        """,
+        article_ids,
+    ):
+        bucket = entities.setdefault(article_id, [])
+        if len(bucket) < ENTITY_PAIR_MAX_ENTITIES:
+            bucket.append(entity_id)
+
+    result = {}
+    for article_id in article_ids:
+        day = days.get(article_id)
+        cats = categories.get(article_id)
+        ents = entities.get(article_id, [])
+        if day and cats and len(ents) > 1:
+            result[article_id] = (day, sorted(cats), sorted(ents))
+    return result
+
+
+def _add_contribution(delta, contribution, sign):
+    day, categories, entity_ids = contribution
+    for e1, e2 in combinations(entity_ids, 2):
+        for category in categories:
+            delta[(day, category, e1, e2)] += sign
+
+
+def _backfill_if_needed(cursor, db_path):
+    """Queue every article in the retention window the first time counts are built."""
+    if get_watermark(ENTITY_PAIR_BACKFILL_WATERMARK, db_path=db_path, cursor=cursor):
+        return
+    cursor.execute(
+        """
+        INSERT OR IGNORE INTO entity_pair_dirty (article_id)
+        SELECT id FROM articles WHERE date(published_date) >= ?
+        """,
+        (_cutoff_day(ENTITY_PAIR_RETENTION_DAYS),),
+    )
+    logger.info(f"Queued {cursor.rowcount} articles for the initial entity co-occurrence backfill.")
+    set_watermark(ENTITY_PAIR_BACKFILL_WATERMARK, 1, db_path=db_path, cursor=cursor)
+
+
+def refresh_entity_pair_daily(db_path="db/news.db"):
+    """
+    Fold queued article changes into `entity_pair_daily` and prune days past
+    the retention window. Runs in one transaction; returns the number of
+    articles processed (0 on error).
+    """
+    conn = None
+    processed = 0
+    try:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+        _backfill_if_needed(cursor, db_path)
+
+        cutoff = _cutoff_day(ENTITY_PAIR_RETENTION_DAYS)
+        cursor.execute("DELETE FROM entity_pair_daily WHERE day < ?", (cutoff,))
+        cursor.execute("DELETE FROM entity_pair_article_state WHERE day < ?", (cutoff,))
+
+        dirty = [row[0] for row in cursor.execute("SELECT article_id FROM entity_pair_dirty")]
+        for start in range(0, len(dirty), ENTITY_PAIR_BATCH_SIZE):
+            batch = dirty[start : start + ENTITY_PAIR_BATCH_SIZE]
+            placeholders = ",".join("?" for _ in batch)
+            previous = {
+                article_id: (day, json.loads(cats), json.loads(ents))
+                for article_id, day, cats, ents in cursor.execute(
+                    f"""
+                    SELECT article_id, day, categories, entity_ids
+                    FROM entity_pair_article_state WHERE article_id IN ({placeholders})
+                    """,
+                    batch,
+                )
+            }
+            current = {
+                article_id: contribution
+                for article_id, contribution in _load_current_contributions(cursor, batch).items()
+                if contribution[0] >= cutoff
+            }
+
+            delta = Counter()
+            for contribution in previous.values():
+                _add_contribution(delta, contribution, -1)
+            for contribution in current.values():
+                _add_contribution(delta, contribution, 1)
+            changes = [(*key, n) for key, n in delta.items() if n]
+
+            cursor.executemany(
+                """
+                INSERT INTO entity_pair_daily (day, category, e1, e2, count)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(category, day, e1, e2) DO UPDATE SET count = count + excluded.count
+                """,
+                changes,
+            )
+            cursor.executemany(
+                "DELETE FROM entity_pair_daily WHERE category = ? AND day = ? AND e1 = ? AND e2 = ? AND count <= 0",
+                [(category, day, e1, e2) for day, category, e1, e2, n in changes if n < 0],
+            )
+            cursor.executemany(
+                "DELETE FROM entity_pair_article_state WHERE article_id = ?",
+                [(a,) for a in previous if a not in current],
+            )
+            cursor.executemany(
+                """
+                INSERT OR REPLACE INTO entity_pair_article_state (article_id, day, categories, entity_ids)
+                VALUES (?, ?, ?, ?)
+                """,
+                [
+                    (article_id, day, json.dumps(cats), json.dumps(ents))
+                    for article_id, (day, cats, ents) in current.items()
+                ],
+            )
+            cursor.executemany("DELETE FROM entity_pair_dirty WHERE article_id = ?", [(a,) for a in batch])
+            processed += len(batch)
+
+        conn.commit()
+        if processed:
+            logger.info(f"Entity co-occurrence counts refreshed for {processed} articles.")
+    except sqlite3.Error as e:
+        logger.error(f"Error refreshing entity co-occurrence counts: {e}", exc_info=True)
+        if conn:
+            conn.rollback()
+        processed = 0
+    finally:
+        if conn:
+            conn.close()
+    return processed
+
+
+def get_entity_pair_counts(category, hours=48, limit=20, min_count=2, db_path="db/news.db"):
+    """
+    Most frequent entity pairs in a category over the last `hours`, summed
+    from daily rows (whole days, so the window starts at midnight UTC of the
+    cutoff day). Returns a DataFrame with entity1_id/name/type,
+    entity2_id/name/type and co_occurrence_count.
+    """
+    cutoff_day = (datetime.now(timezone.utc) - timedelta(hours=hours)).strftime("%Y-%m-%d")
+    query = """
+        SELECT
+            p.e1 AS entity1_id, en1.entity_name AS entity1_name, en1.entity_type AS entity1_type,
+            p.e2 AS entity2_id, en2.entity_name AS entity2_name, en2.entity_type AS entity2_type,
+            p.co_occurrence_count
+        FROM (
+            SELECT e1, e2, SUM(count) AS co_occurrence_count
+            FROM entity_pair_daily
+            WHERE category = ? AND day >= ?
+            GROUP BY e1, e2
+            HAVING co_occurrence_count >= ?
+            ORDER BY co_occurrence_count DESC
+            LIMIT ?
+        ) p
+        JOIN entity_profiles en1 ON en1.entity_id = p.e1
+        JOIN entity_profiles en2 ON en2.entity_id = p.e2
+        ORDER BY p.co_occurrence_count DESC
+    """
+    conn = get_connection(db_path)
+    try:
+        return pd.read_sql_query(query, conn, params=(category, cutoff_day, min_count, limit))
+    finally:
+        conn.close()
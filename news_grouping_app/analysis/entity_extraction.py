@@ -7,37 +7,77 @@ import time
 import pandas as pd
 import logging
 
-from news_grouping_app.db.database import get_connection, insert_entity, link_entity_to_article
+from news_grouping_app.db.database import get_connection, get_article_bodies, insert_entity, link_entity_to_article
 from news_grouping_app.llm_calls import call_gpt_api
-from news_grouping_app.utils import chunk_summaries, MAX_TOKEN_CHUNK
+from news_grouping_app.utils import chunk_summaries, count_tokens, MAX_TOKEN_CHUNK
 from news_grouping_app.config import OPENAI_MODEL
 
 logger = logging.getLogger(__name__)
 MODEL = OPENAI_MODEL  # default model can be overridden via env var
 
 # Increase the token chunk size for faster processing
-EXTRACTION_TOKEN_CHUNK = MAX_TOKEN_CHUNK * 1.5  # 50% larger chunks for extraction
-
-
-def get_articles_missing_entity_extraction(db_path="db/news.db"):
+EXTRACTION_TOKEN_CHUNK = int(MAX_TOKEN_CHUNK * 1.5)  # 50% larger chunks for extraction
+# Expected JSON output per article (~8 entities with description and context)
+ENTITY_OUTPUT_TOKENS_PER_ARTICLE = 500
+# Article IDs per IN (...) query in bulk entity lookups
+ENTITY_LOOKUP_CHUNK_SIZE = 500
+
+ENTITY_PROMPT_HEADER = (
+    "Extract important named entities from these articles. "
+    "Include people, organizations, technologies, products, places, and key concepts. "
+    "For each entity, determine its type and provide a brief description.\n\n"
+    "Return only JSON with the format:\n"
+    '{ "articles": [ '
+    '{ "article_id": "...", "entities": ['
+    '{ "name": "Entity Name", "type": "person|organization|technology|product|place|concept", '
+    '"description": "Brief description", "relevance": 0.1-1.0, "context": "snippet where entity appears" },'
+    "..."
+    "] },"
+    "..."
+    "] }\n\n"
+)
+ENTITY_SYSTEM_PROMPT = "Extract named entities from multiple articles in batch mode."
+
+
+def get_articles_missing_entity_extraction(db_path="db/news.db", article_ids=None):
     """
     Returns a DataFrame of articles that do NOT have any entry in article_entities.
+    Near-duplicates are skipped; they inherit their canonical article's entities.
+    If article_ids is given, only those articles are considered.
     """
+    id_filter = ""
+    params = []
+    if article_ids is not None:
+        params = [int(a) for a in article_ids]
+        if not params:
+            return pd.DataFrame(columns=["article_id", "expanded_summary"])
+        id_filter = f"AND a.id IN ({','.join('?' for _ in params)})"
     conn = get_connection(db_path)
-    query = """
+    query = f"""
         SELECT
             a.id AS article_id,
-            a.title || ' - ' || a.content AS expanded_summary
+            a.title
         FROM articles a
         WHERE NOT EXISTS (
             SELECT 1 FROM article_entities ae
             WHERE ae.article_id = a.id
         )
+        AND NOT EXISTS (
+            SELECT 1 FROM article_duplicates d
+            WHERE d.article_id = a.id  -- near-duplicates inherit from their canonical
+        )
+        {id_filter}
         ORDER BY a.published_date DESC
     """
-    df = pd.read_sql_query(query, conn)
+    df = pd.read_sql_query(query, conn, params=params)
+    bodies = get_article_bodies(df["article_id"], cursor=conn.cursor())
     conn.close()
-    return df
+    # Same as the old `title || ' - ' || content`: NULL when there is no body
+    df["expanded_summary"] = [
+        f"{title} - {bodies[article_id]}" if article_id in bodies else None
+        for article_id, title in zip(df["article_id"], df["title"])
+    ]
+    return df.drop(columns="title")
 
 
 def extract_entities_from_batch(article_batch, api_key, model=MODEL):
@@ -46,31 +86,16 @@ def extract_entities_from_batch(article_batch, api_key, model=MODEL):
     article_batch is a dict of {article_id: text}
     Returns a dict of {article_id: [entity_dicts]}
     """
-    # Build a prompt that includes multiple articles for batch processing
-    prompt = (
-        "Extract important named entities from these articles. "
-        "Include people, organizations, technologies, products, places, and key concepts. "
-        "For each entity, determine its type and provide a brief description.\n\n"
-        "Return only JSON with the format:\n"
-        '{ "articles": [ '
-        '{ "article_id": "...", "entities": ['
-        '{ "name": "Entity Name", "type": "person|organization|technology|product|place|concept", '
-        '"description": "Brief description", "relevance": 0.1-1.0, "context": "snippet where entity appears" },'
-        "..."
-        "] },"
-        "..."
-        "] }\n\n"
-    )
-
-    # Add each article to the prompt
+    # Build a prompt that includes multiple articles for batch processing.
+    # Articles are already sized to fit by chunk_summaries, so no truncation here.
+    prompt = ENTITY_PROMPT_HEADER
     for art_id, text in article_batch.items():
-        # Limit text length for each article
-        prompt += f"Article ID={art_id}:\n{text[:3000]}...\n\n"
+        prompt += f"Article ID={art_id}:\n{text}\n\n"
 
     messages = [
         {
             "role": "system",
-            "content": "Extract named entities from multiple articles in batch mode.",
+            "content": ENTITY_SYSTEM_PROMPT,
         },
         {"role": "user", "content": prompt},
     ]
@@ -123,7 +148,12 @@ def extract_entities_for_all_articles(api_key, db_path="db/news.db"):
 
     # Split into chunks for batch processing
     chunked_articles = list(
-        chunk_summaries(summaries_dict, max_token_chunk=EXTRACTION_TOKEN_CHUNK)
+        chunk_summaries(
+            summaries_dict,
+            max_token_chunk=EXTRACTION_TOKEN_CHUNK,
+            prompt_overhead_tokens=count_tokens(ENTITY_SYSTEM_PROMPT + ENTITY_PROMPT_HEADER),
+            output_tokens_per_item=ENTITY_OUTPUT_TOKENS_PER_ARTICLE,
+        )
     )
     total_articles = len(summaries_dict)
     processed_articles = 0
@@ -223,12 +253,60 @@ def get_entities_for_article(article_id, db_path="db/news.db"):
     return df
 
 
-def get_entities_for_category(category, limit=20, db_path="db/news.db"):
+def get_entities_for_articles(article_ids, db_path="db/news.db"):
     """
-    Get the most mentioned entities within a specific category.
-    Returns a DataFrame with entity information.
+    Bulk variant of get_entities_for_article.
+    Returns {article_id: DataFrame} for every requested ID (empty frames for
+    articles without entities), reading all of them over one connection.
     """
+    article_ids = list(dict.fromkeys(int(a) for a in article_ids))
+    columns = [
+        "article_id",
+        "entity_id",
+        "entity_name",
+        "entity_type",
+        "description",
+        "relevance_score",
+        "context_snippet",
+    ]
+    frames = []
     conn = get_connection(db_path)
+    try:
+        # IN (...) lists are sliced to stay under SQLite's bound-parameter limit
+        for start in range(0, len(article_ids), ENTITY_LOOKUP_CHUNK_SIZE):
+            chunk = article_ids[start : start + ENTITY_LOOKUP_CHUNK_SIZE]
+            placeholders = ",".join("?" for _ in chunk)
+            query = f"""
+                SELECT
+                    ae.article_id,
+                    e.entity_id,
+                    e.entity_name,
+                    e.entity_type,
+                    e.description,
+                    ae.relevance_score,
+                    ae.context_snippet
+                FROM entity_profiles e
+                JOIN article_entities ae ON e.entity_id = ae.entity_id
+                WHERE ae.article_id IN ({placeholders})
+                ORDER BY ae.article_id, ae.relevance_score DESC
+            """
+            frames.append(pd.read_sql_query(query, conn, params=chunk))
+    finally:
+        conn.close()
+
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+    grouped = {int(k): g.drop(columns="article_id").reset_index(drop=True) for k, g in df.groupby("article_id")}
+    empty = pd.DataFrame(columns=columns[1:])
+    return {article_id: grouped.get(article_id, empty) for article_id in article_ids}
+
+
+def get_entities_for_category(category, limit=20, db_path="db/news.db", cursor=None):
+    """
+    Get the most mentioned entities within a specific category.
+    Returns a DataFrame with entity information. Reads through the connection
+    of `cursor` if given, and leaves it open.
+    """
+    conn = cursor.connection if cursor else get_connection(db_path)
     query = """
         SELECT
             e.entity_id,
@@ -247,7 +325,8 @@ def get_entities_for_category(category, limit=20, db_path="db/news.db"):
         LIMIT ?
     """
     df = pd.read_sql_query(query, conn, params=(category, limit))
-    conn.close()
+    if cursor is None:
+        conn.close()
     return df
 
 
@@ -277,13 +356,14 @@ def get_related_entities(entity_id, limit=10, db_path="db/news.db"):
     return df
 
 
-def get_trending_entities(hours=48, limit=20, db_path="db/news.db"):
+def get_trending_entities(hours=48, limit=20, db_path="db/news.db", cursor=None):
     """
     Get entities that are trending in recent articles.
     Returns a DataFrame with entity information and recent mention count.
     MODIFIED: Correctly joins articles table to filter by date.
+    Reads through the connection of `cursor` if given, and leaves it open.
     """
-    conn = get_connection(db_path)
+    conn = cursor.connection if cursor else get_connection(db_path)
     # Calculate cutoff time directly for the SQL query
     # Use the format SQLite expects: YYYY-MM-DD HH:MM:SS
     from datetime import datetime, timedelta, timezone  # Add timezone import
@@ -311,5 +391,6 @@ def get_trending_entities(hours=48, limit=20, db_path="db/news.db"):
     """
     # Use cutoff_time_str and limit as parameters
     df = pd.read_sql_query(query, conn, params=(cutoff_time_str, limit))
-    conn.close()
+    if cursor is None:
+        conn.close()
     return df
@@ -1,77 +1,433 @@
 # analysis/group_merging.py
+# Merges groups that cover the same story.
+#
+# Pairs are not compared exhaustively. Groups are blocked on shared top
+# entities, companies, CVEs and named events, and within each block only groups
+# whose latest articles are close in time are paired. Candidate pairs get a
+# structural similarity from bulk-loaded group profiles plus text-centroid
+# cosine. Only pairs that could still reach the merge threshold are sent to
+# the LLM, in batches. Accepted pairs are resolved with union-find into merge
+# sets, and each set is merged in one transaction with one label LLM call.
 import logging
 import sqlite3
 import json
 import time
-from typing import List, Dict, Tuple, Optional
+from collections import defaultdict
+from typing import List, Dict, Tuple
+
+import pandas as pd
 
 # Assuming these are in the parent directory or PYTHONPATH is set correctly
-from news_grouping_app.db.database import get_connection
+from news_grouping_app.db.database import get_connection, mark_group_dirty, record_change
 from news_grouping_app.llm_calls import call_gpt_api
-
-# Import necessary functions from news_grouping_app.enhanced_grouping (needs to be importable)
-try:
-    from news_grouping_app.enhanced_grouping import (
-        get_existing_groups as get_existing_groups_enhanced,
-        generate_group_signature,
-        calculate_article_to_group_similarity,
-    )
-except ImportError as e:
-    logging.error(f"Failed to import from news_grouping_app.enhanced_grouping for merging: {e}")
-    # Define dummy functions or raise error if essential
-    get_existing_groups_enhanced = None
-    generate_group_signature = None
-    calculate_article_to_group_similarity = None
+from news_grouping_app.utils import approximate_tokens
+from news_grouping_app.analysis.text_vectors import GroupTextIndex
 
 logger = logging.getLogger(__name__)
 from news_grouping_app.config import OPENAI_MODEL
 MERGE_LLM_MODEL = OPENAI_MODEL  # Model for generating merged labels/desc
 
+# --- Candidate Blocking ---
+MERGE_BLOCK_TOP_ENTITIES = 5  # Most frequent entities per group used as blocking keys
+MERGE_BLOCK_TOP_COMPANIES = 3
+MERGE_BLOCK_WINDOW = 50  # Max neighbours (by date) paired within one blocking key
+MERGE_MAX_BLOCK_SIZE = 200  # Keys shared by more groups are too generic to block on
+MERGE_MAX_DAYS_APART = 7  # Latest-article dates further apart than this are never merged
+MERGE_MIN_SHARED_KEYS = 2  # A shared CVE or named event counts as two keys
+MERGE_MAX_CANDIDATES_PER_GROUP = 5  # Best-scoring candidates per group sent to the LLM
+MIN_ENTITY_RELEVANCE = 0.7  # Same cut as article signatures' primary entities
+
+# --- Scoring (final = structural * SIGNATURE_WEIGHT + llm * LLM_WEIGHT) ---
+SIGNATURE_WEIGHT = 0.7
+LLM_WEIGHT = 0.3
+STRUCTURAL_WEIGHTS = {
+    "entity_similarity": 0.30,
+    "company_similarity": 0.15,
+    "cve_similarity": 0.15,
+    "event_similarity": 0.10,
+    "text_similarity": 0.20,
+}
+CORE_ENTITY_BONUS = 0.20  # Both groups' top entity is the same product/organization/technology
+CORE_ENTITY_TYPES = {"product", "organization", "technology"}
+MERGE_JUDGE_BATCH_SIZE = 20  # Pairs per LLM similarity call
+MERGE_JUDGE_MAX_PROMPT_TOKENS = 30000
+
+
+def load_group_profiles(db_path: str = "db/news.db") -> Dict[int, Dict]:
+    """
+    Load what merging needs for every non-empty group with a handful of
+    aggregate queries: label, description, article count, latest article date,
+    and per-group frequencies of entities, companies, CVEs and named events.
+    """
+    conn = get_connection(db_path)
+    try:
+        profiles = {}
+        for group_id, main_topic, label, description, count, latest in conn.execute(
+            """
+            SELECT g.group_id, g.main_topic, g.group_label, g.description,
+                   COUNT(m.article_id), MAX(a.published_date)
+            FROM two_phase_article_groups g
+            JOIN two_phase_article_group_memberships m ON m.group_id = g.group_id
+            JOIN articles a ON a.id = m.article_id
+            GROUP BY g.group_id
+            """
+        ):
+            profiles[group_id] = {
+                "group_id": group_id,
+                "main_topic": main_topic,
+                "group_label": label or "",
+                "description": description or "",
+                "article_count": count,
+                "latest_published_date": latest,
+                "entities": {},
+                "companies": {},
+                "cves": set(),
+                "events": set(),
+                "top_entity": None,
+            }
+
+        entity_rows = conn.execute(
+            """
+            SELECT m.group_id, ae.entity_id, e.entity_type, COUNT(*) AS n
+            FROM two_phase_article_group_memberships m
+            JOIN article_entities ae ON ae.article_id = m.article_id
+            JOIN entity_profiles e ON e.entity_id = ae.entity_id
+            WHERE ae.relevance_score >= ?
+            GROUP BY m.group_id, ae.entity_id
+            ORDER BY m.group_id, n DESC, ae.entity_id
+            """,
+            (MIN_ENTITY_RELEVANCE,),
+        ).fetchall()
+        company_rows = conn.execute(
+            """
+            SELECT m.group_id, ac.company_name, COUNT(*) AS n
+            FROM two_phase_article_group_memberships m
+            JOIN article_companies ac ON ac.article_id = m.article_id
+            GROUP BY m.group_id, ac.company_name
+            ORDER BY m.group_id, n DESC, ac.company_name
+            """
+        ).fetchall()
+        cve_rows = conn.execute(
+            """
+            SELECT DISTINCT m.group_id, c.cve_id
+            FROM two_phase_article_group_memberships m
+            JOIN article_cves c ON c.article_id = m.article_id
+            """
+        ).fetchall()
+        event_rows = conn.execute(
+            """
+            SELECT DISTINCT m.group_id, ne.event_name
+            FROM two_phase_article_group_memberships m
+            JOIN article_events ae ON ae.article_id = m.article_id
+            JOIN named_events ne ON ne.event_id = ae.event_id
+            """
+        ).fetchall()
+    finally:
+        conn.close()
+
+    for group_id, entity_id, entity_type, n in entity_rows:
+        profile = profiles.get(group_id)
+        if profile is None:
+            continue
+        profile["entities"][entity_id] = n / profile["article_count"]
+        if profile["top_entity"] is None:
+            profile["top_entity"] = (entity_id, entity_type)
+    for group_id, company, n in company_rows:
+        if group_id in profiles:
+            profiles[group_id]["companies"][company] = n / profiles[group_id]["article_count"]
+    for group_id, cve_id in cve_rows:
+        if group_id in profiles:
+            profiles[group_id]["cves"].add(cve_id)
+    for group_id, event_name in event_rows:
+        if group_id in profiles:
+            profiles[group_id]["events"].add(event_name)
+
+    # Parse all dates in one vectorized call; groups without a date get NaN
+    group_ids = list(profiles)
+    dates = pd.to_datetime(
+        pd.Series([profiles[g]["latest_published_date"] for g in group_ids], dtype=object),
+        utc=True,
+        errors="coerce",
+    )
+    for group_id, ts in zip(group_ids, dates):
+        profiles[group_id]["latest_ts"] = ts.timestamp() if pd.notna(ts) else float("nan")
+    return profiles
+
+
+def _blocking_keys(profile: Dict) -> List[Tuple[str, int]]:
+    """Blocking keys with their weight: entities/companies 1, CVEs/events 2."""
+    keys = [(f"e:{eid}", 1) for eid in list(profile["entities"])[:MERGE_BLOCK_TOP_ENTITIES]]
+    keys += [(f"c:{name.lower()}", 1) for name in list(profile["companies"])[:MERGE_BLOCK_TOP_COMPANIES]]
+    keys += [(f"v:{cve}", 2) for cve in profile["cves"]]
+    keys += [(f"x:{name.lower()}", 2) for name in profile["events"]]
+    return keys
+
+
+def generate_candidate_pairs(profiles: Dict[int, Dict]) -> set:
+    """
+    Pairs of group ids that share blocking keys worth at least
+    MERGE_MIN_SHARED_KEYS and whose latest articles are at most
+    MERGE_MAX_DAYS_APART apart. Within each key, groups are sorted by date and
+    each is paired only with its next MERGE_BLOCK_WINDOW neighbours, so very
+    common keys cost linear rather than quadratic work; keys shared by more than
+    MERGE_MAX_BLOCK_SIZE groups are ignored like stopwords. Groups without a
+    dated article are never paired.
+    """
+    blocks = defaultdict(list)
+    for group_id, profile in profiles.items():
+        for key, weight in _blocking_keys(profile):
+            blocks[key].append((group_id, weight))
+
+    max_gap = MERGE_MAX_DAYS_APART * 86400
+    shared = defaultdict(int)
+    for entries in blocks.values():
+        if len(entries) < 2 or len(entries) > MERGE_MAX_BLOCK_SIZE:
+            continue
+        members = [g for g, _ in entries]
+        weight = entries[0][1]
+        dated = sorted(
+            (g for g in members if profiles[g]["latest_ts"] == profiles[g]["latest_ts"]),
+            key=lambda g: profiles[g]["latest_ts"],
+        )
+        for i, group_a in enumerate(dated):
+            ts_a = profiles[group_a]["latest_ts"]
+            for group_b in dated[i + 1 : i + 1 + MERGE_BLOCK_WINDOW]:
+                if profiles[group_b]["latest_ts"] - ts_a > max_gap:
+                    break
+                shared[(min(group_a, group_b), max(group_a, group_b))] += weight
+    return {pair for pair, count in shared.items() if count >= MERGE_MIN_SHARED_KEYS}
 
-def _calculate_group_similarity(
-    group_sig_a: Dict, group_sig_b: Dict, api_key: Optional[str]
-) -> float:
-    """Calculate similarity between two group signatures."""
-    if not calculate_article_to_group_similarity:
+
+def _jaccard(a, b) -> float:
+    if not a or not b:
         return 0.0
+    union = len(a | b)
+    return len(a & b) / union if union else 0.0
 
-    # Option 1: Treat A as article, B as group (and maybe average the reverse)
-    sim_a_b_results = calculate_article_to_group_similarity(
-        group_sig_a, group_sig_b, api_key
-    )
-    sim_b_a_results = calculate_article_to_group_similarity(
-        group_sig_b, group_sig_a, api_key
-    )
 
-    sim_a_b = sim_a_b_results.get("composite_score", 0.0)
-    sim_b_a = sim_b_a_results.get("composite_score", 0.0)
+def _weighted_jaccard(a: Dict, b: Dict) -> float:
+    if not a or not b:
+        return 0.0
+    keys = a.keys() | b.keys()
+    num = sum(min(a.get(k, 0.0), b.get(k, 0.0)) for k in keys)
+    den = sum(max(a.get(k, 0.0), b.get(k, 0.0)) for k in keys)
+    return num / den if den else 0.0
 
-    # Average the two perspectives, or just take the max? Average is safer.
-    avg_sim = (sim_a_b + sim_b_a) / 2.0
 
-    # Option 2 (More Advanced): Add direct LLM comparison of labels/descriptions
-    label_desc_sim = 0.0
-    if api_key and group_sig_a.get("description") and group_sig_b.get("description"):
-        prompt = (
-            f"Rate the semantic similarity of these two group concepts on a scale of 0.0 to 1.0. Focus only on whether they describe the exact same core event or topic.\n\n"
-            f"Group A:\nLabel: {group_sig_a.get('group_label', '')}\nDescription: {group_sig_a.get('description', '')[:500]}\n\n"
-            f"Group B:\nLabel: {group_sig_b.get('group_label', '')}\nDescription: {group_sig_b.get('description', '')[:500]}\n\n"
-            f"Similarity Score (0.0-1.0):"
-        )
-        messages = [{"role": "user", "content": prompt}]
-        score_str = call_gpt_api(messages, api_key, model=MERGE_LLM_MODEL)
-        try:
-            label_desc_sim = float(score_str)
-        except:
-            label_desc_sim = 0.0
-
-    # Combine scores (adjust weighting as needed)
-    final_sim = (avg_sim * 0.7) + (label_desc_sim * 0.3)  # Example weighting
-
-    logger.debug(
-        f"Group Sim {group_sig_a.get('group_id')} vs {group_sig_b.get('group_id')}: AvgSigSim={avg_sim:.3f}, LLMLabelSim={label_desc_sim:.3f} -> Final={final_sim:.3f}"
+def structural_similarity(profile_a: Dict, profile_b: Dict, text_similarity: float = 0.0) -> float:
+    """
+    Symmetric group-to-group score on the same scale as the article-to-group
+    composite: weighted entity/company/CVE/event overlap plus text cosine, with
+    the temporal and core-entity adjustments.
+    """
+    scores = {
+        "entity_similarity": _weighted_jaccard(profile_a["entities"], profile_b["entities"]),
+        "company_similarity": _jaccard(set(profile_a["companies"]), set(profile_b["companies"])),
+        "cve_similarity": _jaccard(profile_a["cves"], profile_b["cves"]),
+        "event_similarity": _jaccard(profile_a["events"], profile_b["events"]),
+        "text_similarity": max(0.0, min(1.0, text_similarity)),
+    }
+    score = sum(scores[k] * w for k, w in STRUCTURAL_WEIGHTS.items())
+
+    hours_apart = abs(profile_a["latest_ts"] - profile_b["latest_ts"]) / 3600
+    if hours_apart <= 48:
+        score += 0.05 * (1 - hours_apart / 48)
+    top_a, top_b = profile_a["top_entity"], profile_b["top_entity"]
+    if top_a and top_b and top_a[0] == top_b[0] and top_a[1] in CORE_ENTITY_TYPES:
+        score += CORE_ENTITY_BONUS
+    return max(0.0, min(1.0, score))
+
+
+def _build_judge_prompt(pairs: List[Tuple[int, int]], profiles: Dict[int, Dict]) -> str:
+    """One prompt for several pairs; each group is described once."""
+    group_ids = sorted({g for pair in pairs for g in pair})
+    prompt = (
+        "Rate the semantic similarity of each pair of group concepts below on a scale of 0.0 to 1.0. "
+        "Focus only on whether they describe the exact same core event or topic.\n\nGROUPS:\n"
     )
-    return final_sim
+    for gid in group_ids:
+        p = profiles[gid]
+        prompt += f"Group {gid}:\nLabel: {p['group_label']}\nDescription: {p['description'][:500]}\n\n"
+    prompt += "PAIRS:\n"
+    for num, (a, b) in enumerate(pairs, start=1):
+        prompt += f"Pair {num}: Group {a} vs Group {b}\n"
+    prompt += '\nReturn only JSON: { "scores": { "<pair number>": 0.0-1.0, ... } }'
+    return prompt
+
+
+def judge_pairs_with_llm(
+    pairs: List[Tuple[int, int]], profiles: Dict[int, Dict], api_key: str
+) -> Tuple[Dict[Tuple[int, int], float], int]:
+    """
+    LLM label/description similarity for candidate pairs, MERGE_JUDGE_BATCH_SIZE
+    pairs per call. Returns ({pair: score}, calls made); unanswered pairs score 0.0.
+    """
+    batches, batch = [], []
+    for pair in pairs:
+        if batch and (
+            len(batch) >= MERGE_JUDGE_BATCH_SIZE
+            or approximate_tokens(_build_judge_prompt(batch + [pair], profiles)) > MERGE_JUDGE_MAX_PROMPT_TOKENS
+        ):
+            batches.append(batch)
+            batch = []
+        batch.append(pair)
+    if batch:
+        batches.append(batch)
+
+    llm_scores = {}
+    for batch in batches:
+        messages = [{"role": "user", "content": _build_judge_prompt(batch, profiles)}]
+        response = call_gpt_api(messages, api_key, model=MERGE_LLM_MODEL)
+        scores = {}
+        if response:
+            try:
+                scores = json.loads(response.strip().strip("```json").strip("```")).get("scores", {}) or {}
+            except (json.JSONDecodeError, AttributeError) as e:
+                logger.warning(f"Could not parse LLM pair similarity scores: {e}")
+        for num, pair in enumerate(batch, start=1):
+            try:
+                llm_scores[pair] = max(0.0, min(1.0, float(scores.get(str(num), 0.0))))
+            except (TypeError, ValueError):
+                llm_scores[pair] = 0.0
+    return llm_scores, len(batches)
+
+
+def build_merge_sets(pairs) -> List[List[int]]:
+    """Union-find over accepted pairs; returns each connected set of group ids, sorted."""
+    parent = {}
+
+    def find(x):
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]  # Path halving
+            x = parent[x]
+        return x
+
+    for a, b in pairs:
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    sets = defaultdict(list)
+    for x in parent:
+        sets[find(x)].append(x)
+    return [sorted(members) for members in sets.values() if len(members) > 1]
+
+
+def _merged_label_for_set(group_ids: List[int], profiles: Dict[int, Dict], api_key: str) -> Tuple[str, str]:
+    """One LLM call for the unified label and description of a merge set."""
+    merged_label = " / ".join(profiles[g]["group_label"] for g in group_ids)  # Fallback
+    merged_description = "\n---\n".join(profiles[g]["description"] for g in group_ids)  # Fallback
+    if not api_key:
+        return merged_label, merged_description
+
+    merge_prompt = (
+        f"These {len(group_ids)} article groups seem to cover the same topic. Suggest a concise, unified label and a brief description (1-2 sentences) for the merged group.\n\n"
+    )
+    for gid in group_ids:
+        merge_prompt += f"Group (ID {gid}):\nLabel: {profiles[gid]['group_label']}\nDescription: {profiles[gid]['description']}\n\n"
+    merge_prompt += 'Respond ONLY in JSON format: {"merged_label": "New Label", "merged_description": "New Description"}'
+    messages = [{"role": "user", "content": merge_prompt}]
+    llm_response = call_gpt_api(messages, api_key, model=MERGE_LLM_MODEL)
+    try:
+        if llm_response:
+            merge_data = json.loads(llm_response.strip().strip("```json").strip("```"))
+            merged_label = merge_data.get("merged_label", merged_label)
+            merged_description = merge_data.get("merged_description", merged_description)
+            logger.info(f"LLM suggested merge label: '{merged_label}'")
+    except Exception as llm_err:
+        logger.warning(
+            f"Could not parse LLM merge suggestion: {llm_err}. Using fallback label/description."
+        )
+    return merged_label, merged_description
+
+
+def _execute_merge_set(
+    surviving_group_id: int,
+    deleted_group_ids: List[int],
+    merged_label: str,
+    merged_description: str,
+    db_path: str = "db/news.db",
+) -> bool:
+    """Fold every group of a merge set into the survivor in one transaction."""
+    placeholders = ",".join("?" for _ in deleted_group_ids)
+    conn_merge = None
+    try:
+        conn_merge = get_connection(db_path)
+        cursor_merge = conn_merge.cursor()
+        cursor_merge.execute("BEGIN TRANSACTION")
+        first_change_id = cursor_merge.execute("SELECT COALESCE(MAX(change_id), 0) FROM change_log").fetchone()[0]
+
+        # 1. Update surviving group's label and description
+        cursor_merge.execute(
+            """
+            UPDATE two_phase_article_groups
+            SET group_label = ?, description = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE group_id = ?
+            """,
+            (merged_label, merged_description, surviving_group_id),
+        )
+        # 2. Move articles and group entities to the survivor
+        cursor_merge.execute(
+            f"""
+            INSERT OR IGNORE INTO two_phase_article_group_memberships (article_id, group_id)
+            SELECT article_id, ? FROM two_phase_article_group_memberships WHERE group_id IN ({placeholders})
+            """,
+            (surviving_group_id, *deleted_group_ids),
+        )
+        cursor_merge.execute(
+            f"""
+            INSERT OR IGNORE INTO group_entities (group_id, entity_id, relevance_score)
+            SELECT ?, entity_id, relevance_score FROM group_entities WHERE group_id IN ({placeholders})
+            """,
+            (surviving_group_id, *deleted_group_ids),
+        )
+        # 3. Delete the merged groups and their rows (foreign keys are not enforced)
+        for table in (
+            "two_phase_article_group_memberships",
+            "group_entities",
+            "group_consistency_state",
+            "two_phase_article_groups",
+        ):
+            cursor_merge.execute(
+                f"DELETE FROM {table} WHERE group_id IN ({placeholders})", deleted_group_ids
+            )
+        mark_group_dirty(surviving_group_id, db_path=db_path, cursor=cursor_merge)
+        # 4. One change event instead of the label, move and delete events the triggers logged
+        cursor_merge.execute(
+            f"DELETE FROM change_log WHERE change_id > ? AND group_id IN (?, {placeholders})",
+            (first_change_id, surviving_group_id, *deleted_group_ids),
+        )
+        cursor_merge.execute(
+            "SELECT main_topic FROM two_phase_article_groups WHERE group_id = ?", (surviving_group_id,)
+        )
+        category = (cursor_merge.fetchone() or [None])[0]
+        if record_change(
+            "group_merged",
+            category,
+            surviving_group_id,
+            {"merged_group_ids": list(deleted_group_ids)},
+            db_path=db_path,
+            cursor=cursor_merge,
+        ) is None:
+            raise sqlite3.Error("failed to record group_merged change")
+
+        conn_merge.commit()
+        logger.info(
+            f"Successfully merged Groups {deleted_group_ids} into Group {surviving_group_id}. New Label: '{merged_label}'"
+        )
+        return True
+    except sqlite3.Error as db_err:
+        logger.error(
+            f"Database error during merge of {deleted_group_ids} into {surviving_group_id}: {db_err}",
+            exc_info=True,
+        )
+        if conn_merge:
+            conn_merge.rollback()
+        return False
+    finally:
+        if conn_merge:
+            conn_merge.close()
 
 
 def merge_similar_groups(
@@ -82,180 +438,90 @@ def merge_similar_groups(
 
     Args:
         merge_threshold: Similarity score above which groups should be merged.
-        api_key: OpenAI API key.
+        api_key: OpenAI API key (without one, only structural similarity is used).
         db_path: Path to the database.
 
     Returns:
-        Dictionary containing merge statistics.
+        Dictionary containing merge statistics. "merged_pairs" counts groups
+        folded into another group.
     """
-    if not all(
-        [
-            get_existing_groups_enhanced,
-            generate_group_signature,
-            calculate_article_to_group_similarity,
-        ]
-    ):
-        logger.error(
-            "Missing necessary functions from news_grouping_app.enhanced_grouping. Cannot perform merge."
-        )
-        return {"merged_pairs": 0, "errors": 1}
-
     logger.info(f"--- Starting Group Merging Pass (Threshold: {merge_threshold}) ---")
     start_time = time.time()
-    merged_pairs_count = 0
-    errors = 0
-    processed_group_ids = set()  # Track IDs involved in a merge to avoid re-merging
+    stats = {"merged_pairs": 0, "merge_sets": 0, "candidate_pairs": 0, "llm_pairs": 0, "llm_calls": 0, "errors": 0}
 
-    groups = get_existing_groups_enhanced(db_path)
-    if len(groups) < 2:
+    profiles = load_group_profiles(db_path)
+    if len(profiles) < 2:
         logger.info("Not enough groups (< 2) to perform merging.")
-        return {"merged_pairs": 0, "errors": 0}
+        return stats
+
+    try:
+        text_index = GroupTextIndex.load(db_path=db_path)
+    except sqlite3.Error as e:
+        logger.warning(f"Text centroids unavailable for merging: {e}")
+        text_index = None
 
+    pairs = generate_candidate_pairs(profiles)
+    stats["candidate_pairs"] = len(pairs)
     logger.info(
-        f"Generating signatures for {len(groups)} groups for merging analysis..."
+        f"Blocking reduced {len(profiles) * (len(profiles) - 1) // 2} possible pairs over {len(profiles)} groups to {len(pairs)} candidates."
     )
-    groups_with_signatures = []
-    for group in groups:
-        if group.get("article_ids"):  # Only consider groups with articles
-            group_sig = generate_group_signature(group, db_path)
-            if group_sig:
-                groups_with_signatures.append((group, group_sig))
-            else:
-                logger.warning(
-                    f"Could not generate signature for group {group.get('group_id')} during merge prep."
-                )
-
-    logger.info("Comparing group pairs for potential merging...")
-    # Iterate through unique pairs
-    logger.info("Comparing group pairs for potential merging...")
-    # Iterate through unique pairs
-    for i in range(len(groups_with_signatures)):
-        for j in range(i + 1, len(groups_with_signatures)):
-            group_a_dict, group_a_sig = groups_with_signatures[i]
-            group_b_dict, group_b_sig = groups_with_signatures[j]
-
-            group_a_id = group_a_dict.get("group_id")
-            group_b_id = group_b_dict.get("group_id")
-
-            if group_a_id in processed_group_ids or group_b_id in processed_group_ids:
-                continue
-
-            # Calculate similarity between the two groups
-            similarity = _calculate_group_similarity(group_a_sig, group_b_sig, api_key)
-
-            # <<< --- ADDED LOGGING HERE --- >>>
+
+    # Structural score, then keep only pairs that can still reach the threshold
+    scored = []
+    for a, b in pairs:
+        text_sim = text_index.similarity(a, b) if text_index is not None else 0.0
+        structural = structural_similarity(profiles[a], profiles[b], text_sim)
+        can_use_llm = bool(api_key and profiles[a]["description"] and profiles[b]["description"])
+        best_possible = structural * SIGNATURE_WEIGHT + (LLM_WEIGHT if can_use_llm else 0.0)
+        if best_possible >= merge_threshold:
+            scored.append(((a, b), structural, can_use_llm))
+
+    # Bound LLM work: each group keeps its best few candidates
+    scored.sort(key=lambda item: item[1], reverse=True)
+    per_group = defaultdict(int)
+    shortlisted = []
+    for pair, structural, can_use_llm in scored:
+        a, b = pair
+        if per_group[a] >= MERGE_MAX_CANDIDATES_PER_GROUP or per_group[b] >= MERGE_MAX_CANDIDATES_PER_GROUP:
+            continue
+        per_group[a] += 1
+        per_group[b] += 1
+        shortlisted.append((pair, structural, can_use_llm))
+
+    llm_pairs = [pair for pair, structural, can_use_llm in shortlisted if can_use_llm]
+    stats["llm_pairs"] = len(llm_pairs)
+    llm_scores = {}
+    if llm_pairs:
+        llm_scores, stats["llm_calls"] = judge_pairs_with_llm(llm_pairs, profiles, api_key)
+
+    accepted = []
+    for pair, structural, _ in shortlisted:
+        similarity = structural * SIGNATURE_WEIGHT + llm_scores.get(pair, 0.0) * LLM_WEIGHT
+        logger.debug(
+            f"Group {pair[0]} vs Group {pair[1]}: Structural={structural:.3f}, LLM={llm_scores.get(pair, 0.0):.3f} -> {similarity:.3f}"
+        )
+        if similarity >= merge_threshold:
             logger.info(
-                f"Comparing Group {group_a_id} ('{group_a_dict.get('group_label', '')[:30]}...') vs "
-                f"Group {group_b_id} ('{group_b_dict.get('group_label', '')[:30]}...'). "
-                f"Similarity: {similarity:.4f}, Merge Threshold: {merge_threshold}"
+                f"Potential Merge Found: Group {pair[0]} ('{profiles[pair[0]]['group_label']}') and Group {pair[1]} ('{profiles[pair[1]]['group_label']}') - Similarity: {similarity:.3f}"
             )
-            # <<< --- END ADDED LOGGING --- >>>
-
-            if similarity >= merge_threshold:
-                logger.info(
-                    f"Potential Merge Found: Group {group_a_id} ('{group_a_dict.get('group_label')}') and Group {group_b_id} ('{group_b_dict.get('group_label')}') - Similarity: {similarity:.3f}"
-                )
-
-                # --- Decide which group survives ---
-                # Simple rule: Keep the one with more articles, or the older one if counts are equal
-                # (Requires 'created_at' in group_dict or fetch it)
-                # For now, let's assume group_a survives, group_b is merged into it. Need better logic later.
-                surviving_group_id = group_a_id
-                deleted_group_id = group_b_id
-                surviving_group_dict = group_a_dict
-                deleted_group_dict = group_b_dict
-
-                # --- Get Merged Label/Description from LLM ---
-                merged_label = f"{surviving_group_dict.get('group_label')} / {deleted_group_dict.get('group_label')}"  # Fallback
-                merged_description = f"{surviving_group_dict.get('description')}\n---\n{deleted_group_dict.get('description')}"  # Fallback
-
-                merge_prompt = (
-                    f"These two article groups seem to cover the same topic. Suggest a concise, unified label and a brief description (1-2 sentences) for the merged group.\n\n"
-                    f"Group A (ID {surviving_group_id}):\nLabel: {surviving_group_dict.get('group_label')}\nDescription: {surviving_group_dict.get('description')}\n\n"
-                    f"Group B (ID {deleted_group_id}):\nLabel: {deleted_group_dict.get('group_label')}\nDescription: {deleted_group_dict.get('description')}\n\n"
-                    f'Respond ONLY in JSON format: {{"merged_label": "New Label", "merged_description": "New Description"}}'
-                )
-                messages = [{"role": "user", "content": merge_prompt}]
-                llm_response = call_gpt_api(messages, api_key, model=MERGE_LLM_MODEL)
-
-                try:
-                    if llm_response:
-                        merge_data = json.loads(
-                            llm_response.strip().strip("```json").strip("```")
-                        )
-                        merged_label = merge_data.get("merged_label", merged_label)
-                        merged_description = merge_data.get(
-                            "merged_description", merged_description
-                        )
-                        logger.info(f"LLM suggested merge label: '{merged_label}'")
-                except Exception as llm_err:
-                    logger.warning(
-                        f"Could not parse LLM merge suggestion: {llm_err}. Using fallback label/description."
-                    )
-
-                # --- Perform Database Merge ---
-                conn_merge = None
-                try:
-                    conn_merge = get_connection(db_path)
-                    cursor_merge = conn_merge.cursor()
-                    cursor_merge.execute("BEGIN TRANSACTION")
-
-                    # 1. Update surviving group's label and description
-                    cursor_merge.execute(
-                        """
-                        UPDATE two_phase_article_groups
-                        SET group_label = ?, description = ?, updated_at = CURRENT_TIMESTAMP
-                        WHERE group_id = ?
-                    """,
-                        (merged_label, merged_description, surviving_group_id),
-                    )
-
-                    # 2. Reassign articles from the deleted group to the surviving group
-                    # Use INSERT OR IGNORE to handle cases where an article might somehow
-                    # exist in both (shouldn't happen but safer)
-                    cursor_merge.execute(
-                        """
-                        INSERT OR IGNORE INTO two_phase_article_group_memberships (article_id, group_id)
-                        SELECT article_id, ? FROM two_phase_article_group_memberships WHERE group_id = ?
-                    """,
-                        (surviving_group_id, deleted_group_id),
-                    )
-
-                    # 3. Delete the now-empty group (ON DELETE CASCADE should handle memberships if IGNORE wasn't used, but doing Step 2 first is safer)
-                    # Make sure ON DELETE CASCADE is set on the FK in two_phase_article_group_memberships
-                    cursor_merge.execute(
-                        "DELETE FROM two_phase_article_groups WHERE group_id = ?",
-                        (deleted_group_id,),
-                    )
-
-                    conn_merge.commit()
-                    logger.info(
-                        f"Successfully merged Group {deleted_group_id} into Group {surviving_group_id}. New Label: '{merged_label}'"
-                    )
-                    merged_pairs_count += 1
-                    processed_group_ids.add(
-                        group_a_id
-                    )  # Mark both as processed for this pass
-                    processed_group_ids.add(group_b_id)
-
-                except sqlite3.Error as db_err:
-                    logger.error(
-                        f"Database error during merge of {deleted_group_id} into {surviving_group_id}: {db_err}",
-                        exc_info=True,
-                    )
-                    if conn_merge:
-                        conn_merge.rollback()
-                    errors += 1
-                finally:
-                    if conn_merge:
-                        conn_merge.close()
-
-                # Since group B was deleted, we should ideally break from the inner loop
-                # or handle indices carefully if continuing. Breaking is simpler.
-                break  # Move to the next 'i'
+            accepted.append(pair)
+
+    for group_ids in build_merge_sets(accepted):
+        # Survivor: the largest group, the oldest on ties
+        surviving_group_id = min(group_ids, key=lambda g: (-profiles[g]["article_count"], g))
+        deleted_group_ids = [g for g in group_ids if g != surviving_group_id]
+        merged_label, merged_description = _merged_label_for_set(group_ids, profiles, api_key)
+        if api_key:
+            stats["llm_calls"] += 1
+        if _execute_merge_set(surviving_group_id, deleted_group_ids, merged_label, merged_description, db_path):
+            stats["merge_sets"] += 1
+            stats["merged_pairs"] += len(deleted_group_ids)
+        else:
+            stats["errors"] += 1
 
     elapsed = time.time() - start_time
     logger.info(
-        f"--- Group Merging Pass Finished in {elapsed:.2f} seconds ({merged_pairs_count} pairs merged, {errors} errors) ---"
+        f"--- Group Merging Pass Finished in {elapsed:.2f} seconds ({stats['merged_pairs']} groups merged in {stats['merge_sets']} sets, "
+        f"{stats['candidate_pairs']} candidate pairs, {stats['llm_pairs']} judged by LLM in {stats['llm_calls']} calls, {stats['errors']} errors) ---"
     )
-    return {"merged_pairs": merged_pairs_count, "errors": errors}
+    return stats
@@ -0,0 +1,326 @@
+# analysis/text_vectors.py
+# Local lexical similarity for grouping: hashed TF-IDF vectors over title + content.
+#
+# Each article gets a sparse term-frequency vector (feature hashing, so there is
+# no vocabulary to maintain), stored in `article_text_vectors`. Document
+# frequencies live in `text_term_df` and IDF is applied at query time, so stored
+# vectors never go stale as the corpus grows. Each group has a centroid (mean of
+# its members' TF vectors) in `group_text_centroids`. GroupTextIndex packs the
+# centroids into CSR arrays and scores an article against every group with a
+# few vectorized NumPy operations.
+
+import re
+import math
+import zlib
+import sqlite3
+import logging
+
+import numpy as np
+
+from news_grouping_app.db.database import get_article_bodies, get_connection, get_watermark, set_watermark
+
+logger = logging.getLogger(__name__)
+
+N_FEATURES = 1 << 18
+TITLE_WEIGHT = 2  # Title terms count double
+CENTROID_MAX_TERMS = 2000  # Keep only the heaviest terms per group centroid
+TEXT_VECTOR_WATERMARK = "text_vector_article_id"
+TEXT_VECTOR_BATCH_SIZE = 500
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9\-\.]*[a-z0-9]|[a-z0-9]")
+STOPWORDS = frozenset(
+    """
+    a about after all also an and any are as at be been before but by can could did do does
+    for from had has have he her his how if in into is it its just more most new not of on
+    one or other our out over said says she so some than that the their them then there these
+    they this those to up us was we were what when which who will with would you your
+    """.split()
+)
+
+
+def _terms(text):
+    """Unigrams and adjacent bigrams of non-stopword tokens."""
+    tokens = [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in STOPWORDS and len(t) > 1]
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+def vectorize_text(title, content):
+    """
+    Return the sparse sublinear-TF vector for an article as (indices uint32, weights float32),
+    indices sorted ascending.
+    """
+    counts = {}
+    for weight, text in ((TITLE_WEIGHT, title), (1, content)):
+        for term in _terms(text):
+            feature = zlib.crc32(term.encode("utf-8")) & (N_FEATURES - 1)
+            counts[feature] = counts.get(feature, 0) + weight
+    if not counts:
+        return np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.float32)
+    indices = np.fromiter(counts.keys(), dtype=np.uint32, count=len(counts))
+    weights = np.fromiter((1.0 + math.log(c) for c in counts.values()), dtype=np.float32, count=len(counts))
+    order = np.argsort(indices)
+    return indices[order], weights[order]
+
+
+def _to_blobs(indices, weights):
+    return sqlite3.Binary(indices.astype(np.uint32).tobytes()), sqlite3.Binary(weights.astype(np.float32).tobytes())
+
+
+def _from_blobs(idx_blob, w_blob):
+    return np.frombuffer(idx_blob, dtype=np.uint32), np.frombuffer(w_blob, dtype=np.float32)
+
+
+def vectorize_new_articles(db_path="db/news.db"):
+    """
+    Vectorize articles added since the last run and update document frequencies.
+    Returns the number of articles vectorized.
+    """
+    last_id = get_watermark(TEXT_VECTOR_WATERMARK, db_path=db_path)
+    vectorized = 0
+    conn = get_connection(db_path)
+    cursor = conn.cursor()
+    try:
+        while True:
+            rows = cursor.execute(
+                "SELECT id, title FROM articles WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, TEXT_VECTOR_BATCH_SIZE),
+            ).fetchall()
+            if not rows:
+                break
+            bodies = get_article_bodies([row[0] for row in rows], cursor=cursor)
+            vector_rows = []
+            df_counts = {}
+            for article_id, title in rows:
+                indices, weights = vectorize_text(title, bodies.get(article_id))
+                if not len(indices):
+                    continue
+                vector_rows.append((article_id, *_to_blobs(indices, weights)))
+                for feature in indices.tolist():
+                    df_counts[feature] = df_counts.get(feature, 0) + 1
+            cursor.executemany(
+                "INSERT OR REPLACE INTO article_text_vectors (article_id, indices, weights) VALUES (?, ?, ?)",
+                vector_rows,
+            )
+            cursor.executemany(
+                """
+                INSERT INTO text_term_df (feature, df) VALUES (?, ?)
+                ON CONFLICT(feature) DO UPDATE SET df = df + excluded.df
+                """,
+                list(df_counts.items()),
+            )
+            vectorized += len(vector_rows)
+            last_id = rows[-1][0]
+            set_watermark(TEXT_VECTOR_WATERMARK, last_id, db_path=db_path, cursor=cursor)
+            conn.commit()
+    except sqlite3.Error as e:
+        logger.error(f"Database error while vectorizing articles: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+    if vectorized:
+        logger.info(f"Vectorized {vectorized} new articles for text similarity.")
+    return vectorized
+
+
+def load_idf(db_path="db/news.db", cursor=None):
+    """Return a dense float32 IDF array of length N_FEATURES (smooth IDF)."""
+    conn = None
+    if cursor is None:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+    try:
+        n_docs = cursor.execute("SELECT COUNT(*) FROM article_text_vectors").fetchone()[0]
+        df = np.zeros(N_FEATURES, dtype=np.float32)
+        rows = cursor.execute("SELECT feature, df FROM text_term_df").fetchall()
+        if rows:
+            features, counts = zip(*rows)
+            df[np.fromiter(features, dtype=np.int64)] = counts
+    finally:
+        if conn:
+            conn.close()
+    return (np.log((1.0 + n_docs) / (1.0 + df)) + 1.0).astype(np.float32)
+
+
+def get_article_vector(article_id, db_path="db/news.db", cursor=None):
+    """Return (indices, weights) for an article, or None if it has not been vectorized."""
+    conn = None
+    if cursor is None:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+    try:
+        row = cursor.execute(
+            "SELECT indices, weights FROM article_text_vectors WHERE article_id = ?", (article_id,)
+        ).fetchone()
+    finally:
+        if conn:
+            conn.close()
+    return _from_blobs(*row) if row else None
+
+
+def _mean_vector(vectors):
+    """Mean of sparse vectors, truncated to the CENTROID_MAX_TERMS heaviest terms."""
+    if not vectors:
+        return np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.float32)
+    all_idx = np.concatenate([v[0] for v in vectors])
+    all_w = np.concatenate([v[1] for v in vectors]).astype(np.float32)
+    indices, inverse = np.unique(all_idx, return_inverse=True)
+    weights = np.zeros(len(indices), dtype=np.float32)
+    np.add.at(weights, inverse, all_w)
+    weights /= len(vectors)
+    if len(indices) > CENTROID_MAX_TERMS:
+        keep = np.sort(np.argpartition(weights, -CENTROID_MAX_TERMS)[-CENTROID_MAX_TERMS:])
+        indices, weights = indices[keep], weights[keep]
+    return indices.astype(np.uint32), weights
+
+
+def refresh_group_centroids(db_path="db/news.db"):
+    """
+    Rebuild centroids for groups whose membership changed since their centroid
+    was computed (or that have none). Returns the number of centroids rebuilt.
+    """
+    conn = get_connection(db_path)
+    cursor = conn.cursor()
+    rebuilt = 0
+    try:
+        stale = cursor.execute(
+            """
+            SELECT m.group_id
+            FROM two_phase_article_group_memberships m
+            LEFT JOIN group_text_centroids c ON c.group_id = m.group_id
+            GROUP BY m.group_id
+            HAVING c.article_count IS NULL OR c.article_count != COUNT(m.article_id)
+            """
+        ).fetchall()
+        for (group_id,) in stale:
+            rows = cursor.execute(
+                """
+                SELECT v.indices, v.weights
+                FROM two_phase_article_group_memberships m
+                JOIN article_text_vectors v ON v.article_id = m.article_id
+                WHERE m.group_id = ?
+                """,
+                (group_id,),
+            ).fetchall()
+            member_count = cursor.execute(
+                "SELECT COUNT(*) FROM two_phase_article_group_memberships WHERE group_id = ?",
+                (group_id,),
+            ).fetchone()[0]
+            indices, weights = _mean_vector([_from_blobs(*r) for r in rows])
+            cursor.execute(
+                """
+                INSERT OR REPLACE INTO group_text_centroids (group_id, indices, weights, article_count, updated_at)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                """,
+                (group_id, *_to_blobs(indices, weights), member_count),
+            )
+            rebuilt += 1
+        # Groups that no longer exist
+        cursor.execute(
+            "DELETE FROM group_text_centroids WHERE group_id NOT IN (SELECT group_id FROM two_phase_article_groups)"
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.error(f"Database error refreshing group text centroids: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+    if rebuilt:
+        logger.info(f"Rebuilt text centroids for {rebuilt} groups.")
+    return rebuilt
+
+
+class GroupTextIndex:
+    """
+    In-memory cosine index over group centroids. Centroids are kept as running
+    sums so articles added during a grouping run update their group immediately.
+    """
+
+    def __init__(self, idf):
+        self.idf = idf
+        self._sums = {}  # group_id -> (indices, summed weights)
+        self._counts = {}  # group_id -> member count
+        self._packed = None
+
+    @classmethod
+    def load(cls, db_path="db/news.db"):
+        """Build an index from `group_text_centroids` (call refresh_group_centroids first)."""
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+        try:
+            index = cls(load_idf(cursor=cursor))
+            for group_id, idx_blob, w_blob, count in cursor.execute(
+                "SELECT group_id, indices, weights, article_count FROM group_text_centroids"
+            ):
+                indices, weights = _from_blobs(idx_blob, w_blob)
+                if len(indices) and count:
+                    index._sums[group_id] = (indices, weights * count)
+                    index._counts[group_id] = count
+        finally:
+            conn.close()
+        return index
+
+    def __len__(self):
+        return len(self._sums)
+
+    def add_article(self, group_id, vector):
+        """Fold an article's TF vector into a group's centroid (creating the group if new)."""
+        if vector is None or not len(vector[0]):
+            return
+        if group_id in self._sums:
+            indices, weights = _mean_vector([self._sums[group_id], vector])
+            self._sums[group_id] = (indices, weights * 2)
+        else:
+            self._sums[group_id] = vector
+        self._counts[group_id] = self._counts.get(group_id, 0) + 1
+        self._packed = None
+
+    def _pack(self):
+        group_ids = list(self._sums)
+        if not group_ids:
+            self._packed = ([], None, None, None, None)
+            return
+        lengths = np.array([len(self._sums[g][0]) for g in group_ids])
+        indices = np.concatenate([self._sums[g][0] for g in group_ids]).astype(np.int64)
+        data = np.concatenate(
+            [self._sums[g][1] / self._counts[g] for g in group_ids]
+        ).astype(np.float32) * self.idf[indices]
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        norms = np.sqrt(np.add.reduceat(data * data, offsets))
+        self._packed = (group_ids, indices, data, offsets, norms)
+
+    def scores(self, vector):
+        """Return {group_id: cosine similarity} against every group."""
+        if self._packed is None:
+            self._pack()
+        group_ids, indices, data, offsets, norms = self._packed
+        if not group_ids or vector is None or not len(vector[0]):
+            return {}
+        q_idx = vector[0].astype(np.int64)
+        q_val = vector[1] * self.idf[q_idx]
+        q_norm = float(np.sqrt(np.dot(q_val, q_val)))
+        if q_norm == 0:
+            return {}
+        dense = np.zeros(N_FEATURES, dtype=np.float32)
+        dense[q_idx] = q_val / q_norm
+        sims = np.add.reduceat(data * dense[indices], offsets) / np.maximum(norms, 1e-12)
+        return dict(zip(group_ids, sims.tolist()))
+
+    def _unit_vector(self, group_id):
+        indices, sums = self._sums[group_id]
+        weights = sums / self._counts[group_id] * self.idf[indices.astype(np.int64)]
+        norm = float(np.sqrt(np.dot(weights, weights)))
+        return indices, weights / norm if norm else weights
+
+    def similarity(self, group_a, group_b):
+        """Cosine between two group centroids (0.0 if either has none)."""
+        if group_a not in self._sums or group_b not in self._sums:
+            return 0.0
+        idx_a, w_a = self._unit_vector(group_a)
+        idx_b, w_b = self._unit_vector(group_b)
+        _, pos_a, pos_b = np.intersect1d(idx_a, idx_b, assume_unique=True, return_indices=True)
+        return float(np.dot(w_a[pos_a], w_b[pos_b]))
+
+    def top_k(self, vector, k=10):
+        """Return [(group_id, cosine)] for the k most similar groups, best first."""
+        scored = self.scores(vector)
+        return sorted(scored.items(), key=lambda item: item[1], reverse=True)[:k]
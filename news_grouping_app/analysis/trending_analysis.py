@@ -1,11 +1,13 @@
 # analysis/trending_analysis.py - UPDATED FOR CURSOR PASSING
 # Implements 48-hour trending analysis of articles within their assigned categories.
 
+import hashlib
 import logging
 import json
+import os
 import re
-import time
 import sqlite3  # Import sqlite3
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 
 import pandas as pd
@@ -14,20 +16,32 @@ import pytz
 # Import necessary functions from news_grouping_app.db.database (assuming they are modified)
 from news_grouping_app.db.database import (
     get_connection,
+    get_article_bodies,
     link_entity_to_trend,
     insert_entity,  # Make sure this accepts optional cursor
+    record_change,
 )
 from news_grouping_app.llm_calls import call_gpt_api
 from news_grouping_app.utils import chunk_summaries, MAX_TOKEN_CHUNK
 
 # Import entity/context functions (these primarily read, should be okay)
-from news_grouping_app.analysis.entity_extraction import get_entities_for_article, get_trending_entities
+from news_grouping_app.analysis.entity_extraction import get_entities_for_articles, get_trending_entities
 from news_grouping_app.analysis.context_builder import build_grouping_context, format_context_for_prompt
+from news_grouping_app.analysis.entity_cooccurrence import get_entity_pair_counts, refresh_entity_pair_daily
 from news_grouping_app.config import OPENAI_MODEL
 
 logger = logging.getLogger(__name__)
 MODEL = OPENAI_MODEL  # default model can be overridden via env var
 
+# Categories analysed concurrently; each worker spends most of its time waiting on the LLM
+TRENDING_WORKERS = int(os.environ.get("TRENDING_WORKERS", "5"))
+TRENDING_WINDOW_HOURS = 48
+# A category whose window gained at most this many articles, and at most this
+# share of the window, gets an incremental "merge into existing trends" prompt
+# instead of a full re-analysis.
+TRENDING_INCREMENTAL_MAX_ARTICLES = 40
+TRENDING_INCREMENTAL_MAX_SHARE = 0.3
+
 
 def setup_trending_tables(db_path="db/news.db"):
     """
@@ -79,6 +93,18 @@ def setup_trending_tables(db_path="db/news.db"):
             )
         """
         )
+        # trending_category_state: the article-id set last analysed per category
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS trending_category_state (
+                category TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                article_ids TEXT NOT NULL, /* JSON array */
+                article_count INTEGER NOT NULL DEFAULT 0,
+                analyzed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """
+        )
         conn.commit()
         logger.info("Trending tables verified/created.")
     except sqlite3.Error as e:
@@ -90,6 +116,39 @@ def setup_trending_tables(db_path="db/news.db"):
             conn.close()
 
 
+def _with_bodies(df, conn):
+    """Add `content` and `expanded_summary` (title - content) after `title`."""
+    df = df.copy()
+    bodies = get_article_bodies(df["article_id"], cursor=conn.cursor())
+    position = df.columns.get_loc("title") + 1
+    df.insert(position, "content", df["article_id"].map(bodies))
+    df.insert(
+        position + 1,
+        "expanded_summary",
+        [
+            f"{title} - {bodies[article_id]}" if article_id in bodies else None
+            for article_id, title in zip(df["article_id"], df["title"])
+        ],
+    )
+    return df
+
+
+def attach_article_bodies(articles, db_path="db/news.db"):
+    """
+    Add bodies to frames returned by get_recent_articles_by_category(...,
+    with_bodies=False), decompressing only these articles. Frames that
+    already carry a `content` column are returned unchanged.
+    """
+    conn = get_connection(db_path)
+    try:
+        return {
+            category: df if "content" in df.columns else _with_bodies(df, conn)
+            for category, df in articles.items()
+        }
+    finally:
+        conn.close()
+
+
 def get_articles_by_category_last_48h(category, db_path="db/news.db"):
     """
     Retrieve articles from the last 48 hours for a specific main_topic category.
@@ -101,9 +160,7 @@ def get_articles_by_category_last_48h(category, db_path="db/news.db"):
 
     query = """
         SELECT
-            a.id AS article_id, a.title, a.content,
-            a.title || ' - ' || a.content AS expanded_summary,
-            a.published_date
+            a.id AS article_id, a.title, a.published_date
         FROM articles a
         JOIN two_phase_article_group_memberships tgm ON a.id = tgm.article_id
         JOIN two_phase_article_groups tg ON tgm.group_id = tg.group_id
@@ -112,7 +169,7 @@ def get_articles_by_category_last_48h(category, db_path="db/news.db"):
         ORDER BY a.published_date DESC
     """
     try:
-        df = pd.read_sql_query(query, conn, params=(category, cutoff_iso))
+        df = _with_bodies(pd.read_sql_query(query, conn, params=(category, cutoff_iso)), conn)
     except Exception as e:
         logger.error(f"Error fetching articles for category '{category}': {e}")
         df = pd.DataFrame()  # Return empty DataFrame on error
@@ -121,43 +178,129 @@ def get_articles_by_category_last_48h(category, db_path="db/news.db"):
     return df
 
 
-def get_entity_co_occurrences(category, hours=48, limit=20, db_path="db/news.db"):
+def get_recent_articles_by_category(
+    categories, hours=TRENDING_WINDOW_HOURS, db_path="db/news.db", with_bodies=True
+):
     """
-    Get entity co-occurrence patterns within a specific category in recent articles.
-    (Read operation - uses its own connection)
+    Retrieve recent articles for several main_topic categories in one query.
+    Returns {category: DataFrame} with the same columns as
+    get_articles_by_category_last_48h (empty frames for quiet categories).
+    With with_bodies=False the frames hold only article_id, title and
+    published_date; attach_article_bodies() adds the rest later.
     """
+    categories = list(categories)
     conn = get_connection(db_path)
     cutoff_time_utc = datetime.now(pytz.UTC) - timedelta(hours=hours)
     cutoff_iso = cutoff_time_utc.strftime("%Y-%m-%d %H:%M:%S")
 
-    query = """
+    placeholders = ",".join("?" for _ in categories)
+    query = f"""
         SELECT
-            e1.entity_id AS entity1_id, e1.entity_name AS entity1_name, e1.entity_type AS entity1_type,
-            e2.entity_id AS entity2_id, e2.entity_name AS entity2_name, e2.entity_type AS entity2_type,
-            COUNT(DISTINCT a.id) AS co_occurrence_count
+            tg.main_topic AS category,
+            a.id AS article_id, a.title, a.published_date
         FROM articles a
         JOIN two_phase_article_group_memberships tgm ON a.id = tgm.article_id
         JOIN two_phase_article_groups tg ON tgm.group_id = tg.group_id
-        JOIN article_entities ae1 ON a.id = ae1.article_id
-        JOIN entity_profiles e1 ON ae1.entity_id = e1.entity_id
-        JOIN article_entities ae2 ON a.id = ae2.article_id
-        JOIN entity_profiles e2 ON ae2.entity_id = e2.entity_id
-        WHERE tg.main_topic = ?
+        WHERE tg.main_topic IN ({placeholders})
           AND a.published_date >= ?
-          AND e1.entity_id < e2.entity_id /* Avoid duplicate pairs */
-        GROUP BY e1.entity_id, e2.entity_id
-        HAVING co_occurrence_count > 1
-        ORDER BY co_occurrence_count DESC
-        LIMIT ?
+        ORDER BY a.published_date DESC
     """
     try:
-        df = pd.read_sql_query(query, conn, params=(category, cutoff_iso, limit))
+        df = pd.read_sql_query(query, conn, params=(*categories, cutoff_iso))
+        if with_bodies:
+            df = _with_bodies(df, conn)
     except Exception as e:
-        logger.error(f"Error fetching entity co-occurrences for '{category}': {e}")
-        df = pd.DataFrame()  # Return empty DataFrame on error
+        logger.error(f"Error fetching recent articles for trending: {e}")
+        columns = ["category", "article_id", "title", "published_date"]
+        if with_bodies:
+            columns[3:3] = ["content", "expanded_summary"]
+        df = pd.DataFrame(columns=columns)
     finally:
         conn.close()
-    return df
+
+    by_category = {
+        category: group.drop(columns="category").reset_index(drop=True)
+        for category, group in df.groupby("category", sort=False)
+    }
+    empty = df.drop(columns="category").iloc[0:0]
+    return {category: by_category.get(category, empty) for category in categories}
+
+
+def window_fingerprint(article_ids):
+    """Order-independent fingerprint of a set of article IDs."""
+    joined = ",".join(str(a) for a in sorted({int(a) for a in article_ids}))
+    return hashlib.sha1(joined.encode("utf-8")).hexdigest()
+
+
+def get_category_states(db_path="db/news.db"):
+    """
+    Return {category: {"fingerprint", "article_ids" (set), "trend_count"}} for
+    every category analysed before. trend_count is the number of trends the
+    category currently has, so categories whose trends were cleaned up are
+    re-analysed from scratch.
+    """
+    conn = get_connection(db_path)
+    try:
+        rows = conn.execute(
+            """
+            SELECT s.category, s.fingerprint, s.article_ids,
+                   (SELECT COUNT(*) FROM trending_groups tg WHERE tg.category = s.category)
+            FROM trending_category_state s
+            """
+        ).fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"Error loading trending category state: {e}")
+        return {}
+    finally:
+        conn.close()
+
+    states = {}
+    for category, fingerprint, article_ids, trend_count in rows:
+        try:
+            ids = {int(a) for a in json.loads(article_ids)}
+        except (TypeError, ValueError):
+            continue
+        states[category] = {
+            "fingerprint": fingerprint,
+            "article_ids": ids,
+            "trend_count": trend_count,
+        }
+    return states
+
+
+def plan_category_update(article_ids, state):
+    """
+    Decide how to refresh a category whose window holds `article_ids`.
+    Returns (mode, new_ids) with mode one of "skip", "incremental" or "full".
+    """
+    article_ids = {int(a) for a in article_ids}
+    if state is None or not state["trend_count"]:
+        return "full", article_ids
+    if window_fingerprint(article_ids) == state["fingerprint"]:
+        return "skip", set()
+    new_ids = article_ids - state["article_ids"]
+    if not new_ids:
+        # Only articles ageing out of the window; existing trends still stand
+        return "skip", set()
+    if (
+        len(new_ids) <= TRENDING_INCREMENTAL_MAX_ARTICLES
+        and len(new_ids) <= TRENDING_INCREMENTAL_MAX_SHARE * len(article_ids)
+    ):
+        return "incremental", new_ids
+    return "full", article_ids
+
+
+def get_entity_co_occurrences(category, hours=48, limit=20, db_path="db/news.db"):
+    """
+    Get entity co-occurrence patterns within a specific category in recent articles.
+    Reads the daily aggregates in `entity_pair_daily`; run_trending_analysis
+    refreshes them once per run before categories are analysed.
+    """
+    try:
+        return get_entity_pair_counts(category, hours=hours, limit=limit, db_path=db_path)
+    except Exception as e:
+        logger.error(f"Error fetching entity co-occurrences for '{category}': {e}")
+        return pd.DataFrame()  # Return empty DataFrame on error
 
 
 def _prepare_trending_entity_context(trending_entities_df, max_items=10):
@@ -184,14 +327,24 @@ def _prepare_co_occurrence_context(co_occurrences_df, max_items=8):
     return "\n".join(lines) + "\n"
 
 
-def _prepare_article_text(df, chunk_dict, db_path):
-    """Build snippet text for articles, including entities and date."""
+def _prepare_article_text(df, chunk_dict, db_path, article_entities=None):
+    """
+    Build snippet text for articles, including entities and date.
+    article_entities is an optional {article_id: DataFrame} preloaded by the
+    caller; missing articles are looked up in one bulk query.
+    """
+    if article_entities is None:
+        article_entities = {}
+    missing = [art_id for art_id in chunk_dict if art_id not in article_entities]
+    if missing:
+        article_entities = {**article_entities, **get_entities_for_articles(missing, db_path=db_path)}
+    published = dict(zip(df["article_id"], df["published_date"]))
+
     article_text = ""
     for art_id, text in chunk_dict.items():
-        # Fetch entities (Read operation, okay to use separate connection if get_entities_for_article does)
-        entities_df = get_entities_for_article(art_id, db_path=db_path)
+        entities_df = article_entities.get(art_id)
         entity_summary = ""
-        if not entities_df.empty:
+        if entities_df is not None and not entities_df.empty:
             top_entities = entities_df.sort_values(
                 "relevance_score", ascending=False
             ).head(5)
@@ -203,7 +356,7 @@ def _prepare_article_text(df, chunk_dict, db_path):
 
         date_str = ""
         try:
-            date_row = df[df["article_id"] == art_id]["published_date"].iloc[0]
+            date_row = published.get(art_id)
             if date_row:
                 date_str = f"\nPublished: {pd.to_datetime(date_row).strftime('%Y-%m-%d %H:%M')}"
         except:
@@ -231,11 +384,125 @@ def _build_trend_analysis_prompt(
     )
 
 
-def identify_trends_in_category(category, api_key, db_path="db/news.db"):
-    """Identify trends using LLM analysis, entity context, etc."""
+def _build_trend_merge_prompt(category, entity_context, existing_trends, article_text):
+    """Construct the LLM user prompt for merging new articles into existing trends."""
+    trend_lines = []
+    for trend in existing_trends:
+        trend_lines.append(
+            f"Trend ID={trend['trend_id']}: {trend['trend_label']}\n  Summary: {trend['summary']}"
+        )
+        for title in trend["titles"]:
+            trend_lines.append(f"  * {title}")
+    return (
+        f"These articles were published in the '{category}' category since its trends were last analysed. "
+        "Merge them into the existing trends below where they cover the same subject, and only propose a new trend "
+        "for a clearly distinct subject. Articles that fit neither can be left out.\n\n"
+        f"\n{entity_context}\n"
+        "EXISTING TRENDS:\n" + "\n".join(trend_lines) + "\n\n"
+        "For each existing trend that gains articles, provide trend_id, articles (new article IDs) and, if the new "
+        "articles change the story, an updated summary. New trends use the usual fields.\n\n"
+        "Return valid JSON only:\n"
+        '{ "updates": [ {"trend_id": N, "articles": [...], "summary": "..."} ], '
+        '"new_trends": [ {"trend_label": "...", "summary": "...", "importance_score": X, "confidence_score": Y, '
+        '"key_entities": [{"name": "...", "type": "..."}], "articles": [...]} ] }\n\n'
+        f"New articles:\n\n{article_text}"
+    )
+
+
+def get_existing_trends(categories, titles_per_trend=3, db_path="db/news.db"):
+    """
+    Return {category: [{"trend_id", "trend_label", "summary", "titles"}]} for
+    the current trends of each category, with a few recent article titles.
+    """
+    categories = list(categories)
+    result = {category: [] for category in categories}
+    if not categories:
+        return result
+    conn = get_connection(db_path)
+    try:
+        placeholders = ",".join("?" for _ in categories)
+        trends = conn.execute(
+            f"""
+            SELECT trend_id, category, trend_label, summary
+            FROM trending_groups
+            WHERE category IN ({placeholders})
+            ORDER BY importance_score DESC, trend_id
+            """,
+            categories,
+        ).fetchall()
+        titles = {}
+        for trend_id, title in conn.execute(
+            f"""
+            SELECT tgm.trend_id, a.title
+            FROM trending_group_memberships tgm
+            JOIN articles a ON a.id = tgm.article_id
+            JOIN trending_groups tg ON tg.trend_id = tgm.trend_id
+            WHERE tg.category IN ({placeholders})
+            ORDER BY a.published_date DESC
+            """,
+            categories,
+        ):
+            bucket = titles.setdefault(trend_id, [])
+            if len(bucket) < titles_per_trend:
+                bucket.append(title)
+    except sqlite3.Error as e:
+        logger.error(f"Error loading existing trends: {e}")
+        return result
+    finally:
+        conn.close()
+
+    for trend_id, category, label, summary in trends:
+        result[category].append(
+            {
+                "trend_id": trend_id,
+                "trend_label": label,
+                "summary": summary,
+                "titles": titles.get(trend_id, []),
+            }
+        )
+    return result
+
+
+def prepare_trending_inputs(categories, db_path="db/news.db", articles=None):
+    """
+    Load the inputs shared by every category in a trending run: recent articles
+    per category, the entities of all those articles (one bulk lookup), and the
+    trending-entity context, which does not depend on the category.
+    `articles` may be passed in when the caller already loaded it.
+    """
+    if articles is None:
+        articles = get_recent_articles_by_category(categories, db_path=db_path)
+    else:
+        articles = attach_article_bodies(
+            {category: articles[category] for category in categories if category in articles},
+            db_path=db_path,
+        )
+    article_ids = set()
+    for category in categories:
+        df = articles.get(category)
+        if df is not None:
+            article_ids.update(int(a) for a in df["article_id"])
+    trending_entities = get_trending_entities(
+        hours=TRENDING_WINDOW_HOURS, limit=15, db_path=db_path
+    )
+    return {
+        "articles": articles,
+        "article_entities": get_entities_for_articles(article_ids, db_path=db_path),
+        "entity_context": _prepare_trending_entity_context(trending_entities),
+    }
+
+
+def identify_trends_in_category(category, api_key, db_path="db/news.db", shared=None):
+    """
+    Identify trends using LLM analysis, entity context, etc.
+    `shared` is the output of prepare_trending_inputs; without it the inputs
+    are loaded for this category alone.
+    """
     logger.info(f"Identifying trends for category: {category}")
-    df = get_articles_by_category_last_48h(category, db_path=db_path)
-    if df.empty:
+    if shared is None:
+        shared = prepare_trending_inputs([category], db_path=db_path)
+    df = shared["articles"].get(category)
+    if df is None or df.empty:
         logger.info(f"No recent articles found for category: {category}")
         return None
 
@@ -248,25 +515,30 @@ def identify_trends_in_category(category, api_key, db_path="db/news.db"):
         logger.info(f"No valid summaries for trend analysis in category: {category}")
         return None
 
-    trending_entities = get_trending_entities(hours=48, limit=15, db_path=db_path)
+    article_entities = shared["article_entities"]
+    entity_context = shared["entity_context"]
     co_occurrences = get_entity_co_occurrences(
-        category, hours=48, limit=15, db_path=db_path
+        category, hours=TRENDING_WINDOW_HOURS, limit=15, db_path=db_path
+    )
+    co_occurrence_context = _prepare_co_occurrence_context(co_occurrences)
+    # Category entities, exemplars and recent groups are the same for every chunk
+    context = build_grouping_context(
+        summaries_dict, category, api_key, db_path=db_path, article_entities=article_entities
     )
     result = {"trends": []}
     chunked_data = list(
         chunk_summaries(summaries_dict, max_token_chunk=MAX_TOKEN_CHUNK)
     )  # Ensure list conversion
 
+    answered = 0
     for idx, chunk_dict in enumerate(chunked_data, start=1):
         logger.info(
             f"Processing chunk {idx}/{len(chunked_data)} for category: {category}"
         )
-        # Build context (reads DB, likely ok with separate connection)
-        context = build_grouping_context(chunk_dict, category, api_key, db_path=db_path)
-        context_prompt = format_context_for_prompt(context)
-        entity_context = _prepare_trending_entity_context(trending_entities)
-        co_occurrence_context = _prepare_co_occurrence_context(co_occurrences)
-        article_text = _prepare_article_text(df, chunk_dict, db_path)
+        context_prompt = format_context_for_prompt(
+            {**context, "article_count": len(chunk_dict)}
+        )
+        article_text = _prepare_article_text(df, chunk_dict, db_path, article_entities)
 
         prompt = _build_trend_analysis_prompt(
             category,
@@ -294,18 +566,200 @@ def identify_trends_in_category(category, api_key, db_path="db/news.db"):
             data = json.loads(cleaned)
             chunk_trends = data.get("trends", [])
             result["trends"].extend(chunk_trends)
+            answered += 1
         except json.JSONDecodeError as exc:
             logger.error(f"Error parsing trend identification JSON: {exc}\n{cleaned}")
 
+    if not answered:
+        logger.warning(f"No usable LLM response for any chunk in category: {category}")
+        return None
     return result
 
 
-def save_trends(category, trends_data, db_path="db/news.db"):
+def identify_trend_updates(
+    category, new_article_ids, existing_trends, api_key, db_path="db/news.db", shared=None
+):
+    """
+    Merge articles that entered a category's window since its last analysis
+    into its existing trends. Only the new articles are sent to the LLM.
+    Returns {"updates": [...], "trends": [...]} (new trends use the same
+    shape as identify_trends_in_category), or None if the LLM gave nothing usable.
+    """
+    logger.info(
+        f"Merging {len(new_article_ids)} new articles into {len(existing_trends)} trends for category: {category}"
+    )
+    if shared is None:
+        shared = prepare_trending_inputs([category], db_path=db_path)
+    df = shared["articles"].get(category)
+    if df is None or df.empty:
+        return None
+    summaries_dict = {
+        row["article_id"]: row["expanded_summary"]
+        for _, row in df.iterrows()
+        if row["expanded_summary"] and int(row["article_id"]) in new_article_ids
+    }
+    if not summaries_dict:
+        return None
+
+    valid_trend_ids = {trend["trend_id"] for trend in existing_trends}
+    result = {"updates": [], "trends": []}
+    answered = 0
+    for chunk_dict in chunk_summaries(summaries_dict, max_token_chunk=MAX_TOKEN_CHUNK):
+        article_text = _prepare_article_text(df, chunk_dict, db_path, shared["article_entities"])
+        prompt = _build_trend_merge_prompt(
+            category, shared["entity_context"], existing_trends, article_text
+        )
+        messages = [
+            {
+                "role": "system",
+                "content": f"Update the existing trends in '{category}' with newly published articles.",
+            },
+            {"role": "user", "content": prompt},
+        ]
+        response = call_gpt_api(messages, api_key)
+        if not response:
+            logger.warning(f"No response from GPT for trend merge in category: {category}")
+            continue
+        cleaned = response.strip().strip("```json").strip("```").strip()
+        try:
+            data = json.loads(cleaned)
+        except json.JSONDecodeError as exc:
+            logger.error(f"Error parsing trend merge JSON: {exc}\n{cleaned}")
+            continue
+        answered += 1
+        for update in data.get("updates", []):
+            try:
+                trend_id = int(update.get("trend_id"))
+            except (TypeError, ValueError):
+                continue
+            if trend_id in valid_trend_ids:
+                result["updates"].append({**update, "trend_id": trend_id})
+            else:
+                logger.warning(f"Trend merge referenced unknown trend_id {update.get('trend_id')} in {category}")
+        result["trends"].extend(data.get("new_trends", []))
+
+    return result if answered else None
+
+
+def _insert_trend(cursor, category, trend, db_path="db/news.db"):
+    """
+    Insert one trend with its article memberships and key entities using the
+    caller's cursor. Returns (trend_id, entity_link_errors); sqlite3.Error on
+    the trend row itself propagates to the caller.
+    """
+    entity_link_errors = 0
+    cursor.execute(
+        """
+        INSERT INTO trending_groups
+        (category, trend_label, summary, importance_score, confidence_score)
+        VALUES (?, ?, ?, ?, ?)
+    """,
+        (
+            category,
+            trend.get("trend_label", "Untitled Trend"),
+            trend.get("summary", ""),
+            trend.get("importance_score", 5.0),
+            trend.get("confidence_score", 0.7),
+        ),
+    )
+    trend_id = cursor.lastrowid
+    _link_trend_articles(cursor, trend_id, trend.get("articles", []))
+
+    # Link key entities (PASS CURSOR)
+    for entity_data in trend.get("key_entities", []):
+        entity_name = entity_data.get("name", "").strip()
+        entity_type = entity_data.get("type", "unknown").lower()
+        wiki_qid = entity_data.get("qid") or entity_data.get("wiki_qid")
+        aliases = entity_data.get("aliases", [])
+        if not entity_name:
+            continue
+        try:
+            # Pass the existing cursor
+            entity_id = insert_entity(
+                entity_name,
+                entity_type,
+                wiki_qid=wiki_qid,
+                aliases=aliases,
+                db_path=db_path,
+                cursor=cursor,
+            )
+            if entity_id is None:  # Check if entity insertion failed
+                logger.error(
+                    f"Failed to insert/get entity '{entity_name}' for trend {trend_id}"
+                )
+                entity_link_errors += 1
+                continue  # Skip linking if entity_id is None
+            # Use a default relevance or calculate if possible
+            relevance = 0.8
+            link_entity_to_trend(
+                trend_id,
+                entity_id,
+                relevance,
+                db_path=db_path,
+                cursor=cursor,
+            )
+        # Catch potential OperationalError specifically if needed, though passing cursor should prevent most locks
+        except sqlite3.OperationalError as lock_err:
+            logger.error(
+                f"DATABASE LOCKED during entity linking for trend {trend_id}, entity '{entity_name}': {lock_err}"
+            )
+            entity_link_errors += 1
+        except Exception as exc:
+            logger.error(
+                f"Error processing entity '{entity_name}' for trend {trend_id}: {exc}",
+                exc_info=False,
+            )
+            entity_link_errors += 1
+    return trend_id, entity_link_errors
+
+
+def _link_trend_articles(cursor, trend_id, article_ids):
+    """Add article memberships to a trend, skipping invalid IDs."""
+    for article_id in article_ids:
+        try:
+            cursor.execute(
+                "INSERT OR IGNORE INTO trending_group_memberships (article_id, trend_id) VALUES (?, ?)",
+                (int(article_id), trend_id),
+            )
+        except (ValueError, TypeError, sqlite3.Error) as article_err:
+            logger.warning(
+                f"Skipping invalid article ID {article_id} or DB error for trend {trend_id}: {article_err}"
+            )
+
+
+def _record_category_state(cursor, category, article_ids):
+    """Remember the article-id set a category's trends were computed from."""
+    ids = sorted({int(a) for a in article_ids})
+    cursor.execute(
+        """
+        INSERT INTO trending_category_state (category, fingerprint, article_ids, article_count, analyzed_at)
+        VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(category) DO UPDATE SET
+            fingerprint = excluded.fingerprint,
+            article_ids = excluded.article_ids,
+            article_count = excluded.article_count,
+            analyzed_at = excluded.analyzed_at
+        """,
+        (category, window_fingerprint(ids), json.dumps(ids), len(ids)),
+    )
+
+
+def save_trends(
+    category, trends_data, db_path="db/news.db", replace_existing=False, window_article_ids=None
+):
     """
     Save identified trend data. Uses a single connection and cursor
     and passes the cursor to helper functions.
+
+    trends_data may also carry "updates" (from identify_trend_updates): new
+    articles and optional summaries for existing trends. With replace_existing
+    the category's current trends are deleted first (a full re-analysis), and
+    window_article_ids, if given, is recorded as the category's analysed
+    window in the same transaction.
     """
-    if not trends_data or not trends_data.get("trends"):
+    trends = (trends_data or {}).get("trends", [])
+    updates = (trends_data or {}).get("updates", [])
+    if not trends and not updates and window_article_ids is None:
         logger.info(f"No trends to save for category: {category}")
         return
 
@@ -316,83 +770,36 @@ def save_trends(category, trends_data, db_path="db/news.db"):
         conn = get_connection(db_path)
         cursor = conn.cursor()
 
-        for trend in trends_data["trends"]:
-            try:  # Inner try for individual trend saving
-                # Insert trend group
+        if replace_existing:
+            # Memberships and entity links first; foreign keys are not enforced
+            for table in ("trending_group_memberships", "trend_entities"):
                 cursor.execute(
-                    """
-                    INSERT INTO trending_groups
-                    (category, trend_label, summary, importance_score, confidence_score)
-                    VALUES (?, ?, ?, ?, ?)
-                """,
-                    (
-                        category,
-                        trend.get("trend_label", "Untitled Trend"),
-                        trend.get("summary", ""),
-                        trend.get("importance_score", 5.0),
-                        trend.get("confidence_score", 0.7),
-                    ),
+                    f"DELETE FROM {table} WHERE trend_id IN (SELECT trend_id FROM trending_groups WHERE category = ?)",
+                    (category,),
+                )
+            cursor.execute("DELETE FROM trending_groups WHERE category = ?", (category,))
+            if cursor.rowcount:
+                logger.info(f"Replacing {cursor.rowcount} existing trends for category: {category}")
+
+        for update in updates:
+            trend_id = update["trend_id"]
+            _link_trend_articles(cursor, trend_id, update.get("articles", []))
+            summary = (update.get("summary") or "").strip()
+            if summary:
+                cursor.execute(
+                    "UPDATE trending_groups SET summary = ?, updated_at = CURRENT_TIMESTAMP WHERE trend_id = ?",
+                    (summary, trend_id),
+                )
+            else:
+                cursor.execute(
+                    "UPDATE trending_groups SET updated_at = CURRENT_TIMESTAMP WHERE trend_id = ?",
+                    (trend_id,),
                 )
-                trend_id = cursor.lastrowid
-
-                # Link articles
-                articles = trend.get("articles", [])
-                for article_id in articles:
-                    try:
-                        cursor.execute(
-                            "INSERT OR IGNORE INTO trending_group_memberships (article_id, trend_id) VALUES (?, ?)",
-                            (int(article_id), trend_id),
-                        )
-                    except (ValueError, TypeError, sqlite3.Error) as article_err:
-                        logger.warning(
-                            f"Skipping invalid article ID {article_id} or DB error for trend {trend_id}: {article_err}"
-                        )
-
-                # Link key entities (PASS CURSOR)
-                key_entities = trend.get("key_entities", [])
-                for entity_data in key_entities:
-                    entity_name = entity_data.get("name", "").strip()
-                    entity_type = entity_data.get("type", "unknown").lower()
-                    wiki_qid = entity_data.get("qid") or entity_data.get("wiki_qid")
-                    aliases = entity_data.get("aliases", [])
-                    if entity_name:
-                        try:
-                            # Pass the existing cursor
-                            entity_id = insert_entity(
-                                entity_name,
-                                entity_type,
-                                wiki_qid=wiki_qid,
-                                aliases=aliases,
-                                db_path=db_path,
-                                cursor=cursor,
-                            )
-                            if entity_id is None:  # Check if entity insertion failed
-                                logger.error(
-                                    f"Failed to insert/get entity '{entity_name}' for trend {trend_id}"
-                                )
-                                entity_link_errors += 1
-                                continue  # Skip linking if entity_id is None
-                            # Use a default relevance or calculate if possible
-                            relevance = 0.8
-                            link_entity_to_trend(
-                                trend_id,
-                                entity_id,
-                                relevance,
-                                db_path=db_path,
-                                cursor=cursor,
-                            )
-                        # Catch potential OperationalError specifically if needed, though passing cursor should prevent most locks
-                        except sqlite3.OperationalError as lock_err:
-                            logger.error(
-                                f"DATABASE LOCKED during entity linking for trend {trend_id}, entity '{entity_name}': {lock_err}"
-                            )
-                            entity_link_errors += 1
-                        except Exception as exc:
-                            logger.error(
-                                f"Error processing entity '{entity_name}' for trend {trend_id}: {exc}",
-                                exc_info=False,
-                            )
-                            entity_link_errors += 1
+
+        for trend in trends:
+            try:  # Inner try for individual trend saving
+                _, link_errors = _insert_trend(cursor, category, trend, db_path=db_path)
+                entity_link_errors += link_errors
                 saved_count += 1
             except sqlite3.Error as trend_err:
                 logger.error(
@@ -401,9 +808,38 @@ def save_trends(category, trends_data, db_path="db/news.db"):
                 # Decide if rollback is needed here or continue with others
                 # For now, we log and continue
 
+        if window_article_ids is not None:
+            _record_category_state(cursor, category, window_article_ids)
+
+        if trends or updates or replace_existing:
+            # Live dashboards (/api/stream) swap in the category's current trend list
+            cursor.execute(
+                """
+                SELECT t.trend_id, t.trend_label, t.summary, t.importance_score,
+                       (SELECT COUNT(*) FROM trending_group_memberships m WHERE m.trend_id = t.trend_id)
+                FROM trending_groups t
+                WHERE t.category = ?
+                ORDER BY t.importance_score DESC
+                """,
+                (category,),
+            )
+            current = [
+                {"trend_id": row[0], "trend_label": row[1], "summary": row[2],
+                 "importance_score": row[3], "article_count": row[4]}
+                for row in cursor.fetchall()
+            ]
+            record_change(
+                "trends_replaced" if replace_existing else "trends_updated",
+                category,
+                payload={"trends": current},
+                db_path=db_path,
+                cursor=cursor,
+            )
+
         conn.commit()  # Commit all successfully processed trends at the end
         logger.info(
-            f"Attempted to save {len(trends_data['trends'])} trends for category: {category}. Successfully saved: {saved_count}. Entity link errors: {entity_link_errors}."
+            f"Attempted to save {len(trends)} trends for category: {category}. Successfully saved: {saved_count}. "
+            f"Updated existing trends: {len(updates)}. Entity link errors: {entity_link_errors}."
         )
 
     except Exception as exc:
@@ -418,7 +854,10 @@ def save_trends(category, trends_data, db_path="db/news.db"):
 
 
 def cleanup_old_trends(db_path="db/news.db"):
-    """Remove trend data older than 48 hours. Uses its own connection."""
+    """
+    Remove trends neither created nor updated in the last 48 hours.
+    Uses its own connection.
+    """
     logger.info("Running cleanup of old trending data.")
     conn = None
     deleted_count = 0
@@ -430,7 +869,7 @@ def cleanup_old_trends(db_path="db/news.db"):
 
         # Get IDs to delete first (optional, for logging count)
         cursor.execute(
-            f"SELECT COUNT(*) FROM trending_groups WHERE created_at < {cutoff_time_sql}"
+            f"SELECT COUNT(*) FROM trending_groups WHERE COALESCE(updated_at, created_at) < {cutoff_time_sql}"
         )
         to_delete_count = cursor.fetchone()[0]
         logger.info(f"Found {to_delete_count} trends older than 48 hours to remove.")
@@ -438,7 +877,7 @@ def cleanup_old_trends(db_path="db/news.db"):
         if to_delete_count > 0:
             # Rely on ON DELETE CASCADE for memberships and entities
             cursor.execute(
-                f"DELETE FROM trending_groups WHERE created_at < {cutoff_time_sql}"
+                f"DELETE FROM trending_groups WHERE COALESCE(updated_at, created_at) < {cutoff_time_sql}"
             )
             deleted_count = cursor.rowcount
             conn.commit()
@@ -585,12 +1024,12 @@ def ensure_minimum_trends(min_count=6, api_key=None, db_path="db/news.db"):
             conn.close()
 
 
-def get_trending_topics(category=None, limit=10, db_path="db/news.db"):
+def get_trending_topics(category=None, limit=10, db_path="db/news.db", cursor=None):
     """
     Retrieve trending topics, optionally filtered.
-    (Read operation - uses its own connection)
+    (Read operation - uses the connection of `cursor` if given, else its own)
     """
-    conn = get_connection(db_path)
+    conn = cursor.connection if cursor else get_connection(db_path)
     article_data_map = {}
     entity_data_map = {}
     df = pd.DataFrame()  # Initialize df
@@ -646,12 +1085,26 @@ def get_trending_topics(category=None, limit=10, db_path="db/news.db"):
         logger.error(f"Error fetching trending topics: {e}")
         df = pd.DataFrame()  # Return empty on error
     finally:
-        conn.close()
+        if cursor is None:
+            conn.close()
     return df
 
 
-def run_trending_analysis(api_key, categories=None, db_path="db/news.db", min_trends=6):
-    """Main function to run the 48-hour trending analysis."""
+def run_trending_analysis(
+    api_key, categories=None, db_path="db/news.db", min_trends=6, max_workers=TRENDING_WORKERS
+):
+    """
+    Main function to run the 48-hour trending analysis.
+
+    Shared inputs are loaded once, then categories are analysed concurrently
+    by a bounded thread pool (the work is dominated by LLM calls). Trends are
+    saved on this thread as each category finishes, so DB writes stay serial.
+
+    Each category's article-id window is compared with the one its trends were
+    last computed from: unchanged categories are skipped, a small number of new
+    articles is merged into the existing trends, and anything else is
+    re-analysed in full (replacing the category's trends).
+    """
     logger.info("Starting enhanced trending analysis run.")
     if categories is None:
         from news_grouping_app.analysis.two_phase_grouping import (
@@ -663,12 +1116,54 @@ def run_trending_analysis(api_key, categories=None, db_path="db/news.db", min_tr
     setup_trending_tables(db_path=db_path)  # Ensure tables exist
     cleanup_old_trends(db_path=db_path)  # Clean first
 
+    refresh_entity_pair_daily(db_path=db_path)  # Co-occurrence counts read by every category
+    # Bodies are decompressed later, only for categories that need analysis
+    articles = get_recent_articles_by_category(categories, db_path=db_path, with_bodies=False)
+    states = get_category_states(db_path=db_path)
+    plans = {}
     for category in categories:
-        logger.info(f"Processing category for trends: {category}")
-        trends = identify_trends_in_category(category, api_key, db_path=db_path)
-        if trends:
-            save_trends(category, trends, db_path=db_path)
-        time.sleep(1)  # Small delay
+        window_ids = {int(a) for a in articles[category]["article_id"]}
+        mode, new_ids = plan_category_update(window_ids, states.get(category))
+        plans[category] = (mode, new_ids, window_ids)
+    active = [c for c in categories if plans[c][0] != "skip"]
+    logger.info(
+        "Trending plan: "
+        + ", ".join(f"{c}={plans[c][0]}" + (f"(+{len(plans[c][1])})" if plans[c][0] == "incremental" else "") for c in categories)
+    )
+
+    if active:
+        shared = prepare_trending_inputs(active, db_path=db_path, articles=articles)
+        existing = get_existing_trends(
+            [c for c in active if plans[c][0] == "incremental"], db_path=db_path
+        )
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(active)))) as executor:
+            futures = {}
+            for category in active:
+                mode, new_ids, _ = plans[category]
+                if mode == "incremental":
+                    future = executor.submit(
+                        identify_trend_updates, category, new_ids, existing[category], api_key, db_path, shared
+                    )
+                else:
+                    future = executor.submit(identify_trends_in_category, category, api_key, db_path, shared)
+                futures[future] = category
+            for future in as_completed(futures):
+                category = futures[future]
+                mode, _, window_ids = plans[category]
+                try:
+                    trends = future.result()
+                except Exception as exc:
+                    logger.error(f"Error identifying trends for category {category}: {exc}", exc_info=True)
+                    continue
+                if trends is None:
+                    continue  # Nothing usable; the window is retried next run
+                save_trends(
+                    category,
+                    trends,
+                    db_path=db_path,
+                    replace_existing=(mode == "full"),
+                    window_article_ids=window_ids,
+                )
 
     # Ensure minimum trends exist AFTER attempting to generate new ones
     ensure_minimum_trends(min_count=min_trends, api_key=api_key, db_path=db_path)
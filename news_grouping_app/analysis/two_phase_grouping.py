@@ -13,24 +13,43 @@ import sqlite3
 from typing import Optional, List, Dict, Tuple, Any  # Added Any
 
 # --- Database & Utility Imports ---
-from news_grouping_app.db.database import get_connection, setup_database
-from news_grouping_app.utils import approximate_tokens  # Assuming this exists
+from news_grouping_app.db.database import (
+    get_article_bodies,
+    get_connection,
+    mark_group_dirty,
+    setup_database,
+)
+from news_grouping_app.utils import SQLITE_DATETIME_FORMAT, approximate_tokens
+from news_grouping_app.analysis.near_duplicates import (
+    assign_duplicates_to_canonical_groups,
+    get_duplicate_canonical_map,
+)
+from news_grouping_app.analysis.text_vectors import (
+    GroupTextIndex,
+    get_article_vector,
+    refresh_group_centroids,
+    vectorize_new_articles,
+)
 
 # --- LLM & Signature/Grouping Imports ---
 try:
     from news_grouping_app.llm_calls import call_gpt_api
-    from news_grouping_app.article_signature import generate_article_signature
+    from news_grouping_app.article_signature import (
+        generate_article_signature,
+        calculate_signature_similarity,
+    )
 
     # Assumes enhanced_grouping.py has the UPDATED versions of these functions
     from news_grouping_app.enhanced_grouping import (
         get_existing_groups as get_existing_groups_enhanced,
         generate_group_signature,
+        aggregate_group_signature,
         calculate_article_to_group_similarity,
         add_article_to_group,
     )
 
-    # Optional: For consistency check after adding
-    from news_grouping_app.analysis.consistency_checker import evaluate_group_consistency
+    # Deferred consistency evaluation of groups changed in this run
+    from news_grouping_app.analysis.consistency_checker import run_consistency_pass
 except ImportError as e:
     logging.error(f"Failed to import necessary modules: {e}", exc_info=True)
     # Decide if you want to raise e or try to continue partially
@@ -56,12 +75,38 @@ PREDEFINED_CATEGORIES = [
 ENABLE_LLM_MATCH_ASSESSMENT = (
     True  # Set to False to disable LLM checks for ambiguous cases
 )
-from news_grouping_app.config import OPENAI_MODEL
+from news_grouping_app.config import (
+    ACTIVE_GROUP_WINDOW_DAYS,
+    OPENAI_MODEL,
+    SECOND_CHANCE_GROUP_SEARCH,
+)
 LLM_CHECK_MODEL = OPENAI_MODEL
 AMBIGUITY_ZONE_BELOW_THRESHOLD = 0.10  # How far below threshold triggers check
 AMBIGUITY_ZONE_ABOVE_THRESHOLD = 0.05  # How far above threshold triggers check
 MAX_SCORE_GAP_FOR_AMBIGUITY = 0.08  # If second best is this close, trigger check
 
+# --- Local Text Similarity ---
+ENABLE_TEXT_SIMILARITY = True  # TF-IDF cosine term + LLM candidate shortlist
+TEXT_SHORTLIST_EXTRA = 2  # Extra LLM candidates taken from the top text matches
+TEXT_SHORTLIST_MIN_SIMILARITY = 0.25  # ...if their cosine is at least this
+
+# --- Batched Adjudication (two-pass grouping) ---
+BATCH_LLM_ADJUDICATION = True  # Collect ambiguous articles and decide them in batches
+ADJUDICATION_BATCH_SIZE = 25  # Max articles per adjudication call
+ADJUDICATION_MAX_PROMPT_TOKENS = 30000  # Catalogue + articles per call
+
+# --- Batched New-Group Creation ---
+BATCH_NEW_GROUP_CREATION = True  # Cluster unmatched articles locally, then label clusters in batches
+NEW_GROUP_CLUSTER_THRESHOLD = 0.25  # Min mean pair similarity to join a cluster (pair composites seldom pass 0.5)
+CLUSTER_SIGNATURE_WEIGHT = 0.5  # Pair similarity = signature composite * w + text cosine * (1 - w)
+NEW_GROUP_BATCH_SIZE = 10  # Max clusters per labelling call
+NEW_GROUP_MAX_PROMPT_TOKENS = 30000
+NEW_GROUP_EXCERPT_CHARS = 1500  # Content excerpt per cluster (lead article)
+NEW_GROUP_MAX_TITLES = 5  # Member titles listed per cluster
+
+# --- Second-Chance Search (groups outside ACTIVE_GROUP_WINDOW_DAYS) ---
+SECOND_CHANCE_CANDIDATES = 10  # Older groups scored per unmatched article, closest by text first
+
 # Dynamic Threshold Rules (Example - customize as needed)
 DEFAULT_SIMILARITY_THRESHOLD = 0.40  # Base threshold if no rules match
 DYNAMIC_THRESHOLD_RULES = {
@@ -85,10 +130,17 @@ DYNAMIC_THRESHOLD_RULES = {
 # --- Core Database Functions ---
 
 
+def _with_bodies(df: pd.DataFrame, conn) -> pd.DataFrame:
+    """Add the decompressed `content` column, keeping the column order callers expect."""
+    bodies = get_article_bodies(df["article_id"], cursor=conn.cursor())
+    df.insert(2, "content", df["article_id"].map(bodies))
+    return df
+
+
 def get_ungrouped_articles_for_processing(db_path: str = "db/news.db") -> pd.DataFrame:
     """Gets ungrouped articles (ID, title, content, date) ordered by date."""
     query = """
-        SELECT a.id AS article_id, a.title, a.content, a.published_date
+        SELECT a.id AS article_id, a.title, a.published_date
         FROM articles a
         WHERE NOT EXISTS (
             SELECT 1 FROM two_phase_article_group_memberships tgm WHERE tgm.article_id = a.id
@@ -99,7 +151,7 @@ def get_ungrouped_articles_for_processing(db_path: str = "db/news.db") -> pd.Dat
     try:
         conn = get_connection(db_path)
         df = pd.read_sql_query(query, conn)
-        return df
+        return _with_bodies(df, conn)
     except Exception as e:
         logger.error(f"Error fetching ungrouped articles: {e}", exc_info=True)
         return pd.DataFrame()  # Return empty dataframe on error
@@ -295,6 +347,110 @@ def _get_group_details_for_prompt(
     return None
 
 
+def _add_to_existing_group(
+    article_id: int,
+    group_id: int,
+    existing_groups_with_signatures: List[Tuple[Dict, Dict]],
+    api_key: str,
+    db_path: str = "db/news.db",
+    text_index: Optional[GroupTextIndex] = None,
+    article_vec=None,
+) -> bool:
+    """Add an article to an existing group and update in-run state. Returns success."""
+    # Use a dedicated connection/cursor for the write operation if add_article_to_group doesn't manage it
+    conn_add = None
+    success = False
+    try:
+        conn_add = get_connection(db_path)
+        cursor_add = conn_add.cursor()
+        cursor_add.execute("BEGIN")
+        success = add_article_to_group(
+            article_id, group_id, db_path=db_path, cursor=cursor_add
+        )
+        if success:
+            # Evaluated later by the deferred consistency pass
+            mark_group_dirty(group_id, db_path=db_path, cursor=cursor_add)
+            conn_add.commit()
+        else:
+            conn_add.rollback()
+    except Exception as add_err:
+        logger.error(
+            f"Error during add_article_to_group transaction for article {article_id}: {add_err}"
+        )
+        if conn_add:
+            conn_add.rollback()
+        success = False
+    finally:
+        if conn_add:
+            conn_add.close()
+
+    if not success:
+        return False
+
+    # Update local list for subsequent checks in this run
+    for grp_d, grp_s in existing_groups_with_signatures:
+        if grp_d["group_id"] == group_id:
+            grp_d["article_ids"].append(article_id)
+            # Re-generating signature here is too costly for a long run.
+            break
+    if text_index is not None:
+        text_index.add_article(group_id, article_vec)
+    return True
+
+
+def _create_group_for_article(
+    article_id: int,
+    article_title: str,
+    article_content: str,
+    group_scores: List[Dict],
+    api_key: str,
+    db_path: str = "db/news.db",
+    text_index: Optional[GroupTextIndex] = None,
+    article_vec=None,
+) -> Optional[Dict]:
+    """Create a new group for an article, passing its closest groups as near-miss context."""
+    # Prepare context of near misses for the LLM
+    near_miss_groups = [
+        {
+            "label": g["group_label"],
+            "desc": g["description"],
+            "score": g["score"],
+        }
+        for g in group_scores[:2]  # Pass top 2 regardless of score
+    ]
+    new_group_info = create_new_group_for_single_article(
+        article_id,
+        article_title,
+        article_content,
+        api_key,
+        db_path,
+        closest_groups_info=near_miss_groups,  # Pass near-miss context
+    )
+    if new_group_info and text_index is not None and new_group_info.get("group_id"):
+        text_index.add_article(new_group_info["group_id"], article_vec)
+    return new_group_info
+
+
+def _unmatched_result(
+    article_id: int,
+    article_title: str,
+    article_content: str,
+    article_sig: Dict,
+    article_vec,
+    group_scores: List[Dict],
+) -> Dict:
+    """Result for an article that needs a new group, deferred to batched creation."""
+    return {
+        "status": "unmatched",
+        "article_id": article_id,
+        "article_title": article_title,
+        "article_content": article_content,
+        "article_sig": article_sig,
+        "article_vec": article_vec,
+        "group_scores": group_scores[:2],
+    }
+
+
 def process_single_ungrouped_article(
     article_id: int,
     article_title: str,
@@ -305,15 +461,28 @@ def process_single_ungrouped_article(
     threshold_rules: Dict,  # Use rules dictionary
     api_key: str,
     db_path: str = "db/news.db",
+    text_index: Optional[GroupTextIndex] = None,
+    defer_ambiguous: bool = False,
+    defer_create_new: bool = False,
+    article_sig: Optional[Dict] = None,
 ) -> Dict:
     """
     Processes a single article: matches to existing groups using dynamic thresholds
     and optional LLM checks, or creates a new one with context.
+    With defer_ambiguous, ambiguous articles are not sent to the LLM here; they are
+    returned with status "ambiguous" for adjudicate_ambiguous_articles.
+    With defer_create_new, no group is created here; the article is returned with
+    status "unmatched" for cluster_unmatched_articles / create_groups_for_clusters.
+    If text_index is given, TF-IDF cosine to each group feeds the similarity score
+    and the closest groups by text join the LLM check's candidate shortlist; the
+    index is updated with the article's final group.
+    article_sig may be passed in when it was generated ahead of time.
     Returns a result dictionary including new group info if created.
     """
     logger.debug(f"Processing article {article_id} ('{article_title[:50]}...')")
     try:
-        article_sig = generate_article_signature(article_id, db_path)
+        if article_sig is None:
+            article_sig = generate_article_signature(article_id, db_path)
         if not article_sig:
             logger.warning(
                 f"Could not generate signature for article {article_id}. Skipping."
@@ -324,6 +493,13 @@ def process_single_ungrouped_article(
                 "article_id": article_id,
             }
 
+        # Lexical similarity to every group in one vectorized pass
+        article_vec = None
+        text_scores = {}
+        if text_index is not None:
+            article_vec = get_article_vector(article_id, db_path=db_path)
+            text_scores = text_index.scores(article_vec)
+
         # Store similarity scores for all groups for context/LLM check
         group_scores = []
 
@@ -344,7 +520,12 @@ def process_single_ungrouped_article(
             # Calculate similarity (ASSUMES THIS FUNCTION IS UPDATED)
             # Pass api_key if calculate_... needs it for description similarity
             similarity_scores = calculate_article_to_group_similarity(
-                article_sig, group_sig, api_key=api_key
+                article_sig,
+                group_sig,
+                api_key=api_key,
+                text_similarity=text_scores.get(group_dict["group_id"])
+                if text_index is not None
+                else None,
             )
             composite_score = similarity_scores.get("composite_score", 0.0)
 
@@ -355,6 +536,7 @@ def process_single_ungrouped_article(
                     "description": group_dict.get("description", ""),
                     "score": composite_score,
                     "dynamic_threshold": current_dynamic_threshold,  # Store the threshold used for this comparison
+                    "text_similarity": text_scores.get(group_dict["group_id"], 0.0),
                 }
             )
 
@@ -410,9 +592,15 @@ def process_single_ungrouped_article(
                     for e in article_sig.get("primary_entities", [])[:10]
                     if e.get("entity_name")
                 ]
-                candidate_group_ids = [
-                    g["group_id"] for g in group_scores[:3]
-                ]  # Top 3 candidates
+                candidate_scores = group_scores[:3]  # Top 3 candidates
+                # Add the closest groups by text that the composite score ranked lower
+                if text_scores:
+                    for g in sorted(
+                        group_scores[3:], key=lambda x: x["text_similarity"], reverse=True
+                    )[:TEXT_SHORTLIST_EXTRA]:
+                        if g["text_similarity"] >= TEXT_SHORTLIST_MIN_SIMILARITY:
+                            candidate_scores.append(g)
+                candidate_group_ids = [g["group_id"] for g in candidate_scores]
                 candidate_groups_details = [
                     _get_group_details_for_prompt(gid, existing_groups_with_signatures)
                     for gid in candidate_group_ids
@@ -421,13 +609,30 @@ def process_single_ungrouped_article(
                     d for d in candidate_groups_details if d
                 ]  # Filter out None
 
+                if defer_ambiguous and candidate_groups_details:
+                    # Two-pass mode: decided later in a batched LLM call
+                    return {
+                        "status": "ambiguous",
+                        "article_id": article_id,
+                        "article_title": article_title,
+                        "article_content": article_content,
+                        "article_entities": article_entities,
+                        "article_sig": article_sig,
+                        "candidates": candidate_scores,
+                        "group_scores": group_scores[:2],
+                        "fallback_group_id": (
+                            best_match_group["group_id"] if is_match_above_threshold else None
+                        ),
+                        "article_vec": article_vec,
+                    }
+
                 if candidate_groups_details:
                     prompt = (
                         f"Article ID {article_id} (Title: '{article_title}', Entities: {article_entities}) needs grouping.\n"
                         f"It has the following similarity scores to existing groups (higher is better):\n"
                     )
-                    for cand_g in group_scores[:3]:
-                        prompt += f"- Group {cand_g['group_id']} '{cand_g['group_label']}': Score = {cand_g['score']:.3f} (Threshold for this group was {cand_g['dynamic_threshold']:.3f})\n"
+                    for cand_g in candidate_scores:
+                        prompt += f"- Group {cand_g['group_id']} '{cand_g['group_label']}': Score = {cand_g['score']:.3f} (Threshold for this group was {cand_g['dynamic_threshold']:.3f}, text similarity {cand_g['text_similarity']:.2f})\n"
 
                     prompt += "\nBased on the *meaning and topic* described below, which group is the best fit? Or should it be in a 'None' (new) group?\n\n"
                     for i, details in enumerate(candidate_groups_details):
@@ -502,73 +707,16 @@ def process_single_ungrouped_article(
             logger.info(
                 f"Decision: Add Article {article_id} to Group {final_group_id} (Score: {best_match_score:.3f}, Thr: {best_match_threshold_used:.3f}, LLM Checked: {llm_check_triggered})"
             )
-            # Use a dedicated connection/cursor for the write operation if add_article_to_group doesn't manage it
-            conn_add = None
-            cursor_add = None
-            success = False
-            try:
-                conn_add = get_connection(db_path)
-                cursor_add = conn_add.cursor()
-                cursor_add.execute("BEGIN")
-                success = add_article_to_group(
-                    article_id, final_group_id, db_path=db_path, cursor=cursor_add
-                )
-                if success:
-                    conn_add.commit()
-                else:
-                    conn_add.rollback()
-            except Exception as add_err:
-                logger.error(
-                    f"Error during add_article_to_group transaction for article {article_id}: {add_err}"
-                )
-                if conn_add:
-                    conn_add.rollback()
-                success = False
-            finally:
-                if conn_add:
-                    conn_add.close()
-
+            success = _add_to_existing_group(
+                article_id,
+                final_group_id,
+                existing_groups_with_signatures,
+                api_key,
+                db_path,
+                text_index=text_index,
+                article_vec=article_vec,
+            )
             if success:
-                # Update local list for subsequent checks in this run
-                for i, (grp_d, grp_s) in enumerate(existing_groups_with_signatures):
-                    if grp_d["group_id"] == final_group_id:
-                        existing_groups_with_signatures[i][0]["article_ids"].append(
-                            article_id
-                        )
-                        # Re-generating signature here is too costly for a long run.
-                        break
-
-                # --- Optional: Post-Add Consistency Check ---
-                try:
-                    updated_group_data_dict = next(
-                        (
-                            g[0]
-                            for g in existing_groups_with_signatures
-                            if g[0]["group_id"] == final_group_id
-                        ),
-                        None,
-                    )
-                    if (
-                        updated_group_data_dict
-                        and len(updated_group_data_dict.get("article_ids", [])) > 1
-                    ):
-                        evaluation = evaluate_group_consistency(
-                            updated_group_data_dict, api_key, db_path
-                        )
-                        consistency_score = evaluation.get("consistency_score", 0.5)
-                        logger.info(
-                            f"Consistency check for Group {final_group_id} after adding Article {article_id}: Score={consistency_score:.2f}"
-                        )
-                        # TODO: Potentially store this score or act on it if needed.
-                except NameError:  # evaluate_group_consistency not imported
-                    pass  # Silently skip if checker not available
-                except Exception as cons_err:
-                    logger.error(
-                        f"Error during post-add consistency check: {cons_err}",
-                        exc_info=False,
-                    )
-                # --- End Consistency Check ---
-
                 return {
                     "status": "added_to_existing",
                     "article_id": article_id,
@@ -587,25 +735,19 @@ def process_single_ungrouped_article(
             logger.info(
                 f"Decision: Create new group for Article {article_id} (Best score: {best_match_score:.3f} vs Thr: {best_match_threshold_used:.3f}, LLM Checked: {llm_check_triggered})"
             )
-            # Prepare context of near misses for the LLM
-            near_miss_groups = []
-            if group_scores:
-                near_miss_groups = [
-                    {
-                        "label": g["group_label"],
-                        "desc": g["description"],
-                        "score": g["score"],
-                    }
-                    for g in group_scores[:2]  # Pass top 2 regardless of score
-                ]
-
-            new_group_info = create_new_group_for_single_article(
+            if defer_create_new:
+                return _unmatched_result(
+                    article_id, article_title, article_content, article_sig, article_vec, group_scores
+                )
+            new_group_info = _create_group_for_article(
                 article_id,
                 article_title,
                 article_content,
+                group_scores,
                 api_key,
                 db_path,
-                closest_groups_info=near_miss_groups,  # Pass near-miss context
+                text_index=text_index,
+                article_vec=article_vec,
             )
             if new_group_info:
                 return {
@@ -635,33 +777,407 @@ def process_single_ungrouped_article(
         return {"status": "error", "message": str(e), "article_id": article_id}
 
 
-def run_grouping_update(
-    threshold_rules: Dict = DYNAMIC_THRESHOLD_RULES,  # Use rules dict
-    api_key: Optional[str] = None,
+def _build_adjudication_prompt(batch: List[Dict], catalogue: Dict[int, Dict]) -> str:
+    """Prompt with each candidate group described once, followed by the articles."""
+    prompt = (
+        "Assign each article below to the existing group that best fits its *meaning and topic*, "
+        "or to null if none of its candidate groups is a good semantic fit.\n\n"
+        "CANDIDATE GROUPS:\n"
+    )
+    for gid, details in catalogue.items():
+        prompt += f"Group {gid}:\n  Label: {details['label']}\n  Description: {(details['description'] or '')[:500]}\n  Key Entities: {details['key_entities']}\n\n"
+    prompt += "ARTICLES:\n"
+    for item in batch:
+        candidates = ", ".join(
+            f"{c['group_id']} (score {c['score']:.2f}, text {c['text_similarity']:.2f})"
+            for c in item["candidates"]
+        )
+        prompt += (
+            f"Article {item['article_id']}: '{item['article_title']}'\n"
+            f"  Entities: {item['article_entities']}\n"
+            f"  Candidate groups: {candidates}\n\n"
+        )
+    prompt += (
+        "Only choose among each article's own candidate groups.\n"
+        'Return only JSON: { "decisions": { "<article_id>": <group_id or null>, ... } }'
+    )
+    return prompt
+
+
+def _pack_adjudication_batches(
+    pending: List[Dict], existing_groups_with_signatures: List[Tuple[Dict, Dict]]
+) -> List[Tuple[List[Dict], Dict[int, Dict]]]:
+    """
+    Split ambiguous articles into batches bounded by article count and prompt size.
+    Articles are ordered by their top candidate so batches share catalogue entries.
+    """
+    details_cache = {}
+
+    def details_for(gid):
+        if gid not in details_cache:
+            details_cache[gid] = _get_group_details_for_prompt(gid, existing_groups_with_signatures)
+        return details_cache[gid]
+
+    batches = []
+    batch, catalogue = [], {}
+    for item in sorted(pending, key=lambda x: x["candidates"][0]["group_id"]):
+        new_groups = {
+            c["group_id"]: details_for(c["group_id"])
+            for c in item["candidates"]
+            if c["group_id"] not in catalogue and details_for(c["group_id"])
+        }
+        if batch:
+            trial = _build_adjudication_prompt(batch + [item], {**catalogue, **new_groups})
+            if (
+                len(batch) >= ADJUDICATION_BATCH_SIZE
+                or approximate_tokens(trial) > ADJUDICATION_MAX_PROMPT_TOKENS
+            ):
+                batches.append((batch, catalogue))
+                batch, catalogue = [], {}
+                new_groups = {
+                    c["group_id"]: details_for(c["group_id"])
+                    for c in item["candidates"]
+                    if details_for(c["group_id"])
+                }
+        batch.append(item)
+        catalogue.update(new_groups)
+    if batch:
+        batches.append((batch, catalogue))
+    return batches
+
+
+def adjudicate_ambiguous_articles(
+    pending: List[Dict],
+    existing_groups_with_signatures: List[Tuple[Dict, Dict]],
+    api_key: str,
     db_path: str = "db/news.db",
-    batch_delay: float = 0.2,
-):
+    text_index: Optional[GroupTextIndex] = None,
+    defer_create_new: bool = False,
+) -> List[Dict]:
     """
-    Main function: processes ungrouped articles, matching or creating groups,
-    using dynamic thresholds and optional LLM checks.
+    Second pass of two-pass grouping: decide all deferred ambiguous articles with
+    one LLM call per packed batch. Returns result dicts shaped like those of
+    process_single_ungrouped_article. Articles the LLM leaves undecided fall back
+    to the threshold decision, as in the single-article check.
     """
-    logger.info("--- Starting Grouping Update Run ---")
-    if api_key is None:
-        api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        logger.error(
-            "API Key not found. LLM checks and new group creation will fail. Aborting grouping."
+    results = []
+    batches = _pack_adjudication_batches(pending, existing_groups_with_signatures)
+    logger.info(
+        f"Adjudicating {len(pending)} ambiguous articles in {len(batches)} LLM calls."
+    )
+
+    for batch_idx, (batch, catalogue) in enumerate(batches, start=1):
+        messages = [{"role": "user", "content": _build_adjudication_prompt(batch, catalogue)}]
+        response = call_gpt_api(messages, api_key, model=LLM_CHECK_MODEL)
+        decisions = {}
+        if response:
+            cleaned = response.strip().strip("```json").strip("```").strip()
+            try:
+                decisions = json.loads(cleaned).get("decisions", {}) or {}
+            except (json.JSONDecodeError, AttributeError) as e:
+                logger.error(f"Error parsing adjudication JSON for batch {batch_idx}: {e}\n{cleaned}")
+        else:
+            logger.error(f"LLM adjudication failed for batch {batch_idx}.")
+
+        for item in batch:
+            article_id = item["article_id"]
+            candidate_ids = [c["group_id"] for c in item["candidates"]]
+            key = str(article_id)
+            group_id = None
+            if key in decisions:
+                raw = decisions[key]
+                if raw is None or (isinstance(raw, str) and raw.strip().lower() in ("null", "none")):
+                    group_id = "None"
+                else:
+                    try:
+                        group_id = int(raw)
+                    except (TypeError, ValueError):
+                        group_id = None
+                    if group_id is not None and group_id not in candidate_ids:
+                        logger.warning(
+                            f"LLM returned group ID {group_id} for article {article_id}, not in candidates {candidate_ids}. Ignoring."
+                        )
+                        group_id = None
+            if group_id is None:
+                # LLM failed or unclear response: fall back to threshold logic
+                group_id = item["fallback_group_id"] or "None"
+
+            if group_id != "None":
+                logger.info(f"Adjudication: Add Article {article_id} to Group {group_id}.")
+                if _add_to_existing_group(
+                    article_id,
+                    group_id,
+                    existing_groups_with_signatures,
+                    api_key,
+                    db_path,
+                    text_index=text_index,
+                    article_vec=item["article_vec"],
+                ):
+                    results.append(
+                        {"status": "added_to_existing", "article_id": article_id, "group_id": group_id}
+                    )
+                else:
+                    results.append(
+                        {
+                            "status": "error",
+                            "message": f"Failed to add article {article_id} to group {group_id}",
+                            "article_id": article_id,
+                        }
+                    )
+                continue
+
+            logger.info(f"Adjudication: Create new group for Article {article_id}.")
+            if defer_create_new:
+                results.append(
+                    _unmatched_result(
+                        article_id,
+                        item["article_title"],
+                        item["article_content"],
+                        item["article_sig"],
+                        item["article_vec"],
+                        item["group_scores"],
+                    )
+                )
+                continue
+            new_group_info = _create_group_for_article(
+                article_id,
+                item["article_title"],
+                item["article_content"],
+                item["group_scores"],
+                api_key,
+                db_path,
+                text_index=text_index,
+                article_vec=item["article_vec"],
+            )
+            if new_group_info:
+                results.append(
+                    {"status": "created_new", "article_id": article_id, "new_group_info": new_group_info}
+                )
+            else:
+                results.append(
+                    {
+                        "status": "error",
+                        "message": f"Failed to create new group for article {article_id}",
+                        "article_id": article_id,
+                    }
+                )
+    return results
+
+
+def cluster_unmatched_articles(unmatched: List[Dict], idf=None) -> List[List[Dict]]:
+    """
+    Cluster articles that matched no existing group among themselves, in the
+    order given. Pair similarity blends the signature composite with TF-IDF
+    cosine (signature only when either article has no text vector); an article
+    joins the cluster with the highest mean pair similarity if it reaches
+    NEW_GROUP_CLUSTER_THRESHOLD, otherwise it starts a new cluster.
+    """
+    # Reuse the centroid index with one "group" per article for pairwise cosine
+    text_index = None
+    if idf is not None:
+        text_index = GroupTextIndex(idf)
+        for pos, item in enumerate(unmatched):
+            text_index.add_article(pos, item.get("article_vec"))
+
+    clusters: List[List[int]] = []
+    for pos, item in enumerate(unmatched):
+        text_row = {}
+        if text_index is not None and item.get("article_vec") is not None:
+            text_row = text_index.scores(item["article_vec"])
+
+        def pair_score(other: int) -> float:
+            sig_score = calculate_signature_similarity(
+                item["article_sig"], unmatched[other]["article_sig"]
+            ).get("composite_score", 0.0)
+            if pos in text_row and other in text_row:
+                return (
+                    CLUSTER_SIGNATURE_WEIGHT * sig_score
+                    + (1 - CLUSTER_SIGNATURE_WEIGHT) * text_row[other]
+                )
+            return sig_score
+
+        best_cluster, best_score = None, NEW_GROUP_CLUSTER_THRESHOLD
+        for cluster in clusters:
+            mean_score = sum(pair_score(other) for other in cluster) / len(cluster)
+            if mean_score >= best_score:
+                best_cluster, best_score = cluster, mean_score
+        if best_cluster is not None:
+            best_cluster.append(pos)
+        else:
+            clusters.append([pos])
+
+    return [[unmatched[pos] for pos in cluster] for cluster in clusters]
+
+
+def _build_new_groups_prompt(batch: List[List[Dict]]) -> str:
+    """Prompt asking for category, label and description for each numbered cluster."""
+    prompt = (
+        "Each numbered cluster below contains one or more articles that did not match any existing group. "
+        "For each cluster, determine the most appropriate category, a concise group label, and a brief "
+        "description (1-2 sentences) covering all of its articles.\n\n"
+        "Choose one category from this list:\n"
+        + "\n".join(f"- {cat}" for cat in PREDEFINED_CATEGORIES)
+        + "\n\nIf none fit well, use 'Other'.\n\n"
+    )
+    for num, cluster in enumerate(batch, start=1):
+        lead = cluster[0]
+        prompt += (
+            f"CLUSTER {num} ({len(cluster)} article{'s' if len(cluster) > 1 else ''}):\n"
+            f"Lead Article Title: {lead['article_title']}\n"
+            f"Lead Article Content (excerpt):\n{(lead['article_content'] or '')[:NEW_GROUP_EXCERPT_CHARS]}...\n"
         )
-        return
+        others = cluster[1:NEW_GROUP_MAX_TITLES]
+        if others:
+            prompt += "Other Article Titles:\n" + "".join(f"- {m['article_title']}\n" for m in others)
+        if lead["group_scores"]:
+            prompt += "Closest existing groups (not matched):\n" + "".join(
+                f"- '{g['group_label']}' (Score: {g['score']:.2f}): {(g['description'] or '')[:100]}...\n"
+                for g in lead["group_scores"]
+            )
+        prompt += "\n"
+    prompt += (
+        "If a cluster seems very related to one of its closest groups, still define a new group, "
+        "using a label that reflects the specific nuance these articles add.\n\n"
+        "Return ONLY JSON in this exact format:\n"
+        '{ "groups": { "<cluster number>": { "main_topic": "Chosen Category", '
+        '"group_label": "Concise Group Label", "description": "Brief description." }, ... } }'
+    )
+    return prompt
+
+
+def _pack_new_group_batches(clusters: List[List[Dict]]) -> List[List[List[Dict]]]:
+    """Split clusters into labelling batches bounded by count and prompt size."""
+    batches, batch = [], []
+    for cluster in clusters:
+        if batch and (
+            len(batch) >= NEW_GROUP_BATCH_SIZE
+            or approximate_tokens(_build_new_groups_prompt(batch + [cluster]))
+            > NEW_GROUP_MAX_PROMPT_TOKENS
+        ):
+            batches.append(batch)
+            batch = []
+        batch.append(cluster)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def create_groups_for_clusters(
+    clusters: List[List[Dict]],
+    api_key: str,
+    db_path: str = "db/news.db",
+    text_index: Optional[GroupTextIndex] = None,
+) -> List[Dict]:
+    """
+    Create one group per cluster of unmatched articles, with one LLM call per
+    packed batch of clusters for category, label and description. Each cluster
+    is written in its own transaction. Returns one result per cluster with the
+    new group's info and a signature aggregated from the members' existing
+    article signatures.
+    """
+    results = []
+    batches = _pack_new_group_batches(clusters)
+    logger.info(
+        f"Creating {len(clusters)} new groups for {sum(len(c) for c in clusters)} articles in {len(batches)} LLM calls."
+    )
 
-    logger.info("Fetching existing groups...")
-    existing_groups = get_existing_groups_enhanced(db_path=db_path)
-    logger.info(f"Found {len(existing_groups)} existing groups initially.")
+    for batch_idx, batch in enumerate(batches, start=1):
+        messages = [
+            {
+                "role": "system",
+                "content": "You are an expert news analyst. Define a new group for each cluster of related articles, considering the context of near-miss groups if provided. Respond only in JSON.",
+            },
+            {"role": "user", "content": _build_new_groups_prompt(batch)},
+        ]
+        response = call_gpt_api(messages, api_key, model=LLM_CHECK_MODEL)
+        groups_info = {}
+        if response:
+            cleaned = response.strip().strip("```json").strip("```").strip()
+            try:
+                groups_info = json.loads(cleaned).get("groups", {}) or {}
+            except (json.JSONDecodeError, AttributeError) as e:
+                logger.error(f"Failed to parse new-group JSON for batch {batch_idx}: {e}\nResponse: {cleaned}")
+        else:
+            logger.error(f"LLM call failed for new-group batch {batch_idx}.")
+
+        for num, cluster in enumerate(batch, start=1):
+            lead = cluster[0]
+            article_ids = [m["article_id"] for m in cluster]
+            group_info = groups_info.get(str(num))
+            if not isinstance(group_info, dict):
+                group_info = {}
+            main_topic = group_info.get("main_topic", "Other")
+            group_label = group_info.get("group_label") or f"Group for Article {lead['article_id']} (Auto)"
+            description = group_info.get("description") or lead["article_title"]
+            if main_topic not in PREDEFINED_CATEGORIES:
+                main_topic = "Other"
+
+            conn = get_connection(db_path)
+            cursor = conn.cursor()
+            try:
+                cursor.execute("BEGIN")
+                cursor.execute(
+                    """
+                    INSERT INTO two_phase_article_groups (main_topic, sub_topic, group_label, description, consistency_score)
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    (main_topic, "", group_label, description, 0.7),  # Initial score
+                )
+                new_group_id = cursor.lastrowid
+                for article_id in article_ids:
+                    if not add_article_to_group(article_id, new_group_id, db_path=db_path, cursor=cursor):
+                        raise sqlite3.Error(f"failed to add article {article_id} to group {new_group_id}")
+                if len(article_ids) > 1:
+                    mark_group_dirty(new_group_id, db_path=db_path, cursor=cursor)
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Database error creating group for cluster led by article {lead['article_id']}: {e}")
+                conn.rollback()
+                results.extend(
+                    {
+                        "status": "error",
+                        "message": f"Failed to create new group for article {article_id}",
+                        "article_id": article_id,
+                    }
+                    for article_id in article_ids
+                )
+                continue
+            finally:
+                conn.close()
 
-    logger.info(f"Generating initial signatures for {len(existing_groups)} groups...")
-    # This list will be MODIFIED during the run: List[Tuple[Dict, Dict]] -> List[[group_dict, group_sig]]
-    existing_groups_with_signatures = []
-    for group in existing_groups:
+            logger.info(
+                f"Created new group (ID: {new_group_id}, Label: '{group_label}') for {len(article_ids)} articles {article_ids}."
+            )
+            new_group_info = {
+                "group_id": new_group_id,
+                "main_topic": main_topic,
+                "sub_topic": "",
+                "group_label": group_label,
+                "description": description,
+                "consistency_score": 0.7,
+                "article_ids": article_ids,
+            }
+            if text_index is not None:
+                for member in cluster:
+                    text_index.add_article(new_group_id, member["article_vec"])
+            results.append(
+                {
+                    "status": "created_new",
+                    "article_id": lead["article_id"],
+                    "article_ids": article_ids,
+                    "new_group_info": new_group_info,
+                    "group_signature": aggregate_group_signature(
+                        new_group_info, [m["article_sig"] for m in cluster], db_path
+                    ),
+                }
+            )
+    return results
+
+
+def _sign_groups(groups: List[Dict], db_path: str) -> List[List]:
+    """Pair each group that has members with its signature: [[group_dict, group_sig], ...]."""
+    groups_with_signatures = []
+    for group in groups:
         # Ensure group has articles before generating signature
         if group.get("article_ids"):
             try:
@@ -669,7 +1185,7 @@ def run_grouping_update(
                     group, db_path
                 )  # Assumes updated version
                 if group_sig:
-                    existing_groups_with_signatures.append(
+                    groups_with_signatures.append(
                         [group, group_sig]
                     )  # Use list for mutability
                 else:
@@ -681,45 +1197,211 @@ def run_grouping_update(
                     f"Error generating signature for group {group.get('group_id')}: {sig_err}",
                     exc_info=False,
                 )
+    return groups_with_signatures
+
+
+def load_grouping_state(db_path: str = "db/news.db") -> Dict[str, Any]:
+    """
+    Load what grouping compares articles against: the groups active within
+    ACTIVE_GROUP_WINDOW_DAYS with their signatures, and the text similarity
+    index (after vectorizing new articles and refreshing stale centroids). Older
+    groups are only consulted by second_chance_match. The returned dict is
+    updated in place as batches create groups, so a long-running caller can
+    reuse it across batches.
+    """
+    # Local text vectors: embed new articles and bring group centroids up to date
+    text_index = None
+    if ENABLE_TEXT_SIMILARITY:
+        try:
+            vectorize_new_articles(db_path=db_path)
+            refresh_group_centroids(db_path=db_path)
+            text_index = GroupTextIndex.load(db_path=db_path)
+            logger.info(f"Loaded text similarity index for {len(text_index)} groups.")
+        except Exception as e:
+            logger.error(f"Text similarity index unavailable, continuing without it: {e}")
+            text_index = None
+
+    active_since = None
+    if ACTIVE_GROUP_WINDOW_DAYS > 0:
+        active_since = (
+            datetime.now(pytz.utc) - timedelta(days=ACTIVE_GROUP_WINDOW_DAYS)
+        ).strftime(SQLITE_DATETIME_FORMAT)
+        logger.info(f"Fetching groups active since {active_since}...")
+    else:
+        logger.info("Fetching existing groups...")
+    existing_groups = get_existing_groups_enhanced(db_path=db_path, active_since=active_since)
+    logger.info(f"Found {len(existing_groups)} existing groups initially.")
+
+    logger.info(f"Generating initial signatures for {len(existing_groups)} groups...")
+    # This list will be MODIFIED during the run: List[Tuple[Dict, Dict]] -> List[[group_dict, group_sig]]
+    existing_groups_with_signatures = _sign_groups(existing_groups, db_path)
     logger.info(
         f"Finished generating initial signatures for {len(existing_groups_with_signatures)} groups."
     )
+    return {
+        "groups": existing_groups_with_signatures,
+        "text_index": text_index,
+        "active_since": active_since,
+        "older_groups": None,  # {group_id: group_dict}, loaded by second_chance_match
+        "older_signatures": {},  # {group_id: group_sig}, signed on demand
+    }
 
-    logger.info("Fetching ungrouped articles...")
-    ungrouped_df = get_ungrouped_articles_for_processing(db_path)
-    if ungrouped_df.empty:
-        logger.info("No ungrouped articles found to process.")
-        logger.info("--- Grouping Update Run Finished ---")
-        return
-    logger.info(f"Found {len(ungrouped_df)} ungrouped articles to process.")
-
-    results_summary = {"added_to_existing": 0, "created_new": 0, "errors": 0}
-    total_articles = len(ungrouped_df)
-
-    for index, row in ungrouped_df.iterrows():
-        article_id = row["article_id"]
-        article_title = row["title"]
-        article_content = row["content"]
 
-        logger.info(
-            f"Processing article {index + 1}/{total_articles} (ID: {article_id})"
-        )
-        if not article_content:
-            logger.warning(f"Article {article_id} has no content. Skipping.")
-            results_summary["errors"] += 1
+def _second_chance_candidates(item: Dict, state: Dict[str, Any], db_path: str) -> List[List]:
+    """
+    The older groups closest to an unmatched article, signed on first use.
+    Without a text vector to rank by, the most recently active ones.
+    """
+    older = state["older_groups"]
+    text_index = state.get("text_index")
+    if text_index is not None and item.get("article_vec") is not None:
+        text_scores = text_index.scores(item["article_vec"])
+        ranked = sorted(
+            (gid for gid in older if gid in text_scores),
+            key=lambda gid: text_scores[gid],
+            reverse=True,
+        )[:SECOND_CHANCE_CANDIDATES]
+    else:
+        ranked = list(older)[:SECOND_CHANCE_CANDIDATES]  # Loaded newest first
+    signatures = state["older_signatures"]
+    unsigned = [older[gid] for gid in ranked if gid not in signatures]
+    for group, group_sig in _sign_groups(unsigned, db_path):
+        signatures[group["group_id"]] = group_sig
+    return [[older[gid], signatures[gid]] for gid in ranked if gid in signatures]
+
+
+def second_chance_match(
+    unmatched: List[Dict],
+    state: Dict[str, Any],
+    threshold_rules: Dict,
+    api_key: str,
+    db_path: str = "db/news.db",
+) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Compare articles that matched no active group with groups outside the active
+    window: the closest SECOND_CHANCE_CANDIDATES by text, or the most recently
+    active ones when the article has no text vector. Only a score above the
+    group's threshold counts: ambiguous matches are not sent to the LLM. A group
+    that takes an article becomes active again and joins state["groups"].
+    Returns (results for matched articles, articles still unmatched).
+    """
+    if state.get("older_groups") is None:
+        groups = get_existing_groups_enhanced(db_path=db_path, active_before=state["active_since"])
+        state["older_groups"] = {g["group_id"]: g for g in groups if g.get("article_ids")}
+        logger.info(f"Loaded {len(state['older_groups'])} older groups for second-chance matching.")
+
+    matched, still_unmatched = [], []
+    for item in unmatched:
+        candidates = _second_chance_candidates(item, state, db_path) if state["older_groups"] else []
+        if not candidates:
+            still_unmatched.append(item)
             continue
-
-        # Pass the CURRENT list of signatures and threshold rules
         result = process_single_ungrouped_article(
-            article_id,
-            article_title,
-            article_content,
-            existing_groups_with_signatures,  # This list can now grow
-            threshold_rules,  # Pass rules dict
+            item["article_id"],
+            item["article_title"],
+            item["article_content"],
+            candidates,
+            threshold_rules,
             api_key,
             db_path,
+            text_index=state.get("text_index"),
+            defer_ambiguous=True,
+            defer_create_new=True,
+            article_sig=item["article_sig"],
+        )
+        group_id = None
+        if result["status"] == "added_to_existing":
+            group_id = result["group_id"]
+        elif result["status"] == "ambiguous" and result["fallback_group_id"]:
+            group_id = result["fallback_group_id"]
+            if _add_to_existing_group(
+                item["article_id"],
+                group_id,
+                candidates,
+                api_key,
+                db_path,
+                text_index=state.get("text_index"),
+                article_vec=result["article_vec"],
+            ):
+                result = {"status": "added_to_existing", "article_id": item["article_id"], "group_id": group_id}
+            else:
+                group_id = None
+        if group_id is None:
+            still_unmatched.append(item)
+            continue
+        logger.info(f"Second chance: Article {item['article_id']} joins older Group {group_id}.")
+        state["groups"].append([state["older_groups"].pop(group_id), state["older_signatures"].pop(group_id)])
+        matched.append(result)
+    return matched, still_unmatched
+
+
+def get_ungrouped_articles_by_id(article_ids, db_path: str = "db/news.db") -> pd.DataFrame:
+    """Like get_ungrouped_articles_for_processing, restricted to the given article IDs."""
+    article_ids = [int(a) for a in article_ids]
+    if not article_ids:
+        return pd.DataFrame(columns=["article_id", "title", "content", "published_date"])
+    placeholders = ",".join("?" for _ in article_ids)
+    query = f"""
+        SELECT a.id AS article_id, a.title, a.published_date
+        FROM articles a
+        WHERE a.id IN ({placeholders})
+          AND NOT EXISTS (
+            SELECT 1 FROM two_phase_article_group_memberships tgm WHERE tgm.article_id = a.id
+        )
+        ORDER BY a.published_date DESC
+    """
+    conn = None
+    try:
+        conn = get_connection(db_path)
+        return _with_bodies(pd.read_sql_query(query, conn, params=article_ids), conn)
+    except Exception as e:
+        logger.error(f"Error fetching ungrouped articles by id: {e}", exc_info=True)
+        return pd.DataFrame()
+    finally:
+        if conn:
+            conn.close()
+
+
+def group_article_batch(
+    ungrouped_df: pd.DataFrame,
+    state: Dict[str, Any],
+    threshold_rules: Dict = DYNAMIC_THRESHOLD_RULES,
+    api_key: Optional[str] = None,
+    db_path: str = "db/news.db",
+    batch_delay: float = 0.0,
+    article_signatures: Optional[Dict[int, Dict]] = None,
+) -> Dict[str, int]:
+    """
+    Group the articles in `ungrouped_df` against `state` (from load_grouping_state):
+    per-article matching, then batched adjudication of ambiguous articles, then
+    clustering of unmatched ones into new groups. New groups are appended to
+    state["groups"]. `article_signatures` may hold signatures computed ahead of
+    time ({article_id: signature}). Returns the per-batch summary counts.
+    """
+    existing_groups_with_signatures = state["groups"]
+    text_index = state.get("text_index")
+    article_signatures = article_signatures or {}
+
+    # Duplicates whose canonical is grouped in this batch are assigned afterwards
+    duplicate_map = get_duplicate_canonical_map(db_path=db_path)
+    pending_ids = set(ungrouped_df["article_id"])
+    deferred = ungrouped_df["article_id"].map(
+        lambda art_id: duplicate_map.get(art_id) in pending_ids
+    )
+    if deferred.any():
+        logger.info(
+            f"Deferring {int(deferred.sum())} near-duplicates until their canonical articles are grouped."
         )
+        ungrouped_df = ungrouped_df[~deferred].reset_index(drop=True)
+    logger.info(f"Found {len(ungrouped_df)} ungrouped articles to process.")
 
+    results_summary = {"added_to_existing": 0, "created_new": 0, "errors": 0}
+    total_articles = len(ungrouped_df)
+    results_summary["processed"] = total_articles
+    ambiguous_pending = []  # Deferred to batched adjudication in two-pass mode
+    unmatched_pending = []  # Deferred to clustering and batched group creation
+
+    def record_result(result):
         # Process results and update local signature list if new group created
         if result["status"] == "added_to_existing":
             results_summary["added_to_existing"] += 1
@@ -731,7 +1413,10 @@ def run_grouping_update(
                     f"Generating signature for newly created group {new_group_info.get('group_id')}..."
                 )
                 try:
-                    new_group_sig = generate_group_signature(new_group_info, db_path)
+                    # Clustered groups arrive with a signature built from their members
+                    new_group_sig = result.get("group_signature") or generate_group_signature(
+                        new_group_info, db_path
+                    )
                     if new_group_sig:
                         existing_groups_with_signatures.append(
                             [new_group_info, new_group_sig]
@@ -756,15 +1441,151 @@ def run_grouping_update(
         elif result["status"] == "error":
             results_summary["errors"] += 1
             logger.error(
-                f"Error processing article {article_id}: {result.get('message')}"
+                f"Error processing article {result.get('article_id')}: {result.get('message')}"
             )
 
+    for index, row in ungrouped_df.iterrows():
+        article_id = row["article_id"]
+        article_title = row["title"]
+        article_content = row["content"]
+
+        logger.info(
+            f"Processing article {index + 1}/{total_articles} (ID: {article_id})"
+        )
+        if not article_content:
+            logger.warning(f"Article {article_id} has no content. Skipping.")
+            results_summary["errors"] += 1
+            continue
+
+        # Pass the CURRENT list of signatures and threshold rules
+        result = process_single_ungrouped_article(
+            article_id,
+            article_title,
+            article_content,
+            existing_groups_with_signatures,  # This list can now grow
+            threshold_rules,  # Pass rules dict
+            api_key,
+            db_path,
+            text_index=text_index,
+            defer_ambiguous=BATCH_LLM_ADJUDICATION,
+            defer_create_new=BATCH_NEW_GROUP_CREATION,
+            article_sig=article_signatures.get(int(article_id)),
+        )
+
+        if result["status"] == "ambiguous":
+            ambiguous_pending.append(result)
+            continue
+        if result["status"] == "unmatched":
+            unmatched_pending.append(result)
+            continue
+        record_result(result)
+
         if batch_delay > 0:
             time.sleep(batch_delay)
 
+    # Pass two: decide all ambiguous articles with batched LLM calls
+    results_summary["adjudicated"] = len(ambiguous_pending)
+    if ambiguous_pending:
+        for result in adjudicate_ambiguous_articles(
+            ambiguous_pending,
+            existing_groups_with_signatures,
+            api_key,
+            db_path,
+            text_index=text_index,
+            defer_create_new=BATCH_NEW_GROUP_CREATION,
+        ):
+            if result["status"] == "unmatched":
+                unmatched_pending.append(result)
+            else:
+                record_result(result)
+
+    # Articles no active group took get one look at older groups
+    if unmatched_pending and SECOND_CHANCE_GROUP_SEARCH and state.get("active_since"):
+        matched, unmatched_pending = second_chance_match(
+            unmatched_pending, state, threshold_rules, api_key, db_path
+        )
+        results_summary["second_chance"] = len(matched)
+        for result in matched:
+            record_result(result)
+
+    # Pass three: cluster unmatched articles and create their groups in batches
+    results_summary["new_group_articles"] = len(unmatched_pending)
+    if unmatched_pending:
+        clusters = cluster_unmatched_articles(
+            unmatched_pending, idf=text_index.idf if text_index is not None else None
+        )
+        for result in create_groups_for_clusters(
+            clusters, api_key, db_path, text_index=text_index
+        ):
+            record_result(result)
+
+    results_summary["duplicates_assigned"] = assign_duplicates_to_canonical_groups(
+        db_path=db_path
+    )
+    return results_summary
+
+
+def run_grouping_update(
+    threshold_rules: Dict = DYNAMIC_THRESHOLD_RULES,  # Use rules dict
+    api_key: Optional[str] = None,
+    db_path: str = "db/news.db",
+    batch_delay: float = 0.2,
+):
+    """
+    Main function: processes ungrouped articles, matching or creating groups,
+    using dynamic thresholds and optional LLM checks.
+    """
+    logger.info("--- Starting Grouping Update Run ---")
+    if api_key is None:
+        api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        logger.error(
+            "API Key not found. LLM checks and new group creation will fail. Aborting grouping."
+        )
+        return
+
+    state = load_grouping_state(db_path=db_path)
+
+    # Near-duplicates of already-grouped articles join that group directly
+    assign_duplicates_to_canonical_groups(db_path=db_path)
+
+    logger.info("Fetching ungrouped articles...")
+    ungrouped_df = get_ungrouped_articles_for_processing(db_path)
+    if ungrouped_df.empty:
+        logger.info("No ungrouped articles found to process.")
+        logger.info("--- Grouping Update Run Finished ---")
+        return
+
+    results_summary = group_article_batch(
+        ungrouped_df, state, threshold_rules, api_key, db_path, batch_delay=batch_delay
+    )
+    finish_grouping_run(state, api_key, db_path, results_summary)
+
+
+def finish_grouping_run(state: Dict[str, Any], api_key: str, db_path: str, results_summary: Dict):
+    """Persist centroids, run the deferred consistency pass and log the run summary."""
+    if state.get("text_index") is not None:
+        refresh_group_centroids(db_path=db_path)  # Persist centroids for changed groups
+
+    # One batched consistency evaluation for the groups changed in this run
+    try:
+        results_summary["consistency_evaluated"] = run_consistency_pass(api_key, db_path=db_path)
+    except Exception as cons_err:
+        logger.error(f"Error during deferred consistency pass: {cons_err}", exc_info=False)
+        results_summary["consistency_evaluated"] = 0
+
     logger.info("--- Grouping Update Summary ---")
-    logger.info(f"Total articles processed: {total_articles}")
-    logger.info(f"Added to existing groups: {results_summary['added_to_existing']}")
-    logger.info(f"Created new groups: {results_summary['created_new']}")
-    logger.info(f"Errors encountered: {results_summary['errors']}")
+    logger.info(f"Total articles processed: {results_summary.get('processed', 0)}")
+    logger.info(f"Added to existing groups: {results_summary.get('added_to_existing', 0)}")
+    logger.info(f"Created new groups: {results_summary.get('created_new', 0)}")
+    logger.info(f"Ambiguous articles adjudicated in batches: {results_summary.get('adjudicated', 0)}")
+    logger.info(f"Matched to older groups on second chance: {results_summary.get('second_chance', 0)}")
+    logger.info(
+        f"Unmatched articles clustered into new groups: {results_summary.get('new_group_articles', 0)}"
+    )
+    logger.info(
+        f"Near-duplicates assigned to canonical groups: {results_summary.get('duplicates_assigned', 0)}"
+    )
+    logger.info(f"Groups evaluated for consistency: {results_summary['consistency_evaluated']}")
+    logger.info(f"Errors encountered: {results_summary.get('errors', 0)}")
     logger.info("--- Grouping Update Run Finished ---")
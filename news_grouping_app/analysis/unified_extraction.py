@@ -0,0 +1,275 @@
+# analysis/unified_extraction.py
+
+import sqlite3
+import json
+import re
+import time
+import logging
+
+from news_grouping_app.db.database import (
+    get_connection,
+    insert_entity,
+    link_entity_to_article,
+    link_company_to_article,
+    insert_named_event,
+    link_event_to_article,
+    insert_quote,
+    link_quote_to_article,
+    insert_article_author,
+    insert_article_external_reference,
+)
+from news_grouping_app.llm_calls import call_gpt_api
+from news_grouping_app.utils import chunk_summaries, count_tokens, normalize_url, CVE_PATTERN
+from news_grouping_app.config import OPENAI_MODEL, EXTRACT_EXTENDED_FIELDS
+from news_grouping_app.analysis.entity_extraction import (
+    get_articles_missing_entity_extraction,
+    EXTRACTION_TOKEN_CHUNK,
+)
+
+logger = logging.getLogger(__name__)
+MODEL = OPENAI_MODEL  # default model can be overridden via env var
+
+# Expected JSON output per article: entities plus companies, and with the
+# extended fields also authors, quotes, events and references
+UNIFIED_OUTPUT_TOKENS_PER_ARTICLE = 600
+EXTENDED_OUTPUT_TOKENS_PER_ARTICLE = 1000
+UNIFIED_SYSTEM_PROMPT = "Extract entities, companies and article metadata from multiple articles in batch mode."
+
+
+def build_unified_prompt(article_batch, extended=EXTRACT_EXTENDED_FIELDS):
+    """Build the single extraction prompt for a batch of {article_id: text}."""
+    fields = [
+        '"entities": [ { "name": "Entity Name", "type": "person|organization|technology|product|place|concept", '
+        '"description": "Brief description", "relevance": 0.1-1.0, "context": "snippet where entity appears" } ]',
+        '"companies": ["CompanyA", "CompanyB"]',
+    ]
+    instructions = (
+        "For each article extract:\n"
+        "- entities: important named entities (people, organizations, technologies, products, places, key concepts) "
+        "with type, brief description, relevance and a context snippet.\n"
+        "- companies: every company name mentioned.\n"
+    )
+    if extended:
+        fields += [
+            '"authors": ["Author Name"]',
+            '"quotes": [ { "text": "exact quoted words", "speaker": "Who said it or null" } ]',
+            '"events": [ { "name": "Named event, campaign, incident or release", "type": "cyberattack|data_breach|vulnerability|product_launch|acquisition|lawsuit|conference|other", '
+            '"cve_ids": ["CVE-YYYY-NNNN"], "context": "snippet" } ]',
+            '"references": [ { "url": "https://...", "type": "advisory|report|source|other" } ]',
+        ]
+        instructions += (
+            "- authors: the article's byline author(s), only if stated.\n"
+            "- quotes: direct quotations, verbatim, with the speaker if known.\n"
+            "- events: specifically named events, incidents, campaigns or releases (not generic topics).\n"
+            "- references: URLs that appear in the article text. Never invent URLs.\n"
+        )
+    prompt = (
+        instructions
+        + "Use empty lists when nothing applies.\n\n"
+        "Return only JSON with the format:\n"
+        '{ "articles": [ { "article_id": "...", ' + ", ".join(fields) + " }, ... ] }\n\n"
+    )
+    for art_id, text in article_batch.items():
+        prompt += f"Article ID={art_id}:\n{text}\n\n"
+    return prompt
+
+
+def extract_unified_from_batch(article_batch, api_key, model=MODEL, extended=EXTRACT_EXTENDED_FIELDS):
+    """
+    Run one LLM call for a batch of articles ({article_id: text}).
+    Returns {article_id (int): result_dict} where result_dict holds the lists
+    described in build_unified_prompt.
+    """
+    messages = [
+        {
+            "role": "system",
+            "content": UNIFIED_SYSTEM_PROMPT,
+        },
+        {"role": "user", "content": build_unified_prompt(article_batch, extended)},
+    ]
+
+    resp = call_gpt_api(messages, api_key, model=model)
+    if not resp:
+        logger.warning("No response from GPT for unified extraction batch.")
+        return {}
+
+    cleaned = resp.strip().strip("```json").strip("```").strip()
+    cleaned = re.sub(r"^json\s+", "", cleaned, flags=re.IGNORECASE)
+
+    try:
+        data = json.loads(cleaned)
+    except json.JSONDecodeError as e:
+        logger.error(f"Error parsing unified extraction JSON: {e}\n{cleaned}")
+        return {}
+
+    results = {}
+    for article in data.get("articles", []):
+        if not isinstance(article, dict):
+            continue
+        try:
+            art_id = int(article.get("article_id"))
+        except (TypeError, ValueError):
+            continue
+        if art_id in article_batch:
+            results[art_id] = article
+    return results
+
+
+def _as_list(value):
+    return value if isinstance(value, list) else []
+
+
+def store_unified_extraction(art_id, result, article_text="", db_path="db/news.db", cursor=None):
+    """
+    Write one article's unified extraction result. Returns the number of entity links written.
+    References are only stored if the URL actually appears in the article text.
+    """
+    entity_count = 0
+    for entity in _as_list(result.get("entities")):
+        if not isinstance(entity, dict):
+            continue
+        entity_name = str(entity.get("name") or "").strip()
+        if not entity_name:
+            continue
+        try:
+            relevance = float(entity.get("relevance", 1.0))
+        except (TypeError, ValueError):
+            relevance = 1.0
+        entity_id = insert_entity(
+            entity_name=entity_name,
+            entity_type=str(entity.get("type") or "unknown").lower(),
+            description=entity.get("description", ""),
+            wiki_qid=entity.get("qid") or entity.get("wiki_qid"),
+            aliases=entity.get("aliases", []),
+            db_path=db_path,
+            cursor=cursor,
+        )
+        if entity_id and link_entity_to_article(
+            art_id, entity_id, relevance, entity.get("context", ""), db_path=db_path, cursor=cursor
+        ):
+            entity_count += 1
+
+    for comp in _as_list(result.get("companies")):
+        comp_name = str(comp or "").strip()
+        if comp_name:
+            link_company_to_article(art_id, comp_name, db_path=db_path, cursor=cursor)
+
+    for author in _as_list(result.get("authors")):
+        author_name = str(author or "").strip()
+        if author_name:
+            insert_article_author(art_id, author_name, db_path=db_path, cursor=cursor)
+
+    for quote in _as_list(result.get("quotes")):
+        if not isinstance(quote, dict):
+            continue
+        quote_text = str(quote.get("text") or "").strip().strip('"').strip()
+        if len(quote_text) < 15:  # Skip fragments too short to identify a quote
+            continue
+        quote_id = insert_quote(quote_text, quote.get("speaker") or None, db_path=db_path, cursor=cursor)
+        if quote_id:
+            link_quote_to_article(art_id, quote_id, db_path=db_path, cursor=cursor)
+
+    for event in _as_list(result.get("events")):
+        if not isinstance(event, dict):
+            continue
+        event_name = str(event.get("name") or "").strip()
+        if not event_name:
+            continue
+        cve_ids = [c for c in _as_list(event.get("cve_ids")) if isinstance(c, str) and CVE_PATTERN.fullmatch(c)]
+        event_id = insert_named_event(
+            event_name, str(event.get("type") or "other").lower(), cve_ids, db_path=db_path, cursor=cursor
+        )
+        if event_id:
+            link_event_to_article(art_id, event_id, event.get("context"), db_path=db_path, cursor=cursor)
+
+    for ref in _as_list(result.get("references")):
+        url = ref.get("url") if isinstance(ref, dict) else ref
+        if not isinstance(url, str) or url not in article_text:
+            continue
+        normalized_url, domain = normalize_url(url)
+        if normalized_url:
+            insert_article_external_reference(
+                art_id,
+                url,
+                normalized_url,
+                domain,
+                ref.get("type") if isinstance(ref, dict) else None,
+                db_path=db_path,
+                cursor=cursor,
+            )
+
+    return entity_count
+
+
+def run_unified_extraction_for_all_articles(
+    api_key, db_path="db/news.db", extended=EXTRACT_EXTENDED_FIELDS, article_ids=None, batch_delay=0.5
+):
+    """
+    Single-pass replacement for extract_entities_for_all_articles followed by
+    extract_company_names_for_all_articles: one LLM call per chunk fills
+    article_entities and article_companies (plus authors, quotes, events and
+    references when `extended`). Each chunk is written in one transaction.
+    article_ids restricts the run to those articles (the streaming pipeline
+    passes one batch at a time).
+    """
+    df = get_articles_missing_entity_extraction(db_path=db_path, article_ids=article_ids)
+    if df.empty:
+        logger.info("All articles already have entity extractions.")
+        return
+
+    summaries_dict = {}
+    for _, row in df.iterrows():
+        content = str(row["expanded_summary"]).strip()
+        if content:
+            summaries_dict[int(row["article_id"])] = content
+
+    chunked_articles = list(
+        chunk_summaries(
+            summaries_dict,
+            max_token_chunk=EXTRACTION_TOKEN_CHUNK,
+            prompt_overhead_tokens=count_tokens(
+                UNIFIED_SYSTEM_PROMPT + build_unified_prompt({}, extended)
+            ),
+            output_tokens_per_item=(
+                EXTENDED_OUTPUT_TOKENS_PER_ARTICLE if extended else UNIFIED_OUTPUT_TOKENS_PER_ARTICLE
+            ),
+        )
+    )
+    total_articles = len(summaries_dict)
+    processed_articles = 0
+    total_extractions = 0
+
+    logger.info(
+        f"Starting unified extraction for {total_articles} articles in {len(chunked_articles)} batches"
+    )
+
+    for idx, chunk_dict in enumerate(chunked_articles, start=1):
+        logger.info(
+            f"Processing batch {idx}/{len(chunked_articles)} with {len(chunk_dict)} articles. "
+            f"Progress: {processed_articles}/{total_articles} articles ({processed_articles/total_articles*100:.1f}%)"
+        )
+        batch_results = extract_unified_from_batch(chunk_dict, api_key, extended=extended)
+
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+        try:
+            for art_id, result in batch_results.items():
+                total_extractions += store_unified_extraction(
+                    art_id, result, chunk_dict.get(art_id, ""), db_path=db_path, cursor=cursor
+                )
+            conn.commit()
+            processed_articles += len(batch_results)
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.error(f"DB error saving unified extraction batch {idx}: {e}")
+        finally:
+            conn.close()
+
+        # Small delay between batches to avoid rate limiting
+        if batch_delay > 0 and idx < len(chunked_articles):
+            time.sleep(batch_delay)
+
+    logger.info(
+        f"Finished unified extraction. Processed {processed_articles}/{total_articles} articles. "
+        f"Extracted {total_extractions} entity-article relationships."
+    )
@@ -1,7 +1,7 @@
 # app.py
 import os
 import sqlite3
-from flask import Flask, send_from_directory, jsonify, request
+from flask import Blueprint, Flask, Response, current_app, send_from_directory, jsonify, request, stream_with_context
 import pytz
 from datetime import datetime, timedelta
 import logging
@@ -11,37 +11,46 @@ import numpy as np
 import threading
 import time
 import json
+from functools import partial
 
 # --- Core Modules & Utilities ---
 from news_grouping_app.analysis.cve_extraction import build_cve_table
-from news_grouping_app.analysis.trending_analysis import (
-    get_trending_topics,
-    cleanup_old_trends,
-    ensure_minimum_trends,
-)
+from news_grouping_app.analysis.trending_analysis import get_trending_topics
 from news_grouping_app.analysis.entity_extraction import get_trending_entities, get_entities_for_category
-from news_grouping_app.pipeline import schedule_regular_cleanup
 from news_grouping_app.llm_calls import call_gpt_api
 from pathlib import Path
-from news_grouping_app.db.database import DEFAULT_DB_PATH
+from news_grouping_app.db.database import DEFAULT_DB_PATH, get_article_bodies
+from news_grouping_app.archive import attach_archive
+from news_grouping_app.search import build_match_query, search_articles, search_groups
+from news_grouping_app.utils import to_utc_sqlite_str
+from news_grouping_app.config import STREAM_POLL_SECONDS, STREAM_MAX_SECONDS
 
 # --- Database ---
 BASE_DIR = Path(__file__).resolve().parent
-# Use the same database location defined in database.py to avoid mismatched paths
-DB_PATH = DEFAULT_DB_PATH
+# Request handlers only read. Each server thread keeps one read-only connection
+# per database and reuses it across requests (WAL lets these readers run
+# alongside the pipeline's writes); maintenance runs in the pipeline process.
+_thread_local = threading.local()
+
+
+def current_db_path():
+    return current_app.config["DB_PATH"]
 
 
 def get_connection():
-    return sqlite3.connect(str(DB_PATH), check_same_thread=False)
+    """This thread's read-only connection to the app's database. Do not close it."""
+    connections = _thread_local.__dict__.setdefault("connections", {})
+    db_path = current_db_path()
+    conn = connections.get(db_path)
+    if conn is None:
+        conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True, timeout=10.0)
+        connections[db_path] = conn
+    return conn
 
 
 # Use frontend_build directory at the project root as the static folder
 STATIC_DIR = Path(__file__).resolve().parent.parent / "frontend_build"
-app = Flask(
-    __name__,
-    static_folder=str(STATIC_DIR),
-    # static_url_path=""  # Keep default static path relative to static_folder
-)
+api = Blueprint("api", __name__)
 
 # --- Logging Setup ---
 logger = logging.getLogger(__name__)
@@ -53,31 +62,138 @@ if not logger.handlers:
     logger.addHandler(handler)
 
 
-# --- Background Cleanup Scheduler ---
-# (Keep the existing scheduler thread)
-def cleanup_scheduler():
-    while True:
-        try:
-            logger.info("Running scheduled trending data cleanup...")
-            schedule_regular_cleanup(DB_PATH)
-            logger.info("Scheduled cleanup finished.")
-        except Exception as e:
-            logger.error(f"Error in cleanup scheduler: {e}")
-        time.sleep(60 * 60)
-
-
-cleanup_thread = threading.Thread(target=cleanup_scheduler, daemon=True)
-cleanup_thread.start()
-logger.info("Background cleanup scheduler started.")
+# Members of an archived group are archived too, unless they also belong to a live group
+ARCHIVED_GROUP_ARTICLES = """(
+    SELECT id, link, title, published_date FROM main.articles
+    UNION ALL
+    SELECT id, link, title, published_date FROM archive.articles
+)"""
+
+
+def include_archived_arg():
+    """True if the request asks for archived groups (?include_archived=1)."""
+    return request.args.get("include_archived", "").lower() in ("1", "true", "yes")
+
+
+# --- Keyset Pagination ---
+# Groups are ordered by (article_count, group_id) and a group's articles by
+# (published_date, article_id), both descending; `after` is the last key of the
+# previous page, e.g. after=12,345 or after=2025-06-01 08:00:00,678.
+GROUP_PAGE_SIZE = 50
+GROUP_PAGE_MAX = 200
+GROUP_ARTICLES_PREVIEW = 10  # Articles embedded per group in group listings
+ARTICLE_PAGE_SIZE = 20  # /api/groups/<id>/articles
+ARTICLE_PAGE_MAX = 100
+
+
+def parse_cursor(value, first_type):
+    """
+    Split an `after` value into (first_type key, int id); None if absent.
+    Raises ValueError. The key may be empty (an article without a date).
+    """
+    if not value:
+        return None
+    key, separator, row_id = value.rpartition(",")
+    if not separator:
+        raise ValueError(value)
+    return first_type(key), int(row_id)
+
+
+def limit_arg(name, default, maximum):
+    return min(max(request.args.get(name, type=int, default=default), 1), maximum)
+
+
+def hours_cutoff(hours):
+    if hours is None or hours <= 0:
+        return None
+    return (datetime.now(pytz.UTC) - timedelta(hours=hours)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def fetch_group_articles(c, group_id, schema="main", cutoff_iso=None, after=None, limit=ARTICLE_PAGE_SIZE):
+    """One page of a group's articles, newest first, with previews. Returns (articles, next_cursor)."""
+    articles_source = "main.articles" if schema == "main" else ARCHIVED_GROUP_ARTICLES
+    query = f"""
+        SELECT a.id, a.link, a.title, a.published_date
+        FROM {schema}.two_phase_article_group_memberships tgm
+        JOIN {articles_source} a ON a.id = tgm.article_id
+        WHERE tgm.group_id = ?
+    """
+    params = [group_id]
+    if cutoff_iso:
+        query += " AND a.published_date >= ?"
+        params.append(cutoff_iso)
+    if after:
+        query += " AND (COALESCE(a.published_date, ''), a.id) < (?, ?)"
+        params.extend(after)
+    query += " ORDER BY COALESCE(a.published_date, '') DESC, a.id DESC LIMIT ?"
+    params.append(limit + 1)
+    rows = c.execute(query, params).fetchall()
+
+    bodies = get_article_bodies([row[0] for row in rows[:limit]], current_db_path(), cursor=c)
+    articles = []
+    for article_id, link, title, pubdate in rows[:limit]:
+        content = bodies.get(article_id)
+        articles.append(
+            {
+                "article_id": article_id,
+                "link": link,
+                "title": title,
+                "published_date": pubdate,
+                "preview": (content or "")[:300] + "..." if content else "",
+            }
+        )
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = f"{articles[-1]['published_date'] or ''},{articles[-1]['article_id']}"
+    return articles, next_cursor
+
+
+def _group_page_query(schema, cutoff_iso, after):
+    """SQL and params for one tier's page of (article_count, group_id, label, description)."""
+    if schema == "main" and not cutoff_iso:
+        # Member counts are kept in group_activity and indexed with group_id
+        query = """
+            SELECT ga.article_count, g.group_id, g.group_label, g.description
+            FROM group_activity ga
+            JOIN two_phase_article_groups g ON g.group_id = ga.group_id
+            WHERE g.main_topic = ? AND ga.article_count > 0
+        """
+        order_key = "(ga.article_count, ga.group_id)"
+        if after:
+            query += f" AND {order_key} < (?, ?)"
+        return query + " ORDER BY ga.article_count DESC, ga.group_id DESC LIMIT ?"
+    # Counts of articles in the window (live: via idx_articles_published_date), or archived tier
+    articles_source = "main.articles" if schema == "main" else ARCHIVED_GROUP_ARTICLES
+    query = f"""
+        SELECT COUNT(*) AS n, g.group_id, g.group_label, g.description
+        FROM {articles_source} a
+        JOIN {schema}.two_phase_article_group_memberships tgm ON tgm.article_id = a.id
+        JOIN {schema}.two_phase_article_groups g ON g.group_id = tgm.group_id
+        WHERE g.main_topic = ?
+    """
+    if cutoff_iso:
+        query += " AND a.published_date >= ?"
+    query += " GROUP BY g.group_id"
+    if after:
+        query += " HAVING (n, g.group_id) < (?, ?)"
+    return query + " ORDER BY n DESC, g.group_id DESC LIMIT ?"
 
 
 # --- Helper Function to Fetch PRIMARY Groups & Filtered Articles ---
-# (Keep the existing fetch_groups_for_category function)
-def fetch_groups_for_category(category_value, hours=None):
-    cutoff_iso = None
-    if hours is not None and hours > 0:
-        cutoff_utc = datetime.now(pytz.UTC) - timedelta(hours=hours)
-        cutoff_iso = cutoff_utc.strftime("%Y-%m-%d %H:%M:%S")
+def fetch_groups_for_category(
+    category_value,
+    hours=None,
+    include_archived=False,
+    after=None,
+    limit=GROUP_PAGE_SIZE,
+    articles_per_group=GROUP_ARTICLES_PREVIEW,
+):
+    """
+    One page of a category's groups, largest first (articles in the time window),
+    each with its newest `articles_per_group` articles. Returns (groups, next_cursor).
+    """
+    cutoff_iso = hours_cutoff(hours)
+    if cutoff_iso:
         logger.info(
             f"Filtering articles for category '{category_value}' published after: {cutoff_iso}"
         )
@@ -89,54 +205,37 @@ def fetch_groups_for_category(category_value, hours=None):
     conn = get_connection()
     c = conn.cursor()
     groups_data = []
+    next_cursor = None
     try:
-        c.execute(
-            "SELECT group_id, main_topic, group_label, description FROM two_phase_article_groups WHERE main_topic = ?",
-            (category_value,),
-        )
-        group_definitions = c.fetchall()
-
-        for group_id, _, group_label, description in group_definitions:
-            description = description or "No description available."
-            article_query = "SELECT a.id AS article_id, a.link, a.title, a.published_date, a.content FROM articles a JOIN two_phase_article_group_memberships tgm ON a.id = tgm.article_id WHERE tgm.group_id = ?"
-            params = [group_id]
-            if cutoff_iso:
-                article_query += " AND a.published_date >= ?"
-                params.append(cutoff_iso)
-            article_query += " ORDER BY a.published_date DESC"
-
-            c.execute(article_query, params)
-            article_rows = c.fetchall()
-
-            if not article_rows:
-                continue
-
-            articles_list = []
-            latest_article_date = None
-            for article_id, link, title, pubdate, content in article_rows:
-                preview = (content or "")[:300] + "..." if content else ""
-                articles_list.append(
-                    {
-                        "article_id": article_id,
-                        "link": link,
-                        "title": title,
-                        "published_date": pubdate,
-                        "preview": preview,
-                    }
-                )
-                if pubdate and (
-                    latest_article_date is None or pubdate > latest_article_date
-                ):
-                    latest_article_date = pubdate
-
+        tiers = ["main"]
+        if include_archived and attach_archive(conn, current_db_path()):
+            tiers.append("archive")
+        page = []
+        for schema in tiers:
+            params = [category_value] + ([cutoff_iso] if cutoff_iso else []) + list(after or ()) + [limit + 1]
+            page.extend(
+                row + (schema,)
+                for row in c.execute(_group_page_query(schema, cutoff_iso, after), params).fetchall()
+            )
+        # Group IDs are never reused, so keys are unique across tiers
+        page.sort(key=lambda row: (row[0], row[1]), reverse=True)
+        if len(page) > limit:
+            page = page[:limit]
+            next_cursor = f"{page[-1][0]},{page[-1][1]}"
+
+        for article_count, group_id, group_label, description, schema in page:
+            articles_list, articles_cursor = fetch_group_articles(
+                c, group_id, schema, cutoff_iso, limit=articles_per_group
+            )
             groups_data.append(
                 {
                     "group_id": group_id,
                     "group_label": group_label,
-                    "description": description,
-                    "article_count": len(article_rows),
+                    "description": description or "No description available.",
+                    "article_count": article_count,
                     "articles": articles_list,
-                    "latest_article_date": latest_article_date,
+                    "articles_next_cursor": articles_cursor,
+                    "archived": schema == "archive",
                 }
             )
     except sqlite3.Error as e:
@@ -144,25 +243,34 @@ def fetch_groups_for_category(category_value, hours=None):
             f"Error fetching groups/articles for category '{category_value}': {e}",
             exc_info=True,
         )
-    finally:
-        conn.close()
 
-    groups_data.sort(
-        key=lambda x: (x["article_count"], x.get("latest_article_date", "")),
-        reverse=True,
-    )
-    for group in groups_data:
-        group.pop("latest_article_date", None)
     logger.info(
         f"Found {len(groups_data)} groups with articles for category '{category_value}' in the time window."
     )
-    return groups_data
+    return groups_data, next_cursor
+
+
+def category_groups_response(category):
+    """JSON page of a category's groups from the request's hours/after/limit/articles arguments."""
+    try:
+        after = parse_cursor(request.args.get("after"), int)
+    except ValueError:
+        return jsonify({"error": "'after' must be <article_count>,<group_id>"}), 400
+    groups, next_cursor = fetch_groups_for_category(
+        category,
+        hours=request.args.get("hours", type=int, default=None),
+        include_archived=include_archived_arg(),
+        after=after,
+        limit=limit_arg("limit", GROUP_PAGE_SIZE, GROUP_PAGE_MAX),
+        articles_per_group=limit_arg("articles", GROUP_ARTICLES_PREVIEW, ARTICLE_PAGE_MAX),
+    )
+    return jsonify({"category": category, "groups": groups, "next_cursor": next_cursor})
 
 
 # --- API Endpoints ---
 # (Keep existing /api/... endpoints as they are)
 # /api/home_groups
-@app.route("/api/home_groups", methods=["GET"])
+@api.route("/api/home_groups", methods=["GET"])
 def get_home_groups():
     hours = request.args.get("hours", type=int, default=None)
     logger.info(f"API call to /api/home_groups with hours={hours}")
@@ -174,8 +282,9 @@ def get_home_groups():
         PREDEFINED_CATEGORIES = ["Other"]  # Basic fallback
 
     for cat in PREDEFINED_CATEGORIES:
-        groups_all = fetch_groups_for_category(cat, hours=hours)
-        top_3 = groups_all[:3]
+        top_3, _ = fetch_groups_for_category(
+            cat, hours=hours, include_archived=include_archived_arg(), limit=3
+        )
         if top_3:
             categories_data.append({"category": cat, "groups": top_3})
 
@@ -183,99 +292,281 @@ def get_home_groups():
 
 
 # /api/category_groups
-@app.route("/api/category_groups", methods=["GET"])
+@api.route("/api/category_groups", methods=["GET"])
 def get_category_groups():
     category = request.args.get("category")
     if not category:
         return jsonify({"error": "Missing 'category' parameter"}), 400
-    hours = request.args.get("hours", type=int, default=None)
     logger.info(
-        f"API call to /api/category_groups with category={category}, hours={hours}"
+        f"API call to /api/category_groups with category={category}, hours={request.args.get('hours')}, after={request.args.get('after')}"
     )
-    groups_data = fetch_groups_for_category(category_value=category, hours=hours)
-    return jsonify({"category": category, "groups": groups_data})
+    return category_groups_response(category)
 
 
 # --- Specific Category Endpoints ---
-@app.route("/api/science_environment_groups", methods=["GET"])
+@api.route("/api/science_environment_groups", methods=["GET"])
 def get_science_environment_groups():
-    hours = request.args.get("hours", type=int, default=None)
-    groups = fetch_groups_for_category("Science & Environment", hours=hours)
-    return jsonify({"category": "Science & Environment", "groups": groups})
+    return category_groups_response("Science & Environment")
 
 
-@app.route("/api/business_finance_trade_groups", methods=["GET"])
+@api.route("/api/business_finance_trade_groups", methods=["GET"])
 def get_business_finance_trade_groups():
-    hours = request.args.get("hours", type=int, default=None)
-    groups = fetch_groups_for_category("Business, Finance & Trade", hours=hours)
-    return jsonify({"category": "Business, Finance & Trade", "groups": groups})
+    return category_groups_response("Business, Finance & Trade")
 
 
-@app.route("/api/ai_machine_learning_groups", methods=["GET"])
+@api.route("/api/ai_machine_learning_groups", methods=["GET"])
 def get_ai_machine_learning_groups():
-    hours = request.args.get("hours", type=int, default=None)
-    groups = fetch_groups_for_category(
-        "Artificial Intelligence & Machine Learning", hours=hours
-    )
-    return jsonify(
-        {"category": "Artificial Intelligence & Machine Learning", "groups": groups}
-    )
+    return category_groups_response("Artificial Intelligence & Machine Learning")
 
 
-@app.route("/api/cybersecurity_data_privacy_groups", methods=["GET"])
+@api.route("/api/cybersecurity_data_privacy_groups", methods=["GET"])
 def get_cybersecurity_data_privacy_groups():
-    hours = request.args.get("hours", type=int, default=None)
-    groups = fetch_groups_for_category("Cybersecurity & Data Privacy", hours=hours)
-    return jsonify({"category": "Cybersecurity & Data Privacy", "groups": groups})
+    return category_groups_response("Cybersecurity & Data Privacy")
 
 
-@app.route("/api/politics_government_groups", methods=["GET"])
+@api.route("/api/politics_government_groups", methods=["GET"])
 def get_politics_government_groups():
-    hours = request.args.get("hours", type=int, default=None)
-    groups = fetch_groups_for_category("Politics & Government", hours=hours)
-    return jsonify({"category": "Politics & Government", "groups": groups})
+    return category_groups_response("Politics & Government")
 
 
-@app.route("/api/consumer_tech_gadgets_groups", methods=["GET"])
+@api.route("/api/consumer_tech_gadgets_groups", methods=["GET"])
 def get_consumer_tech_gadgets_groups():
-    hours = request.args.get("hours", type=int, default=None)
-    groups = fetch_groups_for_category("Consumer Technology & Gadgets", hours=hours)
-    return jsonify({"category": "Consumer Technology & Gadgets", "groups": groups})
+    return category_groups_response("Consumer Technology & Gadgets")
 
 
-@app.route("/api/automotive_space_transportation_groups", methods=["GET"])
+@api.route("/api/automotive_space_transportation_groups", methods=["GET"])
 def get_automotive_space_transportation_groups():
-    hours = request.args.get("hours", type=int, default=None)
-    groups = fetch_groups_for_category(
-        "Automotive, Space & Transportation", hours=hours
-    )
-    return jsonify({"category": "Automotive, Space & Transportation", "groups": groups})
+    return category_groups_response("Automotive, Space & Transportation")
 
 
-@app.route("/api/enterprise_cloud_computing_groups", methods=["GET"])
+@api.route("/api/enterprise_cloud_computing_groups", methods=["GET"])
 def get_enterprise_cloud_computing_groups():
-    hours = request.args.get("hours", type=int, default=None)
-    groups = fetch_groups_for_category(
-        "Enterprise Technology & Cloud Computing", hours=hours
-    )
+    return category_groups_response("Enterprise Technology & Cloud Computing")
+
+
+@api.route("/api/other_groups", methods=["GET"])
+def get_other_groups():
+    return category_groups_response("Other")
+
+
+# /api/groups/<id>/articles
+@api.route("/api/groups/<int:group_id>/articles", methods=["GET"])
+def get_group_articles(group_id):
+    """A group's articles, newest first: hours, after=<published_date>,<article_id>, limit."""
+    try:
+        after = parse_cursor(request.args.get("after"), str)
+    except ValueError:
+        return jsonify({"error": "'after' must be <published_date>,<article_id>"}), 400
+    limit = limit_arg("limit", ARTICLE_PAGE_SIZE, ARTICLE_PAGE_MAX)
+    cutoff_iso = hours_cutoff(request.args.get("hours", type=int, default=None))
+    conn = get_connection()
+    c = conn.cursor()
+    try:
+        # Live first; a group missing there may have been archived
+        for schema in ("main", "archive"):
+            if schema == "archive" and not attach_archive(conn, current_db_path()):
+                break
+            group = c.execute(
+                f"SELECT group_label, main_topic, description FROM {schema}.two_phase_article_groups WHERE group_id = ?",
+                (group_id,),
+            ).fetchone()
+            if group:
+                articles, next_cursor = fetch_group_articles(c, group_id, schema, cutoff_iso, after, limit)
+                return jsonify(
+                    {
+                        "group_id": group_id,
+                        "group_label": group[0],
+                        "category": group[1],
+                        "description": group[2] or "No description available.",
+                        "archived": schema == "archive",
+                        "articles": articles,
+                        "next_cursor": next_cursor,
+                    }
+                )
+    except sqlite3.Error as e:
+        logger.error(f"Error fetching articles for group {group_id}: {e}", exc_info=True)
+        return jsonify({"error": "Failed to fetch group articles"}), 500
+    return jsonify({"error": f"Group {group_id} not found"}), 404
+
+
+SEARCH_MAX_PER_PAGE = 100
+
+
+# /api/search
+@api.route("/api/search", methods=["GET"])
+def search_api():
+    """
+    Full-text search. Parameters: q, type (articles|groups), category, hours
+    or since/until (any date format), page (from 1), per_page. `truncated`
+    says older matches were left unranked (no date bound given).
+    """
+    match = build_match_query(request.args.get("q", ""))
+    if match is None:
+        return jsonify({"error": "Missing or empty 'q' parameter"}), 400
+    search_type = request.args.get("type", "articles")
+    if search_type not in ("articles", "groups"):
+        return jsonify({"error": "'type' must be 'articles' or 'groups'"}), 400
+    since = hours_cutoff(request.args.get("hours", type=int, default=None))
+    until = None
+    for name in ("since", "until"):
+        value = request.args.get(name)
+        if value:
+            parsed = to_utc_sqlite_str(value)
+            if parsed is None:
+                return jsonify({"error": f"Unparseable '{name}' date: {value}"}), 400
+            if name == "since":
+                since = max(since, parsed) if since else parsed
+            else:
+                until = parsed
+    page = max(request.args.get("page", type=int, default=1), 1)
+    per_page = min(max(request.args.get("per_page", type=int, default=20), 1), SEARCH_MAX_PER_PAGE)
+    category = request.args.get("category")
+    logger.info(f"API call to /api/search with q={request.args.get('q')!r}, type={search_type}, page={page}")
+
+    search = search_groups if search_type == "groups" else partial(search_articles, db_path=current_db_path())
+    conn = get_connection()
+    try:
+        # One extra row tells whether another page exists without counting all matches
+        results, truncated = search(
+            conn.cursor(), match, since=since, until=until, category=category,
+            limit=per_page + 1, offset=(page - 1) * per_page,
+        )
+    except sqlite3.OperationalError as e:
+        logger.error(f"Search failed for {match!r}: {e}", exc_info=True)
+        return jsonify({"error": "Search is unavailable"}), 503
     return jsonify(
-        {"category": "Enterprise Technology & Cloud Computing", "groups": groups}
+        {
+            "query": request.args.get("q"),
+            "type": search_type,
+            "page": page,
+            "per_page": per_page,
+            "has_more": len(results) > per_page,
+            "truncated": truncated,
+            "results": results[:per_page],
+        }
     )
 
 
-@app.route("/api/other_groups", methods=["GET"])
-def get_other_groups():
-    hours = request.args.get("hours", type=int, default=None)
-    groups = fetch_groups_for_category("Other", hours=hours)
-    return jsonify({"category": "Other", "groups": groups})
+# --- Live Updates ---
+# /api/stream tails change_log as server-sent events. Each event's id is its
+# change_id and its data is one JSON object: the logged ids joined to the
+# current group (label, description, count) and article rows.
+STREAM_BATCH_SIZE = 200  # change_log rows read per poll
+STREAM_KEEPALIVE_SECONDS = 15
+STREAM_RETRY_MS = 3000  # Reconnect delay suggested to EventSource clients
+
+
+def fetch_changes(c, after_id, categories=None, limit=STREAM_BATCH_SIZE):
+    """
+    change_log events after `after_id`, oldest first, optionally only those in
+    `categories`. Returns (events, last change_id read, whether more rows wait).
+    """
+    rows = c.execute(
+        """
+        SELECT cl.change_id, cl.event_type, cl.category, cl.group_id, cl.article_id, cl.payload, cl.created_at,
+               g.group_label, g.description, ga.article_count, ga.last_article_date,
+               a.title, a.link, a.published_date
+        FROM change_log cl
+        LEFT JOIN two_phase_article_groups g ON g.group_id = cl.group_id
+        LEFT JOIN group_activity ga ON ga.group_id = cl.group_id
+        LEFT JOIN articles a ON a.id = cl.article_id
+        WHERE cl.change_id > ?
+        ORDER BY cl.change_id
+        LIMIT ?
+        """,
+        (after_id, limit),
+    ).fetchall()
+    events = []
+    for (change_id, event_type, category, group_id, article_id, payload, created_at,
+         label, description, article_count, latest_date, title, link, published_date) in rows:
+        if categories and category not in categories:
+            continue
+        event = {
+            "id": change_id,
+            "type": event_type,
+            "category": category,
+            "group_id": group_id,
+            "created_at": created_at,
+        }
+        if label is not None and event_type != "group_removed":
+            event["group"] = {
+                "group_label": label,
+                "description": description,
+                "article_count": article_count,
+                "latest_article_date": latest_date,
+            }
+        if article_id is not None:
+            event["article"] = {"article_id": article_id, "title": title, "link": link, "published_date": published_date}
+        if payload:
+            event.update(json.loads(payload))
+        events.append(event)
+    last_id = rows[-1][0] if rows else after_id
+    return events, last_id, len(rows) == limit
+
+
+def format_sse(event_type, data, event_id=None):
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event_type}", f"data: {json.dumps(data)}"]
+    return "\n".join(lines) + "\n\n"
+
+
+# /api/stream
+@api.route("/api/stream", methods=["GET"])
+def stream_api():
+    """
+    Server-sent events for group, article and trend changes. Resumes after the
+    Last-Event-ID header (or ?last_event_id=); without one, only new changes
+    are sent. Repeat category= to filter. A `reset` event means the client
+    fell behind the retained log and should refetch full payloads.
+    """
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return jsonify({"error": "Last-Event-ID must be an integer"}), 400
+    categories = set(request.args.getlist("category")) or None
 
+    def generate():
+        c = get_connection().cursor()
+        try:
+            oldest, newest = c.execute("SELECT MIN(change_id), COALESCE(MAX(change_id), 0) FROM change_log").fetchone()
+            yield f"retry: {STREAM_RETRY_MS}\n\n"
+            after = newest if last_event_id is None else last_event_id
+            if last_event_id is not None and (
+                last_event_id > newest or (oldest is not None and last_event_id < oldest - 1)
+            ):
+                # Pruned past the client's position, or a different database
+                after = newest
+                yield format_sse("reset", {"id": newest}, newest)
+            deadline = time.monotonic() + STREAM_MAX_SECONDS
+            last_write = time.monotonic()
+            while time.monotonic() < deadline:
+                events, after, more = fetch_changes(c, after, categories)
+                for event in events:
+                    yield format_sse(event["type"], event, event["id"])
+                    last_write = time.monotonic()
+                if more:
+                    continue
+                if time.monotonic() - last_write >= STREAM_KEEPALIVE_SECONDS:
+                    yield ": keepalive\n\n"
+                    last_write = time.monotonic()
+                time.sleep(STREAM_POLL_SECONDS)
+        except sqlite3.Error as e:
+            logger.error(f"Error streaming changes: {e}", exc_info=True)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-@app.route("/api/cve_table", methods=["GET"])
+
+@api.route("/api/cve_table", methods=["GET"])
 def cve_table_api():
     hours = request.args.get("hours", type=int, default=None)
     logger.info(f"API call to /api/cve_table with hours={hours}")
     try:
-        df = build_cve_table(date_hours=hours, db_path=DB_PATH)
+        df = build_cve_table(date_hours=hours, cursor=get_connection().cursor())
         logger.info(f"build_cve_table returned DataFrame with {len(df)} rows.")
         df = df.replace({np.nan: None})
         records = df.to_dict(orient="records")
@@ -287,7 +578,7 @@ def cve_table_api():
 
 
 # /api/trending
-@app.route("/api/trending", methods=["GET"])
+@api.route("/api/trending", methods=["GET"])
 def get_trending_api():
     category = request.args.get("category")
     requested_limit = request.args.get("limit", type=int, default=10)
@@ -298,9 +589,7 @@ def get_trending_api():
         f"API call to /api/trending with category={category}, limit={limit}, hours={hours}"
     )
     try:
-        api_key = os.environ.get("OPENAI_API_KEY")
-        ensure_minimum_trends(min_count=min_limit, api_key=api_key, db_path=DB_PATH)
-        df = get_trending_topics(category=category, limit=limit, db_path=DB_PATH)
+        df = get_trending_topics(category=category, limit=limit, cursor=get_connection().cursor())
 
         if df.empty:
             return jsonify([])
@@ -360,13 +649,13 @@ def get_trending_api():
 
 # --- Other Endpoints ---
 # (Keep /api/trending_entities, /api/category_entities, /api/prompt_tester/*, /api/debug/date_format as they were)
-@app.route("/api/trending_entities", methods=["GET"])
+@api.route("/api/trending_entities", methods=["GET"])
 def get_trending_entities_api():
     hours = request.args.get("hours", type=int, default=48)
     limit = request.args.get("limit", type=int, default=20)
     logger.info(f"API call to /api/trending_entities with hours={hours}, limit={limit}")
     try:
-        df = get_trending_entities(hours=hours, limit=limit, db_path=DB_PATH)
+        df = get_trending_entities(hours=hours, limit=limit, cursor=get_connection().cursor())
         records = df.to_dict(orient="records")
         return jsonify(records)
     except Exception as e:
@@ -374,7 +663,7 @@ def get_trending_entities_api():
         return jsonify({"error": "Failed to generate trending entities"}), 500
 
 
-@app.route("/api/category_entities", methods=["GET"])
+@api.route("/api/category_entities", methods=["GET"])
 def get_category_entities_api():
     category = request.args.get("category")
     if not category:
@@ -384,7 +673,7 @@ def get_category_entities_api():
         f"API call to /api/category_entities with category={category}, limit={limit}"
     )
     try:
-        df = get_entities_for_category(category, limit=limit, db_path=DB_PATH)
+        df = get_entities_for_category(category, limit=limit, cursor=get_connection().cursor())
         records = df.to_dict(orient="records")
         return jsonify(records)
     except Exception as e:
@@ -397,7 +686,7 @@ def get_category_entities_api():
         )
 
 
-@app.route("/api/prompt_tester/articles", methods=["GET"])
+@api.route("/api/prompt_tester/articles", methods=["GET"])
 def get_recent_articles_for_testing():
     hours = request.args.get("hours", type=int, default=24)
     limit = request.args.get("limit", type=int, default=20)
@@ -410,29 +699,29 @@ def get_recent_articles_for_testing():
     conn = get_connection()
     articles = []
     try:
-        query = "SELECT id, title, content, published_date, source FROM articles WHERE published_date >= ? ORDER BY published_date DESC LIMIT ?"
+        query = "SELECT id, title, published_date, source FROM articles WHERE published_date >= ? ORDER BY published_date DESC LIMIT ?"
         rows = conn.execute(query, (cutoff_time, limit)).fetchall()
+        bodies = get_article_bodies([row[0] for row in rows], current_db_path(), cursor=conn.cursor())
         for row in rows:
+            content = bodies.get(row[0])
             articles.append(
                 {
                     "article_id": row[0],
                     "title": row[1],
                     "content": (
-                        row[2][:500] + "..." if row[2] and len(row[2]) > 500 else row[2]
+                        content[:500] + "..." if content and len(content) > 500 else content
                     ),
-                    "full_content": row[2],
-                    "published_date": row[3],
-                    "source": row[4],
+                    "full_content": content,
+                    "published_date": row[2],
+                    "source": row[3],
                 }
             )
     except Exception as e:
         logger.error(f"Error fetching articles for prompt tester: {e}", exc_info=True)
-    finally:
-        conn.close()
     return jsonify(articles)
 
 
-@app.route("/api/prompt_tester/test_prompt", methods=["POST"])
+@api.route("/api/prompt_tester/test_prompt", methods=["POST"])
 def test_grouping_prompt():
     logger.info("API call to /api/prompt_tester/test_prompt")
     try:
@@ -449,9 +738,10 @@ def test_grouping_prompt():
 
         conn = get_connection()
         placeholders = ",".join("?" for _ in article_ids)
-        query = f"SELECT id, title, content FROM articles WHERE id IN ({placeholders})"
+        query = f"SELECT id, title FROM articles WHERE id IN ({placeholders})"
         df = pd.read_sql_query(query, conn, params=article_ids)
-        conn.close()
+        bodies = get_article_bodies(df["id"], current_db_path(), cursor=conn.cursor())
+        df["content"] = df["id"].map(bodies)
 
         if df.empty:
             return jsonify({"error": "No articles found for the given IDs"}), 404
@@ -483,7 +773,7 @@ def test_grouping_prompt():
         return jsonify({"error": f"Internal server error: {str(e)}"}), 500
 
 
-@app.route("/api/debug/date_format", methods=["GET"])
+@api.route("/api/debug/date_format", methods=["GET"])
 def debug_date_format():
     conn = get_connection()
     results = []
@@ -528,31 +818,29 @@ def debug_date_format():
     except Exception as e:
         logger.error(f"Error in date debug endpoint: {e}", exc_info=True)
         return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
     return jsonify(results)
 
 
 # --- Serve React App ---
 # Serve the main index.html for the root path
-@app.route("/")
+@api.route("/")
 def serve_index():
-    return send_from_directory(app.static_folder, "index.html")
+    return send_from_directory(current_app.static_folder, "index.html")
 
 
 # Catch-all route for client-side navigation
 # This MUST come AFTER your API routes
-@app.route("/<path:path>")
+@api.route("/<path:path>")
 def serve_react_app(path):
     # Construct the full path to the requested file/asset
-    requested_path = os.path.join(app.static_folder, path)
+    requested_path = os.path.join(current_app.static_folder, path)
 
     # Check if the requested path points to an existing file in the static folder
     # (e.g., CSS, JS, images, manifest.json, etc.)
     if os.path.exists(requested_path) and os.path.isfile(requested_path):
         # If it's an existing file, serve it directly
         logger.debug(f"Serving static file: {path}")
-        return send_from_directory(app.static_folder, path)
+        return send_from_directory(current_app.static_folder, path)
     else:
         # If the path doesn't correspond to an existing file,
         # it's likely a client-side route. Serve the main index.html
@@ -560,12 +848,29 @@ def serve_react_app(path):
         logger.debug(
             f"Path '{path}' not found as static file, serving index.html for client-side routing."
         )
-        return send_from_directory(app.static_folder, "index.html")
+        return send_from_directory(current_app.static_folder, "index.html")
+
+
+# --- App Factory ---
+def create_app(db_path=None):
+    """
+    Build the Flask app serving the API and the React build for the database
+    at db_path (default: DEFAULT_DB_PATH). Production servers call this once
+    per worker (see serve.py).
+    """
+    app = Flask(
+        __name__,
+        static_folder=str(STATIC_DIR),
+        # static_url_path=""  # Keep default static path relative to static_folder
+    )
+    app.config["DB_PATH"] = str(db_path or DEFAULT_DB_PATH)
+    app.register_blueprint(api)
+    return app
 
 
 # --- Run Server ---
 if __name__ == "__main__":
-    logger.info("Starting Flask application...")
-    # Set debug=False for production/stable environments
+    logger.info("Starting Flask development server...")
+    # Single process; use `python -m news_grouping_app.serve` in production
     # Host 0.0.0.0 makes it accessible outside the container
-    app.run(host="0.0.0.0", port=8501, debug=False)
+    create_app().run(host="0.0.0.0", port=8501, debug=False)
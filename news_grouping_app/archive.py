@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+archive.py
+
+Retention tiers for the live database. Data grouping no longer needs moves to
+an archive database next to it (news.db -> news_archive.db), which uses the
+same table names and is attached as `archive` when read:
+
+- Groups with no new members for GROUP_ARCHIVE_AFTER_DAYS move there with
+  their memberships, and so do their articles (unless an article is also in a
+  live group or an exemplar) and the article bodies. Data used only to match
+  new articles against old ones (text vectors, MinHash fingerprints, duplicate
+  links, centroids) is dropped. Entity, company and CVE mentions stay live;
+  CVE mentions take the article's link and source along, so the CVE summary
+  keeps counting and listing them.
+  Archived links are kept in `archived_links` so scrapers do not store the
+  same articles again.
+- Bodies of live articles published more than ARTICLE_BODY_ARCHIVE_AFTER_DAYS
+  ago move to archive.article_bodies. get_article_bodies() reads them there.
+
+Every batch is one transaction across both databases, so an interrupted run
+loses nothing and the next run continues. The API returns archived groups when
+called with include_archived=1.
+
+Usage:
+    python -m news_grouping_app.archive                 # apply the configured policy
+    python -m news_grouping_app.archive --group-days 60 --vacuum
+"""
+
+import argparse
+import logging
+import sqlite3
+import sys
+from datetime import datetime, timedelta, timezone
+
+from news_grouping_app.db.database import (
+    DEFAULT_DB_PATH,
+    compact_article_bodies,
+    get_archive_db_path,
+    get_connection,
+)
+from news_grouping_app.search import sync_search_index, unindex_articles
+from news_grouping_app.analysis.cve_extraction import refresh_cve_mentions_summary
+from news_grouping_app.config import ARTICLE_BODY_ARCHIVE_AFTER_DAYS, GROUP_ARCHIVE_AFTER_DAYS
+from news_grouping_app.utils import SQLITE_DATETIME_FORMAT
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_GROUP_BATCH_SIZE = 200  # Groups moved per transaction
+ARCHIVE_BODY_BATCH_SIZE = 2000  # Bodies moved per transaction
+ARCHIVED_LINK_GUARD_DAYS = 180  # Feeds no longer list links this old
+
+ARCHIVE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS archive.articles (
+        id INTEGER PRIMARY KEY,
+        link TEXT,
+        title TEXT,
+        published_date TIMESTAMP,
+        source TEXT,
+        processed_date TIMESTAMP,
+        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS archive.article_bodies (
+        article_id INTEGER PRIMARY KEY,
+        codec TEXT NOT NULL,
+        blob BLOB NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS archive.two_phase_article_groups (
+        group_id INTEGER PRIMARY KEY,
+        main_topic TEXT NOT NULL,
+        sub_topic TEXT NOT NULL,
+        group_label TEXT NOT NULL,
+        description TEXT,
+        consistency_score FLOAT,
+        created_at TIMESTAMP,
+        updated_at TIMESTAMP,
+        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS archive.two_phase_article_group_memberships (
+        article_id INTEGER NOT NULL,
+        group_id INTEGER NOT NULL,
+        added_at TIMESTAMP,
+        PRIMARY KEY (group_id, article_id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS archive.idx_archived_groups_topic ON two_phase_article_groups(main_topic)",
+]
+
+# Live rows removed with an archived group / article (foreign keys are not enforced)
+LIVE_GROUP_TABLES = (
+    "two_phase_article_group_memberships",
+    "group_entities",
+    "group_consistency_state",
+    "group_text_centroids",
+    "two_phase_article_groups",
+)
+LIVE_ARTICLE_TABLES = (
+    ("article_text_vectors", "article_id"),
+    ("article_fingerprints", "article_id"),
+    ("article_lsh_buckets", "article_id"),
+    ("article_duplicates", "article_id"),
+    ("article_duplicates", "canonical_id"),
+    ("two_phase_subgroup_memberships", "article_id"),
+    ("articles", "id"),  # Triggers drop the live body and queue co-occurrence updates
+)
+
+
+def attach_archive(conn, db_path=DEFAULT_DB_PATH, create=False):
+    """
+    Attach the archive database of db_path to conn as `archive` (a no-op if
+    conn already has it). Without create, returns False (and attaches
+    nothing) if there is no archive yet.
+    """
+    archive_path = get_archive_db_path(db_path)
+    if not create and not archive_path.exists():
+        return False
+    if not any(row[1] == "archive" for row in conn.execute("PRAGMA database_list")):
+        conn.execute("ATTACH DATABASE ? AS archive", (str(archive_path),))
+    if create:
+        for statement in ARCHIVE_SCHEMA:
+            conn.execute(statement)
+        conn.commit()
+    return True
+
+
+def _cutoff(days):
+    return (datetime.now(timezone.utc) - timedelta(days=days)).strftime(SQLITE_DATETIME_FORMAT)
+
+
+def find_inactive_groups(cursor, days):
+    """IDs of live groups with no member published or added in the last `days`."""
+    cursor.execute(
+        """
+        SELECT g.group_id
+        FROM two_phase_article_groups g
+        LEFT JOIN two_phase_article_group_memberships m ON m.group_id = g.group_id
+        LEFT JOIN articles a ON a.id = m.article_id
+        GROUP BY g.group_id
+        HAVING MAX(
+            COALESCE(MAX(a.published_date), ''),
+            COALESCE(MAX(m.added_at), ''),
+            COALESCE(g.updated_at, g.created_at, '')
+        ) < ?
+        """,
+        (_cutoff(days),),
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _archive_group_batch(cursor, group_ids, db_path):
+    """Move one batch of groups and their articles. Returns the number of articles moved."""
+    cursor.execute("DELETE FROM temp.archive_batch_groups")
+    cursor.execute("DELETE FROM temp.archive_batch_articles")
+    cursor.executemany("INSERT INTO temp.archive_batch_groups (group_id) VALUES (?)", [(g,) for g in group_ids])
+    # Articles that belong only to groups in this batch and are not exemplars
+    cursor.execute(
+        """
+        INSERT OR IGNORE INTO temp.archive_batch_articles (article_id)
+        SELECT m.article_id
+        FROM two_phase_article_group_memberships m
+        WHERE m.group_id IN (SELECT group_id FROM temp.archive_batch_groups)
+          AND NOT EXISTS (
+              SELECT 1 FROM two_phase_article_group_memberships x
+              WHERE x.article_id = m.article_id
+                AND x.group_id NOT IN (SELECT group_id FROM temp.archive_batch_groups)
+          )
+          AND NOT EXISTS (SELECT 1 FROM exemplar_articles e WHERE e.article_id = m.article_id)
+        """
+    )
+    unindex_articles(
+        cursor, [row[0] for row in cursor.execute("SELECT article_id FROM temp.archive_batch_articles")], db_path
+    )
+    cursor.execute(
+        """
+        INSERT OR REPLACE INTO archive.two_phase_article_groups
+            (group_id, main_topic, sub_topic, group_label, description, consistency_score, created_at, updated_at)
+        SELECT group_id, main_topic, sub_topic, group_label, description, consistency_score, created_at, updated_at
+        FROM main.two_phase_article_groups
+        WHERE group_id IN (SELECT group_id FROM temp.archive_batch_groups)
+        """
+    )
+    cursor.execute(
+        """
+        INSERT OR IGNORE INTO archive.two_phase_article_group_memberships (article_id, group_id, added_at)
+        SELECT article_id, group_id, added_at FROM main.two_phase_article_group_memberships
+        WHERE group_id IN (SELECT group_id FROM temp.archive_batch_groups)
+        """
+    )
+    cursor.execute(
+        """
+        INSERT OR REPLACE INTO archive.articles (id, link, title, published_date, source, processed_date)
+        SELECT id, link, title, published_date, source, processed_date FROM main.articles
+        WHERE id IN (SELECT article_id FROM temp.archive_batch_articles)
+        """
+    )
+    moved = cursor.rowcount
+    # Compressed bodies, plus any still inline (compaction normally ran just before)
+    cursor.execute(
+        """
+        INSERT OR REPLACE INTO archive.article_bodies (article_id, codec, blob)
+        SELECT article_id, codec, blob FROM main.article_bodies
+        WHERE article_id IN (SELECT article_id FROM temp.archive_batch_articles)
+        """
+    )
+    cursor.execute(
+        """
+        INSERT OR REPLACE INTO archive.article_bodies (article_id, codec, blob)
+        SELECT id, 'raw', content FROM main.articles
+        WHERE id IN (SELECT article_id FROM temp.archive_batch_articles) AND content IS NOT NULL
+        """
+    )
+    cursor.execute(
+        """
+        UPDATE main.article_cves SET
+            link = (SELECT a.link FROM main.articles a WHERE a.id = article_cves.article_id),
+            source = (SELECT a.source FROM main.articles a WHERE a.id = article_cves.article_id)
+        WHERE article_id IN (SELECT article_id FROM temp.archive_batch_articles)
+        """
+    )
+    cursor.execute(
+        """
+        INSERT OR IGNORE INTO archived_links (link)
+        SELECT link FROM main.articles
+        WHERE id IN (SELECT article_id FROM temp.archive_batch_articles) AND link IS NOT NULL
+        """
+    )
+
+    for table in LIVE_GROUP_TABLES:
+        cursor.execute(f"DELETE FROM main.{table} WHERE group_id IN (SELECT group_id FROM temp.archive_batch_groups)")
+    for table, column in LIVE_ARTICLE_TABLES:
+        cursor.execute(
+            f"DELETE FROM main.{table} WHERE {column} IN (SELECT article_id FROM temp.archive_batch_articles)"
+        )
+    return moved
+
+
+def restore_archived_cve_mentions(conn):
+    """
+    Copy link and source from archive.articles onto CVE mentions of articles
+    archived before article_cves kept them, and refresh those CVEs' summary
+    rows. Returns the number of CVEs refreshed.
+    """
+    cursor = conn.cursor()
+    orphaned = (
+        "link IS NULL AND article_id NOT IN (SELECT id FROM main.articles) "
+        "AND article_id IN (SELECT id FROM archive.articles)"
+    )
+    cve_ids = [
+        row[0] for row in cursor.execute(f"SELECT DISTINCT cve_id FROM main.article_cves WHERE {orphaned}").fetchall()
+    ]
+    if not cve_ids:
+        return 0
+    cursor.execute(
+        f"""
+        UPDATE main.article_cves SET
+            link = (SELECT a.link FROM archive.articles a WHERE a.id = article_cves.article_id),
+            source = (SELECT a.source FROM archive.articles a WHERE a.id = article_cves.article_id)
+        WHERE {orphaned}
+        """
+    )
+    refresh_cve_mentions_summary(cve_ids, cursor=cursor)
+    conn.commit()
+    logger.info(f"Restored archived mentions of {len(cve_ids)} CVEs to the CVE summary.")
+    return len(cve_ids)
+
+
+def archive_inactive_groups(conn, days=GROUP_ARCHIVE_AFTER_DAYS, db_path=str(DEFAULT_DB_PATH)):
+    """
+    Move groups inactive for `days` to the attached archive, one committed
+    batch at a time. Returns (groups, articles) moved.
+    """
+    cursor = conn.cursor()
+    cursor.execute("CREATE TEMP TABLE IF NOT EXISTS archive_batch_groups (group_id INTEGER PRIMARY KEY)")
+    cursor.execute("CREATE TEMP TABLE IF NOT EXISTS archive_batch_articles (article_id INTEGER PRIMARY KEY)")
+    group_ids = find_inactive_groups(cursor, days)
+    groups = articles = 0
+    for start in range(0, len(group_ids), ARCHIVE_GROUP_BATCH_SIZE):
+        batch = group_ids[start : start + ARCHIVE_GROUP_BATCH_SIZE]
+        articles += _archive_group_batch(cursor, batch, db_path)
+        conn.commit()
+        groups += len(batch)
+    if groups:
+        logger.info(f"Archived {groups} groups inactive for {days} days, with {articles} articles.")
+    return groups, articles
+
+
+def archive_old_article_bodies(conn, days=ARTICLE_BODY_ARCHIVE_AFTER_DAYS):
+    """Move compressed bodies of live articles published before the cutoff. Returns the count."""
+    cursor = conn.cursor()
+    cutoff = _cutoff(days)
+    moved = 0
+    while True:
+        ids = [
+            row[0]
+            for row in cursor.execute(
+                """
+                SELECT b.article_id FROM main.article_bodies b
+                JOIN main.articles a ON a.id = b.article_id
+                WHERE a.published_date < ? AND b.codec != 'raw'
+                LIMIT ?
+                """,
+                (cutoff, ARCHIVE_BODY_BATCH_SIZE),
+            ).fetchall()
+        ]
+        if not ids:
+            break
+        placeholders = ",".join("?" for _ in ids)
+        cursor.execute(
+            f"""
+            INSERT OR REPLACE INTO archive.article_bodies (article_id, codec, blob)
+            SELECT article_id, codec, blob FROM main.article_bodies WHERE article_id IN ({placeholders})
+            """,
+            ids,
+        )
+        cursor.execute(f"DELETE FROM main.article_bodies WHERE article_id IN ({placeholders})", ids)
+        conn.commit()
+        moved += len(ids)
+    if moved:
+        logger.info(f"Moved {moved} bodies of articles older than {days} days to the archive.")
+    return moved
+
+
+def run_retention(
+    db_path=str(DEFAULT_DB_PATH),
+    group_days=GROUP_ARCHIVE_AFTER_DAYS,
+    body_days=ARTICLE_BODY_ARCHIVE_AFTER_DAYS,
+):
+    """
+    Apply both retention tiers (a tier with 0 days is skipped) and give the
+    freed pages back if the database uses incremental auto-vacuum.
+    Returns {"groups", "articles", "bodies"} counts moved.
+    """
+    stats = {"groups": 0, "articles": 0, "bodies": 0}
+    if group_days <= 0 and body_days <= 0:
+        return stats
+    compact_article_bodies(db_path=db_path)  # Only compressed bodies are moved
+    conn = None
+    try:
+        conn = get_connection(db_path)
+        attach_archive(conn, db_path, create=True)
+        restore_archived_cve_mentions(conn)  # No-op once earlier archives are covered
+        if group_days > 0:
+            stats["groups"], stats["articles"] = archive_inactive_groups(conn, group_days, db_path)
+        if body_days > 0:
+            stats["bodies"] = archive_old_article_bodies(conn, body_days)
+        conn.execute(
+            "DELETE FROM archived_links WHERE archived_at < datetime('now', ?)",
+            (f"-{ARCHIVED_LINK_GUARD_DAYS} days",),
+        )
+        conn.commit()
+        if conn.execute("PRAGMA main.auto_vacuum").fetchone()[0] == 2:
+            conn.execute("PRAGMA main.incremental_vacuum").fetchall()  # Frees pages as it steps
+    except sqlite3.Error as e:
+        logger.error(f"Error applying retention policy: {e}", exc_info=True)
+        if conn and conn.in_transaction:
+            conn.rollback()
+    finally:
+        if conn:
+            conn.close()
+    sync_search_index(db_path=db_path)
+    return stats
+
+
+def enable_incremental_vacuum(db_path=str(DEFAULT_DB_PATH)):
+    """
+    Switch the live database to incremental auto-vacuum (rewrites the file
+    once with VACUUM), so later retention runs shrink it as they go.
+    """
+    conn = sqlite3.connect(str(db_path))
+    try:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Move inactive groups and old article bodies to the archive database.")
+    arg_parser.add_argument("--group-days", type=int, default=GROUP_ARCHIVE_AFTER_DAYS,
+                            help="Archive groups with no activity for this many days (0 = skip)")
+    arg_parser.add_argument("--body-days", type=int, default=ARTICLE_BODY_ARCHIVE_AFTER_DAYS,
+                            help="Archive bodies of articles older than this many days (0 = skip)")
+    arg_parser.add_argument("--vacuum", action="store_true",
+                            help="Afterwards, rewrite the live database with incremental auto-vacuum enabled")
+    arg_parser.add_argument("--db", default=str(DEFAULT_DB_PATH), help="Path to the SQLite database")
+    args = arg_parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    stats = run_retention(args.db, args.group_days, args.body_days)
+    logger.info(
+        f"Retention: {stats['groups']} groups, {stats['articles']} articles and "
+        f"{stats['bodies']} bodies moved to {get_archive_db_path(args.db)}."
+    )
+    if args.vacuum:
+        enable_incremental_vacuum(args.db)
+        logger.info("Live database vacuumed; incremental auto-vacuum enabled.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
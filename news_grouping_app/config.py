@@ -5,3 +5,66 @@ import os
 #   export OPENAI_MODEL="gpt-4.1-mini"
 #OPENAI_MODEL = os.getenv("OPENAI_MODEL", "o3-mini")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4.1-mini")
+
+# Single-pass extraction: one LLM prompt per batch returns entities and companies
+# (and, with EXTRACT_EXTENDED_FIELDS, authors, quotes, named events and external
+# references) instead of separate entity and company passes.
+UNIFIED_EXTRACTION = os.getenv("UNIFIED_EXTRACTION", "true").lower() in ("1", "true", "yes")
+EXTRACT_EXTENDED_FIELDS = os.getenv("EXTRACT_EXTENDED_FIELDS", "true").lower() in ("1", "true", "yes")
+
+# Largest response the model is expected to produce for one batched prompt.
+# Batches are sized so their expected output stays under this.
+MAX_OUTPUT_TOKENS = int(os.getenv("MAX_OUTPUT_TOKENS", "16000"))
+
+# Streaming pipeline: scraping, CVE regex, extraction, signatures and grouping
+# run as concurrent stages joined by bounded queues, so articles are grouped
+# while scrapers are still running. Set to false for the phased pipeline.
+STREAMING_PIPELINE = os.getenv("STREAMING_PIPELINE", "true").lower() in ("1", "true", "yes")
+# Batches buffered between two stages before the upstream stage blocks
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "4"))
+
+# Scheduler (main.main). Each scraper is polled on its own interval, derived
+# from how often its source published over the last week and clamped to
+# [SCRAPER_MIN_INTERVAL_MINUTES, SCRAPER_MAX_INTERVAL_MINUTES]; sources with no
+# history start at SCHEDULE_INTERVAL_MINUTES.
+SCHEDULE_INTERVAL_MINUTES = int(os.getenv("SCHEDULE_INTERVAL_MINUTES", "15"))
+SCRAPER_MIN_INTERVAL_MINUTES = int(os.getenv("SCRAPER_MIN_INTERVAL_MINUTES", "5"))
+SCRAPER_MAX_INTERVAL_MINUTES = int(os.getenv("SCRAPER_MAX_INTERVAL_MINUTES", "120"))
+# Extraction/grouping run once this many new articles are waiting, or when the
+# oldest has waited GROUPING_MAX_WAIT_MINUTES
+GROUPING_MIN_NEW_ARTICLES = int(os.getenv("GROUPING_MIN_NEW_ARTICLES", "10"))
+GROUPING_MAX_WAIT_MINUTES = int(os.getenv("GROUPING_MAX_WAIT_MINUTES", "30"))
+TRENDING_INTERVAL_MINUTES = int(os.getenv("TRENDING_INTERVAL_MINUTES", "60"))
+
+# Retention (archive.py). Groups with no new members for GROUP_ARCHIVE_AFTER_DAYS
+# move to the archive database with their articles and stop taking part in
+# grouping and merging; bodies of articles published more than
+# ARTICLE_BODY_ARCHIVE_AFTER_DAYS ago move there even while their group is live.
+# 0 disables a tier. The scheduler runs retention every RETENTION_INTERVAL_HOURS.
+GROUP_ARCHIVE_AFTER_DAYS = int(os.getenv("GROUP_ARCHIVE_AFTER_DAYS", "30"))
+ARTICLE_BODY_ARCHIVE_AFTER_DAYS = int(os.getenv("ARTICLE_BODY_ARCHIVE_AFTER_DAYS", "14"))
+RETENTION_INTERVAL_HOURS = int(os.getenv("RETENTION_INTERVAL_HOURS", "24"))
+# Removal of stale trends and change_log events, also run by the scheduler
+CLEANUP_INTERVAL_MINUTES = int(os.getenv("CLEANUP_INTERVAL_MINUTES", "60"))
+
+# Grouping candidates. New articles are matched only against groups whose latest
+# member was published within ACTIVE_GROUP_WINDOW_DAYS (0 = all groups). With
+# SECOND_CHANCE_GROUP_SEARCH, an article no active group takes is compared with
+# its closest older groups before it starts a new one.
+ACTIVE_GROUP_WINDOW_DAYS = int(os.getenv("ACTIVE_GROUP_WINDOW_DAYS", "14"))
+SECOND_CHANCE_GROUP_SEARCH = os.getenv("SECOND_CHANCE_GROUP_SEARCH", "true").lower() in ("1", "true", "yes")
+
+# Live updates (/api/stream). The endpoint polls change_log every
+# STREAM_POLL_SECONDS and ends a connection after STREAM_MAX_SECONDS (browsers
+# reconnect and resume from the last event id). Events older than
+# CHANGE_LOG_RETENTION_HOURS are pruned by the hourly cleanup.
+STREAM_POLL_SECONDS = float(os.getenv("STREAM_POLL_SECONDS", "1"))
+STREAM_MAX_SECONDS = int(os.getenv("STREAM_MAX_SECONDS", "300"))
+CHANGE_LOG_RETENTION_HOURS = int(os.getenv("CHANGE_LOG_RETENTION_HOURS", "48"))
+
+# Web server (python -m news_grouping_app.serve). Requests are read-only and
+# SQLite reads scale across processes, so the server runs WEB_WORKERS gunicorn
+# processes of WEB_THREADS threads each; an open /api/stream holds a thread.
+WEB_BIND = os.getenv("WEB_BIND", "0.0.0.0:8501")
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", str(min(2 * (os.cpu_count() or 1) + 1, 8))))
+WEB_THREADS = int(os.getenv("WEB_THREADS", "8"))
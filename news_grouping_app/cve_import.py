@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+cve_import.py
+
+Offline bulk import of CVE JSON 5.x records into `cve_info`, from a local
+checkout of the CVE List (github.com/CVEProject/cvelistV5) or a zip of it,
+including the nested "cves.zip" bundles published as release assets.
+
+By default only CVEs referenced in `article_cves` are parsed; pass --all to
+import every record. Files are streamed one at a time and written in batches,
+so memory stays bounded regardless of archive size.
+
+Usage:
+    python -m news_grouping_app.cve_import /path/to/cvelistV5/cves
+    python -m news_grouping_app.cve_import cves.zip --all
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import time
+import zipfile
+
+from news_grouping_app.db.database import (
+    DEFAULT_DB_PATH,
+    get_connection,
+    insert_or_update_cve_info_bulk,
+    upsert_cve_records_bulk,
+)
+from news_grouping_app.analysis.cve_extraction import (
+    CVE_API_URL,
+    CVE_RECORD_CODEC,
+    compress_cve_record,
+    parse_cve_record,
+    refresh_cve_mentions_summary,
+)
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = 1000
+# CVE List files are named after the record, e.g. cves/2024/0xxx/CVE-2024-0001.json
+CVE_FILENAME_RE = re.compile(r"(CVE-\d{4}-\d{4,})\.json$", re.IGNORECASE)
+
+
+def _iter_zip(zf, wanted):
+    """Yield (cve_id, raw_bytes) for matching members of an open ZipFile, recursing into nested zips."""
+    for info in zf.infolist():
+        if info.is_dir():
+            continue
+        name = info.filename
+        if name.lower().endswith(".zip"):
+            with zf.open(info) as nested_fh, zipfile.ZipFile(nested_fh) as nested:
+                yield from _iter_zip(nested, wanted)
+            continue
+        match = CVE_FILENAME_RE.search(name)
+        if not match:
+            continue
+        cve_id = match.group(1).upper()
+        if wanted is not None and cve_id not in wanted:
+            continue
+        with zf.open(info) as fh:
+            yield cve_id, fh.read()
+
+
+def iter_cve_files(source, wanted=None):
+    """
+    Stream (cve_id, raw_bytes) pairs from a directory tree or zip archive.
+    If `wanted` is a set, files for other CVE IDs are skipped without being read.
+    """
+    if os.path.isdir(source):
+        for root, _dirs, files in os.walk(source):
+            for filename in files:
+                match = CVE_FILENAME_RE.search(filename)
+                if not match:
+                    continue
+                cve_id = match.group(1).upper()
+                if wanted is not None and cve_id not in wanted:
+                    continue
+                with open(os.path.join(root, filename), "rb") as fh:
+                    yield cve_id, fh.read()
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as zf:
+            yield from _iter_zip(zf, wanted)
+    else:
+        raise ValueError(f"{source} is neither a directory nor a zip archive")
+
+
+def get_referenced_cve_counts(db_path=DEFAULT_DB_PATH):
+    """Return {cve_id: mention_count} for every CVE in `article_cves`."""
+    conn = get_connection(db_path)
+    try:
+        return dict(
+            conn.execute(
+                "SELECT cve_id, COUNT(*) FROM article_cves GROUP BY cve_id"
+            ).fetchall()
+        )
+    finally:
+        conn.close()
+
+
+def import_cve_records(source, import_all=False, cache_records=True, db_path=DEFAULT_DB_PATH):
+    """
+    Parse CVE JSON 5.x records from `source` and bulk-upsert them into `cve_info`
+    (and, if cache_records, the compressed raw record into `cve_records`).
+    Returns a dict of counts: scanned, imported, skipped.
+    """
+    mention_counts = get_referenced_cve_counts(db_path)
+    wanted = None if import_all else set(mention_counts)
+    if wanted is not None and not wanted:
+        logger.info("No CVEs referenced in article_cves; nothing to import.")
+        return {"scanned": 0, "imported": 0, "skipped": 0}
+
+    stats = {"scanned": 0, "imported": 0, "skipped": 0}
+    imported_referenced = []
+    info_rows = []
+    record_rows = []
+    start_time = time.time()
+
+    conn = get_connection(db_path)
+    cursor = conn.cursor()
+
+    def flush():
+        if not info_rows:
+            return
+        if not insert_or_update_cve_info_bulk(info_rows, db_path=db_path, cursor=cursor):
+            raise sqlite3.Error("bulk upsert into cve_info failed")
+        if record_rows and not upsert_cve_records_bulk(record_rows, db_path=db_path, cursor=cursor):
+            raise sqlite3.Error("bulk upsert into cve_records failed")
+        conn.commit()
+        info_rows.clear()
+        record_rows.clear()
+        logger.info(f"Imported {stats['imported']} CVE records ({stats['scanned']} scanned)...")
+
+    try:
+        for cve_id, raw in iter_cve_files(source, wanted):
+            stats["scanned"] += 1
+            try:
+                data = json.loads(raw)
+            except ValueError as e:
+                logger.warning(f"Skipping {cve_id}: invalid JSON ({e})")
+                stats["skipped"] += 1
+                continue
+            metadata = data.get("cveMetadata") or {}
+            if metadata.get("state") == "REJECTED":
+                stats["skipped"] += 1
+                continue
+            fields = parse_cve_record(data)
+            if fields is None:
+                stats["skipped"] += 1
+                continue
+
+            info_rows.append(
+                (
+                    cve_id,
+                    fields["base_score"],
+                    fields["vendor"],
+                    fields["affected_products"],
+                    CVE_API_URL.format(cve_id=cve_id),
+                    fields["vendor_link"],
+                    fields["solution"],
+                    mention_counts.get(cve_id, 0),
+                    None,
+                )
+            )
+            if cache_records:
+                record_rows.append((cve_id, CVE_RECORD_CODEC, compress_cve_record(data)))
+            if cve_id in mention_counts:
+                imported_referenced.append(cve_id)
+            stats["imported"] += 1
+
+            if len(info_rows) >= IMPORT_BATCH_SIZE:
+                flush()
+        flush()
+
+        if imported_referenced:
+            refresh_cve_mentions_summary(imported_referenced, db_path=db_path, cursor=cursor)
+            conn.commit()
+    except sqlite3.Error as e:
+        logger.error(f"Database error during CVE import: {e}", exc_info=True)
+        conn.rollback()
+    finally:
+        conn.close()
+
+    logger.info(
+        f"CVE import finished in {time.time() - start_time:.2f}s. Scanned: {stats['scanned']}, Imported: {stats['imported']}, Skipped: {stats['skipped']}."
+    )
+    return stats
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Import CVE JSON 5.x records into cve_info.")
+    arg_parser.add_argument("source", help="CVE List directory or zip archive")
+    arg_parser.add_argument(
+        "--all", action="store_true", help="Import every record, not just CVEs referenced in articles"
+    )
+    arg_parser.add_argument(
+        "--no-cache", action="store_true", help="Do not store compressed raw records in cve_records"
+    )
+    arg_parser.add_argument("--db", default=DEFAULT_DB_PATH, help="Path to the SQLite database")
+    args = arg_parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    try:
+        import_cve_records(
+            args.source, import_all=args.all, cache_records=not args.no_cache, db_path=args.db
+        )
+    except ValueError as e:
+        logger.error(str(e))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,12 +6,31 @@ Updates various date/time columns across multiple tables in `db/news.db`
 so that each timestamp is stored in the 'YYYY-MM-DD HH:MM:SS' UTC format
 that SQLite can parse easily with strftime().
 
+New rows are normalized when they are written (see utils.normalize_date), so
+this only has to convert rows stored before that. It is a one-shot job: each
+column is walked in rowid order in batches, with the highest rowid processed
+kept as a watermark, so an interrupted run resumes where it stopped. Once every
+column is done, later calls return immediately.
+
 Backup your database before running!
 """
 
 import sqlite3
-from datetime import timezone
-from dateutil import parser
+import logging
+
+from news_grouping_app.db.database import (
+    DEFAULT_DB_PATH,
+    get_connection,
+    get_watermark,
+    refresh_group_activity_dates,
+    set_watermark,
+)
+from news_grouping_app.utils import SQLITE_DATETIME_PATTERN, to_utc_sqlite_str
+
+logger = logging.getLogger(__name__)
+
+DATE_MIGRATION_BATCH_SIZE = 2000  # Rows read, converted and committed per batch
+DATE_MIGRATION_DONE_WATERMARK = "date_migration_done"
 
 # List which tables & columns need date updates:
 # (If you have additional tables/columns with dates, add them here)
@@ -64,59 +83,92 @@ TABLES_WITH_DATE_COLUMNS = {
 
 def convert_to_utc_sqlite_format(date_str):
     """
-    Parses a date string via dateutil, converts to UTC,
-    and returns 'YYYY-MM-DD HH:MM:SS'.
+    Parses a date string and returns 'YYYY-MM-DD HH:MM:SS' UTC
+    (naive dates are assumed to be UTC). Raises ValueError if unparseable.
     """
-    dt = parser.parse(date_str)
-    # If no timezone info, assume UTC:
-    if dt.tzinfo is None:
-        dt = dt.replace(tzinfo=timezone.utc)
-    # Convert to UTC just in case:
-    dt_utc = dt.astimezone(timezone.utc)
-    # Format as 'YYYY-MM-DD HH:MM:SS' (which SQLite recognizes):
-    return dt_utc.strftime("%Y-%m-%d %H:%M:%S")
-
-
-def main():
-    db_path = "db/news.db"  # Adjust if needed
-    conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
-
-    for table_name, date_cols in TABLES_WITH_DATE_COLUMNS.items():
-        for col_name in date_cols:
-            print(f"\nProcessing {table_name}.{col_name} ...")
-            # We'll select rowid and the date column so we can update row by row:
-            select_sql = f"SELECT rowid, {col_name} FROM {table_name} WHERE {col_name} IS NOT NULL"
-            try:
-                rows = cur.execute(select_sql).fetchall()
-            except sqlite3.Error as e:
-                print(f"SKIP {table_name}.{col_name} (SQL error): {e}")
+    converted = to_utc_sqlite_str(date_str)
+    if converted is None:
+        raise ValueError(f"Unparseable date: {date_str!r}")
+    return converted
+
+
+def _column_watermark(table_name, col_name):
+    return f"date_migration:{table_name}.{col_name}"
+
+
+def migrate_column(cursor, conn, table_name, col_name, db_path=DEFAULT_DB_PATH):
+    """
+    Normalize one column from its watermark onwards, committing after each
+    batch. Returns the number of rows updated.
+    """
+    watermark = _column_watermark(table_name, col_name)
+    last_rowid = get_watermark(watermark, db_path=db_path, cursor=cursor)
+    updated = 0
+    while True:
+        rows = cursor.execute(
+            f"SELECT rowid, {col_name} FROM {table_name} WHERE rowid > ? ORDER BY rowid LIMIT ?",
+            (last_rowid, DATE_MIGRATION_BATCH_SIZE),
+        ).fetchall()
+        if not rows:
+            break
+        changes = []
+        for rowid, old_date in rows:
+            if not old_date or (isinstance(old_date, str) and SQLITE_DATETIME_PATTERN.match(old_date)):
                 continue
+            new_date = to_utc_sqlite_str(old_date)
+            if new_date is None:
+                logger.warning(f"Could not parse '{old_date}' in {table_name}.{col_name} (rowid={rowid})")
+            elif new_date != old_date:
+                changes.append((new_date, rowid))
+        cursor.executemany(f"UPDATE {table_name} SET {col_name} = ? WHERE rowid = ?", changes)
+        last_rowid = rows[-1][0]
+        set_watermark(watermark, last_rowid, db_path=db_path, cursor=cursor)
+        conn.commit()  # Changes and watermark together, so a restart resumes here
+        updated += len(changes)
+    return updated
 
-            for rowid, old_date_str in rows:
-                if not old_date_str:
-                    continue
+
+def main(db_path=DEFAULT_DB_PATH):
+    """Run the migration if it has not completed yet. Returns rows updated."""
+    conn = get_connection(db_path)
+    cursor = conn.cursor()
+    total = 0
+    complete = True
+    try:
+        if get_watermark(DATE_MIGRATION_DONE_WATERMARK, cursor=cursor):
+            logger.debug("Date migration already completed; skipping.")
+            return 0
+
+        for table_name, date_cols in TABLES_WITH_DATE_COLUMNS.items():
+            for col_name in date_cols:
                 try:
-                    new_date_str = convert_to_utc_sqlite_format(old_date_str)
-                    # Update if it actually changed, to reduce churn:
-                    if new_date_str != old_date_str:
-                        update_sql = (
-                            f"UPDATE {table_name} SET {col_name} = ? WHERE rowid = ?"
-                        )
-                        cur.execute(update_sql, (new_date_str, rowid))
-                        print(
-                            f"  {table_name} rowid={rowid}: '{old_date_str}' -> '{new_date_str}'"
-                        )
-                except Exception as parse_err:
-                    print(
-                        f"  WARNING: Could not parse '{old_date_str}' in {table_name}.{col_name}: {parse_err}"
-                    )
-
-            conn.commit()  # Commit after each column to keep changes so far
-
-    conn.close()
-    print("\nDone. Remember to verify with a SELECT or test queries.")
+                    updated = migrate_column(cursor, conn, table_name, col_name, db_path)
+                except sqlite3.Error as e:
+                    conn.rollback()
+                    logger.warning(f"SKIP {table_name}.{col_name} (SQL error): {e}")
+                    if "no such" not in str(e):  # Missing tables/columns have nothing to convert
+                        complete = False  # e.g. locked; resume from the watermark next time
+                    continue
+                if updated:
+                    logger.info(f"Normalized {updated} dates in {table_name}.{col_name}.")
+                total += updated
+
+        if complete:
+            try:
+                # Backfilled from the unconverted dates, and MAX over those kept them
+                refresh_group_activity_dates(cursor=cursor)
+            except sqlite3.Error as e:
+                logger.warning(f"Could not refresh group_activity dates: {e}")
+            set_watermark(DATE_MIGRATION_DONE_WATERMARK, 1, cursor=cursor)
+            conn.commit()
+            logger.info(f"Date migration completed; {total} values normalized.")
+    finally:
+        if conn.in_transaction:
+            conn.rollback()  # Interrupted mid-batch; that batch is redone from the watermark
+        conn.close()
+    return total
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
     main()
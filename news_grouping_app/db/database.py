@@ -5,8 +5,15 @@ import time
 from datetime import datetime
 from pathlib import Path
 import json
+import hashlib
+import zlib
 import logging  # Import logging
 
+try:
+    import zstandard
+except ImportError:  # Optional; article bodies fall back to zlib
+    zstandard = None
+
 logger = logging.getLogger(__name__)  # Add logger for potential errors
 
 
@@ -30,6 +37,84 @@ def get_connection(db_path=DEFAULT_DB_PATH):
     return sqlite3.connect(str(db_path), timeout=10.0)
 
 
+SEARCH_TOKENIZER = "porter unicode61 remove_diacritics 2"
+# 'YYYY-MM-DD HH:MM:SS' (utils.SQLITE_DATETIME_PATTERN) for GLOB in SQL; only
+# dates of this form compare correctly as text
+SQLITE_DATETIME_GLOB = "[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9]"
+# article_search is contentless (index only; result text comes from articles and
+# article_bodies). SQLite 3.43+ can then still delete its rows by rowid; older
+# versions need the indexed values back (search.unindex_articles).
+ARTICLE_SEARCH_OPTIONS = "content=''" + (", contentless_delete=1" if sqlite3.sqlite_version_info >= (3, 43, 0) else "")
+ARTICLE_SEARCH_TRIGGERS = (
+    "trg_search_article_insert",
+    "trg_search_body_insert",
+    "trg_search_article_title",
+    "trg_search_article_delete",
+)
+
+
+def _latest_activity_date(new_date):
+    """
+    SQL for group_activity.last_article_date after a member dated `new_date`.
+    A stored date not in canonical form (backfilled before datemigration)
+    sorts above every canonical one, so it is replaced rather than kept by MAX.
+    """
+    return (
+        f"CASE WHEN last_article_date GLOB '{SQLITE_DATETIME_GLOB}' "
+        f"THEN MAX(last_article_date, {new_date}) ELSE {new_date} END"
+    )
+
+
+def _setup_search_tables(cursor):
+    """FTS5 tables and sync triggers. Articles indexed before the triggers existed are added by search.sync_search_index()."""
+    groups_indexed = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'group_search'"
+    ).fetchone()
+    article_search = cursor.execute("SELECT sql FROM sqlite_master WHERE name = 'article_search'").fetchone()
+    if article_search and ARTICLE_SEARCH_OPTIONS not in article_search[0]:
+        # Index that stored its own copy of every body (or lacks delete support): rebuilt by sync_search_index()
+        cursor.execute("DROP TABLE article_search")
+        for name in ARTICLE_SEARCH_TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+    cursor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS article_search USING fts5(title, body, "
+        f"{ARTICLE_SEARCH_OPTIONS}, tokenize='{SEARCH_TOKENIZER}')"
+    )
+    cursor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS group_search USING fts5(group_label, description, "
+        f"content='two_phase_article_groups', content_rowid='group_id', tokenize='{SEARCH_TOKENIZER}')"
+    )
+    if not groups_indexed:
+        cursor.execute("INSERT INTO group_search (group_search) VALUES ('rebuild')")
+    search_triggers = {
+        # Articles arriving with content are indexed by trg_search_body_insert instead
+        # Each article is indexed once, as first stored (a contentless row cannot be updated in place)
+        "trg_search_article_insert": "AFTER INSERT ON articles WHEN NEW.content IS NULL BEGIN "
+        "INSERT INTO article_search (rowid, title, body) VALUES (NEW.id, NEW.title, NULL); END",
+        "trg_search_body_insert": "AFTER INSERT ON article_bodies WHEN NEW.codec = 'raw' BEGIN "
+        "INSERT INTO article_search (rowid, title, body) "
+        "SELECT id, title, CAST(NEW.blob AS TEXT) FROM articles WHERE id = NEW.article_id "
+        "AND NOT EXISTS (SELECT 1 FROM article_search WHERE rowid = NEW.article_id); END",
+        "trg_search_group_insert": "AFTER INSERT ON two_phase_article_groups BEGIN "
+        "INSERT INTO group_search (rowid, group_label, description) "
+        "VALUES (NEW.group_id, NEW.group_label, NEW.description); END",
+        "trg_search_group_delete": "AFTER DELETE ON two_phase_article_groups BEGIN "
+        "INSERT INTO group_search (group_search, rowid, group_label, description) "
+        "VALUES ('delete', OLD.group_id, OLD.group_label, OLD.description); END",
+        "trg_search_group_update": "AFTER UPDATE OF group_label, description ON two_phase_article_groups BEGIN "
+        "INSERT INTO group_search (group_search, rowid, group_label, description) "
+        "VALUES ('delete', OLD.group_id, OLD.group_label, OLD.description); "
+        "INSERT INTO group_search (rowid, group_label, description) "
+        "VALUES (NEW.group_id, NEW.group_label, NEW.description); END",
+    }
+    if "contentless_delete" in ARTICLE_SEARCH_OPTIONS:
+        search_triggers["trg_search_article_delete"] = (
+            "AFTER DELETE ON articles BEGIN DELETE FROM article_search WHERE rowid = OLD.id; END"
+        )
+    for name, body in search_triggers.items():
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
+
 def setup_database(db_path=DEFAULT_DB_PATH):
     """
     Create all necessary tables with integer-based article IDs.
@@ -44,6 +129,8 @@ def setup_database(db_path=DEFAULT_DB_PATH):
         conn = get_connection(db_path)
         cursor = conn.cursor()
         logger.info(f"Setting up database schema in '{db_path}'...")
+        # Stored in the file: web server readers then never block pipeline writes
+        cursor.execute("PRAGMA journal_mode=WAL")
 
         # Articles Table
         cursor.execute(
@@ -90,6 +177,11 @@ def setup_database(db_path=DEFAULT_DB_PATH):
         )
         """
         )
+        # Members of one group (listings, centroids) and articles in a time window
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_memberships_group ON two_phase_article_group_memberships(group_id, article_id)"
+        )
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_articles_published_date ON articles(published_date)")
         logger.debug("Table 'two_phase_article_group_memberships' checked/created.")
 
         # Subgroup tables (Keep if still used, otherwise remove)
@@ -143,11 +235,19 @@ def setup_database(db_path=DEFAULT_DB_PATH):
             article_id INTEGER NOT NULL,
             cve_id TEXT NOT NULL,
             published_date TIMESTAMP,
+            link TEXT, /* Copied from the article when it is archived */
+            source TEXT,
             PRIMARY KEY (article_id, cve_id),
             FOREIGN KEY (article_id) REFERENCES articles (id) ON DELETE CASCADE
         )
         """
         )
+        cursor.execute("PRAGMA table_info(article_cves)")
+        article_cve_columns = [row[1] for row in cursor.fetchall()]
+        for column in ("link", "source"):
+            if column not in article_cve_columns:
+                # Mentions of archived articles keep these (archive.py)
+                cursor.execute(f"ALTER TABLE article_cves ADD COLUMN {column} TEXT")
         logger.debug("Table 'article_cves' checked/created.")
 
         cursor.execute(
@@ -169,6 +269,178 @@ def setup_database(db_path=DEFAULT_DB_PATH):
         )
         logger.debug("Table 'cve_info' checked/created.")
 
+        # Materialized per-CVE mention summary (maintained by cve_extraction)
+        cursor.execute(
+            """
+        CREATE TABLE IF NOT EXISTS cve_mentions_summary (
+            cve_id TEXT PRIMARY KEY,
+            times_seen INTEGER DEFAULT 0,
+            first_mention TIMESTAMP, /* Stored as TEXT 'YYYY-MM-DD HH:MM:SS' UTC */
+            last_mention TIMESTAMP, /* Stored as TEXT 'YYYY-MM-DD HH:MM:SS' UTC */
+            sources TEXT,
+            article_links TEXT, /* JSON list of {"url": ..., "source": ...} */
+            base_score REAL,
+            vendor TEXT,
+            affected_products TEXT,
+            vendor_link TEXT,
+            solution TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+        )
+        cursor.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_cve_summary_last_mention ON cve_mentions_summary(last_mention)
+        """
+        )
+        cursor.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_article_cves_cve_id ON article_cves(cve_id)
+        """
+        )
+        logger.debug("Table 'cve_mentions_summary' checked/created.")
+
+        # Incremental-processing watermarks (e.g. last article id scanned for CVEs)
+        cursor.execute(
+            """
+        CREATE TABLE IF NOT EXISTS pipeline_watermarks (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+        )
+        logger.debug("Table 'pipeline_watermarks' checked/created.")
+
+        # Scheduler state: per-source polling intervals (times are Unix epoch
+        # seconds) and named leases that keep two pipeline runs from overlapping
+        cursor.execute(
+            """
+        CREATE TABLE IF NOT EXISTS scraper_schedule (
+            source TEXT PRIMARY KEY,
+            interval_seconds INTEGER NOT NULL,
+            next_run_at REAL NOT NULL DEFAULT 0,
+            last_run_at REAL,
+            last_new_articles INTEGER NOT NULL DEFAULT 0,
+            empty_polls INTEGER NOT NULL DEFAULT 0
+        )
+        """
+        )
+        cursor.execute(
+            """
+        CREATE TABLE IF NOT EXISTS pipeline_locks (
+            name TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            acquired_at REAL NOT NULL,
+            expires_at REAL NOT NULL
+        )
+        """
+        )
+        logger.debug("Scheduler tables checked/created.")
+
+        # Local cache of raw CVE JSON records (compressed), so cve_info can be
+        # rebuilt without re-fetching from the API
+        cursor.execute(
+            """
+        CREATE TABLE IF NOT EXISTS cve_records (
+            cve_id TEXT PRIMARY KEY,
+            codec TEXT NOT NULL,
+            record BLOB NOT NULL,
+            fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+        )
+        logger.debug("Table 'cve_records' checked/created.")
+
+        # Near-duplicate detection: MinHash signatures, LSH band buckets and
+        # the duplicate -> canonical article links they produce
+        cursor.execute(
+            """
+        CREATE TABLE IF NOT EXISTS article_fingerprints (
+            article_id INTEGER PRIMARY KEY,
+            minhash BLOB NOT NULL,
+            FOREIGN KEY (article_id) REFERENCES articles (id) ON DELETE CASCADE
+        )
+        """
+        )
+        cursor.execute(
+            """
+        CREATE TABLE IF NOT EXISTS article_lsh_buckets (
+            bucket INTEGER NOT NULL,
+            article_id INTEGER NOT NULL,
+            PRIMARY KEY (bucket, article_id),
+            FOREIGN KEY (article_id) REFERENCES articles (id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+        """
+        )
+        cursor.execute(
+            """
+        CREATE TABLE IF NOT EXISTS article_duplicates (
+            article_id INTEGER PRIMARY KEY,
+            canonical_id INTEGER NOT NULL,
+            similarity REAL,
+            detected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (article_id) REFERENCES articles (id) ON DELETE CASCADE,
+            FOREIGN KEY (canonical_id) REFERENCES articles (id) ON DELETE CASCADE
+        )
+        """
+        )
+        cursor.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_article_duplicates_canonical ON article_duplicates(canonical_id)
+        """
+        )
+        logger.debug("Near-duplicate tables checked/created.")
+
+        # Hashed TF vectors per article, document frequencies and per-group
+        # centroids for local text similarity (see analysis/text_vectors.py)
+        cursor.execute(
+            """
+        CREATE TABLE IF NOT EXISTS article_text_vectors (
+            article_id INTEGER PRIMARY KEY,
+            indices BLOB NOT NULL,
+            weights BLOB NOT NULL,
+            FOREIGN KEY (article_id) REFERENCES articles (id) ON DELETE CASCADE
+        )
+        """
+        )
+        cursor.execute(
+            """
+        CREATE TABLE IF NOT EXISTS text_term_df (
+            feature INTEGER PRIMARY KEY,
+            df INTEGER NOT NULL DEFAULT 0
+        )
+        """
+        )
+        cursor.execute(
+            """
+        CREATE TABLE IF NOT EXISTS group_text_centroids (
+            group_id INTEGER PRIMARY KEY,
+            indices BLOB NOT NULL,
+            weights BLOB NOT NULL,
+            article_count INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (group_id) REFERENCES two_phase_article_groups (group_id) ON DELETE CASCADE
+        )
+        """
+        )
+        logger.debug("Text vector tables checked/created.")
+
+        # Groups awaiting a deferred consistency evaluation
+        cursor.execute(
+            """
+        CREATE TABLE IF NOT EXISTS group_consistency_state (
+            group_id INTEGER PRIMARY KEY,
+            dirty INTEGER NOT NULL DEFAULT 1,
+            marked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            evaluated_at TIMESTAMP,
+            evaluated_article_count INTEGER,
+            FOREIGN KEY (group_id) REFERENCES two_phase_article_groups (group_id) ON DELETE CASCADE
+        )
+        """
+        )
+        logger.debug("Table 'group_consistency_state' checked/created.")
+
         # Trending group tables
         cursor.execute(
             """
@@ -398,6 +670,243 @@ def setup_database(db_path=DEFAULT_DB_PATH):
         )
         logger.debug("Table 'article_authors' checked/created.")
 
+        # Daily entity co-occurrence counts per category. Triggers queue every
+        # article whose entities, groups or date change in entity_pair_dirty;
+        # analysis/entity_cooccurrence.py folds the queue into the counts.
+        cursor.execute(
+            """
+        CREATE TABLE IF NOT EXISTS entity_pair_daily (
+            day TEXT NOT NULL,
+            category TEXT NOT NULL,
+            e1 INTEGER NOT NULL,
+            e2 INTEGER NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (category, day, e1, e2)
+        ) WITHOUT ROWID
+        """
+        )
+        cursor.execute(
+            """
+        CREATE TABLE IF NOT EXISTS entity_pair_article_state (
+            article_id INTEGER PRIMARY KEY,
+            day TEXT NOT NULL,
+            categories TEXT NOT NULL, /* JSON array */
+            entity_ids TEXT NOT NULL /* JSON array */
+        )
+        """
+        )
+        cursor.execute(
+            """
+        CREATE TABLE IF NOT EXISTS entity_pair_dirty (
+            article_id INTEGER PRIMARY KEY
+        )
+        """
+        )
+        pair_triggers = {
+            "trg_pair_dirty_entity_insert": "AFTER INSERT ON article_entities BEGIN "
+            "INSERT OR IGNORE INTO entity_pair_dirty (article_id) VALUES (NEW.article_id); END",
+            "trg_pair_dirty_entity_delete": "AFTER DELETE ON article_entities BEGIN "
+            "INSERT OR IGNORE INTO entity_pair_dirty (article_id) VALUES (OLD.article_id); END",
+            "trg_pair_dirty_entity_update": "AFTER UPDATE OF article_id, entity_id ON article_entities BEGIN "
+            "INSERT OR IGNORE INTO entity_pair_dirty (article_id) VALUES (OLD.article_id), (NEW.article_id); END",
+            "trg_pair_dirty_membership_insert": "AFTER INSERT ON two_phase_article_group_memberships BEGIN "
+            "INSERT OR IGNORE INTO entity_pair_dirty (article_id) VALUES (NEW.article_id); END",
+            "trg_pair_dirty_membership_delete": "AFTER DELETE ON two_phase_article_group_memberships BEGIN "
+            "INSERT OR IGNORE INTO entity_pair_dirty (article_id) VALUES (OLD.article_id); END",
+            "trg_pair_dirty_membership_update": "AFTER UPDATE OF article_id, group_id ON two_phase_article_group_memberships BEGIN "
+            "INSERT OR IGNORE INTO entity_pair_dirty (article_id) VALUES (OLD.article_id), (NEW.article_id); END",
+            "trg_pair_dirty_group_topic": "AFTER UPDATE OF main_topic ON two_phase_article_groups BEGIN "
+            "INSERT OR IGNORE INTO entity_pair_dirty (article_id) "
+            "SELECT article_id FROM two_phase_article_group_memberships WHERE group_id = NEW.group_id; END",
+            "trg_pair_dirty_article_date": "AFTER UPDATE OF published_date ON articles BEGIN "
+            "INSERT OR IGNORE INTO entity_pair_dirty (article_id) VALUES (NEW.id); END",
+            "trg_pair_dirty_article_delete": "AFTER DELETE ON articles BEGIN "
+            "INSERT OR IGNORE INTO entity_pair_dirty (article_id) VALUES (OLD.id); END",
+        }
+        for name, body in pair_triggers.items():
+            cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+        logger.debug("Entity co-occurrence tables and triggers checked/created.")
+
+        # Article bodies live outside the hot articles row, compressed. Triggers
+        # move any content written to articles.content here as 'raw' text;
+        # compact_article_bodies() compresses it later.
+        cursor.execute(
+            """
+        CREATE TABLE IF NOT EXISTS article_bodies (
+            article_id INTEGER PRIMARY KEY,
+            codec TEXT NOT NULL, /* 'raw', 'zlib' or 'zstd' */
+            blob BLOB NOT NULL
+        )
+        """
+        )
+        body_triggers = {
+            "trg_article_body_insert": "AFTER INSERT ON articles WHEN NEW.content IS NOT NULL BEGIN "
+            "INSERT OR REPLACE INTO article_bodies (article_id, codec, blob) VALUES (NEW.id, 'raw', NEW.content); "
+            "UPDATE articles SET content = NULL WHERE id = NEW.id; END",
+            "trg_article_body_update": "AFTER UPDATE OF content ON articles WHEN NEW.content IS NOT NULL BEGIN "
+            "INSERT OR REPLACE INTO article_bodies (article_id, codec, blob) VALUES (NEW.id, 'raw', NEW.content); "
+            "UPDATE articles SET content = NULL WHERE id = NEW.id; END",
+            "trg_article_body_delete": "AFTER DELETE ON articles BEGIN "
+            "DELETE FROM article_bodies WHERE article_id = OLD.id; END",
+        }
+        for name, body in body_triggers.items():
+            cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+        logger.debug("Table 'article_bodies' and triggers checked/created.")
+
+        # Links of articles moved to the archive database (archive.py). Scrapers
+        # check `articles` for known links, so inserts of these are ignored here.
+        cursor.execute(
+            """
+        CREATE TABLE IF NOT EXISTS archived_links (
+            link TEXT PRIMARY KEY,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+        )
+        cursor.execute(
+            "CREATE TRIGGER IF NOT EXISTS trg_article_archived_link BEFORE INSERT ON articles "
+            "WHEN EXISTS (SELECT 1 FROM archived_links WHERE link = NEW.link) "
+            "BEGIN SELECT RAISE(IGNORE); END"
+        )
+        logger.debug("Table 'archived_links' and trigger checked/created.")
+
+        # Latest member publication date and member count per group, indexed so
+        # grouping can load only the groups active within a window and the API
+        # can page groups by size. Triggers keep both current; removing members
+        # never lowers the date.
+        cursor.execute(
+            """
+        CREATE TABLE IF NOT EXISTS group_activity (
+            group_id INTEGER PRIMARY KEY,
+            last_article_date TIMESTAMP NOT NULL,
+            article_count INTEGER NOT NULL DEFAULT 0
+        )
+        """
+        )
+        recount = False
+        article_date_trigger = cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'trg_group_activity_article_date'"
+        ).fetchone()
+        if article_date_trigger and "GLOB" not in article_date_trigger[0]:
+            # Triggers that kept the MAX of unmigrated (RFC 822) dates: replace them
+            for name in (
+                "trg_group_activity_membership_insert",
+                "trg_group_activity_membership_update",
+                "trg_group_activity_article_date",
+            ):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cursor.execute("PRAGMA table_info(group_activity)")
+        if "article_count" not in [row[1] for row in cursor.fetchall()]:
+            # Tables created before member counts: add the column, replace the triggers
+            cursor.execute("ALTER TABLE group_activity ADD COLUMN article_count INTEGER NOT NULL DEFAULT 0")
+            for name in ("trg_group_activity_membership_insert", "trg_group_activity_membership_update"):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            recount = True
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_group_activity_last_article ON group_activity(last_article_date)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_group_activity_count ON group_activity(article_count, group_id)"
+        )
+        activity_upsert = (
+            "INSERT INTO group_activity (group_id, last_article_date, article_count) VALUES (NEW.group_id, "
+            "COALESCE((SELECT published_date FROM articles WHERE id = NEW.article_id), CURRENT_TIMESTAMP), 1) "
+            "ON CONFLICT(group_id) DO UPDATE SET "
+            f"last_article_date = {_latest_activity_date('excluded.last_article_date')}, "
+            "article_count = article_count + 1; "
+        )
+        activity_triggers = {
+            "trg_group_activity_membership_insert": "AFTER INSERT ON two_phase_article_group_memberships BEGIN "
+            + activity_upsert + "END",
+            "trg_group_activity_membership_update": "AFTER UPDATE OF group_id ON two_phase_article_group_memberships "
+            "WHEN NEW.group_id != OLD.group_id BEGIN " + activity_upsert
+            + "UPDATE group_activity SET article_count = article_count - 1 WHERE group_id = OLD.group_id; END",
+            "trg_group_activity_membership_delete": "AFTER DELETE ON two_phase_article_group_memberships BEGIN "
+            "UPDATE group_activity SET article_count = article_count - 1 WHERE group_id = OLD.group_id; END",
+            "trg_group_activity_article_date": "AFTER UPDATE OF published_date ON articles "
+            "WHEN NEW.published_date IS NOT NULL BEGIN "
+            f"UPDATE group_activity SET last_article_date = {_latest_activity_date('NEW.published_date')} "
+            "WHERE group_id IN (SELECT group_id FROM two_phase_article_group_memberships WHERE article_id = NEW.id); END",
+            "trg_group_activity_group_delete": "AFTER DELETE ON two_phase_article_groups BEGIN "
+            "DELETE FROM group_activity WHERE group_id = OLD.group_id; END",
+        }
+        for name, body in activity_triggers.items():
+            cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+        # Backfill groups that predate the table (or the triggers)
+        cursor.execute(
+            """
+            INSERT OR IGNORE INTO group_activity (group_id, last_article_date, article_count)
+            SELECT g.group_id, COALESCE(MAX(a.published_date), g.created_at, CURRENT_TIMESTAMP), COUNT(*)
+            FROM two_phase_article_groups g
+            JOIN two_phase_article_group_memberships m ON m.group_id = g.group_id
+            LEFT JOIN articles a ON a.id = m.article_id
+            WHERE NOT EXISTS (SELECT 1 FROM group_activity x WHERE x.group_id = g.group_id)
+            GROUP BY g.group_id
+            """
+        )
+        # Dates backfilled before datemigration ran; no-op once the articles are migrated
+        refresh_group_activity_dates(cursor=cursor, noncanonical_only=True)
+        if recount:
+            cursor.execute(
+                """
+                UPDATE group_activity SET article_count = (
+                    SELECT COUNT(*) FROM two_phase_article_group_memberships m
+                    WHERE m.group_id = group_activity.group_id
+                )
+                """
+            )
+        logger.debug("Table 'group_activity' and triggers checked/created.")
+
+        # Change log for /api/stream: triggers append group and membership
+        # changes, record_change() the events only the pipeline knows about
+        # (merges, trend saves). Rows carry ids, not content; readers join the
+        # current group and article rows. AUTOINCREMENT keeps change_ids unique
+        # after pruning, so they can serve as SSE event ids.
+        cursor.execute(
+            """
+        CREATE TABLE IF NOT EXISTS change_log (
+            change_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_type TEXT NOT NULL,
+            category TEXT,
+            group_id INTEGER,
+            article_id INTEGER,
+            payload TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+        )
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_change_log_created ON change_log(created_at)")
+        group_category = "(SELECT main_topic FROM two_phase_article_groups WHERE group_id = NEW.group_id)"
+        change_triggers = {
+            "trg_change_group_insert": "AFTER INSERT ON two_phase_article_groups BEGIN "
+            "INSERT INTO change_log (event_type, category, group_id) "
+            "VALUES ('group_created', NEW.main_topic, NEW.group_id); END",
+            "trg_change_group_update": "AFTER UPDATE OF main_topic, group_label, description ON two_phase_article_groups "
+            "WHEN NEW.main_topic IS NOT OLD.main_topic OR NEW.group_label IS NOT OLD.group_label "
+            "OR NEW.description IS NOT OLD.description BEGIN "
+            "INSERT INTO change_log (event_type, category, group_id) "
+            "VALUES ('group_updated', NEW.main_topic, NEW.group_id); END",
+            "trg_change_group_delete": "AFTER DELETE ON two_phase_article_groups BEGIN "
+            "INSERT INTO change_log (event_type, category, group_id) "
+            "VALUES ('group_removed', OLD.main_topic, OLD.group_id); END",
+            "trg_change_article_added": "AFTER INSERT ON two_phase_article_group_memberships BEGIN "
+            "INSERT INTO change_log (event_type, category, group_id, article_id) "
+            f"VALUES ('article_added', {group_category}, NEW.group_id, NEW.article_id); END",
+        }
+        for name, body in change_triggers.items():
+            cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+        logger.debug("Table 'change_log' and triggers checked/created.")
+
+        # Full-text search (search.py). article_search stores only the index:
+        # the body is indexed from the 'raw' row the body triggers write, and
+        # snippets are cut from the stored bodies of one page of results.
+        # group_search reads labels and descriptions from two_phase_article_groups.
+        try:
+            _setup_search_tables(cursor)
+            logger.debug("Search tables and triggers checked/created.")
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Full-text search unavailable (SQLite built without FTS5?): {e}")
+
         conn.commit()
         logger.info("Database schema setup: Commit successful.")
 
@@ -448,6 +957,31 @@ def _execute_write(sql, params, db_path, cursor=None):
             conn.close()
 
 
+def _execute_write_many(sql, rows, db_path, cursor=None):
+    """Like _execute_write, but runs one executemany over `rows`."""
+    conn_managed_here = False
+    conn = None
+    if cursor is None:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+        conn_managed_here = True
+    try:
+        cursor.executemany(sql, rows)
+        if conn_managed_here and conn:
+            conn.commit()
+    except sqlite3.Error as e:
+        logger.error(
+            f"Database error executing bulk query ({len(rows)} rows): {e}. SQL: {sql[:100]}...",
+            exc_info=True,
+        )
+        if conn_managed_here and conn:
+            conn.rollback()
+        raise
+    finally:
+        if conn_managed_here and conn:
+            conn.close()
+
+
 def insert_entity(
     entity_name,
     entity_type,
@@ -601,6 +1135,144 @@ def link_entity_to_trend(
         return False
 
 
+# --- Extended Extraction Functions (companies, events, quotes, authors, references) ---
+def link_company_to_article(article_id, company_name, db_path=DEFAULT_DB_PATH, cursor=None):
+    """Insert or ignore an article_companies row. Returns True on success, False on failure."""
+    sql = "INSERT OR IGNORE INTO article_companies (article_id, company_name) VALUES (?, ?)"
+    try:
+        _execute_write(sql, (article_id, company_name), db_path, cursor)
+        return True
+    except Exception:
+        return False
+
+
+def insert_named_event(event_name, event_type, cve_ids=None, db_path=DEFAULT_DB_PATH, cursor=None):
+    """
+    Insert a named event, or bump last_seen_date (and merge CVE ids) if it exists.
+    Returns event_id or None.
+    """
+    conn_managed_here = False
+    conn = None
+    if cursor is None:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+        conn_managed_here = True
+    cve_ids = sorted({c for c in (cve_ids or []) if c})
+    try:
+        cursor.execute(
+            "SELECT event_id, cve_ids FROM named_events WHERE event_name = ? AND event_type = ?",
+            (event_name, event_type),
+        )
+        row = cursor.fetchone()
+        if row:
+            event_id = row[0]
+            existing = [c for c in (row[1] or "").split(",") if c]
+            merged = ",".join(sorted(set(existing) | set(cve_ids))) or None
+            cursor.execute(
+                "UPDATE named_events SET last_seen_date = CURRENT_TIMESTAMP, cve_ids = ? WHERE event_id = ?",
+                (merged, event_id),
+            )
+        else:
+            cursor.execute(
+                "INSERT INTO named_events (event_name, event_type, cve_ids) VALUES (?, ?, ?)",
+                (event_name, event_type, ",".join(cve_ids) or None),
+            )
+            event_id = cursor.lastrowid
+        if conn_managed_here and conn:
+            conn.commit()
+        return event_id
+    except sqlite3.Error as e:
+        logger.error(f"Error in insert_named_event for '{event_name}': {e}")
+        if conn_managed_here and conn:
+            conn.rollback()
+        return None
+    finally:
+        if conn_managed_here and conn:
+            conn.close()
+
+
+def link_event_to_article(article_id, event_id, context_snippet=None, db_path=DEFAULT_DB_PATH, cursor=None):
+    """Link article and named event. Returns True on success, False on failure."""
+    sql = "INSERT OR REPLACE INTO article_events (article_id, event_id, context_snippet) VALUES (?, ?, ?)"
+    try:
+        _execute_write(sql, (article_id, event_id, context_snippet), db_path, cursor)
+        return True
+    except Exception:
+        return False
+
+
+def insert_quote(quote_text, speaker=None, db_path=DEFAULT_DB_PATH, cursor=None):
+    """
+    Insert a quote keyed by a hash of its whitespace/case-normalized text, so the same
+    quote reported by several outlets maps to one quote_id. Returns quote_id or None.
+    """
+    normalized = " ".join(quote_text.lower().split())
+    quote_hash = hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+    conn_managed_here = False
+    conn = None
+    if cursor is None:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+        conn_managed_here = True
+    try:
+        cursor.execute(
+            "INSERT OR IGNORE INTO quotes (quote_text, quote_hash, speaker) VALUES (?, ?, ?)",
+            (quote_text, quote_hash, speaker),
+        )
+        cursor.execute("SELECT quote_id FROM quotes WHERE quote_hash = ?", (quote_hash,))
+        row = cursor.fetchone()
+        if conn_managed_here and conn:
+            conn.commit()
+        return row[0] if row else None
+    except sqlite3.Error as e:
+        logger.error(f"Error in insert_quote: {e}")
+        if conn_managed_here and conn:
+            conn.rollback()
+        return None
+    finally:
+        if conn_managed_here and conn:
+            conn.close()
+
+
+def link_quote_to_article(
+    article_id, quote_id, context_before=None, context_after=None, db_path=DEFAULT_DB_PATH, cursor=None
+):
+    """Link article and quote. Returns True on success, False on failure."""
+    sql = "INSERT OR REPLACE INTO article_quotes (article_id, quote_id, context_before, context_after) VALUES (?, ?, ?, ?)"
+    try:
+        _execute_write(sql, (article_id, quote_id, context_before, context_after), db_path, cursor)
+        return True
+    except Exception:
+        return False
+
+
+def insert_article_author(article_id, author_name, db_path=DEFAULT_DB_PATH, cursor=None):
+    """Insert or ignore an article_authors row. Returns True on success, False on failure."""
+    sql = "INSERT OR IGNORE INTO article_authors (article_id, author_name) VALUES (?, ?)"
+    try:
+        _execute_write(sql, (article_id, author_name), db_path, cursor)
+        return True
+    except Exception:
+        return False
+
+
+def insert_article_external_reference(
+    article_id, original_url, normalized_url, domain, reference_type=None, db_path=DEFAULT_DB_PATH, cursor=None
+):
+    """Insert or ignore an article_external_references row. Returns True on success, False on failure."""
+    sql = """
+        INSERT OR IGNORE INTO article_external_references
+        (article_id, original_url, normalized_url, domain, reference_type)
+        VALUES (?, ?, ?, ?, ?)
+    """
+    params = (article_id, original_url, normalized_url, domain, reference_type)
+    try:
+        _execute_write(sql, params, db_path, cursor)
+        return True
+    except Exception:
+        return False
+
+
 # --- Exemplar Functions (Modified) ---
 def create_exemplar(
     category,
@@ -630,6 +1302,182 @@ def add_article_to_exemplar(exemplar_id, article_id, db_path=DEFAULT_DB_PATH, cu
         return False
 
 
+# --- Group Consistency State ---
+def mark_group_dirty(group_id, db_path=DEFAULT_DB_PATH, cursor=None):
+    """Flag a group for the next deferred consistency pass. Returns True on success, False on failure."""
+    sql = """
+        INSERT INTO group_consistency_state (group_id, dirty, marked_at)
+        VALUES (?, 1, CURRENT_TIMESTAMP)
+        ON CONFLICT(group_id) DO UPDATE SET dirty=1, marked_at=CURRENT_TIMESTAMP
+    """
+    try:
+        _execute_write(sql, (group_id,), db_path, cursor)
+        return True
+    except Exception:
+        return False
+
+
+def refresh_group_activity_dates(db_path=DEFAULT_DB_PATH, cursor=None, noncanonical_only=False):
+    """
+    Recompute group_activity.last_article_date as the latest member's
+    published_date (falling back to the group's created_at). With
+    `noncanonical_only`, only rows not in 'YYYY-MM-DD HH:MM:SS' form.
+    datemigration runs it over all rows once the dates are converted.
+    """
+    sql = """
+        UPDATE group_activity SET last_article_date = COALESCE(
+            (SELECT MAX(a.published_date) FROM two_phase_article_group_memberships m
+             JOIN articles a ON a.id = m.article_id WHERE m.group_id = group_activity.group_id),
+            (SELECT g.created_at FROM two_phase_article_groups g WHERE g.group_id = group_activity.group_id),
+            last_article_date
+        )
+    """
+    params = ()
+    if noncanonical_only:
+        sql += " WHERE last_article_date NOT GLOB ?"
+        params = (SQLITE_DATETIME_GLOB,)
+    _execute_write(sql, params, db_path, cursor)
+
+
+def record_group_consistency(
+    group_id, consistency_score, article_count, db_path=DEFAULT_DB_PATH, cursor=None
+):
+    """
+    Store an evaluated consistency score on the group and clear its dirty flag.
+    Returns True on success, False on failure.
+    """
+    try:
+        _execute_write(
+            "UPDATE two_phase_article_groups SET consistency_score = ? WHERE group_id = ?",
+            (consistency_score, group_id),
+            db_path,
+            cursor,
+        )
+        _execute_write(
+            """
+            INSERT INTO group_consistency_state (group_id, dirty, evaluated_at, evaluated_article_count)
+            VALUES (?, 0, CURRENT_TIMESTAMP, ?)
+            ON CONFLICT(group_id) DO UPDATE SET
+                dirty=0, evaluated_at=CURRENT_TIMESTAMP, evaluated_article_count=excluded.evaluated_article_count
+            """,
+            (group_id, article_count),
+            db_path,
+            cursor,
+        )
+        return True
+    except Exception:
+        return False
+
+
+# --- Change Log ---
+def record_change(event_type, category=None, group_id=None, payload=None, db_path=DEFAULT_DB_PATH, cursor=None):
+    """
+    Append a pipeline event to change_log (in the caller's transaction when a
+    cursor is given). `payload` is stored as JSON. Returns the change_id, or
+    None on failure.
+    """
+    try:
+        return _execute_write(
+            "INSERT INTO change_log (event_type, category, group_id, payload) VALUES (?, ?, ?, ?)",
+            (event_type, category, group_id, json.dumps(payload) if payload is not None else None),
+            db_path,
+            cursor,
+        )
+    except Exception:
+        return None
+
+
+def prune_change_log(max_age_hours, db_path=DEFAULT_DB_PATH):
+    """Delete change_log rows older than `max_age_hours`. Returns the number deleted."""
+    conn = None
+    try:
+        conn = get_connection(db_path)
+        deleted = conn.execute(
+            "DELETE FROM change_log WHERE created_at < datetime('now', ?)", (f"-{max_age_hours} hours",)
+        ).rowcount
+        conn.commit()
+        return deleted
+    except sqlite3.Error as e:
+        logger.error(f"Error pruning change_log: {e}")
+        return 0
+    finally:
+        if conn:
+            conn.close()
+
+
+# --- Watermark Functions ---
+def get_watermark(name, default=0, db_path=DEFAULT_DB_PATH, cursor=None):
+    """Return the stored watermark value for `name`, or `default` if unset."""
+    conn = None
+    if cursor is None:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT value FROM pipeline_watermarks WHERE name = ?", (name,))
+        row = cursor.fetchone()
+        return row[0] if row else default
+    finally:
+        if conn:
+            conn.close()
+
+
+def set_watermark(name, value, db_path=DEFAULT_DB_PATH, cursor=None):
+    """Store the watermark value for `name`. Returns True on success, False on failure."""
+    sql = """
+        INSERT INTO pipeline_watermarks (name, value, updated_at)
+        VALUES (?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(name) DO UPDATE SET value=excluded.value, updated_at=CURRENT_TIMESTAMP
+    """
+    try:
+        _execute_write(sql, (name, value), db_path, cursor)
+        return True
+    except Exception:
+        return False
+
+
+def acquire_pipeline_lock(name, owner, ttl_seconds, db_path=DEFAULT_DB_PATH):
+    """
+    Take (or renew, if `owner` already holds it) the lease `name` for
+    `ttl_seconds`. A lease held by another owner is only taken once it has
+    expired. Returns True if `owner` now holds the lease.
+    """
+    now = time.time()
+    conn = None
+    try:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            INSERT INTO pipeline_locks (name, owner, acquired_at, expires_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                owner = excluded.owner,
+                acquired_at = CASE WHEN pipeline_locks.owner = excluded.owner
+                                   THEN pipeline_locks.acquired_at ELSE excluded.acquired_at END,
+                expires_at = excluded.expires_at
+            WHERE pipeline_locks.owner = excluded.owner OR pipeline_locks.expires_at < excluded.acquired_at
+            """,
+            (name, owner, now, now + ttl_seconds),
+        )
+        conn.commit()
+        return cursor.rowcount > 0
+    except sqlite3.Error as e:
+        logger.error(f"Error acquiring pipeline lock '{name}': {e}")
+        return False
+    finally:
+        if conn:
+            conn.close()
+
+
+def release_pipeline_lock(name, owner, db_path=DEFAULT_DB_PATH):
+    """Release the lease `name` if `owner` holds it. Returns True on success, False on failure."""
+    try:
+        _execute_write("DELETE FROM pipeline_locks WHERE name = ? AND owner = ?", (name, owner), db_path)
+        return True
+    except Exception:
+        return False
+
+
 # --- CVE Functions (Modified) ---
 def insert_article_cve(
     article_id, cve_id, published_date, db_path=DEFAULT_DB_PATH, cursor=None
@@ -646,6 +1494,266 @@ def insert_article_cve(
         return False
 
 
+def insert_article_cves_bulk(rows, db_path=DEFAULT_DB_PATH, cursor=None):
+    """
+    Insert-or-ignore many (article_id, cve_id, published_date) rows with one executemany.
+    Returns the number of rows actually inserted, or None on failure.
+    """
+    conn_managed_here = False
+    conn = None
+    if cursor is None:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+        conn_managed_here = True
+    try:
+        before = cursor.connection.total_changes
+        cursor.executemany(
+            "INSERT OR IGNORE INTO article_cves (article_id, cve_id, published_date) VALUES (?, ?, ?)",
+            rows,
+        )
+        inserted = cursor.connection.total_changes - before
+        if conn_managed_here and conn:
+            conn.commit()
+        return inserted
+    except sqlite3.Error as e:
+        logger.error(f"Database error bulk-inserting {len(rows)} CVE mentions: {e}")
+        if conn_managed_here and conn:
+            conn.rollback()
+        return None
+    finally:
+        if conn_managed_here and conn:
+            conn.close()
+
+
+# --- Article Bodies ---
+
+ARTICLE_BODY_CODEC = "zstd" if zstandard is not None else "zlib"
+ARTICLE_BODY_COMPRESSION_LEVEL = {"zlib": 6, "zstd": 9}
+ARTICLE_BODY_BATCH_SIZE = 500  # Bodies per read/commit; also keeps IN (...) lists short
+
+
+def compress_article_body(text, codec=ARTICLE_BODY_CODEC):
+    """Compress article text. Returns (codec, blob)."""
+    data = text.encode("utf-8")
+    if codec == "zstd":
+        compressor = zstandard.ZstdCompressor(level=ARTICLE_BODY_COMPRESSION_LEVEL["zstd"])
+        return codec, compressor.compress(data)
+    return "zlib", zlib.compress(data, ARTICLE_BODY_COMPRESSION_LEVEL["zlib"])
+
+
+def decompress_article_body(codec, blob):
+    """Inverse of compress_article_body; 'raw' bodies are returned as stored."""
+    if blob is None:
+        return None
+    if codec == "raw":
+        return blob if isinstance(blob, str) else bytes(blob).decode("utf-8")
+    if codec == "zlib":
+        return zlib.decompress(blob).decode("utf-8")
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("Article body is zstd-compressed but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(blob).decode("utf-8")
+    raise ValueError(f"Unsupported article body codec: {codec}")
+
+
+def get_archive_db_path(db_path=DEFAULT_DB_PATH):
+    """Archive database that goes with db_path: news.db -> news_archive.db."""
+    path = Path(db_path)
+    return path.with_name(f"{path.stem}_archive{path.suffix or '.db'}")
+
+
+def _decode_article_bodies(rows, bodies):
+    """Decode (article_id, codec, blob) rows into `bodies`."""
+    for article_id, codec, blob in rows:
+        if blob is None:
+            continue
+        try:
+            bodies[article_id] = decompress_article_body(codec, blob)
+        except (ValueError, zlib.error) as e:
+            logger.error(f"Could not decode body of article {article_id}: {e}")
+
+
+def _get_archived_article_bodies(article_ids, db_path):
+    """Bodies moved to the archive database (see archive.py), if there is one."""
+    bodies = {}
+    archive_path = get_archive_db_path(db_path)
+    if not archive_path.exists():
+        return bodies
+    conn = get_connection(archive_path)
+    try:
+        for start in range(0, len(article_ids), ARTICLE_BODY_BATCH_SIZE):
+            chunk = article_ids[start : start + ARTICLE_BODY_BATCH_SIZE]
+            placeholders = ",".join("?" for _ in chunk)
+            _decode_article_bodies(
+                conn.execute(
+                    f"SELECT article_id, codec, blob FROM article_bodies WHERE article_id IN ({placeholders})",
+                    chunk,
+                ).fetchall(),
+                bodies,
+            )
+    except sqlite3.Error as e:
+        logger.error(f"Error reading archived article bodies: {e}")
+    finally:
+        conn.close()
+    return bodies
+
+
+def get_article_bodies(article_ids, db_path=DEFAULT_DB_PATH, cursor=None):
+    """
+    Return {article_id: body text} for the given IDs, decompressing only these
+    rows. Articles without a body are omitted. Rows not yet moved out of
+    articles.content are read from there; bodies not in the live database are
+    looked up in its archive.
+    """
+    ids = list(dict.fromkeys(int(a) for a in article_ids))
+    bodies = {}
+    if not ids:
+        return bodies
+    conn = None
+    if cursor is None:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+    try:
+        for start in range(0, len(ids), ARTICLE_BODY_BATCH_SIZE):
+            chunk = ids[start : start + ARTICLE_BODY_BATCH_SIZE]
+            placeholders = ",".join("?" for _ in chunk)
+            cursor.execute(
+                f"""
+                SELECT a.id, a.content, b.codec, b.blob
+                FROM articles a LEFT JOIN article_bodies b ON b.article_id = a.id
+                WHERE a.id IN ({placeholders})
+                """,
+                chunk,
+            )
+            rows = cursor.fetchall()
+            bodies.update((article_id, content) for article_id, content, _, _ in rows if content is not None)
+            _decode_article_bodies(
+                [(article_id, codec, blob) for article_id, content, codec, blob in rows if content is None],
+                bodies,
+            )
+        missing = [a for a in ids if a not in bodies]
+        if missing:
+            # The cursor may belong to any database; ask it which file it is
+            main_path = next((f for _, name, f in cursor.execute("PRAGMA database_list") if name == "main"), "")
+            if main_path:
+                bodies.update(_get_archived_article_bodies(missing, main_path))
+    finally:
+        if conn:
+            conn.close()
+    return bodies
+
+
+def get_article_body(article_id, db_path=DEFAULT_DB_PATH):
+    """Body text of one article, or None."""
+    return get_article_bodies([article_id], db_path).get(int(article_id))
+
+
+def compact_article_bodies(db_path=DEFAULT_DB_PATH):
+    """
+    Compress bodies still stored as text: legacy articles.content values and
+    'raw' rows queued by the article_bodies triggers. Commits per batch, so
+    it can be interrupted and re-run. Returns the number of bodies compressed.
+    """
+    conn = None
+    compacted = 0
+    try:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+        while True:
+            # Legacy rows first; moving them fires no trigger (content becomes NULL)
+            rows = cursor.execute(
+                "SELECT id, content FROM articles WHERE content IS NOT NULL LIMIT ?",
+                (ARTICLE_BODY_BATCH_SIZE,),
+            ).fetchall()
+            if not rows:
+                rows = [
+                    (article_id, decompress_article_body("raw", blob))
+                    for article_id, blob in cursor.execute(
+                        "SELECT article_id, blob FROM article_bodies WHERE codec = 'raw' LIMIT ?",
+                        (ARTICLE_BODY_BATCH_SIZE,),
+                    ).fetchall()
+                ]
+            if not rows:
+                break
+            cursor.executemany(
+                "INSERT OR REPLACE INTO article_bodies (article_id, codec, blob) VALUES (?, ?, ?)",
+                [
+                    (article_id, codec, sqlite3.Binary(blob))
+                    for article_id, (codec, blob) in (
+                        (article_id, compress_article_body(text)) for article_id, text in rows
+                    )
+                ],
+            )
+            cursor.executemany(
+                "UPDATE articles SET content = NULL WHERE id = ? AND content IS NOT NULL",
+                [(article_id,) for article_id, _ in rows],
+            )
+            conn.commit()
+            compacted += len(rows)
+        # Bodies of articles replaced via INSERT OR REPLACE (no delete trigger fires)
+        cursor.execute(
+            "DELETE FROM article_bodies WHERE article_id NOT IN (SELECT id FROM articles)"
+        )
+        conn.commit()
+        if compacted:
+            logger.info(f"Compressed {compacted} article bodies ({ARTICLE_BODY_CODEC}).")
+    except sqlite3.Error as e:
+        logger.error(f"Error compacting article bodies: {e}", exc_info=True)
+        if conn:
+            conn.rollback()
+    finally:
+        if conn:
+            conn.close()
+    return compacted
+
+
+UPSERT_CVE_RECORD_SQL = """
+    INSERT INTO cve_records (cve_id, codec, record, fetched_at)
+    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(cve_id) DO UPDATE SET
+        codec=excluded.codec, record=excluded.record, fetched_at=CURRENT_TIMESTAMP
+"""
+
+
+def upsert_cve_record(cve_id, record_blob, codec, db_path=DEFAULT_DB_PATH, cursor=None):
+    """Insert or replace a compressed raw CVE record. Returns True on success, False on failure."""
+    try:
+        _execute_write(
+            UPSERT_CVE_RECORD_SQL, (cve_id, codec, sqlite3.Binary(record_blob)), db_path, cursor
+        )
+        return True
+    except Exception:
+        return False
+
+
+def upsert_cve_records_bulk(rows, db_path=DEFAULT_DB_PATH, cursor=None):
+    """Bulk variant of upsert_cve_record for (cve_id, codec, record_blob) rows."""
+    try:
+        _execute_write_many(
+            UPSERT_CVE_RECORD_SQL,
+            [(cve_id, codec, sqlite3.Binary(blob)) for cve_id, codec, blob in rows],
+            db_path,
+            cursor,
+        )
+        return True
+    except Exception:
+        return False
+
+
+UPSERT_CVE_INFO_SQL = """
+    INSERT INTO cve_info (
+        cve_id, base_score, vendor, affected_products, cve_url,
+        vendor_link, solution, times_mentioned, raw_json, updated_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(cve_id) DO UPDATE SET
+        base_score=excluded.base_score, vendor=excluded.vendor,
+        affected_products=excluded.affected_products, cve_url=excluded.cve_url,
+        vendor_link=excluded.vendor_link, solution=excluded.solution,
+        times_mentioned=excluded.times_mentioned, raw_json=excluded.raw_json,
+        updated_at=CURRENT_TIMESTAMP
+"""
+
+
 def insert_or_update_cve_info(
     cve_id,
     base_score,
@@ -660,18 +1768,7 @@ def insert_or_update_cve_info(
     cursor=None,
 ):
     """Insert or update cve_info. Returns True on success, False on failure."""
-    sql = """
-        INSERT INTO cve_info (
-            cve_id, base_score, vendor, affected_products, cve_url,
-            vendor_link, solution, times_mentioned, raw_json, updated_at
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-        ON CONFLICT(cve_id) DO UPDATE SET
-            base_score=excluded.base_score, vendor=excluded.vendor,
-            affected_products=excluded.affected_products, cve_url=excluded.cve_url,
-            vendor_link=excluded.vendor_link, solution=excluded.solution,
-            times_mentioned=excluded.times_mentioned, raw_json=excluded.raw_json,
-            updated_at=CURRENT_TIMESTAMP
-    """
+    sql = UPSERT_CVE_INFO_SQL
     params = (
         cve_id,
         base_score,
@@ -688,3 +1785,16 @@ def insert_or_update_cve_info(
         return True
     except Exception:
         return False
+
+
+def insert_or_update_cve_info_bulk(rows, db_path=DEFAULT_DB_PATH, cursor=None):
+    """
+    Bulk variant of insert_or_update_cve_info. Each row is a tuple in column order:
+    (cve_id, base_score, vendor, affected_products, cve_url, vendor_link, solution,
+    times_mentioned, raw_json). Returns True on success, False on failure.
+    """
+    try:
+        _execute_write_many(UPSERT_CVE_INFO_SQL, rows, db_path, cursor)
+        return True
+    except Exception:
+        return False
@@ -50,18 +50,40 @@ except ImportError:
 logger = logging.getLogger(__name__)
 
 
-def get_existing_groups(db_path: str = "db/news.db") -> List[Dict]:
+def get_existing_groups(
+    db_path: str = "db/news.db",
+    active_since: Optional[str] = None,
+    active_before: Optional[str] = None,
+) -> List[Dict]:
     """
-    Get all existing article groups with their members.
+    Get existing article groups with their members.
 
     Args:
         db_path: Path to the database
+        active_since: Only groups whose latest member was published at or after
+                      this 'YYYY-MM-DD HH:MM:SS' time (group_activity)
+        active_before: Only groups whose latest member was published before it
 
     Returns:
-        List of group dictionaries with article IDs
+        List of group dictionaries with article IDs (most recently active
+        first when filtered by activity)
     """
     # Use alias 'g' for groups table and 'm' for memberships for clarity
-    query = """
+    conditions, params = [], []
+    if active_since is not None:
+        conditions.append("ga.last_article_date >= ?")
+        params.append(active_since)
+    if active_before is not None:
+        conditions.append("ga.last_article_date < ?")
+        params.append(active_before)
+    if conditions:
+        # Driven by idx_group_activity_last_article
+        source = "group_activity ga JOIN two_phase_article_groups g ON g.group_id = ga.group_id"
+        where = "WHERE " + " AND ".join(conditions)
+        order = "ORDER BY ga.last_article_date DESC"
+    else:
+        source, where, order = "two_phase_article_groups g", "", ""
+    query = f"""
         SELECT
             g.group_id,
             g.main_topic,
@@ -69,21 +91,27 @@ def get_existing_groups(db_path: str = "db/news.db") -> List[Dict]:
             g.group_label,
             g.description,
             g.consistency_score
-        FROM two_phase_article_groups g
+        FROM {source}
+        {where}
+        {order}
     """
-    membership_query = """
-        SELECT article_id
-        FROM two_phase_article_group_memberships
-        WHERE group_id = ?
+    membership_query = f"""
+        SELECT m.group_id, m.article_id
+        FROM two_phase_article_group_memberships m
+        WHERE m.group_id IN (SELECT g.group_id FROM {source} {where})
     """
     groups = []
     conn = None
     try:
         conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
-        cursor.execute(query)
+        cursor.execute(query, params)
         group_rows = cursor.fetchall()
 
+        members = defaultdict(list)
+        for group_id, article_id in cursor.execute(membership_query, params):
+            members[group_id].append(article_id)
+
         for row in group_rows:
             (
                 group_id,
@@ -93,9 +121,6 @@ def get_existing_groups(db_path: str = "db/news.db") -> List[Dict]:
                 description,
                 consistency_score,
             ) = row
-            cursor.execute(membership_query, (group_id,))
-            article_ids = [r[0] for r in cursor.fetchall()]
-
             groups.append(
                 {
                     "group_id": group_id,
@@ -104,7 +129,7 @@ def get_existing_groups(db_path: str = "db/news.db") -> List[Dict]:
                     "group_label": group_label,
                     "description": description,
                     "consistency_score": consistency_score,
-                    "article_ids": article_ids,
+                    "article_ids": members.get(group_id, []),
                 }
             )
     except sqlite3.Error as e:
@@ -185,6 +210,35 @@ def generate_group_signature(group: Dict, db_path: str = "db/news.db") -> Dict:
         )
         return group_signature
 
+    return aggregate_group_signature(group, article_signatures, db_path)
+
+
+def aggregate_group_signature(
+    group: Dict, article_signatures: List[Dict], db_path: str = "db/news.db"
+) -> Dict:
+    """
+    Build a group signature from already-generated article signatures (steps 2-4
+    of generate_group_signature), so callers holding the member signatures do not
+    have to regenerate them.
+    """
+    group_id = group.get("group_id")
+    group_signature = {
+        "group_id": group_id,
+        "group_label": group.get("group_label", ""),
+        "description": group.get("description", ""),
+        "main_topic": group.get("main_topic", ""),
+        "primary_entities": [],
+        "companies": [],
+        "cves": [],
+        "technologies": [],
+        "products": [],
+        "events": [],
+        "latest_published_date": None,
+        "member_sources": [],
+    }
+    if not article_signatures:
+        return group_signature
+
     # --- Step 2: Aggregate data from article signatures ---
     all_entity_ids = set()
     entity_counts = defaultdict(int)
@@ -351,6 +405,7 @@ def calculate_article_to_group_similarity(
     api_key: Optional[
         str
     ] = None,  # Added optional api_key if needed for description similarity
+    text_similarity: Optional[float] = None,
 ) -> Dict[str, float]:
     """
     Calculate similarity between an article and a group, including
@@ -360,6 +415,9 @@ def calculate_article_to_group_similarity(
         article_signature: Signature of the article (must include 'published_date', 'source', 'primary_entities')
         group_signature: Signature of the group (must include 'latest_published_date', 'member_sources', 'primary_entities')
         api_key: Optional API key if LLM description similarity is used.
+        text_similarity: Optional TF-IDF cosine between the article and the group
+            centroid (see analysis/text_vectors.py). When given it is weighted into
+            the composite so articles with sparse entity extraction can still match.
 
     Returns:
         Dictionary with similarity scores and the final composite score.
@@ -461,6 +519,23 @@ def calculate_article_to_group_similarity(
         "event_similarity": 0.10,
         # Add other weights if more similarity metrics are added
     }
+    if text_similarity is not None:
+        results["text_similarity"] = max(0.0, min(1.0, float(text_similarity)))
+        # Take text's share from entities/companies so the total stays at 0.90
+        weights = {
+            "entity_similarity": 0.30,
+            "company_similarity": 0.15,
+            "cve_similarity": 0.15,
+            "event_similarity": 0.10,
+            "text_similarity": 0.20,
+        }
+        if not article_entities_dict and not article_companies:
+            # Extraction found nothing for this article: rely on the text itself
+            weights = {
+                "cve_similarity": 0.15,
+                "event_similarity": 0.15,
+                "text_similarity": 0.60,
+            }
     composite_score = sum(
         results.get(metric, 0.0) * weight for metric, weight in weights.items()
     )
@@ -6,6 +6,7 @@ import logging
 from openai import OpenAI
 
 from news_grouping_app.config import OPENAI_MODEL
+from news_grouping_app.utils import count_tokens
 
 MODEL = OPENAI_MODEL
 MAX_RETRIES = 3
@@ -27,13 +28,12 @@ def call_gpt_api(messages, api_key=None, model=MODEL):
             )
             return None
 
-    # Estimate tokens (very rough)
-    total_token_estimate = int(sum(len(m["content"].split()) for m in messages) * 1.3)
+    total_token_estimate = sum(count_tokens(m["content"]) for m in messages)
     logger.info("API Request Details:")
     logger.info(f"- Model: {model}")
     logger.info(f"- Timeout: {REQUEST_TIMEOUT}s")
     logger.info(f"- Message count: {len(messages)}")
-    logger.info(f"- Approx token count: {total_token_estimate}")
+    logger.info(f"- Input token count: {total_token_estimate}")
 
     client = OpenAI(api_key=api_key)
     for attempt in range(MAX_RETRIES):
@@ -9,11 +9,12 @@ import sqlite3
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # --- Database Setup & Migration ---
-from news_grouping_app.db.database import setup_database, DEFAULT_DB_PATH
-from news_grouping_app.datemigration import main as run_date_migration  # Keep date migration
+from news_grouping_app.db.database import setup_database, compact_article_bodies, DEFAULT_DB_PATH
+from news_grouping_app.datemigration import main as run_date_migration  # One-shot, resumable
 from news_grouping_app.wiki_qid_migration import (
     main as run_wiki_qid_migration,
 )
+from news_grouping_app.search import sync_search_index
 
 # --- Scrapers ---
 from news_grouping_app.scrapers import bleepingcomputer
@@ -37,7 +38,10 @@ from news_grouping_app.pipeline import (
     run_article_grouping_pipeline,
     run_trending_analysis_pipeline,
     run_full_pipeline_headless,  # Optional: Can use this instead of individual steps below
+    run_streaming_pipeline_headless,
 )
+from news_grouping_app.config import STREAMING_PIPELINE
+from news_grouping_app.scheduler import PipelineScheduler, pipeline_lock
 
 # Configure logging
 logging.basicConfig(
@@ -62,82 +66,56 @@ def verify_table_exists(db_path=DEFAULT_DB_PATH, table_name="two_phase_article_g
         return False
 
 
-def run_scrapers_and_analysis():
-    """
-    Runs all scrapers and then the full analysis pipeline (Extraction -> Grouping -> Trending).
-    """
-    logger.info(
-        f"--- Starting Scheduled Run: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ---"
-    )
-    run_start_time = time.time()
+# Scraper modules keyed by the `source` value each one stores, which the
+# scheduler uses to count a source's new articles
+SCRAPER_SOURCES = {
+    "bleepingcomputer": bleepingcomputer,
+    "krebs": krebsonsecurityscraper,
+    "nist": nist,
+    "schneier": schneier_scraper,
+    "TheHackerNews": Scrapinghackernews,
+    "securelist": securelist_scraper,
+    "slashdot_it": Slashdotit,
+    "sophos": sophos,
+    "techcrunch": techcrunch,
+    "techradar": techradar,
+    "darkreading": darkreading_scraper,
+    "neowin": neowinscraper,
+    "cyberscoop": cyberscoopscraper,
+}
 
-    # 1. Ensure database is set up
-    logger.info("Attempting to set up database schema...")
+
+def run_scraper(scraper_module):
     try:
-        setup_database()
-        logger.info("Database schema setup call completed.")
-        # *** ADD VERIFICATION STEP ***
-        if verify_table_exists(table_name="two_phase_article_groups"):
-            logger.info(
-                "VERIFIED: 'two_phase_article_groups' table exists after setup."
-            )
-        else:
-            logger.error(
-                "VERIFICATION FAILED: 'two_phase_article_groups' table DOES NOT exist after setup. Aborting run."
-            )
-            return  # Stop the run if the table wasn't created
-        # *****************************
-    except Exception as db_setup_err:
-        logger.exception("CRITICAL ERROR DURING DATABASE SETUP! Aborting run.")
-        return  # Stop the run
+        logger.info(f"Running scraper: {scraper_module.__name__}")
+        scraper_module.main()
+        logger.info(f"Scraper {scraper_module.__name__} completed.")
+    except Exception as e:
+        logger.exception(f"Error running scraper {scraper_module.__name__}: {e}")
 
-    # 2. Run Scrapers in parallel
-    logger.info("--- Starting Scrapers ---")
-    scraper_start_time = time.time()
-    scrapers = [
-        bleepingcomputer,
-        krebsonsecurityscraper,
-        nist,
-        schneier_scraper,
-        Scrapinghackernews,
-        securelist_scraper,
-        Slashdotit,
-        sophos,
-        techcrunch,
-        techradar,
-        darkreading_scraper,
-        neowinscraper,
-        cyberscoopscraper,
-    ]
-
-    def run_scraper(scraper_module):
-        try:
-            logger.info(f"Running scraper: {scraper_module.__name__}")
-            scraper_module.main()
-            logger.info(f"Scraper {scraper_module.__name__} completed.")
-        except Exception as e:
-            logger.exception(f"Error running scraper {scraper_module.__name__}: {e}")
-
-    def run_register_scraper():
-        try:
-            logger.info("Running scraper: RegisterScraper")
-            register_scraper = RegisterScraper()
-            register_scraper.process_register_articles(limit=100)
-            logger.info("Scraper RegisterScraper completed.")
-        except Exception as e:
-            logger.exception(f"Error running RegisterScraper: {e}")
-
-    max_workers = min(5, len(scrapers) + 1)  # Limit concurrency
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = [executor.submit(run_scraper, s) for s in scrapers]
-        futures.append(executor.submit(run_register_scraper))
-        for future in as_completed(futures):
-            pass  # results logged within tasks
-
-    scraper_elapsed = time.time() - scraper_start_time
-    logger.info(f"--- Scrapers Finished in {scraper_elapsed:.2f} seconds ---")
-
-    # 3. Run Date Migration (if still needed after initial setup)
+
+def run_register_scraper():
+    try:
+        logger.info("Running scraper: RegisterScraper")
+        register_scraper = RegisterScraper()
+        register_scraper.process_register_articles(limit=100)
+        logger.info("Scraper RegisterScraper completed.")
+    except Exception as e:
+        logger.exception(f"Error running RegisterScraper: {e}")
+
+
+def build_scraper_jobs():
+    """Return {source: callable} for every scraper."""
+    jobs = {
+        source: (lambda module=module: run_scraper(module))
+        for source, module in SCRAPER_SOURCES.items()
+    }
+    jobs["register"] = run_register_scraper
+    return jobs
+
+
+def run_migrations():
+    # Date migration is one-shot and resumable; once complete this returns at once
     logger.info("Running date format migration...")
     try:
         run_date_migration()
@@ -152,30 +130,55 @@ def run_scrapers_and_analysis():
     except Exception as e:
         logger.exception(f"Error during wiki_qid migration: {e}")
 
-    # 4. Run Analysis Pipeline
-    logger.info("--- Starting Analysis Pipeline ---")
-    analysis_start_time = time.time()
-    api_key = os.environ.get("OPENAI_API_KEY")
-    if not api_key:
+    # Moves article bodies still inline in articles.content; no-op once done
+    logger.info("Compressing article bodies...")
+    compact_article_bodies(db_path=str(DEFAULT_DB_PATH))
+
+    # Indexes articles stored before the search triggers existed; no-op once done
+    logger.info("Syncing full-text search index...")
+    sync_search_index(db_path=str(DEFAULT_DB_PATH))
+
+
+def setup_and_verify_database():
+    """Set up the schema. Returns False if the grouping tables are still missing."""
+    logger.info("Attempting to set up database schema...")
+    try:
+        setup_database()
+        logger.info("Database schema setup call completed.")
+        # *** ADD VERIFICATION STEP ***
+        if verify_table_exists(table_name="two_phase_article_groups"):
+            logger.info(
+                "VERIFIED: 'two_phase_article_groups' table exists after setup."
+            )
+            return True
         logger.error(
-            "CRITICAL: OpenAI API Key not found. Analysis requires API key. Skipping analysis."
+            "VERIFICATION FAILED: 'two_phase_article_groups' table DOES NOT exist after setup. Aborting run."
         )
-    else:
-        # Option 1: Run the full pipeline wrapper
-        pipeline_logs = run_full_pipeline_headless(api_key)
-        for log_msg in pipeline_logs:
-            logger.info(log_msg)  # Log messages returned by the pipeline
+        return False
+    except Exception as db_setup_err:
+        logger.exception("CRITICAL ERROR DURING DATABASE SETUP! Aborting run.")
+        return False
+
 
-        # Option 2: Run individual steps (more verbose logging control here)
-        # logger.info("Running Entity/CVE Extraction...")
-        # run_entity_extraction_pipeline(api_key)
-        # logger.info("Running Similarity-Based Grouping...")
-        # run_article_grouping_pipeline(api_key) # Uses default threshold
-        # logger.info("Running Trending Analysis...")
-        # run_trending_analysis_pipeline(api_key)
+def run_scrapers_and_analysis():
+    """
+    Runs all scrapers and then the full analysis pipeline (Extraction -> Grouping -> Trending).
+    """
+    logger.info(
+        f"--- Starting Scheduled Run: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ---"
+    )
+    run_start_time = time.time()
+
+    # 1. Ensure database is set up
+    if not setup_and_verify_database():
+        return  # Stop the run
 
-    analysis_elapsed = time.time() - analysis_start_time
-    logger.info(f"--- Analysis Pipeline Finished in {analysis_elapsed:.2f} seconds ---")
+    # Never overlap with the scheduler or another run
+    with pipeline_lock() as acquired:
+        if not acquired:
+            logger.warning("Another pipeline run holds the lock. Skipping this run.")
+            return
+        _run_scrapers_and_analysis_locked()
 
     run_elapsed = time.time() - run_start_time
     logger.info(
@@ -183,39 +186,74 @@ def run_scrapers_and_analysis():
     )
 
 
+def _run_scrapers_and_analysis_locked():
+    # 2. Run Scrapers in parallel
+    logger.info("--- Starting Scrapers ---")
+    scraper_start_time = time.time()
+    scraper_jobs = list(build_scraper_jobs().values())
+
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if STREAMING_PIPELINE and api_key:
+        # Scraping, extraction and grouping overlap; migrations run once scrapers are done
+        logger.info("--- Starting Streaming Scrape + Analysis Pipeline ---")
+        pipeline_logs = run_streaming_pipeline_headless(
+            scraper_jobs, api_key, after_stream=run_migrations
+        )
+        for log_msg in pipeline_logs:
+            logger.info(log_msg)
+    else:
+        max_workers = min(5, len(scraper_jobs))  # Limit concurrency
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(job) for job in scraper_jobs]
+            for future in as_completed(futures):
+                pass  # results logged within tasks
+
+        scraper_elapsed = time.time() - scraper_start_time
+        logger.info(f"--- Scrapers Finished in {scraper_elapsed:.2f} seconds ---")
+
+        run_migrations()
+
+        # 4. Run Analysis Pipeline
+        logger.info("--- Starting Analysis Pipeline ---")
+        analysis_start_time = time.time()
+        if not api_key:
+            logger.error(
+                "CRITICAL: OpenAI API Key not found. Analysis requires API key. Skipping analysis."
+            )
+        else:
+            # Option 1: Run the full pipeline wrapper
+            pipeline_logs = run_full_pipeline_headless(api_key)
+            for log_msg in pipeline_logs:
+                logger.info(log_msg)  # Log messages returned by the pipeline
+
+            # Option 2: Run individual steps (more verbose logging control here)
+            # logger.info("Running Entity/CVE Extraction...")
+            # run_entity_extraction_pipeline(api_key)
+            # logger.info("Running Similarity-Based Grouping...")
+            # run_article_grouping_pipeline(api_key) # Uses default threshold
+            # logger.info("Running Trending Analysis...")
+            # run_trending_analysis_pipeline(api_key)
+
+        analysis_elapsed = time.time() - analysis_start_time
+        logger.info(f"--- Analysis Pipeline Finished in {analysis_elapsed:.2f} seconds ---")
+
+
 def main():
     """
-    Main execution function: runs once immediately, then schedules regular runs.
+    Main execution function: sets up the database, then hands over to the
+    scheduler, which polls each source on its own interval and runs the
+    analysis stages when they are due.
     """
-    # Run once immediately at startup
-    try:
-        run_scrapers_and_analysis()
-    except Exception as e:
-        logger.exception("Error during initial run.")
+    if not setup_and_verify_database():
+        return
+    run_migrations()
 
-    # Schedule regular runs
-    interval_minutes = int(os.environ.get("SCHEDULE_INTERVAL_MINUTES", "15"))
-    interval_seconds = interval_minutes * 60
-    logger.info(
-        f"Setting up scheduler to run every {interval_minutes} minutes."
+    scheduler = PipelineScheduler(
+        build_scraper_jobs(),
+        api_key=os.environ.get("OPENAI_API_KEY"),
+        db_path=str(DEFAULT_DB_PATH),
     )
-
-    while True:
-        try:
-            logger.info(f"Sleeping for {interval_minutes} minutes until next run...")
-            time.sleep(interval_seconds)
-
-            # Run the full process
-            run_scrapers_and_analysis()
-
-        except KeyboardInterrupt:
-            logger.info("Scheduler interrupted by user. Exiting...")
-            break
-        except Exception as e:
-            logger.exception(f"Unhandled error in scheduler loop: {e}")
-            # Avoid tight loops on persistent errors
-            logger.info("Sleeping for 60 seconds before retrying...")
-            time.sleep(60)
+    scheduler.run_forever()
 
 
 if __name__ == "__main__":
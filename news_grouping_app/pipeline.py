@@ -2,13 +2,21 @@ import os
 import logging
 import time
 from datetime import datetime, timedelta
-from news_grouping_app.db.database import DEFAULT_DB_PATH
+from news_grouping_app.db.database import DEFAULT_DB_PATH, compact_article_bodies, prune_change_log
 
 # --- Core Analysis Modules ---
 from news_grouping_app.analysis.entity_extraction import extract_entities_for_all_articles
 from news_grouping_app.analysis.company_extraction import (
     extract_company_names_for_all_articles,
 )  # Kept for now
+from news_grouping_app.analysis.unified_extraction import (
+    run_unified_extraction_for_all_articles,
+)
+from news_grouping_app.analysis.near_duplicates import (
+    detect_near_duplicates,
+    inherit_canonical_extractions,
+)
+from news_grouping_app.config import UNIFIED_EXTRACTION, CHANGE_LOG_RETENTION_HOURS
 from news_grouping_app.analysis.cve_extraction import (
     process_cves_in_articles,
     update_cve_details_from_api,
@@ -20,6 +28,9 @@ from news_grouping_app.analysis.two_phase_grouping import (
     DYNAMIC_THRESHOLD_RULES,
 )  # <<< IMPORT RULES
 
+# --- Streaming (overlapped phases 1-2) ---
+from news_grouping_app.streaming import StreamingPipeline
+
 # --- Trending Analysis ---
 from news_grouping_app.analysis.trending_analysis import run_trending_analysis, cleanup_old_trends
 
@@ -55,17 +66,32 @@ def run_entity_extraction_pipeline(api_key=None, db_path=str(DEFAULT_DB_PATH)):
     logs.append("PHASE 1: Entity/CVE Extraction Started")
 
     try:
-        # Extract Entities (relies on LLM)
-        logger.info("Extracting entities...")
-        logs.append("Extracting entities...")
-        extract_entities_for_all_articles(api_key, db_path=db_path)
-        logs.append("Done extracting entities.")
-
-        # Extract Company Names (relies on LLM) - Consider if still needed alongside entity extraction
-        logger.info("Extracting company names...")
-        logs.append("Extracting company names...")
-        extract_company_names_for_all_articles(api_key, db_path=db_path)
-        logs.append("Done extracting company names.")
+        # Link near-duplicates to a canonical article first so they skip LLM extraction
+        logger.info("Detecting near-duplicate articles...")
+        logs.append("Detecting near-duplicate articles...")
+        duplicates = detect_near_duplicates(db_path=db_path)
+        logs.append(f"Linked {duplicates} near-duplicate articles.")
+
+        if UNIFIED_EXTRACTION:
+            # One LLM pass for entities, companies and article metadata
+            logger.info("Extracting entities and companies (single pass)...")
+            logs.append("Extracting entities and companies (single pass)...")
+            run_unified_extraction_for_all_articles(api_key, db_path=db_path)
+            logs.append("Done extracting entities and companies.")
+        else:
+            # Extract Entities (relies on LLM)
+            logger.info("Extracting entities...")
+            logs.append("Extracting entities...")
+            extract_entities_for_all_articles(api_key, db_path=db_path)
+            logs.append("Done extracting entities.")
+
+            # Extract Company Names (relies on LLM) - Consider if still needed alongside entity extraction
+            logger.info("Extracting company names...")
+            logs.append("Extracting company names...")
+            extract_company_names_for_all_articles(api_key, db_path=db_path)
+            logs.append("Done extracting company names.")
+
+        inherit_canonical_extractions(db_path=db_path)
 
         # Extract CVE Mentions (Regex-based)
         logger.info("Processing CVE mentions in articles...")
@@ -73,6 +99,10 @@ def run_entity_extraction_pipeline(api_key=None, db_path=str(DEFAULT_DB_PATH)):
         process_cves_in_articles(db_path=db_path)
         logs.append("Done processing CVE mentions.")
 
+        # Compress bodies the scrapers wrote since the last run
+        compacted = compact_article_bodies(db_path=db_path)
+        logs.append(f"Compressed {compacted} article bodies.")
+
         # Update CVE Details (API call to MITRE)
         logger.info("Updating CVE details from API...")
         logs.append("Updating CVE details...")
@@ -179,6 +209,54 @@ def run_trending_analysis_pipeline(api_key=None, db_path=str(DEFAULT_DB_PATH)):
     return logs
 
 
+def _run_merge_and_trending_phases(api_key, db_path, all_logs):
+    """Phases 2.5 (group merging) and 3 (trending), appending to all_logs."""
+    # PHASE 2.5: Group Merging (Optional)
+    if GROUP_MERGING_ENABLED:
+        try:
+            logger.info(
+                f"Starting Group Merging with threshold {DEFAULT_MERGE_THRESHOLD}..."
+            )
+            all_logs.append(
+                f"PHASE 2.5: Group Merging Started (Threshold: {DEFAULT_MERGE_THRESHOLD})"
+            )
+            merge_stats = merge_similar_groups(
+                DEFAULT_MERGE_THRESHOLD, api_key, db_path
+            )
+            all_logs.append(
+                f"Group Merging completed: {merge_stats.get('merged_pairs', 0)} pairs merged, {merge_stats.get('errors', 0)} errors."
+            )
+            logger.info(
+                f"Group Merging completed: {merge_stats.get('merged_pairs', 0)} pairs merged."
+            )
+        except Exception as merge_err:
+            logger.exception("Error during Group Merging")
+            all_logs.append(f"Error in Phase 2.5: {merge_err}")
+    else:
+        all_logs.append("PHASE 2.5: Skipped (module not found or disabled).")
+
+    # PHASE 3: Trending Analysis
+    trending_logs = run_trending_analysis_pipeline(api_key, db_path)
+    all_logs.extend(trending_logs)
+    if any("Error:" in log for log in trending_logs):
+        logger.warning(
+            "Errors occurred during Trending Analysis, but pipeline finished Phases 1 & 2."
+        )
+        all_logs.append("Warnings occurred during Phase 3.")
+
+
+def run_merge_and_trending_pipeline(api_key=None, db_path=str(DEFAULT_DB_PATH)):
+    """Run group merging and trending analysis (phases 2.5 and 3) on their own. Returns logs."""
+    if api_key is None:
+        api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        logger.error("No API key found for merging and trending analysis.")
+        return ["Error: No API key for merging and trending analysis"]
+    logs = []
+    _run_merge_and_trending_phases(api_key, db_path, logs)
+    return logs
+
+
 def run_full_pipeline_headless(api_key=None, db_path=str(DEFAULT_DB_PATH)):
     """
     Run the full analysis pipeline (Extraction -> Grouping -> Trending) in headless mode.
@@ -214,38 +292,7 @@ def run_full_pipeline_headless(api_key=None, db_path=str(DEFAULT_DB_PATH)):
         all_logs.append("Pipeline stopped due to errors in Phase 2.")
         return all_logs
 
-    # PHASE 2.5: Group Merging (Optional)
-    if GROUP_MERGING_ENABLED:
-        try:
-            logger.info(
-                f"Starting Group Merging with threshold {DEFAULT_MERGE_THRESHOLD}..."
-            )
-            all_logs.append(
-                f"PHASE 2.5: Group Merging Started (Threshold: {DEFAULT_MERGE_THRESHOLD})"
-            )
-            merge_stats = merge_similar_groups(
-                DEFAULT_MERGE_THRESHOLD, api_key, db_path
-            )
-            all_logs.append(
-                f"Group Merging completed: {merge_stats.get('merged_pairs', 0)} pairs merged, {merge_stats.get('errors', 0)} errors."
-            )
-            logger.info(
-                f"Group Merging completed: {merge_stats.get('merged_pairs', 0)} pairs merged."
-            )
-        except Exception as merge_err:
-            logger.exception("Error during Group Merging")
-            all_logs.append(f"Error in Phase 2.5: {merge_err}")
-    else:
-        all_logs.append("PHASE 2.5: Skipped (module not found or disabled).")
-
-    # PHASE 3: Trending Analysis
-    trending_logs = run_trending_analysis_pipeline(api_key, db_path)
-    all_logs.extend(trending_logs)
-    if any("Error:" in log for log in trending_logs):
-        logger.warning(
-            "Errors occurred during Trending Analysis, but pipeline finished Phases 1 & 2."
-        )
-        all_logs.append("Warnings occurred during Phase 3.")
+    _run_merge_and_trending_phases(api_key, db_path, all_logs)
 
     overall_elapsed = time.time() - overall_start_time
     all_logs.append(
@@ -258,14 +305,85 @@ def run_full_pipeline_headless(api_key=None, db_path=str(DEFAULT_DB_PATH)):
     return all_logs
 
 
+def run_streaming_pipeline_headless(
+    scraper_jobs=(),
+    api_key=None,
+    db_path=str(DEFAULT_DB_PATH),
+    after_stream=None,
+    include_trending=True,
+):
+    """
+    Streaming variant of run_full_pipeline_headless: runs `scraper_jobs` while
+    their articles stream through extraction, signatures and grouping (see
+    streaming.py), then updates CVE details and runs merging and trending.
+    `after_stream` (optional callable) runs once the stream has drained, before
+    those later phases; include_trending=False leaves out merging and trending.
+    Returns logs.
+    """
+    overall_start_time = time.time()
+    logger.info("--- Running Streaming Analysis Pipeline ---")
+
+    if api_key is None:
+        api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        logger.error("Critical Error: API Key not found. Aborting pipeline.")
+        return ["Critical Error: No API key found. Pipeline aborted."]
+
+    all_logs = ["Pipeline Started at " + datetime.now().strftime("%Y-%m-%d %H:%M:%S")]
+
+    # PHASES 1-2: scraping, extraction and grouping overlapped
+    all_logs.append("PHASES 1-2: Streaming Scrape/Extraction/Grouping Started")
+    try:
+        summary = StreamingPipeline(api_key, db_path=db_path).run(scraper_jobs)
+        all_logs.append(
+            f"Streamed {summary['ingested']} articles in {summary['elapsed']:.2f} seconds "
+            f"(slowest batch grouped {summary['max_latency']:.1f}s after ingest)."
+        )
+        for name, (processed, busy) in summary["stages"].items():
+            all_logs.append(f"  Stage {name}: {processed} articles, {busy}s busy")
+        if summary["stopped"]:
+            all_logs.append("Streaming stopped early; remaining articles are picked up next run.")
+            return all_logs
+    except Exception as e:
+        logger.exception("Error during streaming pipeline")
+        all_logs.append(f"Error in Phases 1-2: {e}")
+        return all_logs
+
+    if after_stream is not None:
+        after_stream()
+
+    try:
+        logger.info("Updating CVE details from API...")
+        update_cve_details_from_api(db_path=db_path)
+        all_logs.append("Done updating CVE details.")
+    except Exception as e:
+        logger.exception("Error updating CVE details")
+        all_logs.append(f"Error updating CVE details: {e}")
+
+    if include_trending:
+        _run_merge_and_trending_phases(api_key, db_path, all_logs)
+
+    overall_elapsed = time.time() - overall_start_time
+    all_logs.append(
+        f"\n--- Streaming Pipeline Completed in {overall_elapsed:.2f} seconds ---"
+    )
+    logger.info(
+        f"--- Streaming Analysis Pipeline Completed in {overall_elapsed:.2f} seconds ---"
+    )
+    return all_logs
+
+
 def schedule_regular_cleanup(db_path=str(DEFAULT_DB_PATH)):
     """
-    Schedule regular cleanup of trending data.
+    Schedule regular cleanup of trending data and old change_log events.
     Placeholder - integrate with your scheduler (APScheduler, cron, etc.).
     """
     logger.info("Scheduled cleanup check: Running cleanup_old_trends.")
     try:
         cleanup_old_trends(db_path=db_path)
+        pruned = prune_change_log(CHANGE_LOG_RETENTION_HOURS, db_path=db_path)
+        if pruned:
+            logger.info(f"Pruned {pruned} change_log events.")
         logger.info("Scheduled cleanup completed successfully.")
         return True
     except Exception as e:
@@ -0,0 +1,406 @@
+# scheduler.py
+# Event-driven scheduler used by main.main() in place of a fixed sleep loop.
+#
+# Scrapers: every source has its own polling interval (scraper_schedule),
+# recomputed after each poll from how often the source published over the last
+# week. A source is never polled twice at once, and a slow source does not hold
+# back the others.
+#
+# Stages: extraction and grouping (or the streaming pipeline, which does both)
+# run when enough new articles are waiting or the oldest has waited long
+# enough; merging/trending, the hourly cleanup (stale trends, change_log) and
+# the retention pass (archive.py) run on fixed intervals. The web server runs
+# no background work of its own, so this process is the only maintenance owner.
+# Stages run one at a time on a single worker thread, and only while
+# this process holds the "pipeline" lease in pipeline_locks, so two runs never
+# overlap, even across processes.
+
+import os
+import time
+import socket
+import logging
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from news_grouping_app.db.database import (
+    DEFAULT_DB_PATH,
+    acquire_pipeline_lock,
+    get_connection,
+    get_watermark,
+    release_pipeline_lock,
+    set_watermark,
+)
+from news_grouping_app.config import (
+    CLEANUP_INTERVAL_MINUTES,
+    GROUPING_MAX_WAIT_MINUTES,
+    GROUPING_MIN_NEW_ARTICLES,
+    RETENTION_INTERVAL_HOURS,
+    SCHEDULE_INTERVAL_MINUTES,
+    SCRAPER_MAX_INTERVAL_MINUTES,
+    SCRAPER_MIN_INTERVAL_MINUTES,
+    STREAMING_PIPELINE,
+    TRENDING_INTERVAL_MINUTES,
+)
+from news_grouping_app.archive import run_retention
+from news_grouping_app.pipeline import (
+    run_article_grouping_pipeline,
+    run_entity_extraction_pipeline,
+    run_merge_and_trending_pipeline,
+    run_streaming_pipeline_headless,
+    schedule_regular_cleanup,
+)
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_TICK_SECONDS = 15  # Longest sleep between checks for due sources and stages
+SCRAPER_FREQUENCY_WINDOW_DAYS = 7  # Publish history used to size a source's interval
+SCRAPER_POLLS_PER_ARTICLE = 2  # Poll twice per average gap between a source's articles
+SCRAPER_EMPTY_POLL_BACKOFF = 1.5  # Interval multiplier per consecutive poll with nothing new
+PIPELINE_LOCK_NAME = "pipeline"
+PIPELINE_LOCK_TTL_SECONDS = 2 * 60 * 60  # Renewed every tick; only matters if the holder dies
+
+# Watermarks: highest article id each stage has already been triggered for
+EXTRACTION_WATERMARK = "scheduler_extraction"
+GROUPING_WATERMARK = "scheduler_grouping"
+STREAM_WATERMARK = "scheduler_stream"
+TRENDING_WATERMARK = "scheduler_trending_at"  # Unix time of the last trending run
+RETENTION_WATERMARK = "scheduler_retention_at"  # Unix time of the last retention run
+CLEANUP_WATERMARK = "scheduler_cleanup_at"  # Unix time of the last cleanup run
+
+
+def lock_owner():
+    """Identifier for this process in pipeline_locks."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+@contextmanager
+def pipeline_lock(owner=None, db_path=str(DEFAULT_DB_PATH)):
+    """
+    Hold the pipeline lease for the duration of the block. Yields False
+    (and runs nothing under the lease) if another run holds it.
+    """
+    owner = owner or lock_owner()
+    acquired = acquire_pipeline_lock(PIPELINE_LOCK_NAME, owner, PIPELINE_LOCK_TTL_SECONDS, db_path)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            release_pipeline_lock(PIPELINE_LOCK_NAME, owner, db_path)
+
+
+def compute_source_interval(source, empty_polls=0, db_path=str(DEFAULT_DB_PATH)):
+    """
+    Polling interval in seconds for `source`: half its average gap between
+    articles over the last week (SCHEDULE_INTERVAL_MINUTES with no recent
+    articles), stretched after consecutive empty polls, and clamped to the
+    configured bounds.
+    """
+    conn = get_connection(db_path)
+    try:
+        (count,) = conn.execute(
+            """
+            SELECT COUNT(*) FROM articles
+            WHERE source = ? AND julianday(published_date) >= julianday('now', ?)
+            """,
+            (source, f"-{SCRAPER_FREQUENCY_WINDOW_DAYS} days"),
+        ).fetchone()
+    finally:
+        conn.close()
+
+    min_seconds = SCRAPER_MIN_INTERVAL_MINUTES * 60
+    max_seconds = SCRAPER_MAX_INTERVAL_MINUTES * 60
+    if count:
+        interval = SCRAPER_FREQUENCY_WINDOW_DAYS * 86400 / count / SCRAPER_POLLS_PER_ARTICLE
+    else:
+        interval = SCHEDULE_INTERVAL_MINUTES * 60
+    interval *= SCRAPER_EMPTY_POLL_BACKOFF ** min(empty_polls, 10)
+    return int(min(max(interval, min_seconds), max_seconds))
+
+
+def load_scraper_schedule(db_path=str(DEFAULT_DB_PATH)):
+    """Return {source: {"interval_seconds", "next_run_at", "empty_polls"}}."""
+    conn = get_connection(db_path)
+    try:
+        return {
+            source: {"interval_seconds": interval, "next_run_at": next_run_at, "empty_polls": empty_polls}
+            for source, interval, next_run_at, empty_polls in conn.execute(
+                "SELECT source, interval_seconds, next_run_at, empty_polls FROM scraper_schedule"
+            )
+        }
+    finally:
+        conn.close()
+
+
+def get_new_article_stats(after_id, extracted_only=False, db_path=str(DEFAULT_DB_PATH)):
+    """
+    For articles with id > after_id, return (count, newest_id, oldest_waited)
+    where oldest_waited is True if the oldest of them was stored more than
+    GROUPING_MAX_WAIT_MINUTES ago. extracted_only counts only articles that
+    already have entities (newest_id still covers every new article).
+    """
+    conn = get_connection(db_path)
+    try:
+        newest_id, oldest_waited = conn.execute(
+            """
+            SELECT MAX(id), MIN(processed_date) <= datetime('now', ?)
+            FROM articles WHERE id > ?
+            """,
+            (f"-{GROUPING_MAX_WAIT_MINUTES} minutes", after_id),
+        ).fetchone()
+        if extracted_only:
+            (count,) = conn.execute(
+                """
+                SELECT COUNT(*) FROM articles a
+                WHERE a.id > ? AND EXISTS (SELECT 1 FROM article_entities ae WHERE ae.article_id = a.id)
+                """,
+                (after_id,),
+            ).fetchone()
+        else:
+            (count,) = conn.execute("SELECT COUNT(*) FROM articles WHERE id > ?", (after_id,)).fetchone()
+    finally:
+        conn.close()
+    return count, newest_id or after_id, bool(oldest_waited)
+
+
+class PipelineScheduler:
+    """
+    Runs scraper jobs ({source name: callable}, where the name matches the
+    `source` column the scraper writes) on adaptive intervals and triggers
+    pipeline stages as articles arrive. Call run_forever(); stop() ends it
+    from another thread.
+    """
+
+    def __init__(self, scraper_jobs, api_key=None, db_path=str(DEFAULT_DB_PATH),
+                 max_scraper_workers=5):
+        self.scraper_jobs = dict(scraper_jobs)
+        self.api_key = api_key
+        self.db_path = db_path
+        self.owner = lock_owner()
+        self.schedule = load_scraper_schedule(db_path)
+        self.running_sources = set()
+        self.state_lock = threading.Lock()  # Guards schedule and running_sources
+        self.scrapers = ThreadPoolExecutor(max_workers=max_scraper_workers, thread_name_prefix="scraper")
+        self.stages = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stage")
+        self.stage_future = None
+        self.wake = threading.Event()
+        self.stop_event = threading.Event()
+
+    # --- Scrapers ---
+
+    def _start_due_scrapers(self, now):
+        with self.state_lock:
+            due = [
+                source
+                for source in self.scraper_jobs
+                if source not in self.running_sources
+                and self.schedule.get(source, {}).get("next_run_at", 0) <= now
+            ]
+            self.running_sources.update(due)
+        for source in due:
+            self.scrapers.submit(self._run_scraper, source)
+
+    def _run_scraper(self, source):
+        started = time.time()
+        try:
+            conn = get_connection(self.db_path)
+            try:
+                (start_id,) = conn.execute("SELECT COALESCE(MAX(id), 0) FROM articles").fetchone()
+            finally:
+                conn.close()
+            try:
+                self.scraper_jobs[source]()
+            except Exception as e:
+                logger.exception(f"Scraper '{source}' failed: {e}")
+            conn = get_connection(self.db_path)
+            try:
+                (new_articles,) = conn.execute(
+                    "SELECT COUNT(*) FROM articles WHERE source = ? AND id > ?", (source, start_id)
+                ).fetchone()
+            finally:
+                conn.close()
+            self._reschedule(source, started, new_articles)
+        except Exception as e:
+            logger.exception(f"Error scheduling scraper '{source}': {e}")
+            with self.state_lock:
+                self.schedule[source] = {
+                    "interval_seconds": SCHEDULE_INTERVAL_MINUTES * 60,
+                    "next_run_at": started + SCHEDULE_INTERVAL_MINUTES * 60,
+                    "empty_polls": 0,
+                }
+        finally:
+            with self.state_lock:
+                self.running_sources.discard(source)
+            self.wake.set()
+
+    def _reschedule(self, source, started, new_articles):
+        with self.state_lock:
+            previous = self.schedule.get(source, {})
+        empty_polls = 0 if new_articles else previous.get("empty_polls", 0) + 1
+        interval = compute_source_interval(source, empty_polls, self.db_path)
+        next_run_at = started + interval
+        conn = get_connection(self.db_path)
+        try:
+            conn.execute(
+                """
+                INSERT INTO scraper_schedule
+                    (source, interval_seconds, next_run_at, last_run_at, last_new_articles, empty_polls)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(source) DO UPDATE SET
+                    interval_seconds = excluded.interval_seconds,
+                    next_run_at = excluded.next_run_at,
+                    last_run_at = excluded.last_run_at,
+                    last_new_articles = excluded.last_new_articles,
+                    empty_polls = excluded.empty_polls
+                """,
+                (source, interval, next_run_at, started, new_articles, empty_polls),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        with self.state_lock:
+            self.schedule[source] = {
+                "interval_seconds": interval,
+                "next_run_at": next_run_at,
+                "empty_polls": empty_polls,
+            }
+        logger.info(
+            f"Scraper '{source}': {new_articles} new articles; next poll in {interval / 60:.0f} minutes."
+        )
+
+    # --- Stages ---
+
+    def _due_by_articles(self, watermark, extracted_only=False):
+        """Return the newest article id if the stage behind `watermark` is due, else None."""
+        after_id = get_watermark(watermark, db_path=self.db_path)
+        count, newest_id, oldest_waited = get_new_article_stats(after_id, extracted_only, self.db_path)
+        if count >= GROUPING_MIN_NEW_ARTICLES or (newest_id > after_id and oldest_waited):
+            return newest_id
+        return None
+
+    def _next_stage(self, now):
+        """Return (name, callable) for the stage that should run next, or None."""
+        if STREAMING_PIPELINE:
+            newest_id = self._due_by_articles(STREAM_WATERMARK)
+            if newest_id is not None:
+                return "streaming", lambda: self._run_streaming(newest_id)
+        else:
+            newest_id = self._due_by_articles(EXTRACTION_WATERMARK)
+            if newest_id is not None:
+                return "extraction", lambda: self._run_extraction(newest_id)
+            newest_id = self._due_by_articles(GROUPING_WATERMARK, extracted_only=True)
+            if newest_id is not None:
+                return "grouping", lambda: self._run_grouping(newest_id)
+
+        last_trending = get_watermark(TRENDING_WATERMARK, db_path=self.db_path)
+        if now - last_trending >= TRENDING_INTERVAL_MINUTES * 60:
+            return "trending", lambda: self._run_trending(now)
+
+        last_cleanup = get_watermark(CLEANUP_WATERMARK, db_path=self.db_path)
+        if now - last_cleanup >= CLEANUP_INTERVAL_MINUTES * 60:
+            return "cleanup", lambda: self._run_cleanup(now)
+
+        last_retention = get_watermark(RETENTION_WATERMARK, db_path=self.db_path)
+        if now - last_retention >= RETENTION_INTERVAL_HOURS * 3600:
+            return "retention", lambda: self._run_retention(now)
+        return None
+
+    def _run_streaming(self, newest_id):
+        logs = run_streaming_pipeline_headless(api_key=self.api_key, db_path=self.db_path, include_trending=False)
+        for log_msg in logs:
+            logger.info(log_msg)
+        set_watermark(STREAM_WATERMARK, newest_id, db_path=self.db_path)
+
+    def _run_extraction(self, newest_id):
+        for log_msg in run_entity_extraction_pipeline(self.api_key, self.db_path):
+            logger.info(log_msg)
+        set_watermark(EXTRACTION_WATERMARK, newest_id, db_path=self.db_path)
+
+    def _run_grouping(self, newest_id):
+        for log_msg in run_article_grouping_pipeline(self.api_key, self.db_path):
+            logger.info(log_msg)
+        set_watermark(GROUPING_WATERMARK, newest_id, db_path=self.db_path)
+
+    def _run_trending(self, now):
+        for log_msg in run_merge_and_trending_pipeline(self.api_key, self.db_path):
+            logger.info(log_msg)
+        set_watermark(TRENDING_WATERMARK, int(now), db_path=self.db_path)
+
+    def _run_cleanup(self, now):
+        schedule_regular_cleanup(db_path=self.db_path)
+        set_watermark(CLEANUP_WATERMARK, int(now), db_path=self.db_path)
+
+    def _run_retention(self, now):
+        stats = run_retention(db_path=self.db_path)
+        logger.info(
+            f"Retention moved {stats['groups']} groups, {stats['articles']} articles "
+            f"and {stats['bodies']} bodies to the archive."
+        )
+        set_watermark(RETENTION_WATERMARK, int(now), db_path=self.db_path)
+
+    def _run_stage(self, name, func):
+        with pipeline_lock(self.owner, self.db_path) as acquired:
+            if not acquired:
+                logger.info(f"Skipping '{name}' stage: another pipeline run holds the lock.")
+                return
+            started = time.time()
+            logger.info(f"--- Stage '{name}' started ---")
+            try:
+                func()
+            except Exception as e:
+                logger.exception(f"Stage '{name}' failed: {e}")
+            logger.info(f"--- Stage '{name}' finished in {time.time() - started:.2f} seconds ---")
+        self.wake.set()
+
+    def _start_due_stage(self, now):
+        if self.stage_future is not None and not self.stage_future.done():
+            # Keep the lease alive while a long stage runs
+            acquire_pipeline_lock(PIPELINE_LOCK_NAME, self.owner, PIPELINE_LOCK_TTL_SECONDS, self.db_path)
+            return
+        if not self.api_key:
+            return
+        stage = self._next_stage(now)
+        if stage:
+            self.stage_future = self.stages.submit(self._run_stage, *stage)
+
+    # --- Control ---
+
+    def tick(self):
+        """Start any due scrapers and, if no stage is running, the next due stage."""
+        now = time.time()
+        self._start_due_scrapers(now)
+        try:
+            self._start_due_stage(now)
+        except Exception as e:
+            logger.exception(f"Error checking stage triggers: {e}")
+
+    def _seconds_until_next_source(self):
+        with self.state_lock:
+            pending = [
+                entry["next_run_at"]
+                for source, entry in self.schedule.items()
+                if source in self.scraper_jobs and source not in self.running_sources
+            ]
+        if not pending:
+            return SCHEDULER_TICK_SECONDS
+        return max(0.0, min(min(pending) - time.time(), SCHEDULER_TICK_SECONDS))
+
+    def stop(self):
+        self.stop_event.set()
+        self.wake.set()
+
+    def run_forever(self):
+        if not self.api_key:
+            logger.error("CRITICAL: OpenAI API Key not found. Scrapers will run but analysis stages are skipped.")
+        logger.info(f"Scheduler started for {len(self.scraper_jobs)} sources.")
+        try:
+            while not self.stop_event.is_set():
+                self.wake.clear()
+                self.tick()
+                self.wake.wait(self._seconds_until_next_source())
+        except KeyboardInterrupt:
+            logger.info("Scheduler interrupted by user. Exiting...")
+        finally:
+            self.stop_event.set()
+            self.scrapers.shutdown(wait=False, cancel_futures=True)
+            self.stages.shutdown(wait=True, cancel_futures=True)
@@ -15,6 +15,7 @@ import re
 from email.utils import parsedate_to_datetime
 from typing import Optional, Dict, Any, List
 from news_grouping_app.db.database import DEFAULT_DB_PATH
+from news_grouping_app.utils import normalize_date
 
 
 class THNScraper:
@@ -210,7 +211,7 @@ class THNScraper:
                         INSERT OR REPLACE INTO articles (link, title, published_date, content, source)
                         VALUES (?, ?, ?, ?, ?)
             """,
-                (link, title, published_date, content, source),
+                (link, title, normalize_date(published_date), content, source),
             )
             self.conn.commit()
             self.logger.info(f"Successfully inserted article: {title}")
@@ -9,6 +9,7 @@ import sys
 from datetime import datetime
 from typing import Optional, Dict, Any, List
 from news_grouping_app.db.database import DEFAULT_DB_PATH
+from news_grouping_app.utils import normalize_date
 import logging
 
 
@@ -153,7 +154,7 @@ class SlashdotITNewsScraper:
                         (
                             entry["link"],
                             entry["title"],
-                            pub_date,
+                            normalize_date(pub_date),
                             content,
                             "slashdot_it",  # Use a consistent source name
                         ),
@@ -9,6 +9,7 @@ import sys
 import logging  # Import the logging module
 from typing import Optional, Dict, Any, List
 from news_grouping_app.db.database import DEFAULT_DB_PATH
+from news_grouping_app.utils import normalize_date
 
 
 class BleepingComputerScraper:
@@ -153,7 +154,7 @@ class BleepingComputerScraper:
                         (
                             entry["link"],
                             entry["title"],
-                            entry["published_date"],
+                            normalize_date(entry["published_date"]),
                             content,
                             "bleepingcomputer",
                         ),
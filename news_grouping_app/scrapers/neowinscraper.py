@@ -11,6 +11,7 @@ from email.utils import parsedate_to_datetime
 from typing import Optional, List, Dict, Any
 import logging
 from news_grouping_app.db.database import DEFAULT_DB_PATH
+from news_grouping_app.utils import normalize_date
 
 
 class NeowinScraper:
@@ -195,7 +196,7 @@ class NeowinScraper:
                             (
                                 article["link"],
                                 cleaned_title,
-                                pub_date,
+                                normalize_date(pub_date),
                                 content,
                                 source_name,
                             ),
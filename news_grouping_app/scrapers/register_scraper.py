@@ -9,6 +9,7 @@ import sys
 from typing import Optional, Dict, Any, List
 import logging
 from news_grouping_app.db.database import DEFAULT_DB_PATH
+from news_grouping_app.utils import normalize_date
 
 
 class RegisterScraper:
@@ -136,7 +137,7 @@ class RegisterScraper:
                         (
                             entry["link"],
                             entry["title"],
-                            entry["published_date"],
+                            normalize_date(entry["published_date"]),
                             content,
                             "register",  # Consistent source name
                         ),
@@ -5,6 +5,7 @@ from news_grouping_app.user_agents import RotatingUserAgentSession
 from bs4 import BeautifulSoup
 from typing import Optional, Dict, Any, List
 from news_grouping_app.db.database import DEFAULT_DB_PATH
+from news_grouping_app.utils import normalize_date
 import time
 import xml.etree.ElementTree as ET
 import logging
@@ -140,7 +141,7 @@ class CybersecurityScraper:
                         (
                             article["link"],
                             article["title"],
-                            article["published_date"],
+                            normalize_date(article["published_date"]),
                             article["content"],
                             source_name,
                         ),
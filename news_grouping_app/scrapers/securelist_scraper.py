@@ -7,6 +7,7 @@ from bs4 import BeautifulSoup
 import logging
 from typing import Optional, Dict, Any, List
 from news_grouping_app.db.database import DEFAULT_DB_PATH
+from news_grouping_app.utils import normalize_date
 import time
 import sys
 import re
@@ -162,7 +163,7 @@ class SecurelistProcessor:
                         INSERT OR REPLACE INTO articles (link, title, published_date, content, source)
                         VALUES (?, ?, ?, ?, ?)
                 """,
-                    (link, title, published_date, content, "securelist"),
+                    (link, title, normalize_date(published_date), content, "securelist"),
                 )
                 conn.commit()
             self.logger.info(f"Stored article: {title}")
@@ -8,6 +8,7 @@ import time
 import sys
 from typing import Optional, Dict, Any, List
 from news_grouping_app.db.database import DEFAULT_DB_PATH
+from news_grouping_app.utils import normalize_date
 import logging
 
 
@@ -136,7 +137,7 @@ class SophosNewsScraper:
                         (
                             entry["link"],
                             entry["title"],
-                            entry["published_date"],
+                            normalize_date(entry["published_date"]),
                             content,
                             "sophos",  # Consistent source name
                         ),
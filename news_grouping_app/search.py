@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+search.py
+
+Full-text search over articles (title and body) and groups (label and
+description), backed by the FTS5 tables `article_search` and `group_search`
+that setup_database() creates. Triggers keep both in sync as articles, bodies
+and groups are written; sync_search_index() indexes articles stored before
+the triggers existed.
+
+article_search is contentless: it stores the index but no text, and the
+highlights and snippets of a page are cut from that page's stored titles and
+bodies. Deleted articles leave it through trg_search_article_delete where
+SQLite supports that (3.43+), otherwise through unindex_articles() when
+archived.
+
+Results are ranked with bm25 (title and label matches weigh more) and carry
+highlighted titles and <mark>-delimited snippets. Without a since/until
+bound only the newest SEARCH_RANK_WINDOW matches are ranked, which keeps terms
+found in most articles fast; searches say when that left matches out. Queries are plain text: words must all match, "quoted phrases"
+match as phrases and a trailing * makes a prefix. Archived articles are not
+searchable.
+
+Usage:
+    python -m news_grouping_app.search --sync            # index existing articles
+    python -m news_grouping_app.search "ransomware hospital" --hours 48
+    python -m news_grouping_app.search '"zero day" chrome' --groups
+"""
+
+import argparse
+import json
+import logging
+import re
+import sqlite3
+import sys
+from functools import partial
+
+from news_grouping_app.db.database import DEFAULT_DB_PATH, SEARCH_TOKENIZER, get_article_bodies, get_connection
+
+logger = logging.getLogger(__name__)
+
+SEARCH_INDEX_BATCH_SIZE = 1000  # Articles indexed per transaction by sync_search_index
+ARTICLE_TITLE_WEIGHT = 10.0  # bm25 weights: title vs body
+GROUP_LABEL_WEIGHT = 5.0  # ...and label vs description
+SNIPPET_TOKENS = 24  # Tokens per snippet
+SEARCH_RANK_WINDOW = 5000  # Newest matches ranked by bm25 when no date bound is given
+HIGHLIGHT_OPEN, HIGHLIGHT_CLOSE, SNIPPET_ELLIPSIS = "<mark>", "</mark>", "…"
+MAX_QUERY_TERMS = 16
+
+QUERY_TOKEN_PATTERN = re.compile(r'"([^"]+)"|(\w+)(\*?)', re.UNICODE)
+
+
+def build_match_query(text):
+    """
+    Turn user input into an FTS5 MATCH expression, or None if it has no terms.
+    Every term is quoted, so FTS5 operators and syntax errors cannot leak in.
+    """
+    terms = []
+    for phrase, word, star in QUERY_TOKEN_PATTERN.findall(text or ""):
+        if phrase:
+            words = re.findall(r"\w+", phrase, re.UNICODE)
+            if words:
+                terms.append('"' + " ".join(words) + '"')
+        elif word:
+            terms.append(f'"{word}"' + star)
+    return " ".join(terms[:MAX_QUERY_TERMS]) or None
+
+
+def _filters(conditions, params, column, since, until):
+    if since:
+        conditions.append(f"{column} >= ?")
+        params.append(since)
+    if until:
+        conditions.append(f"{column} < ?")
+        params.append(until)
+
+
+def _ranked_page(cursor, table, join, conditions, params, weight, limit, offset, windowed):
+    """
+    One page of `table` matches as ([(rowid, bm25 score)], truncated), best
+    first. If `windowed`, only the newest SEARCH_RANK_WINDOW matches (by
+    rowid; more for deep pages) are ranked, and `truncated` tells whether
+    older ones were left out.
+    """
+    base = f"FROM {table} {join} WHERE {' AND '.join(conditions)}"
+    truncated = False
+    if windowed:
+        # Walking matches newest-first is cheap; scoring all of a common term is not
+        row = cursor.execute(
+            f"SELECT {table}.rowid {base} ORDER BY {table}.rowid DESC LIMIT 1 OFFSET ?",
+            params + [max(SEARCH_RANK_WINDOW, offset + limit)],
+        ).fetchone()
+        if row:
+            base += f" AND {table}.rowid > ?"
+            params = params + [row[0]]
+            truncated = True
+    page = cursor.execute(
+        f"SELECT {table}.rowid, bm25({table}, ?, 1.0) AS score {base} ORDER BY score LIMIT ? OFFSET ?",
+        [weight] + params + [limit, offset],
+    ).fetchall()
+    return page, truncated
+
+
+def _highlights(cursor, table, match, rowids):
+    """{rowid: (highlighted first column, snippet of second column)} for the given matches of `table`."""
+    placeholders = ",".join("?" for _ in rowids)
+    return {
+        rowid: (title, snippet)
+        for rowid, title, snippet in cursor.execute(
+            f"""
+            SELECT rowid, highlight({table}, 0, ?, ?), snippet({table}, 1, ?, ?, ?, ?)
+            FROM {table}
+            WHERE {table} MATCH ? AND rowid IN ({placeholders})
+            """,
+            [HIGHLIGHT_OPEN, HIGHLIGHT_CLOSE, HIGHLIGHT_OPEN, HIGHLIGHT_CLOSE, SNIPPET_ELLIPSIS, SNIPPET_TOKENS, match]
+            + list(rowids),
+        )
+    }
+
+
+def _article_highlights(cursor, match, titles, db_path):
+    """
+    Highlights for one page of articles ({article_id: title}). article_search
+    stores no text, so the page's titles and bodies are indexed in a throwaway
+    in-memory table with the same tokenizer and highlighted there.
+    """
+    bodies = get_article_bodies(list(titles), db_path, cursor=cursor)
+    page = sqlite3.connect(":memory:")
+    try:
+        page.execute(f"CREATE VIRTUAL TABLE page USING fts5(title, body, tokenize='{SEARCH_TOKENIZER}')")
+        page.executemany(
+            "INSERT INTO page (rowid, title, body) VALUES (?, ?, ?)",
+            [(article_id, title, bodies.get(article_id)) for article_id, title in titles.items()],
+        )
+        return _highlights(page.cursor(), "page", match, list(titles))
+    finally:
+        page.close()
+
+
+def search_articles(
+    cursor, match, since=None, until=None, category=None, limit=20, offset=0, db_path=str(DEFAULT_DB_PATH)
+):
+    """
+    Articles matching `match` (from build_match_query), best first. `since` and
+    `until` bound published_date; `category` keeps articles in a group of that
+    main topic. Each result lists the article's groups. Snippets are cut from
+    the bodies of db_path (or its archive). Returns (results, truncated); see
+    _ranked_page.
+    """
+    conditions, params = ["article_search MATCH ?"], [match]
+    _filters(conditions, params, "a.published_date", since, until)
+    if category:
+        conditions.append(
+            "EXISTS (SELECT 1 FROM two_phase_article_group_memberships m "
+            "JOIN two_phase_article_groups g ON g.group_id = m.group_id "
+            "WHERE m.article_id = a.id AND g.main_topic = ?)"
+        )
+        params.append(category)
+    page, truncated = _ranked_page(
+        cursor, "article_search", "JOIN articles a ON a.id = article_search.rowid",
+        conditions, params, ARTICLE_TITLE_WEIGHT, limit, offset, windowed=not (since or until),
+    )
+    if not page:
+        return [], truncated
+
+    ids = [row[0] for row in page]
+    placeholders = ",".join("?" for _ in ids)
+    articles = {
+        row[0]: row[1:]
+        for row in cursor.execute(
+            f"SELECT id, title, link, source, published_date FROM articles WHERE id IN ({placeholders})", ids
+        )
+    }
+    highlights = _article_highlights(
+        cursor, match, {article_id: article[0] for article_id, article in articles.items()}, db_path
+    )
+    groups = {}
+    for article_id, group_id, label, main_topic in cursor.execute(
+        f"""
+        SELECT m.article_id, g.group_id, g.group_label, g.main_topic
+        FROM two_phase_article_group_memberships m
+        JOIN two_phase_article_groups g ON g.group_id = m.group_id
+        WHERE m.article_id IN ({placeholders})
+        """,
+        ids,
+    ):
+        groups.setdefault(article_id, []).append(
+            {"group_id": group_id, "group_label": label, "category": main_topic}
+        )
+    results = []
+    for article_id, score in page:
+        if article_id not in articles:
+            continue
+        plain_title, link, source, published_date = articles[article_id]
+        title, snippet = highlights.get(article_id, (None, None))
+        results.append(
+            {
+                "article_id": article_id,
+                "title": title or plain_title,
+                "link": link,
+                "source": source,
+                "published_date": published_date,
+                "snippet": snippet or "",
+                "score": round(-score, 4),  # bm25 is lower-is-better
+                "groups": groups.get(article_id, []),
+            }
+        )
+    return results, truncated
+
+
+def search_groups(cursor, match, since=None, until=None, category=None, limit=20, offset=0):
+    """
+    Groups whose label or description match, best first. `since` and `until`
+    bound the latest member's publication date (group_activity). Returns
+    (results, truncated) like search_articles.
+    """
+    conditions, params = ["group_search MATCH ?"], [match]
+    _filters(conditions, params, "ga.last_article_date", since, until)
+    if category:
+        conditions.append("g.main_topic = ?")
+        params.append(category)
+    page, truncated = _ranked_page(
+        cursor, "group_search",
+        "JOIN two_phase_article_groups g ON g.group_id = group_search.rowid "
+        "LEFT JOIN group_activity ga ON ga.group_id = g.group_id",
+        conditions, params, GROUP_LABEL_WEIGHT, limit, offset, windowed=not (since or until),
+    )
+    if not page:
+        return [], truncated
+
+    ids = [row[0] for row in page]
+    placeholders = ",".join("?" for _ in ids)
+    highlights = _highlights(cursor, "group_search", match, ids)
+    groups = {
+        row[0]: row[1:]
+        for row in cursor.execute(
+            f"""
+            SELECT g.group_id, g.group_label, g.main_topic, ga.last_article_date
+            FROM two_phase_article_groups g
+            LEFT JOIN group_activity ga ON ga.group_id = g.group_id
+            WHERE g.group_id IN ({placeholders})
+            """,
+            ids,
+        )
+    }
+    results = []
+    for group_id, score in page:
+        if group_id not in groups:
+            continue
+        plain_label, main_topic, last_article_date = groups[group_id]
+        label, snippet = highlights.get(group_id, (None, None))
+        results.append(
+            {
+                "group_id": group_id,
+                "group_label": label or plain_label,
+                "category": main_topic,
+                "latest_article_date": last_article_date,
+                "snippet": snippet or "",
+                "score": round(-score, 4),
+            }
+        )
+    return results, truncated
+
+
+def _deletes_by_rowid(cursor):
+    """True if article_search was created with contentless_delete (SQLite 3.43+)."""
+    row = cursor.execute("SELECT sql FROM sqlite_master WHERE name = 'article_search'").fetchone()
+    return bool(row) and "contentless_delete" in row[0]
+
+
+def unindex_articles(cursor, article_ids, db_path=str(DEFAULT_DB_PATH)):
+    """
+    Remove articles that are about to be deleted from article_search, where
+    trg_search_article_delete cannot (no contentless_delete). The index then
+    needs the title and body it was given, so entries whose body can no longer
+    be read are left; searches join them away and article ids are not reused.
+    """
+    ids = list(article_ids)
+    if not ids or _deletes_by_rowid(cursor):
+        return
+    placeholders = ",".join("?" for _ in ids)
+    titles = cursor.execute(
+        f"""
+        SELECT a.id, a.title FROM articles a
+        WHERE a.id IN ({placeholders}) AND a.id IN (SELECT rowid FROM article_search WHERE rowid IN ({placeholders}))
+        """,
+        ids + ids,
+    ).fetchall()
+    bodies = get_article_bodies([article_id for article_id, _ in titles], db_path, cursor=cursor)
+    cursor.executemany(
+        "INSERT INTO article_search (article_search, rowid, title, body) VALUES ('delete', ?, ?, ?)",
+        [(article_id, title, bodies[article_id]) for article_id, title in titles if article_id in bodies],
+    )
+
+
+def sync_search_index(db_path=str(DEFAULT_DB_PATH)):
+    """
+    Index articles missing from article_search (stored before the search
+    triggers, or with bodies only in articles.content) and, where the index
+    supports it, drop entries whose article no longer exists. Commits per
+    batch. Returns the number indexed.
+    """
+    conn = None
+    indexed = 0
+    try:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+        if _deletes_by_rowid(cursor):
+            # Scrapers replace articles in place (INSERT OR REPLACE fires no delete trigger)
+            cursor.execute("DELETE FROM article_search WHERE rowid NOT IN (SELECT id FROM articles)")
+            conn.commit()
+        last_id = 0
+        while True:
+            rows = cursor.execute(
+                """
+                SELECT a.id, a.title FROM articles a
+                WHERE a.id > ? AND NOT EXISTS (SELECT 1 FROM article_search s WHERE s.rowid = a.id)
+                ORDER BY a.id
+                LIMIT ?
+                """,
+                (last_id, SEARCH_INDEX_BATCH_SIZE),
+            ).fetchall()
+            if not rows:
+                break
+            bodies = get_article_bodies([row[0] for row in rows], db_path, cursor=cursor)
+            cursor.executemany(
+                "INSERT INTO article_search (rowid, title, body) VALUES (?, ?, ?)",
+                [(article_id, title, bodies.get(article_id)) for article_id, title in rows],
+            )
+            conn.commit()
+            indexed += len(rows)
+            last_id = rows[-1][0]
+        if indexed:
+            cursor.execute("INSERT INTO article_search (article_search) VALUES ('optimize')")
+            conn.commit()
+            logger.info(f"Indexed {indexed} articles for full-text search.")
+    except sqlite3.Error as e:
+        logger.error(f"Error syncing search index: {e}", exc_info=True)
+        if conn and conn.in_transaction:
+            conn.rollback()
+    finally:
+        if conn:
+            conn.close()
+    return indexed
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Search articles and groups, or index existing articles.")
+    arg_parser.add_argument("query", nargs="?", help="Search terms")
+    arg_parser.add_argument("--groups", action="store_true", help="Search groups instead of articles")
+    arg_parser.add_argument("--hours", type=int, help="Only results from the last N hours")
+    arg_parser.add_argument("--category", help="Only results in this category")
+    arg_parser.add_argument("--limit", type=int, default=10)
+    arg_parser.add_argument("--sync", action="store_true", help="Index articles missing from the search index")
+    arg_parser.add_argument("--db", default=str(DEFAULT_DB_PATH), help="Path to the SQLite database")
+    args = arg_parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    if args.sync:
+        sync_search_index(args.db)
+    if not args.query:
+        return 0 if args.sync else 2
+    match = build_match_query(args.query)
+    if match is None:
+        logger.error("Query has no searchable terms.")
+        return 2
+    since = None
+    conn = get_connection(args.db)
+    try:
+        if args.hours:
+            since = conn.execute("SELECT datetime('now', ?)", (f"-{args.hours} hours",)).fetchone()[0]
+        search = search_groups if args.groups else partial(search_articles, db_path=args.db)
+        results, truncated = search(conn.cursor(), match, since=since, category=args.category, limit=args.limit)
+    finally:
+        conn.close()
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    if truncated:
+        logger.info(f"Only the newest {SEARCH_RANK_WINDOW} matches were ranked; narrow with --hours.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
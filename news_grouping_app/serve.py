@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+serve.py
+
+Production web server: the Flask app from app.create_app() under gunicorn,
+with WEB_WORKERS processes of WEB_THREADS threads each. Threaded (gthread)
+workers keep an open /api/stream from tying up a whole process. Each worker
+builds its own app after the fork, and its threads read through their own
+read-only connections. Background maintenance belongs to the pipeline process
+(main.py), so the number of workers changes nothing but request capacity.
+
+Usage:
+    python -m news_grouping_app.serve
+    python -m news_grouping_app.serve --workers 4 --threads 8 --bind 127.0.0.1:8501
+"""
+
+import argparse
+import sys
+
+from gunicorn.app.base import BaseApplication
+
+from news_grouping_app.app import create_app
+from news_grouping_app.config import WEB_BIND, WEB_THREADS, WEB_WORKERS
+from news_grouping_app.db.database import DEFAULT_DB_PATH
+
+
+class WebServer(BaseApplication):
+    """gunicorn application serving create_app(db_path) with the given settings."""
+
+    def __init__(self, db_path, options):
+        self.db_path = db_path
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return create_app(self.db_path)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Serve the API and dashboard with gunicorn.")
+    arg_parser.add_argument("--bind", default=WEB_BIND, help="host:port to listen on")
+    arg_parser.add_argument("--workers", type=int, default=WEB_WORKERS, help="Worker processes")
+    arg_parser.add_argument("--threads", type=int, default=WEB_THREADS, help="Threads per worker")
+    arg_parser.add_argument("--db", default=str(DEFAULT_DB_PATH), help="Path to the SQLite database")
+    args = arg_parser.parse_args(argv)
+
+    WebServer(
+        args.db,
+        {
+            "bind": args.bind,
+            "workers": args.workers,
+            "threads": args.threads,
+            "worker_class": "gthread",
+            "accesslog": None,
+            "errorlog": "-",
+        },
+    ).run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,345 @@
+# streaming.py
+# Staged streaming pipeline: ingest -> local (near-duplicates, CVE regex, text
+# vectors) -> LLM extraction -> article signatures -> grouping.
+#
+# Each stage is a thread reading batches of article IDs from a bounded queue and
+# writing to the next one. A full queue blocks the stage that feeds it, so a slow
+# stage (usually extraction) throttles ingest instead of buffering without limit;
+# scrapers keep writing to the database, which the ingest poller drains later.
+# Every stage is idempotent against the database (watermarks, "missing
+# extraction" and "ungrouped" queries), so work cut short by a stop is picked up
+# by the next run: ingest starts from every article that is still ungrouped.
+
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from news_grouping_app.db.database import get_connection, compact_article_bodies, DEFAULT_DB_PATH
+from news_grouping_app.config import STREAM_QUEUE_SIZE, UNIFIED_EXTRACTION
+from news_grouping_app.analysis.near_duplicates import (
+    detect_near_duplicates,
+    inherit_canonical_extractions,
+    assign_duplicates_to_canonical_groups,
+)
+from news_grouping_app.analysis.cve_extraction import process_cves_in_articles
+from news_grouping_app.analysis.text_vectors import vectorize_new_articles
+from news_grouping_app.analysis.unified_extraction import run_unified_extraction_for_all_articles
+from news_grouping_app.analysis.entity_extraction import extract_entities_for_all_articles
+from news_grouping_app.analysis.company_extraction import extract_company_names_for_all_articles
+from news_grouping_app.article_signature import generate_article_signature
+from news_grouping_app.analysis.two_phase_grouping import (
+    DYNAMIC_THRESHOLD_RULES,
+    finish_grouping_run,
+    get_ungrouped_articles_by_id,
+    group_article_batch,
+    load_grouping_state,
+)
+
+logger = logging.getLogger(__name__)
+
+STREAM_BATCH_SIZE = 20  # Articles per batch emitted by ingest
+STREAM_EXTRACTION_BATCH_SIZE = 60  # Queued batches are merged up to this size for one extraction run
+STREAM_GROUPING_BATCH_SIZE = 60
+STREAM_POLL_SECONDS = 2.0  # How often ingest looks for newly scraped articles
+_QUEUE_WAIT_SECONDS = 0.5  # Blocking queue calls wake up this often to check for a stop
+
+_END = object()  # End-of-stream marker passed down the stages
+
+
+def _new_batch(article_ids):
+    return {"article_ids": list(article_ids), "signatures": {}, "ingested_at": time.time()}
+
+
+def _merge_batches(batches):
+    merged = {"article_ids": [], "signatures": {}, "ingested_at": min(b["ingested_at"] for b in batches)}
+    for batch in batches:
+        merged["article_ids"].extend(batch["article_ids"])
+        merged["signatures"].update(batch["signatures"])
+    return merged
+
+
+class Stage(threading.Thread):
+    """
+    One pipeline stage. `handler(batch)` processes a batch (a dict with
+    "article_ids", "signatures" and "ingested_at") and may add to it; the batch
+    is then passed downstream. Batches waiting in the inbox are merged up to
+    `max_batch` articles. `on_end()` runs once after the last batch.
+    """
+
+    def __init__(self, name, handler, inbox, outbox, stop_event, max_batch=STREAM_BATCH_SIZE, on_end=None):
+        super().__init__(name=f"stream-{name}", daemon=True)
+        self.stage_name = name
+        self.handler = handler
+        self.inbox = inbox
+        self.outbox = outbox
+        self.stop_event = stop_event
+        self.max_batch = max_batch
+        self.on_end = on_end
+        self.processed = 0
+        self.busy_seconds = 0.0
+
+    def _get(self):
+        while not self.stop_event.is_set():
+            try:
+                return self.inbox.get(timeout=_QUEUE_WAIT_SECONDS)
+            except queue.Empty:
+                continue
+        return None
+
+    def _put(self, item):
+        """Blocking put that gives up if the pipeline is stopped."""
+        if self.outbox is None:
+            return True
+        while not self.stop_event.is_set():
+            try:
+                self.outbox.put(item, timeout=_QUEUE_WAIT_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _next_batch(self):
+        """Return (batch or None, reached_end)."""
+        first = self._get()
+        if first is None:
+            return None, False
+        if first is _END:
+            return None, True
+        batches = [first]
+        size = len(first["article_ids"])
+        while size < self.max_batch:
+            try:
+                item = self.inbox.get_nowait()
+            except queue.Empty:
+                break
+            if item is _END:
+                return _merge_batches(batches), True
+            batches.append(item)
+            size += len(item["article_ids"])
+        return _merge_batches(batches), False
+
+    def run(self):
+        reached_end = False
+        while not reached_end and not self.stop_event.is_set():
+            batch, reached_end = self._next_batch()
+            if batch is None:
+                continue
+            started = time.time()
+            try:
+                self.handler(batch)
+            except Exception as e:
+                # Downstream stages still get the batch; anything left undone is retried next run
+                logger.exception(f"Stage '{self.stage_name}' failed on {len(batch['article_ids'])} articles: {e}")
+            self.busy_seconds += time.time() - started
+            self.processed += len(batch["article_ids"])
+            if not self._put(batch):
+                break
+
+        if reached_end and not self.stop_event.is_set():
+            if self.on_end:
+                try:
+                    self.on_end()
+                except Exception as e:
+                    logger.exception(f"Stage '{self.stage_name}' failed while finishing: {e}")
+            self._put(_END)
+        logger.info(
+            f"Stage '{self.stage_name}' stopped after {self.processed} articles ({self.busy_seconds:.1f}s busy)."
+        )
+
+
+class StreamingPipeline:
+    """
+    Runs scraper jobs and streams the articles they store through the analysis
+    stages. Use run() for a complete pass (returns once scrapers have finished
+    and every stage has drained), or stop() from another thread to shut down
+    after the batches currently being processed.
+    """
+
+    def __init__(self, api_key, db_path=str(DEFAULT_DB_PATH), queue_size=STREAM_QUEUE_SIZE,
+                 threshold_rules=DYNAMIC_THRESHOLD_RULES):
+        self.api_key = api_key
+        self.db_path = db_path
+        self.threshold_rules = threshold_rules
+        self.stop_event = threading.Event()
+        self.scrapers_done = threading.Event()
+        self.queues = [queue.Queue(maxsize=max(1, queue_size)) for _ in range(4)]
+        self.grouping_state = None
+        self.grouping_summary = {}
+        self.latencies = []  # Seconds from ingest to grouped, per batch
+        self.ingested = 0
+
+    # --- Stage handlers ---
+
+    def _local_stage(self, batch):
+        # Watermark-driven, so each call covers this batch and anything older
+        detect_near_duplicates(db_path=self.db_path)
+        process_cves_in_articles(db_path=self.db_path)
+        vectorize_new_articles(db_path=self.db_path)
+        compact_article_bodies(db_path=self.db_path)
+
+    def _extraction_stage(self, batch):
+        if UNIFIED_EXTRACTION:
+            run_unified_extraction_for_all_articles(
+                self.api_key, db_path=self.db_path, article_ids=batch["article_ids"], batch_delay=0
+            )
+        else:
+            extract_entities_for_all_articles(self.api_key, db_path=self.db_path)
+            extract_company_names_for_all_articles(self.api_key, db_path=self.db_path)
+        inherit_canonical_extractions(db_path=self.db_path)
+
+    def _signature_stage(self, batch):
+        for article_id in batch["article_ids"]:
+            signature = generate_article_signature(article_id, self.db_path)
+            if signature:
+                batch["signatures"][article_id] = signature
+
+    def _grouping_stage(self, batch):
+        assign_duplicates_to_canonical_groups(db_path=self.db_path)
+        ungrouped_df = get_ungrouped_articles_by_id(batch["article_ids"], db_path=self.db_path)
+        if not ungrouped_df.empty:
+            summary = group_article_batch(
+                ungrouped_df,
+                self.grouping_state,
+                self.threshold_rules,
+                self.api_key,
+                self.db_path,
+                article_signatures=batch["signatures"],
+            )
+            for key, value in summary.items():
+                self.grouping_summary[key] = self.grouping_summary.get(key, 0) + value
+        latency = time.time() - batch["ingested_at"]
+        self.latencies.append(latency)
+        logger.info(f"Grouped batch of {len(batch['article_ids'])} articles {latency:.1f}s after ingest.")
+
+    def _finish_grouping(self):
+        if self.grouping_state is not None:
+            finish_grouping_run(self.grouping_state, self.api_key, self.db_path, self.grouping_summary)
+
+    # --- Ingest ---
+
+    def _ingest(self, outbox):
+        """Emit the ungrouped backlog, then poll for new articles until scrapers finish."""
+        conn = get_connection(self.db_path)
+        try:
+            backlog = [
+                row[0]
+                for row in conn.execute(
+                    """
+                    SELECT a.id FROM articles a
+                    WHERE NOT EXISTS (SELECT 1 FROM two_phase_article_group_memberships m WHERE m.article_id = a.id)
+                    ORDER BY a.id
+                    """
+                )
+            ]
+            last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM articles").fetchone()[0]
+        finally:
+            conn.close()
+        if backlog:
+            logger.info(f"Streaming {len(backlog)} ungrouped articles from earlier runs.")
+        if not self._emit(outbox, backlog):
+            return
+
+        while not self.stop_event.is_set():
+            finished = self.scrapers_done.is_set()
+            conn = get_connection(self.db_path)
+            try:
+                new_ids = [
+                    row[0] for row in conn.execute("SELECT id FROM articles WHERE id > ? ORDER BY id", (last_id,))
+                ]
+            finally:
+                conn.close()
+            if new_ids:
+                last_id = new_ids[-1]
+                if not self._emit(outbox, new_ids):
+                    return
+            elif finished:
+                break  # Scrapers were done before this poll and nothing new arrived
+            else:
+                self.scrapers_done.wait(STREAM_POLL_SECONDS)
+
+        while not self.stop_event.is_set():
+            try:
+                outbox.put(_END, timeout=_QUEUE_WAIT_SECONDS)
+                break
+            except queue.Full:
+                continue
+
+    def _emit(self, outbox, article_ids):
+        for start in range(0, len(article_ids), STREAM_BATCH_SIZE):
+            batch = _new_batch(article_ids[start : start + STREAM_BATCH_SIZE])
+            while True:
+                if self.stop_event.is_set():
+                    return False
+                try:
+                    outbox.put(batch, timeout=_QUEUE_WAIT_SECONDS)
+                    break
+                except queue.Full:
+                    continue  # Backpressure: downstream is behind
+            self.ingested += len(batch["article_ids"])
+        return True
+
+    # --- Control ---
+
+    def stop(self):
+        """Ask every stage to stop after its current batch."""
+        self.stop_event.set()
+
+    def run(self, scraper_jobs=(), max_scraper_workers=5):
+        """
+        Run `scraper_jobs` (callables that store articles) alongside the stages.
+        Returns a summary dict once everything has drained or stop() was called.
+        """
+        started = time.time()
+        # Loaded up front: it also vectorizes new articles, which the local stage does from here on
+        self.grouping_state = load_grouping_state(db_path=self.db_path)
+        q_local, q_extract, q_signature, q_group = self.queues
+        stages = [
+            Stage("local", self._local_stage, q_local, q_extract, self.stop_event),
+            Stage(
+                "extraction", self._extraction_stage, q_extract, q_signature, self.stop_event,
+                max_batch=STREAM_EXTRACTION_BATCH_SIZE,
+            ),
+            Stage("signature", self._signature_stage, q_signature, q_group, self.stop_event),
+            Stage(
+                "grouping", self._grouping_stage, q_group, None, self.stop_event,
+                max_batch=STREAM_GROUPING_BATCH_SIZE, on_end=self._finish_grouping,
+            ),
+        ]
+        for stage in stages:
+            stage.start()
+        ingest = threading.Thread(target=self._ingest, args=(q_local,), name="stream-ingest", daemon=True)
+        ingest.start()
+
+        try:
+            scraper_jobs = list(scraper_jobs)
+            if scraper_jobs:
+                with ThreadPoolExecutor(max_workers=max(1, min(max_scraper_workers, len(scraper_jobs)))) as executor:
+                    for future in [executor.submit(job) for job in scraper_jobs]:
+                        try:
+                            future.result()
+                        except Exception as e:
+                            logger.exception(f"Scraper job failed: {e}")
+            self.scrapers_done.set()
+            logger.info(f"Scrapers finished after {time.time() - started:.1f}s; draining pipeline stages.")
+            ingest.join()
+            for stage in stages:
+                while stage.is_alive():
+                    stage.join(timeout=1.0)
+        except KeyboardInterrupt:
+            logger.info("Interrupted; stopping streaming pipeline after current batches.")
+            self.stop()
+            self.scrapers_done.set()
+            for stage in stages:
+                stage.join(timeout=30)
+            raise
+
+        return {
+            "ingested": self.ingested,
+            "stopped": self.stop_event.is_set(),
+            "elapsed": time.time() - started,
+            "max_latency": max(self.latencies, default=0.0),
+            "stages": {s.stage_name: (s.processed, round(s.busy_seconds, 1)) for s in stages},
+            "grouping": dict(self.grouping_summary),
+        }
@@ -1,30 +1,130 @@
 """
 utils.py
 
-Contains generic helper functions (hashing, token counting, chunking, etc.)
-and the CVE regex from the original code.
+Contains generic helper functions (hashing, token counting, chunking, date
+normalization, etc.) and the CVE regex from the original code.
 """
 
 import re
+import math
 import hashlib
+import functools
+import logging
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from dateutil import parser as date_parser
+
+try:
+    import tiktoken
+except ImportError:  # Optional; counts fall back to the calibrated estimate below
+    tiktoken = None
+
+from news_grouping_app.config import MAX_OUTPUT_TOKENS
+
+logger = logging.getLogger(__name__)
 
 # Increase max token chunk size for faster processing
 MAX_TOKEN_CHUNK = 100000  # Increased from 70k to 100k tokens
+
+# Offline token estimate, calibrated for English news prose on OpenAI BPE
+# encodings (~4 chars or ~0.75 words per token). Numbers, URLs and CVE IDs
+# split finer, so the char ratio is set slightly below 4 and the larger of
+# the two estimates is used.
+CHARS_PER_TOKEN = 3.8
+TOKENS_PER_WORD = 1.33
+FALLBACK_SAFETY_MARGIN = 0.9  # Fraction of the input budget used when estimating
+PER_ITEM_OVERHEAD_TOKENS = 12  # "Article ID=123:\n...\n\n" label around each article
 CVE_REGEX = r"\bCVE-\d{4}-\d{4,7}\b"
+CVE_PATTERN = re.compile(CVE_REGEX)
+
+
+def _estimate_tokens_offline(text: str) -> int:
+    """Calibrated fallback: the larger of the char-based and word-based estimates."""
+    return max(
+        math.ceil(len(text) / CHARS_PER_TOKEN),
+        math.ceil(len(text.split()) * TOKENS_PER_WORD),
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _get_encoder():
+    """Load a tiktoken encoding once; None if tiktoken or its encoding files are unavailable."""
+    if tiktoken is None:
+        return None
+    for name in ("o200k_base", "cl100k_base"):
+        try:
+            return tiktoken.get_encoding(name)
+        except Exception as e:  # Encoding files are downloaded on first use
+            logger.debug(f"tiktoken encoding '{name}' unavailable: {e}")
+    logger.info("tiktoken encodings unavailable; using calibrated token estimate.")
+    return None
+
+
+def tokenizer_is_exact() -> bool:
+    """True when token counts come from a real tokenizer rather than the estimate."""
+    return _get_encoder() is not None
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken if available, else the calibrated offline estimate."""
+    if not text:
+        return 0
+    encoder = _get_encoder()
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    return _estimate_tokens_offline(text)
 
 
 def approximate_tokens(text: str) -> int:
-    """Roughly estimate tokens by counting words and multiplying by ~1.3."""
-    return int(len(text.split()) * 1.3)
+    """Token count for `text` (kept for existing callers; see count_tokens)."""
+    return count_tokens(text)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Trim `text` so that count_tokens(text) <= max_tokens."""
+    max_tokens = max(0, int(max_tokens))
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoder = _get_encoder()
+    if encoder is not None:
+        return encoder.decode(encoder.encode(text, disallowed_special=())[:max_tokens])
+    # Offline: cut proportionally, then shave until the estimate fits
+    cut = int(len(text) * max_tokens / max(1, count_tokens(text)))
+    while cut > 0 and count_tokens(text[:cut]) > max_tokens:
+        cut = int(cut * 0.95)
+    return text[:cut]
 
 
-def chunk_summaries(summaries_dict, max_token_chunk=MAX_TOKEN_CHUNK):
+def chunk_summaries(
+    summaries_dict,
+    max_token_chunk=MAX_TOKEN_CHUNK,
+    prompt_overhead_tokens=0,
+    per_item_overhead_tokens=PER_ITEM_OVERHEAD_TOKENS,
+    output_tokens_per_item=0,
+    max_output_tokens=MAX_OUTPUT_TOKENS,
+):
     """
-    Splits article summaries into chunks without exceeding max_token_chunk.
-    If a single article alone exceeds max_token_chunk, yield it alone.
+    Splits article summaries into chunks that fit one prompt.
 
-    Optimized to create larger, more efficient chunks.
+    Each chunk's input (prompt_overhead_tokens plus every article and its
+    per-item label) stays within max_token_chunk, and if output_tokens_per_item
+    is given, the expected response (items * output_tokens_per_item) stays within
+    max_output_tokens. An article too long to fit on its own is truncated to the
+    input budget rather than sent alone and overflowing. When counts come from the
+    offline estimate, the input budget is reduced by FALLBACK_SAFETY_MARGIN.
     """
+    budget = int(max_token_chunk) - int(prompt_overhead_tokens)
+    if not tokenizer_is_exact():
+        budget = int(budget * FALLBACK_SAFETY_MARGIN)
+    budget = max(budget, per_item_overhead_tokens + 1)
+    max_items = (
+        max(1, int(max_output_tokens) // int(output_tokens_per_item))
+        if output_tokens_per_item
+        else None
+    )
+
     current_chunk = {}
     current_tokens = 0
 
@@ -32,25 +132,21 @@ def chunk_summaries(summaries_dict, max_token_chunk=MAX_TOKEN_CHUNK):
     sorted_items = sorted(summaries_dict.items(), key=lambda x: len(x[1]))
 
     for link, summary in sorted_items:
-        tokens_for_article = approximate_tokens(summary)
-
-        # If this single article exceeds chunk limit, yield it alone
-        if tokens_for_article > max_token_chunk:
-            # First yield any accumulated items
-            if current_chunk:
-                yield current_chunk
-                current_chunk = {}
-                current_tokens = 0
-            # Then yield this large article alone
-            yield {link: summary}
-            continue
-
-        # If adding this article would exceed the limit, yield current chunk first
-        if current_tokens + tokens_for_article > max_token_chunk:
-            if current_chunk:
-                yield current_chunk
-                current_chunk = {}
-                current_tokens = 0
+        tokens_for_article = count_tokens(summary) + per_item_overhead_tokens
+
+        # If this single article exceeds the budget, trim it to fit
+        if tokens_for_article > budget:
+            summary = truncate_to_tokens(summary, budget - per_item_overhead_tokens)
+            tokens_for_article = count_tokens(summary) + per_item_overhead_tokens
+
+        # If adding this article would exceed either limit, yield current chunk first
+        if current_chunk and (
+            current_tokens + tokens_for_article > budget
+            or (max_items is not None and len(current_chunk) >= max_items)
+        ):
+            yield current_chunk
+            current_chunk = {}
+            current_tokens = 0
 
         # Add this article to the current chunk
         current_chunk[link] = summary
@@ -63,4 +159,99 @@ def chunk_summaries(summaries_dict, max_token_chunk=MAX_TOKEN_CHUNK):
 
 def extract_cves(text: str):
     """Extract a set of unique CVE numbers from the provided text."""
-    return set(re.findall(CVE_REGEX, text))
+    return set(CVE_PATTERN.findall(text))
+
+
+# Query parameters that only track the click and never change the target page
+TRACKING_QUERY_PARAMS = {"fbclid", "gclid", "mc_cid", "mc_eid", "ref", "ref_src"}
+
+
+def normalize_url(url: str):
+    """
+    Normalize a URL for de-duplication: lowercase scheme/host, drop "www.",
+    fragments, tracking parameters and trailing slashes.
+    Returns (normalized_url, domain), or (None, None) if it is not an http(s) URL.
+    """
+    try:
+        parts = urlsplit(url.strip())
+    except (ValueError, AttributeError):
+        return None, None
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https") or not parts.hostname:
+        return None, None
+    domain = parts.hostname.lower()
+    if domain.startswith("www."):
+        domain = domain[4:]
+    query = urlencode(
+        [
+            (k, v)
+            for k, v in parse_qsl(parts.query, keep_blank_values=True)
+            if not k.lower().startswith("utm_") and k.lower() not in TRACKING_QUERY_PARAMS
+        ]
+    )
+    path = parts.path.rstrip("/")
+    return urlunsplit(("https", domain, path, query, "")), domain
+
+
+# Dates are stored as 'YYYY-MM-DD HH:MM:SS' UTC text, which SQLite's date
+# functions parse directly
+SQLITE_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+SQLITE_DATETIME_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$")
+# RFC 822 as used by RSS: "Tue, 14 Oct 2025 13:05:00 +0000" (weekday optional)
+RFC822_DATE_PATTERN = re.compile(r"^(?:[A-Za-z]{3},\s*)?\d{1,2} [A-Za-z]{3} \d{2,4} \d{2}:\d{2}(?::\d{2})?(?: \S+)?$")
+DATE_PARSE_CACHE_SIZE = 4096  # Distinct date strings kept by the dateutil fallback
+
+
+def _format_utc(dt: datetime) -> str:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)  # Naive dates are assumed to be UTC
+    return dt.astimezone(timezone.utc).strftime(SQLITE_DATETIME_FORMAT)
+
+
+@functools.lru_cache(maxsize=DATE_PARSE_CACHE_SIZE)
+def _parse_date_string(value: str):
+    """Parse one non-canonical date string; None if unparseable. Memoized per string."""
+    # Fast paths for the two formats feeds use: ISO 8601 and RFC 822
+    try:
+        iso = value[:-1] + "+00:00" if value.endswith("Z") else value
+        return _format_utc(datetime.fromisoformat(iso))
+    except ValueError:
+        pass
+    if RFC822_DATE_PATTERN.match(value):
+        try:
+            return _format_utc(parsedate_to_datetime(value))
+        except (TypeError, ValueError, IndexError):
+            pass
+    try:
+        return _format_utc(date_parser.parse(value))
+    except (ValueError, OverflowError) as e:
+        logger.debug(f"Unparseable date '{value}': {e}")
+        return None
+
+
+def to_utc_sqlite_str(value):
+    """
+    Convert a date (string or datetime) to 'YYYY-MM-DD HH:MM:SS' UTC.
+    Returns None if it is empty or cannot be parsed.
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return _format_utc(value)
+    value = str(value).strip()
+    if not value:
+        return None
+    if SQLITE_DATETIME_PATTERN.match(value):
+        return value  # Already canonical
+    return _parse_date_string(value)
+
+
+def normalize_date(value):
+    """
+    Normalize a date for storage: 'YYYY-MM-DD HH:MM:SS' UTC, or the original
+    value if it cannot be parsed (so nothing is lost), or None if empty.
+    """
+    normalized = to_utc_sqlite_str(value)
+    if normalized is None and value:
+        return str(value)
+    return normalized